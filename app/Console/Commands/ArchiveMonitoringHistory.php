@@ -0,0 +1,68 @@
+<?php
+
+namespace App\Console\Commands;
+
+use App\Services\MonitoringArchiveService;
+use Carbon\Carbon;
+use Illuminate\Console\Command;
+use Illuminate\Support\Facades\Log;
+
+class ArchiveMonitoringHistory extends Command
+{
+    /**
+     * The name and signature of the console command.
+     *
+     * @var string
+     */
+    protected $signature = 'monitoring:archive
+                            {--month= : Archive (or re-archive) a single past month, as YYYY-MM}';
+
+    /**
+     * The console command description.
+     *
+     * @var string
+     */
+    protected $description = 'Archive completed months of rollups to compressed columnar files for long-range reports';
+
+    /**
+     * Execute the console command.
+     */
+    public function handle()
+    {
+        $archive = new MonitoringArchiveService();
+
+        if ($month = $this->option('month')) {
+            if (!preg_match('/^\d{4}-(0[1-9]|1[0-2])$/', $month)) {
+                $this->error("Invalid month {$month}, expected YYYY-MM");
+                return Command::FAILURE;
+            }
+
+            // '!' zeroes the unspecified fields, so the 31st doesn't roll e.g. 2025-02 into March
+            $start = Carbon::createFromFormat('!Y-m', $month);
+            if ($start->gte(now()->startOfMonth())) {
+                // The month is still filling: its file would stop archivePending from ever completing it
+                $this->error("{$month} is not complete yet; only past months can be archived");
+                return Command::FAILURE;
+            }
+
+            $rows = $archive->archive($start);
+            $this->info($rows > 0
+                ? "📦 Archived {$rows} buckets for {$month} to {$archive->file($start)}"
+                : "No rollups left for {$month}");
+            return Command::SUCCESS;
+        }
+
+        $months = $archive->archivePending();
+        if (empty($months)) {
+            $this->info('Nothing to archive');
+            return Command::SUCCESS;
+        }
+
+        foreach ($months as $month) {
+            $this->info("📦 Archived {$month}");
+        }
+        Log::info("Monitoring history archived", ['months' => $months]);
+
+        return Command::SUCCESS;
+    }
+}
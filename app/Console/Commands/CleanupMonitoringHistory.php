@@ -4,6 +4,9 @@
 
 use Illuminate\Console\Command;
 use App\Models\MonitoringHistory;
+use App\Models\DeviceStatusInterval;
+use App\Services\HistoryPartitionService;
+use App\Services\MonitoringRollupService;
 use Carbon\Carbon;
 
 class CleanupMonitoringHistory extends Command
@@ -13,46 +16,56 @@ class CleanupMonitoringHistory extends Command
      *
      * @var string
      */
-    protected $signature = 'monitoring:cleanup {--days=90 : Number of days to keep}';
+    protected $signature = 'monitoring:cleanup {--days= : Number of days to keep (default: monitoring.analytics.retention_days)}';
 
     /**
      * The console command description.
      *
      * @var string
      */
-    protected $description = 'Clean up old monitoring history records (default: keep last 90 days)';
+    protected $description = 'Clean up old monitoring history by dropping whole daily partitions (row DELETE on SQLite)';
 
     /**
      * Execute the console command.
      */
     public function handle()
     {
-        $days = $this->option('days');
+        $days = (int) ($this->option('days') ?: config('monitoring.analytics.retention_days', 30));
         $cutoffDate = Carbon::now()->subDays($days);
+        $partitions = new HistoryPartitionService();
         
         $this->info("Cleaning up monitoring history older than {$days} days...");
         $this->info("Cutoff date: {$cutoffDate->toDateTimeString()}");
         
-        // Count records to be deleted
-        $count = MonitoringHistory::where('checked_at', '<', $cutoffDate)->count();
+        // Partitioned: whole days to drop, no row scan. Otherwise count the rows.
+        $history = $partitions->isPartitioned()
+            ? count($partitions->expired($cutoffDate)) . ' daily partitions'
+            : MonitoringHistory::where('checked_at', '<', $cutoffDate)->count() . ' records';
+        $intervalCount = DeviceStatusInterval::where('is_open', false)->where('ended_at', '<', $cutoffDate)->count();
         
-        if ($count === 0) {
-            $this->info('No records to delete.');
-            return 0;
-        }
-        
-        $this->warn("Found {$count} records to delete.");
+        $this->warn("Found {$history} and {$intervalCount} status intervals to delete.");
         
         if (!$this->confirm('Do you want to proceed?', true)) {
             $this->info('Operation cancelled.');
             return 0;
         }
         
-        // Delete old records
-        $deleted = MonitoringHistory::where('checked_at', '<', $cutoffDate)->delete();
+        // Drop or delete old history
+        $deleted = $partitions->prune($cutoffDate);
+        $deletedIntervals = DeviceStatusInterval::where('is_open', false)->where('ended_at', '<', $cutoffDate)->delete();
+        $unit = $partitions->isPartitioned() ? 'daily partitions' : 'records';
         
-        $this->info("Successfully deleted {$deleted} monitoring history records.");
-        $this->info("Remaining records: " . MonitoringHistory::count());
+        $this->info("Successfully deleted {$deleted} monitoring history {$unit} and {$deletedIntervals} status intervals.");
+        
+        // Rollup buckets follow their own per-tier retention
+        $deletedBuckets = (new MonitoringRollupService())->prune();
+        $this->info("Pruned {$deletedBuckets} rollup buckets past their retention.");
+
+        // Partitions for the days ahead, so inserts never land in the catch-all
+        $created = $partitions->ensure();
+        if ($created > 0) {
+            $this->info("Created {$created} daily partitions ahead.");
+        }
         
         return 0;
     }
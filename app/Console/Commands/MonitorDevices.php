@@ -2,7 +2,9 @@
 
 namespace App\Console\Commands;
 
+use App\Models\Device;
 use App\Services\FastPingService;
+use App\Services\ProbeScheduler;
 use Illuminate\Console\Command;
 use Illuminate\Support\Facades\Log;
 
@@ -18,6 +20,7 @@ class MonitorDevices extends Command
                             {--timeout=1 : Ping timeout in seconds}
                             {--continuous : Run continuous monitoring}
                             {--interval=30 : Interval between checks in seconds}
+                            {--adaptive : Probe each device on its own schedule (monitoring.scheduling)}
                             {--notifications : Send notifications for status changes}';
 
     /**
@@ -41,7 +44,9 @@ public function handle()
         // Initialize ping service with options
         $this->pingService = new FastPingService();
         
-        if ($this->option('continuous')) {
+        if ($this->option('adaptive')) {
+            return $this->runAdaptiveMonitoring();
+        } elseif ($this->option('continuous')) {
             return $this->runContinuousMonitoring();
         } else {
             return $this->runSingleCheck();
@@ -141,6 +146,59 @@ private function runContinuousMonitoring()
         }
     }
 
+    /**
+     * Run adaptive monitoring: each device is probed when its own interval is
+     * up (critical/high/normal/low by SLA target, flapping and category).
+     * Devices of a tier are spread across its interval, so every tick probes
+     * a small slice instead of all devices at once.
+     * NOTE: Like --continuous this loops until stopped with Ctrl+C or the stop file.
+     */
+    private function runAdaptiveMonitoring()
+    {
+        $scheduler = new ProbeScheduler();
+        $tick = max(1, $scheduler->interval(ProbeScheduler::CRITICAL) / 5); // Probe due devices together within a tick
+        $refreshEvery = 60; // Seconds between device table reloads
+        $lastRefresh = 0;
+
+        $this->info('Starting adaptive monitoring (Ctrl+C to stop)');
+
+        while ($this->shouldContinueMonitoring()) {
+            $now = microtime(true);
+            if ($now - $lastRefresh >= $refreshEvery) {
+                $scheduler->sync(Device::where('is_active', true)->get(), $now);
+                $lastRefresh = $now;
+
+                $stats = $scheduler->stats();
+                $tiers = collect($stats['tiers'])->map(fn($count, $tier) => "{$tier}: {$count}")->implode(', ');
+                $this->info("📅 {$stats['devices']} devices scheduled ({$tiers}) - {$stats['probes_per_minute']} probes/min");
+            }
+
+            $due = $scheduler->due($now);
+            if (!empty($due)) {
+                if ($this->option('notifications')) {
+                    $this->loadPreviousStatuses();
+                }
+
+                $results = $this->pingService->pingDevices(collect(array_values($due)));
+                $scheduler->record($results, microtime(true));
+
+                $online = count(array_filter($results, fn($r) => $r['status'] === 'online'));
+                $this->line(now()->format('H:i:s') . " 📡 Probed " . count($results) . " due devices: {$online} online, " . (count($results) - $online) . " offline");
+
+                if ($this->option('notifications')) {
+                    $this->handleStatusChanges($results);
+                }
+            }
+
+            $wait = $scheduler->secondsUntilNext(microtime(true)) ?? $refreshEvery;
+            $wait = min(max($wait, $tick), max(0, $lastRefresh + $refreshEvery - microtime(true)));
+            usleep((int) ($wait * 1000000));
+        }
+
+        $this->info("\n⏹️  Monitoring stopped by external signal");
+        return Command::SUCCESS;
+    }
+
     /**
      * Check if monitoring should continue
      * Allows for external stop signals and graceful shutdown
@@ -0,0 +1,50 @@
+<?php
+
+namespace App\Console\Commands;
+
+use Illuminate\Console\Command;
+
+class ProbeDaemon extends Command
+{
+    /**
+     * The name and signature of the console command.
+     *
+     * @var string
+     */
+    protected $signature = 'devices:probe-daemon {--timeout=1 : Default seconds to wait for an echo reply}';
+
+    /**
+     * The console command description.
+     *
+     * @var string
+     */
+    protected $description = 'Run the ICMP probe daemon that Ping All and devices:ping-all talk to';
+
+    /**
+     * Execute the console command.
+     */
+    public function handle()
+    {
+        $address = config('monitoring.prober.daemon');
+        if (!$address) {
+            $this->error('monitoring.prober.daemon is not configured');
+            return Command::FAILURE;
+        }
+
+        $command = implode(' ', array_map('escapeshellarg', [
+            config('monitoring.prober.python', 'python3'), '-m', 'hostmonitor.probed',
+            '--listen', $address,
+            '--env', base_path('.env'),
+            '--timeout', (string) $this->option('timeout'),
+            '--concurrency', (string) config('monitoring.prober.concurrency', 1000),
+        ]));
+
+        $this->info("Starting probe daemon on {$address} (Ctrl+C to stop)");
+
+        // Runs in the foreground until stopped; hostmonitor.probed is found from the project root
+        chdir(base_path());
+        passthru($command, $exitCode);
+
+        return $exitCode === 0 ? Command::SUCCESS : Command::FAILURE;
+    }
+}
@@ -0,0 +1,186 @@
+<?php
+
+namespace App\Console\Commands;
+
+use App\Helpers\LatencyStats;
+use App\Jobs\CollectProbeResultsJob;
+use App\Services\EnterprisePingService;
+use App\Services\IcmpProbeService;
+use App\Services\ProbeConfirmationService;
+use App\Services\ShardCoordinator;
+use Illuminate\Console\Command;
+use Illuminate\Support\Facades\Log;
+
+class ProbeShard extends Command
+{
+    /**
+     * The name and signature of the console command.
+     *
+     * @var string
+     */
+    protected $signature = 'devices:probe-shard
+                            {--worker= : Worker id, unique across all boxes (default: hostname-pid)}
+                            {--interval= : Seconds between sweeps (default: monitoring.sharding.interval)}
+                            {--timeout=1 : Seconds to wait for an echo reply}
+                            {--status : Show live workers and their shard sizes, then exit}';
+
+    /**
+     * The console command description.
+     *
+     * @var string
+     */
+    protected $description = 'Probe this worker\'s consistent-hash shard of devices and hand results to the collector';
+
+    private $running = true;
+
+    /**
+     * Execute the console command.
+     */
+    public function handle()
+    {
+        $coordinator = new ShardCoordinator();
+
+        if ($this->option('status')) {
+            return $this->showStatus($coordinator);
+        }
+
+        $workerId = $this->option('worker') ?: gethostname() . '-' . getmypid();
+        $interval = (int) ($this->option('interval') ?: config('monitoring.sharding.interval', 30));
+        $timeout = (float) $this->option('timeout');
+        $perWorker = (int) config('monitoring.sharding.devices_per_worker', 5000);
+        $prober = new IcmpProbeService();
+        $confirmation = new ProbeConfirmationService();
+
+        if (function_exists('pcntl_async_signals')) {
+            pcntl_async_signals(true);
+            pcntl_signal(SIGTERM, fn() => $this->running = false);
+            pcntl_signal(SIGINT, fn() => $this->running = false);
+        }
+
+        $this->info("🧩 Shard worker {$workerId} probing every {$interval}s (Ctrl+C to stop)");
+
+        $lastWorkers = null;
+        try {
+            while ($this->running) {
+                $sweepStart = microtime(true);
+
+                $coordinator->heartbeat($workerId);
+                $workers = $coordinator->workers();
+                $devices = $coordinator->assignedDevices($workerId, $coordinator->ring($workers));
+
+                if ($workers !== $lastWorkers) {
+                    $this->info(now()->format('H:i:s') . " 🔀 " . count($workers) . " workers, this shard has {$devices->count()} devices");
+                    Log::info("Shard rebalanced", [
+                        'worker' => $workerId,
+                        'workers' => $workers,
+                        'devices' => $devices->count()
+                    ]);
+                    if ($devices->count() > $perWorker) {
+                        $this->warn("⚠️  Shard exceeds {$perWorker} devices; start another worker to keep sweeps short");
+                    }
+                    $lastWorkers = $workers;
+                }
+
+                if ($devices->isNotEmpty()) {
+                    $results = $this->probe($prober, $devices, $timeout);
+                    // The collector writes results as they are, so a single lost packet
+                    // must be confirmed here before it takes a device down
+                    $results = $this->confirmOffline($prober, $confirmation, $results, $devices, $timeout);
+                    CollectProbeResultsJob::dispatch($workerId, $results);
+
+                    $online = count(array_filter($results, fn($r) => in_array($r['status'], ['online', 'warning'])));
+                    $this->line(now()->format('H:i:s') . " 📡 Probed " . count($results) . " devices: {$online} online, " .
+                        (count($results) - $online) . " offline in " . round((microtime(true) - $sweepStart) * 1000) . "ms");
+                }
+
+                // Sleep in short steps so a stop signal is handled promptly
+                while ($this->running && microtime(true) - $sweepStart < $interval) {
+                    usleep(250000);
+                }
+            }
+        } finally {
+            $coordinator->leave($workerId);
+            $this->info("⏹️  Shard worker {$workerId} left; its devices move to the remaining workers");
+        }
+
+        return Command::SUCCESS;
+    }
+
+    /**
+     * One sweep over the shard, shaped like EnterprisePingService results
+     */
+    private function probe(IcmpProbeService $prober, $devices, $timeout)
+    {
+        $sweep = $prober->probe($prober->targets($devices), $timeout);
+        if ($sweep === null) {
+            // Prober unavailable: exec ping per device
+            $pingService = new EnterprisePingService();
+            return $devices->map(fn($device) => $pingService->executeOptimizedPing($device))->all();
+        }
+
+        $now = now();
+        return $devices->map(function ($device) use ($sweep, $now) {
+            $probe = $sweep[$device->ip_address] ?? ['alive' => false, 'rtt' => null];
+            $latency = LatencyStats::deviceColumns($probe['stats'] ?? null);
+            return [
+                'device_id' => $device->id,
+                'ip_address' => $device->ip_address,
+                'name' => $device->name,
+                'status' => !$probe['alive'] ? 'offline'
+                    : (LatencyStats::isDegraded($latency['jitter'], $latency['packet_loss']) ? 'warning' : 'online'),
+                'response_time' => $probe['rtt'],
+                'stats' => $probe['stats'] ?? null,
+                'timestamp' => $now,
+            ];
+        })->all();
+    }
+
+    /**
+     * Re-probe devices that were up and just missed, all in one wave.
+     * Suspects that answer any re-probe stay online.
+     */
+    private function confirmOffline(IcmpProbeService $prober, ProbeConfirmationService $confirmation, $results, $devices, $timeout)
+    {
+        $devicesById = $devices->keyBy('id');
+        $suspects = [];
+        $targets = [];
+
+        foreach ($results as $index => $result) {
+            $device = $devicesById[$result['device_id']] ?? null;
+            if ($device && $result['status'] === 'offline' && $confirmation->needsConfirmation($device->status)) {
+                $suspects[$index] = $result['ip_address'];
+                $targets[] = $device;
+            }
+        }
+
+        if (empty($suspects)) {
+            return $results;
+        }
+
+        $rtts = $confirmation->confirm($prober->targets($targets), $timeout);
+        foreach ($suspects as $index => $ip) {
+            if (($rtts[$ip] ?? null) !== null) {
+                // The sweep's stats describe the missed burst; keep the reply that answered instead
+                $results[$index]['status'] = 'online';
+                $results[$index]['response_time'] = $rtts[$ip];
+                $results[$index]['stats'] = LatencyStats::fromRtts([$rtts[$ip]], 1);
+            }
+        }
+
+        return $results;
+    }
+
+    private function showStatus(ShardCoordinator $coordinator)
+    {
+        $distribution = $coordinator->distribution();
+        if (empty($distribution)) {
+            $this->warn('No live shard workers');
+            return Command::SUCCESS;
+        }
+
+        $this->table(['Worker', 'Devices'], collect($distribution)->map(fn($count, $worker) => [$worker, $count])->values());
+        $this->info('Total: ' . array_sum($distribution) . ' devices across ' . count($distribution) . ' workers');
+
+        return Command::SUCCESS;
+    }
+}
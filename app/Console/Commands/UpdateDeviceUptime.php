@@ -2,10 +2,8 @@
 
 namespace App\Console\Commands;
 
-use App\Models\Device;
 use App\Services\DeviceUptimeService;
 use Illuminate\Console\Command;
-use Illuminate\Support\Facades\DB;
 use Illuminate\Support\Facades\Log;
 
 class UpdateDeviceUptime extends Command
@@ -50,16 +48,15 @@ public function handle()
         $uptimeService = new DeviceUptimeService();
         
             // Update all device uptimes and downtimes using the service
-        $uptimeService->updateAllDeviceUptimes();
+        $updated = $uptimeService->updateAllDeviceUptimes();
 
         $duration = round((microtime(true) - $startTime) * 1000, 2);
-            $this->info('Device uptime and downtime update completed with proper percentage calculations.');
+            $this->info("Device uptime and downtime update completed: {$updated} devices changed.");
         
         // Log to file for scheduler visibility
-        $deviceCount = Device::where('is_active', true)->count();
             Log::info("Device uptime and downtime update completed", [
             'duration_ms' => $duration,
-            'devices_updated' => $deviceCount
+            'devices_updated' => $updated
         ]);
 
         return Command::SUCCESS;
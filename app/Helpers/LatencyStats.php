@@ -0,0 +1,133 @@
+<?php
+
+namespace App\Helpers;
+
+class LatencyStats
+{
+    /**
+     * Summarise one burst of probes, in the same shape as hostmonitor.icmp's stats
+     *
+     * @param array $rtts Round-trip times in ms of the probes that were answered
+     * @param int $sent Number of probes sent
+     * @return array sent, received, loss (%), min, avg, max, stddev (ms; null when nothing answered)
+     */
+    public static function fromRtts(array $rtts, int $sent): array
+    {
+        $received = count($rtts);
+        $sent = max($sent, $received);
+        $stats = [
+            'sent' => $sent,
+            'received' => $received,
+            'loss' => $sent > 0 ? round(100 * ($sent - $received) / $sent, 1) : 100.0,
+            'min' => null,
+            'avg' => null,
+            'max' => null,
+            'stddev' => null,
+        ];
+
+        if ($received > 0) {
+            $avg = array_sum($rtts) / $received;
+            $variance = array_sum(array_map(fn($rtt) => ($rtt - $avg) ** 2, $rtts)) / $received;
+
+            $stats['min'] = min($rtts);
+            $stats['avg'] = round($avg, 3);
+            $stats['max'] = max($rtts);
+            $stats['stddev'] = round(sqrt($variance), 3); // Population deviation, as ping's mdev
+        }
+
+        return $stats;
+    }
+
+    /**
+     * Stats from the output of a multi-packet ping (Linux, macOS or Windows)
+     *
+     * Every per-reply "time=" is used rather than the summary line, whose
+     * format differs per platform (and has no deviation on Windows).
+     *
+     * @param string $output Ping output
+     * @param int $sent Packets requested, used when the output has no "transmitted"/"Sent =" count
+     * @return array|null Null when no reply times could be found
+     */
+    public static function fromPingOutput(string $output, int $sent): ?array
+    {
+        if (!preg_match_all('/time[=<]\s*(\d+\.?\d*)\s*ms/i', $output, $matches)) {
+            return null;
+        }
+
+        if (preg_match('/(\d+) packets transmitted|Sent = (\d+)/i', $output, $counts)) {
+            $sent = (int) ($counts[1] !== '' ? $counts[1] : $counts[2]);
+        }
+
+        return self::fromRtts(array_map('floatval', $matches[1]), $sent);
+    }
+
+    /**
+     * monitoring_history columns stored next to response_time (the burst average)
+     */
+    public static function historyColumns(?array $stats): array
+    {
+        return [
+            'rtt_min' => $stats['min'] ?? null,
+            'rtt_max' => $stats['max'] ?? null,
+            'jitter' => $stats['stddev'] ?? null,
+            'packet_loss' => isset($stats['loss']) ? (int) round($stats['loss']) : null,
+        ];
+    }
+
+    /**
+     * devices columns describing the latest burst
+     */
+    public static function deviceColumns(?array $stats): array
+    {
+        return [
+            'jitter' => $stats['stddev'] ?? null,
+            'packet_loss' => isset($stats['loss']) ? (int) round($stats['loss']) : null,
+        ];
+    }
+
+    /**
+     * Whether a device that answers is unhealthy enough for 'warning':
+     * jitter or packet loss at or above the monitoring.alerts thresholds
+     */
+    public static function isDegraded($jitter, $packetLoss): bool
+    {
+        return ($packetLoss !== null && $packetLoss >= config('monitoring.alerts.packet_loss_threshold', 50))
+            || ($jitter !== null && $jitter >= config('monitoring.alerts.jitter_threshold', 100));
+    }
+
+    /**
+     * Performance category from average RTT, jitter and packet loss
+     *
+     * The RTT plus twice the jitter is banded (<10ms excellent, <50 good,
+     * <100 fair), any loss costs one band and loss at the alert threshold
+     * is poor outright. Without stats this is the plain RTT banding.
+     */
+    public static function categorize($responseTime, $jitter = null, $packetLoss = null): string
+    {
+        if ($responseTime === null) {
+            return 'offline';
+        }
+
+        if ($packetLoss !== null && $packetLoss >= config('monitoring.alerts.packet_loss_threshold', 50)) {
+            return 'poor';
+        }
+
+        $bands = ['excellent', 'good', 'fair', 'poor'];
+        $effective = $responseTime + 2 * ($jitter ?? 0);
+        if ($effective < 10) {
+            $band = 0;
+        } elseif ($effective < 50) {
+            $band = 1;
+        } elseif ($effective < 100) {
+            $band = 2;
+        } else {
+            $band = 3;
+        }
+
+        if ($packetLoss > 0) {
+            $band = min($band + 1, 3);
+        }
+
+        return $bands[$band];
+    }
+}
@@ -71,6 +71,8 @@ public function stats()
                 if (DB::getSchemaBuilder()->hasTable('monitoring_history')) {
                     $historyData = DB::table('monitoring_history')
                         ->join('devices', 'monitoring_history.device_id', '=', 'devices.id')
+                        // Bounded so only the newest partitions are read
+                        ->where('monitoring_history.checked_at', '>=', now()->subHours((int) config('monitoring.history.raw_retention_hours', 48)))
                         ->orderBy('monitoring_history.checked_at', 'desc')
                         ->limit(10)
                         ->select('monitoring_history.*', 'devices.name as device_name')
@@ -9,6 +9,7 @@
 use App\Services\PingService;
 use App\Services\ActivityLogService;
 use App\Services\DeviceUptimeService;
+use App\Services\UptimeWindowService;
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\Log;
 use Illuminate\Support\Facades\Validator;
@@ -198,10 +199,13 @@ public function index(Request $request)
                 // Paginate results
                 $devices = $query->paginate($perPage);
                 
+                // 24h/7d/30d uptime from the sliding window counters, one primary-key read for the page
+                $uptimeWindows = (new UptimeWindowService())->uptime($devices->pluck('id'));
+                
                 // Transform the data to match frontend expectations
                 return [
-                    'data' => $devices->map(function ($device) {
-                        return $this->transformDevice($device);
+                    'data' => $devices->map(function ($device) use ($uptimeWindows) {
+                        return $this->transformDevice($device, $uptimeWindows->get($device->id));
                     }),
                     'pagination' => [
                         'total' => $devices->total(),
@@ -290,7 +294,9 @@ public function show($id)
                 'managers',
             ])->findOrFail($id);
 
-            return response()->json($this->transformDevice($device));
+            $uptimeWindows = (new UptimeWindowService())->uptime([$device->id]);
+
+            return response()->json($this->transformDevice($device, $uptimeWindows->get($device->id)));
         } catch (\Exception $e) {
             Log::error('Error fetching device: ' . $e->getMessage());
             return response()->json(['error' => 'Failed to fetch device'], 500);
@@ -314,6 +320,8 @@ public function store(Request $request)
                 'serial_number' => 'nullable|string|max:255',
                 'building' => 'nullable|string|max:255',
                 'is_active' => 'boolean',
+                'probe_type' => 'nullable|string|in:icmp,tcp,http,https,snmp',
+                'probe_target' => 'nullable|string|max:255',
             ]);
 
             if ($validator->fails()) {
@@ -346,6 +354,8 @@ public function store(Request $request)
                 'hardware_detail_id' => $hardwareDetail->id, // Use the created hardware_detail
                 'building' => $request->building,
                 'is_active' => $request->is_active ?? true,
+                'probe_type' => $request->probe_type ?: 'icmp',
+                'probe_target' => $request->probe_target ?: null,
                 'uptime_percentage' => 0,
             ]);
 
@@ -391,6 +401,8 @@ public function update(Request $request, $id)
                 'serial_number' => 'nullable|string|max:255',
                 'building' => 'nullable|string|max:255',
                 'is_active' => 'boolean',
+                'probe_type' => 'nullable|string|in:icmp,tcp,http,https,snmp',
+                'probe_target' => 'nullable|string|max:255',
             ]);
 
             if ($validator->fails()) {
@@ -417,7 +429,7 @@ public function update(Request $request, $id)
             $device->fill($request->only([
                 'name', 'ip_address', 'barcode', 'mac_address', 'category', 
                 'status', 'branch_id', 'location_id', 'building', 'is_active',
-                'managed_by', 'serial_number'
+                'managed_by', 'serial_number', 'probe_type', 'probe_target'
             ]));
             
             // Convert empty string to null for managed_by
@@ -792,7 +804,7 @@ public function resetUptimes()
         }
     }
 
-    private function transformDevice($device)
+    private function transformDevice($device, $uptimeWindows = null)
     {
         // Get location data
         $locationName = $device->location ? $device->location->name : ($device->building ?? '');
@@ -849,6 +861,8 @@ private function transformDevice($device)
             ] : null,
             'name' => $device->name,
             'ip_address' => $device->ip_address,
+            'probe_type' => $device->probe_type ?? 'icmp',
+            'probe_target' => $device->probe_target,
             'mac_address' => $device->mac_address,
             'barcode' => $device->barcode,
             'managed_by' => $device->managed_by,
@@ -879,6 +893,7 @@ private function transformDevice($device)
             'model' => $model,
             'uptime_percentage' => $device->getCalculatedUptimePercentage(),
             'uptime_minutes' => (int) ($device->uptime_minutes ?? 0), // Ensure it's an integer
+            'uptime_windows' => $uptimeWindows, // ['24h' => %, '7d' => %, '30d' => %] when loaded
             'is_active' => $device->is_active,
             'response_time' => $device->response_time,
             'last_check' => $device->last_ping,
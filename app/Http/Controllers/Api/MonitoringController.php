@@ -2,8 +2,13 @@
 
 namespace App\Http\Controllers\Api;
 
+use App\Helpers\LatencyStats;
 use App\Http\Controllers\Controller;
+use App\Services\DeviceStatusWriter;
 use App\Services\FastPingService;
+use App\Services\IcmpProbeService;
+use App\Services\MonitoringRollupService;
+use App\Services\StatusIntervalService;
 use App\Models\Device;
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\Log;
@@ -13,10 +18,12 @@
 class MonitoringController extends Controller
 {
     private $pingService;
+    private $prober;
 
     public function __construct(FastPingService $pingService)
     {
         $this->pingService = $pingService;
+        $this->prober = new IcmpProbeService();
     }
 
     /**
@@ -179,155 +186,19 @@ public function fastPingAll($devices)
      */
     private function batchUpdateDevices($results)
     {
+        $results = array_filter($results, fn($result) => isset($result['device']));
         if (empty($results)) {
             return;
         }
 
         $now = now();
-        $deviceIds = [];
-        $statusChanges = []; // Devices that changed status (need updated_at)
-        $onlineSinceUpdates = []; // Devices that came online
-        $offlineSinceUpdates = []; // Devices that went offline
-        $historyData = [];
-                
-                // Helper function to check if status is "online" (online or warning)
-                $isOnlineStatus = function($status) {
-                    return in_array($status, ['online', 'warning']);
-                };
-                
-        // First pass: collect all updates
-        foreach ($results as $result) {
-            if (!isset($result['device'])) {
-                continue;
-            }
-            
-            $device = $result['device'];
-            $previousStatus = $device->status;
-            $newStatus = $result['status'];
-                $wasOnline = $isOnlineStatus($previousStatus);
-            $isNowOnline = $isOnlineStatus($newStatus);
-                
-            $deviceIds[] = $device->id;
-            
-            // Track status changes
-                if ($wasOnline !== $isNowOnline) {
-                $statusChanges[] = $device->id;
-                }
-                
-            // Track online/offline transitions
-                if ($isNowOnline && !$wasOnline) {
-                $onlineSinceUpdates[] = $device->id;
-                } elseif (!$isNowOnline && $wasOnline) {
-                $offlineSinceUpdates[] = $device->id;
-            }
-            
-            // Prepare monitoring history
-            $historyData[] = [
-                'device_id' => $device->id,
-                'status' => $newStatus,
-                'response_time' => $result['response_time'] ?? null,
-                'checked_at' => $now,
-                'created_at' => $now,
-                'updated_at' => $now,
-            ];
-        }
-        
-        if (empty($deviceIds)) {
-            return;
-        }
-        
-        // Use transaction for faster, more consistent updates
-        DB::transaction(function () use ($results, $now, $statusChanges, $onlineSinceUpdates, $offlineSinceUpdates, $historyData) {
-            // Bulk update basic fields for all devices (status, response_time, last_ping)
-            // Group by status to minimize queries
-            $updatesByStatus = [];
-            foreach ($results as $result) {
-                if (!isset($result['device'])) {
-                    continue;
-                }
-                $status = $result['status'];
-                if (!isset($updatesByStatus[$status])) {
-                    $updatesByStatus[$status] = [];
-                }
-                $updatesByStatus[$status][] = [
-                    'id' => $result['device']->id,
-                    'response_time' => $result['response_time'] ?? null,
-                ];
-            }
-            
-            // Bulk update by status group
-            foreach ($updatesByStatus as $status => $deviceUpdates) {
-                $ids = array_column($deviceUpdates, 'id');
-                
-                // Update status and last_ping for all devices with this status
-                DB::table('devices')
-                    ->whereIn('id', $ids)
-                    ->update([
-                        'status' => $status,
-                        'last_ping' => $now,
-                    ]);
-                
-                // Update response_time individually (can't bulk update different values easily)
-                // But we can batch by same response_time values
-                $responseTimeGroups = [];
-                foreach ($deviceUpdates as $update) {
-                    $rt = $update['response_time'] ?? null;
-                    $key = $rt ?? 'null';
-                    if (!isset($responseTimeGroups[$key])) {
-                        $responseTimeGroups[$key] = [];
-                    }
-                    $responseTimeGroups[$key][] = $update['id'];
-                }
-                
-                foreach ($responseTimeGroups as $rt => $rtIds) {
-                    if ($rt === 'null') {
-                        DB::table('devices')
-                            ->whereIn('id', $rtIds)
-                            ->update(['response_time' => null]);
-                    } else {
-                        DB::table('devices')
-                            ->whereIn('id', $rtIds)
-                            ->update(['response_time' => $rt]);
-                    }
-                    }
-                }
-                
-            // Update updated_at for devices that changed status
-            if (!empty($statusChanges)) {
-                DB::table('devices')
-                    ->whereIn('id', $statusChanges)
-                    ->update(['updated_at' => $now]);
-            }
-            
-            // Update online_since for devices that came online
-            if (!empty($onlineSinceUpdates)) {
-                DB::table('devices')
-                    ->whereIn('id', $onlineSinceUpdates)
-                    ->update([
-                        'online_since' => $now,
-                        'offline_since' => null,
-                    ]);
-            }
-            
-            // Update offline_since for devices that went offline
-            if (!empty($offlineSinceUpdates)) {
-                DB::table('devices')
-                    ->whereIn('id', $offlineSinceUpdates)
-                    ->update([
-                        'offline_since' => $now,
-                        'online_since' => null,
-                    ]);
-            }
-            
-            // Bulk insert monitoring history
-            if (!empty($historyData)) {
-                $chunks = array_chunk($historyData, 500);
-                foreach ($chunks as $chunk) {
-                    DB::table('monitoring_history')->insert($chunk);
-            }
-        }
-        });
-        
+
+        // Statuses, response times and online/offline transitions: one statement per 1,000 devices
+        (new DeviceStatusWriter())->write($results, $now);
+
+        // History as status intervals, extended in place while a device's status holds
+        (new StatusIntervalService())->record($results, $now);
+
         // Note: Uptime updates are skipped for performance - they can be calculated later if needed
         // The uptime_percentage is calculated from monitoring history anyway
     }
@@ -346,6 +217,38 @@ private function parallelBatchPingDevices($devices, $batchSize = 200)
         // Most devices respond in 50-200ms, so 250ms is sufficient
         $pingTimeout = 250; // 250ms timeout per device for faster, more consistent pinging
         
+        // One round-trip to the probe daemon (or one prober process) covers every device
+        $sweep = $this->prober->probe($this->prober->targets($devices), ($pingTimeout + 50) / 1000);
+        if ($sweep !== null) {
+            foreach ($devices as $device) {
+                $probe = $sweep[$device->ip_address] ?? ['alive' => false, 'rtt' => null];
+                if ($probe['alive']) {
+                    $totalOnline++;
+                } else {
+                    $totalOffline++;
+                }
+                
+                $allResults[] = [
+                    'id' => $device->id,
+                    'device' => $device,
+                    'ip_address' => $device->ip_address,
+                    'status' => $probe['alive'] ? 'online' : 'offline',
+                    // Whole milliseconds like ping's "time<1ms"
+                    'response_time' => $probe['alive'] ? (int) ceil($probe['rtt']) : null,
+                    'stats' => $probe['stats'] ?? null,
+                ];
+            }
+            
+            Log::info("Parallel Batch Ping: Probed {$totalDevices} devices in one ICMP sweep, {$totalOnline} online, {$totalOffline} offline");
+            $this->batchUpdateDevices($allResults);
+            
+            return [
+                'online' => $totalOnline,
+                'offline' => $totalOffline,
+                'results' => $allResults
+            ];
+        }
+        
         $batches = $devices->chunk($batchSize);
         $batchCount = $batches->count();
         
@@ -875,7 +778,9 @@ public function pingSingleDevice($id)
             $device->recordMonitoringHistory();
 
             // Get device's recent ping history
+            // Bounded by the ring buffer length so only the newest partitions are read
             $recentHistory = \App\Models\MonitoringHistory::where('device_id', $id)
+                ->where('checked_at', '>=', now()->subHours((int) config('monitoring.history.raw_retention_hours', 48)))
                 ->orderBy('checked_at', 'desc')
                 ->limit(10)
                 ->get()
@@ -907,7 +812,11 @@ public function pingSingleDevice($id)
                     'response_time' => $result['response_time'],
                     'ping_duration' => $result['duration'],
                     'is_online' => $result['status'] === 'online',
-                    'performance' => $this->categorizePerformance($result['response_time'])
+                    'performance' => $this->categorizePerformance(
+                        $result['response_time'],
+                        $result['stats']['stddev'] ?? null,
+                        $result['stats']['loss'] ?? null
+                    )
                 ]
             ]);
         } catch (\Exception $e) {
@@ -921,21 +830,11 @@ public function pingSingleDevice($id)
     }
 
     /**
-     * Categorize ping performance
+     * Categorize ping performance from average RTT, jitter and packet loss
      */
-    private function categorizePerformance($responseTime)
+    private function categorizePerformance($responseTime, $jitter = null, $packetLoss = null)
     {
-        if ($responseTime === null) {
-            return 'offline';
-        } elseif ($responseTime < 10) {
-            return 'excellent';
-        } elseif ($responseTime < 50) {
-            return 'good';
-        } elseif ($responseTime < 100) {
-            return 'fair';
-        } else {
-            return 'poor';
-        }
+        return LatencyStats::categorize($responseTime, $jitter, $packetLoss);
     }
 
     /**
@@ -958,7 +857,9 @@ public function getPingStatus()
                         'category' => $device->category,
                         'location' => $device->location?->name,
                         'branch' => $device->branch?->name,
-                        'performance' => $this->categorizePerformance($device->response_time)
+                        'jitter' => $device->jitter,
+                        'packet_loss' => $device->packet_loss,
+                        'performance' => $this->categorizePerformance($device->response_time, $device->jitter, $device->packet_loss)
                     ];
                 });
 
@@ -1095,20 +996,18 @@ public function analytics(Request $request)
                 ->count();
             $offlineDevices = $totalDevices - $onlineDevices;
 
-            // Get recent monitoring history
-            $recentHistory = \App\Models\MonitoringHistory::where('checked_at', '>=', now()->subHours($hours))
-                ->get();
+            // Check counts and response times summed from the coarsest rollup buckets
+            $totals = (new MonitoringRollupService())->overall(now()->subHours($hours), now());
 
             // Calculate uptime percentage
-            $totalChecks = $recentHistory->count();
-            $onlineChecks = $recentHistory->where('status', 'online')->count();
-            $uptimePercentage = $totalChecks > 0 ? round(($onlineChecks / $totalChecks) * 100, 2) : 0;
+            $totalChecks = (int) ($totals->checks ?? 0);
+            $onlineChecks = (int) ($totals->online_checks ?? 0);
+            $uptimePercentage = MonitoringRollupService::uptime($totals) ?? 0;
 
             // Get response time stats
-            $responseTimes = $recentHistory->where('response_time', '>', 0)->pluck('response_time');
-            $avgResponseTime = $responseTimes->isNotEmpty() ? round($responseTimes->avg(), 2) : 0;
-            $minResponseTime = $responseTimes->isNotEmpty() ? $responseTimes->min() : 0;
-            $maxResponseTime = $responseTimes->isNotEmpty() ? $responseTimes->max() : 0;
+            $avgResponseTime = ($totals->rtt_count ?? 0) > 0 ? round($totals->rtt_sum / $totals->rtt_count, 2) : 0;
+            $minResponseTime = $totals->rtt_min ?? 0;
+            $maxResponseTime = $totals->rtt_max ?? 0;
 
             // Get device uptime breakdown
             $deviceUptime = \App\Models\Device::where('is_active', true)
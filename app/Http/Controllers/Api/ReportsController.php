@@ -4,7 +4,11 @@
 
 use App\Http\Controllers\Controller;
 use App\Models\Device;
-use App\Models\MonitoringHistory;
+use App\Services\MonitoringArchiveService;
+use App\Services\MonitoringRollupService;
+use App\Services\ReportStreamWriter;
+use App\Services\UptimeWindowService;
+use App\Services\StatusIntervalService;
 use App\Models\Alert;
 use App\Models\Branch;
 use App\Models\User;
@@ -28,6 +32,35 @@
 
 class ReportsController extends Controller
 {
+    // Sheets of each report that can be streamed
+    const STREAMED_REPORTS = [
+        'uptime' => ['uptime'],
+        'sla' => ['sla'],
+        'incidents' => ['incidents'],
+        'comprehensive' => ['uptime', 'sla', 'incidents'],
+    ];
+
+    // Title and [row key => header] columns of each streamed sheet
+    const STREAM_SHEETS = [
+        'uptime' => ['Uptime', [
+            'device' => 'Device', 'ip_address' => 'IP Address', 'category' => 'Category', 'status' => 'Status',
+            'uptime' => 'Uptime (%)', 'downtime' => 'Downtime', 'incidents' => 'Incidents',
+            'lastIncident' => 'Last Incident', 'location' => 'Location', 'managed_by' => 'Managed By',
+        ]],
+        'sla' => ['SLA', [
+            'device' => 'Device', 'ip_address' => 'IP Address', 'category' => 'Category', 'status' => 'Status',
+            'sla_target' => 'SLA Target (%)', 'actual_uptime' => 'Actual Uptime (%)',
+            'is_compliant' => 'Compliant', 'sla_violations' => 'SLA Violations',
+        ]],
+        'incidents' => ['Incidents', [
+            'deviceName' => 'Device', 'deviceIp' => 'IP Address', 'eventType' => 'Event',
+            'timestamp' => 'Timestamp', 'category' => 'Category',
+        ]],
+    ];
+
+    // Devices (or status changes) computed and written per step of a streamed report
+    const STREAM_CHUNK = 500;
+
     /**
      * Get uptime statistics for devices
      */
@@ -58,28 +91,23 @@ public function uptimeStats(Request $request)
             $devices = $devicesQuery->select('id', 'name', 'ip_address', 'category', 'status', 'uptime_percentage', 'offline_duration_minutes')
                 ->get();
             
-            // Get all monitoring history for these devices in one query
+            // 24h/7d/30d come straight from the sliding window counters, other ranges from the
+            // coarsest rollup buckets; incidents from the status intervals
             $deviceIds = $devices->pluck('id');
-            $allHistory = MonitoringHistory::whereIn('device_id', $deviceIds)
-                ->where('checked_at', '>=', $startDate)
-                ->orderBy('device_id', 'asc')
-                ->orderBy('checked_at', 'asc')
-                ->select('device_id', 'status', 'checked_at')
-                ->get()
-                ->groupBy('device_id');
-            
-            return $devices->map(function ($device) use ($allHistory, $startDate) {
-                // Get history for this specific device
-                $history = $allHistory->get($device->id, collect());
+            $endDate = Carbon::now();
+            $window = ['24hours' => '24h', '7days' => '7d', '30days' => '30d'][$dateRange] ?? null;
+            $allUptime = $window
+                ? (new UptimeWindowService())->uptime($deviceIds)->map(fn($uptime) => $uptime[$window])
+                : (new MonitoringRollupService())->totals($deviceIds, $startDate, $endDate)->map(fn($totals) => MonitoringRollupService::uptime($totals));
+            $intervalService = new StatusIntervalService();
+            $allIntervals = $intervalService->intervals($deviceIds, $startDate, $endDate);
+            
+            return $devices->map(function ($device) use ($allUptime, $allIntervals, $intervalService, $startDate) {
+                $history = $intervalService->summarize($allIntervals->get($device->id, collect()), $startDate);
                 
-                // Calculate uptime percentage from monitoring history for the selected date range
-                $uptimePercentage = 0;
-                if ($history->count() > 0) {
-                    // Count online checks vs total checks in the date range
-                    $totalChecks = $history->count();
-                    $onlineChecks = $history->where('status', 'online')->count();
-                    $uptimePercentage = round((float) (($onlineChecks / $totalChecks) * 100), 2);
-                } else {
+                // Online checks vs total checks in the date range
+                $uptimePercentage = $allUptime->get($device->id);
+                if ($uptimePercentage === null) {
                     // No history in the date range - use current status
                     // If device is currently offline, uptime should be 0% (or very low)
                     // If device is online but no history, assume 100% (newly added device)
@@ -96,26 +124,9 @@ public function uptimeStats(Request $request)
                 $downtimeMinutes = $device->offline_duration_minutes ?? 0;
                 $downtimeStr = \App\Helpers\FormatHelper::formatOfflineDuration($downtimeMinutes);
                 
-                // Count incidents (state transitions from online to offline only)
-                $incidents = 0;
-                $previousStatus = null;
-                foreach ($history as $record) {
-                    if ($previousStatus === 'online' && $record->status === 'offline') {
-                        $incidents++;
-                    }
-                    $previousStatus = $record->status;
-                }
-                
-                // Get last incident (last transition to offline)
-                $lastIncident = null;
-                $previousStatus = null;
-                foreach ($history->reverse() as $record) {
-                    if ($record->status === 'offline' && $previousStatus === 'online') {
-                        $lastIncident = $record;
-                        break;
-                    }
-                    $previousStatus = $record->status;
-                }
+                // Incidents are online-to-offline transitions; the last one is the latest
+                $incidents = $history['incidents'];
+                $lastIncident = $history['last_incident'];
                 
                 return [
                     'device' => $device->name,
@@ -125,7 +136,7 @@ public function uptimeStats(Request $request)
                     'downtime' => $downtimeStr,
                     'incidents' => $incidents,
                     'category' => $this->formatCategory($device->category),
-                    'lastIncident' => $lastIncident ? $lastIncident->checked_at->toDateString() : 'Never',
+                    'lastIncident' => $lastIncident ? $lastIncident->toDateString() : 'Never',
                 ];
             });
         });
@@ -148,43 +159,27 @@ public function deviceEvents(Request $request)
         return Cache::remember($cacheKey, 60, function () use ($branchId, $dateRange, $limit) {
             $startDate = $this->getStartDate($dateRange);
         
-        // Get all monitoring history entries
-        $allHistory = MonitoringHistory::join('devices', 'monitoring_history.device_id', '=', 'devices.id')
-            ->where('devices.branch_id', $branchId)
-            ->where('monitoring_history.checked_at', '>=', $startDate)
-            ->orderBy('monitoring_history.device_id', 'asc')
-            ->orderBy('monitoring_history.checked_at', 'asc')
-            ->select(
-                'monitoring_history.id',
-                'monitoring_history.device_id',
-                'devices.name as device_name',
-                'devices.ip_address as device_ip',
-                'devices.category',
-                'monitoring_history.status',
-                'monitoring_history.checked_at',
-                'monitoring_history.response_time'
-            )
-            ->get();
-        
-        // Filter to only status changes
-        $statusChanges = collect();
-        $lastStatus = [];
-        
-        foreach ($allHistory as $entry) {
-            $deviceId = $entry->device_id;
-            $currentStatus = $entry->status;
-            
-            // If this is the first entry for this device or status changed
-            if (!isset($lastStatus[$deviceId]) || $lastStatus[$deviceId] !== $currentStatus) {
-                $statusChanges->push($entry);
-                $lastStatus[$deviceId] = $currentStatus;
-            }
-        }
+            // Status changes are where a new status interval starts
+            $deviceIds = Device::where('branch_id', $branchId)->pluck('id');
+            $statusChanges = (new StatusIntervalService())->changes($deviceIds, $startDate, Carbon::now())
+                ->join('devices', 'device_status_intervals.device_id', '=', 'devices.id')
+                ->orderBy('device_status_intervals.started_at', 'desc')
+                ->limit($limit)
+                ->select(
+                    'device_status_intervals.id',
+                    'device_status_intervals.device_id',
+                    'devices.name as device_name',
+                    'devices.ip_address as device_ip',
+                    'devices.category',
+                    'device_status_intervals.status',
+                    'device_status_intervals.started_at as checked_at',
+                    // Average RTT over the interval
+                    DB::raw('CASE WHEN device_status_intervals.rtt_samples > 0 THEN device_status_intervals.rtt_sum / device_status_intervals.rtt_samples END as response_time')
+                )
+                ->get();
         
         // Get the most recent status changes
         $events = $statusChanges
-            ->sortByDesc('checked_at')
-            ->take($limit)
             ->map(function ($event) {
                 // checked_at should be a Carbon instance from Eloquent
                 // but handle cases where it might be a string
@@ -329,22 +324,8 @@ public function summary(Request $request)
             
             $deviceIds = $deviceIdsQuery->pluck('id');
             
-            // Count status transitions in a single query using window functions
-            $totalIncidents = DB::table('monitoring_history as mh1')
-                ->join('monitoring_history as mh2', function($join) {
-                    $join->on('mh1.device_id', '=', 'mh2.device_id')
-                         ->whereRaw('mh2.checked_at = (
-                             SELECT MAX(checked_at) 
-                             FROM monitoring_history 
-                             WHERE device_id = mh1.device_id 
-                             AND checked_at < mh1.checked_at
-                         )');
-                })
-                ->whereIn('mh1.device_id', $deviceIds)
-                ->where('mh1.checked_at', '>=', $startDate)
-                ->where('mh2.status', 'online')
-                ->where('mh1.status', 'offline')
-                ->count();
+            // Count online-to-offline transitions in a single query over the status intervals
+            $totalIncidents = (new StatusIntervalService())->incidentCount($deviceIds, $startDate);
             
             // Calculate downtime display
             $hours = floor($totalDowntimeMinutes / 60);
@@ -444,54 +425,21 @@ public function slaReport(Request $request)
             $devices = $devicesQuery->select('id', 'name', 'ip_address', 'category', 'status', 'uptime_percentage', 'sla_target', 'offline_duration_minutes')
                 ->get();
             
-            // Get all monitoring history for these devices - OPTIMIZED: Use database aggregation
+            // Check counts from the coarsest rollup buckets, incidents from the status intervals
             $deviceIds = $devices->pluck('id');
-            
-            // Get aggregated stats per device in one query
-            $historyStats = MonitoringHistory::whereIn('device_id', $deviceIds)
-                ->where('checked_at', '>=', $startDate)
-                ->where('checked_at', '<=', $endDate)
-                ->select('device_id', 'status', 'checked_at')
-                ->orderBy('device_id', 'asc')
-                ->orderBy('checked_at', 'asc')
-                ->get()
-                ->groupBy('device_id');
-            
-            // Pre-calculate uptime stats using database aggregation
-            $uptimeAggregates = MonitoringHistory::whereIn('device_id', $deviceIds)
-                ->where('checked_at', '>=', $startDate)
-                ->where('checked_at', '<=', $endDate)
-                ->select('device_id', DB::raw('COUNT(*) as total_checks'), DB::raw('SUM(CASE WHEN status = \'online\' THEN 1 ELSE 0 END) as online_checks'), DB::raw('SUM(CASE WHEN status IN (\'offline\', \'offline_ack\') THEN 1 ELSE 0 END) as offline_checks'))
-                ->groupBy('device_id')
-                ->get()
-                ->keyBy('device_id');
-            
-            // Get last status change for each device (for last incident)
-            $lastStatusChanges = MonitoringHistory::whereIn('device_id', $deviceIds)
-                ->where('checked_at', '>=', $startDate)
-                ->where('checked_at', '<=', $endDate)
-                ->select('device_id', 'status', 'checked_at')
-                ->orderBy('device_id', 'asc')
-                ->orderBy('checked_at', 'desc')
-                ->get()
-                ->groupBy('device_id')
-                ->map(function ($records) {
-                    return $records->first();
-                });
+            $allTotals = (new MonitoringRollupService())->totals($deviceIds, $startDate, $endDate);
+            $intervalService = new StatusIntervalService();
+            $allIntervals = $intervalService->intervals($deviceIds, $startDate, $endDate);
             
             // Process each device for SLA metrics - OPTIMIZED: Single pass calculation
-            $slaData = $devices->map(function ($device) use ($historyStats, $uptimeAggregates, $lastStatusChanges, $startDate, $endDate, $totalMinutes, $totalHours, $totalDays) {
-                $history = $historyStats->get($device->id, collect());
+            $slaData = $devices->map(function ($device) use ($allTotals, $allIntervals, $intervalService, $startDate, $totalMinutes) {
+                $totals = $allTotals->get($device->id);
+                $history = $intervalService->summarize($allIntervals->get($device->id, collect()), $startDate);
                 $slaTarget = $device->sla_target ?? 99.9; // Default to 99.9% if not set
                 
-                // Use pre-calculated aggregates for faster computation
-                $aggregate = $uptimeAggregates->get($device->id);
-                
                 // Calculate actual uptime percentage
-                $actualUptime = 0;
-                if ($aggregate && $aggregate->total_checks > 0) {
-                    $actualUptime = round((float) (($aggregate->online_checks / $aggregate->total_checks) * 100), 2);
-                } else {
+                $actualUptime = MonitoringRollupService::uptime($totals);
+                if ($actualUptime === null) {
                     // No history - use stored uptime or current status
                     $actualUptime = $device->uptime_percentage ?? ($device->status === 'online' ? 100 : 0);
                 }
@@ -507,8 +455,8 @@ public function slaReport(Request $request)
                 
                 // Calculate actual downtime
                 $actualDowntimeMinutes = 0;
-                if ($aggregate && $aggregate->total_checks > 0) {
-                    $actualDowntimeMinutes = ($totalMinutes * $aggregate->offline_checks) / $aggregate->total_checks;
+                if ($totals && $totals->checks > 0) {
+                    $actualDowntimeMinutes = ($totalMinutes * $totals->down_checks) / $totals->checks;
                 } else {
                     // Use stored offline duration or estimate from current status
                     if ($device->status === 'offline' || $device->status === 'offline_ack') {
@@ -521,34 +469,14 @@ public function slaReport(Request $request)
                 $downtimeViolation = max(0, $actualDowntimeMinutes - $allowedDowntimeMinutes);
                 $downtimeViolationHours = $downtimeViolation / 60;
                 
-                // Calculate incidents and MTTR - OPTIMIZED: Single pass through history
-                $incidents = 0;
-                $downtimeIncidents = [];
-                $previousStatus = null;
-                $downtimeStart = null;
-                $lastIncident = null;
+                // Incidents and outage lengths come straight from the interval transitions
+                $incidents = $history['incidents'];
+                $downtimeIncidents = $history['outages'];
+                $lastIncident = $history['last_incident'];
                 
-                // Only process history if we have it (avoid processing empty collections)
-                if ($history->count() > 0) {
-                    foreach ($history as $record) {
-                        // Track incidents
-                        if ($previousStatus === 'online' && in_array($record->status, ['offline', 'offline_ack'])) {
-                            $incidents++;
-                            $downtimeStart = $record->checked_at;
-                            $lastIncident = $record->checked_at;
-                        } elseif (in_array($previousStatus, ['offline', 'offline_ack']) && $record->status === 'online' && $downtimeStart) {
-                            $downtimeDuration = $downtimeStart->diffInMinutes($record->checked_at);
-                            $downtimeIncidents[] = $downtimeDuration;
-                            $downtimeStart = null;
-                        }
-                        $previousStatus = $record->status;
-                    }
-                    
-                    // Handle ongoing downtime
-                    if ($downtimeStart && ($device->status === 'offline' || $device->status === 'offline_ack')) {
-                        $ongoingDowntime = $downtimeStart->diffInMinutes(Carbon::now());
-                        $downtimeIncidents[] = $ongoingDowntime;
-                    }
+                // Handle ongoing downtime
+                if ($history['down_since'] && ($device->status === 'offline' || $device->status === 'offline_ack')) {
+                    $downtimeIncidents[] = $history['down_since']->diffInMinutes(Carbon::now());
                 }
                 
                 // Calculate MTTR (Mean Time To Repair) - average downtime duration
@@ -758,6 +686,13 @@ public function generate(Request $request)
         // Normalize categories
         $normalizedCategories = array_map([$this, 'normalizeCategory'], $categories);
         
+        // CSV, NDJSON and large XLSX reports stream rows as they are computed instead of building the file in memory
+        $format = $request->input('format', 'xlsx');
+        if (!$customReport && empty($emails) && isset(self::STREAMED_REPORTS[$reportType])
+            && $this->shouldStream($request, $format, $branchId, $normalizedCategories, $managedBy)) {
+            return $this->streamReport($reportType, $format, $branchId, $start, $end, $normalizedCategories, $categories, $managedBy, $reportName, $userId);
+        }
+        
         // Generate report based on type
         $reportData = null;
         $actualReportType = $customReport ? 'custom' : $reportType;
@@ -951,6 +886,229 @@ public function generate(Request $request)
         return response()->json($reportData);
     }
     
+    /**
+     * Whether to stream a report: always for CSV and NDJSON, for XLSX when
+     * asked (stream=1) or when more devices match than report_stream_threshold
+     */
+    private function shouldStream(Request $request, $format, $branchId, $categories, $managedBy)
+    {
+        if (in_array($format, ['csv', 'ndjson'])) {
+            return true;
+        }
+        if ($format !== 'xlsx') {
+            return false;
+        }
+        if ($request->boolean('stream')) {
+            return true;
+        }
+        
+        $threshold = (int) config('monitoring.performance.report_stream_threshold', 2000);
+        
+        return $threshold > 0 && $this->reportDevicesQuery($branchId, $categories, $managedBy)->count() > $threshold;
+    }
+    
+    /**
+     * Stream an uptime, SLA, incident or comprehensive report as XLSX, CSV or NDJSON.
+     *
+     * Rows are computed STREAM_CHUNK devices at a time and written straight
+     * into the response and a copy under storage/app/reports, so memory stays
+     * flat however many devices match and the download starts with the first
+     * chunk. Summary figures are tallied as rows go by and written as the last
+     * sheet; the report history entry is saved once the stream is complete.
+     */
+    private function streamReport($reportType, $format, $branchId, $start, $end, $normalizedCategories, $categories, $managedBy, $reportName, $userId)
+    {
+        $branch = $branchId ? Branch::find($branchId) : null;
+        if ($reportName) {
+            $label = preg_replace('/[^a-zA-Z0-9_-]/', '_', $reportName);
+        } else {
+            $branchName = $branch ? str_replace(' ', '_', $branch->name) : 'Unknown';
+            $label = strtoupper($reportType) . '_' . strtoupper($branchName);
+        }
+        $fileName = "LAPORAN_{$label}_" . time() . ".{$format}";
+        $filePath = storage_path("app/reports/{$fileName}");
+        
+        // Ensure directory exists
+        if (!file_exists(storage_path('app/reports'))) {
+            mkdir(storage_path('app/reports'), 0755, true);
+        }
+        
+        // Opened before the response starts, while a failure can still be reported as an error
+        $file = @fopen($filePath, 'wb');
+        if ($file === false) {
+            \Log::error("Cannot open streamed report file {$filePath}");
+            return response()->json(['error' => 'Failed to generate report file: cannot write to storage/app/reports'], 500);
+        }
+        
+        return response()->stream(function () use ($reportType, $format, $branchId, $start, $end, $normalizedCategories, $categories, $managedBy, $reportName, $userId, $filePath, $file) {
+            $writer = new ReportStreamWriter($format, [fopen('php://output', 'wb'), $file]);
+            
+            $tally = [];
+            foreach (self::STREAMED_REPORTS[$reportType] as $sheet) {
+                [$title, $columns] = self::STREAM_SHEETS[$sheet];
+                $writer->startSheet($title, $columns);
+                foreach ($this->streamedRows($sheet, $branchId, $start, $end, $normalizedCategories, $managedBy) as $rows) {
+                    foreach ($rows as $row) {
+                        $writer->writeRow($row);
+                        $this->tallyStreamedRow($tally, $sheet, $row);
+                    }
+                    $writer->flush();
+                }
+            }
+            
+            if (!isset($tally['uptime_devices']) && !isset($tally['sla_devices'])) {
+                // Incidents only: no per-device sheet to count, so count the devices the report covers
+                $tally['report_devices'] = $this->reportDevicesQuery($branchId, $normalizedCategories, $managedBy)->count();
+            }
+            $summaryStats = $this->streamedSummary($tally);
+            $writer->startSheet('Summary', ['metric' => 'Metric', 'value' => 'Value']);
+            foreach ($summaryStats as $key => $value) {
+                if (is_array($value)) {
+                    foreach ($value as $type => $count) {
+                        $writer->writeRow(['metric' => $this->formatHeaderName($key) . " ({$type})", 'value' => $count]);
+                    }
+                } else {
+                    $writer->writeRow(['metric' => $this->formatHeaderName($key), 'value' => $value]);
+                }
+            }
+            $writer->finish();
+            fclose($file);
+            
+            if (!$userId) {
+                \Log::warning('Skipping report history save - no user ID available');
+                return;
+            }
+            try {
+                ReportHistory::create([
+                    'branch_id' => $branchId,
+                    'user_id' => $userId,
+                    'report_name' => $reportName ?: $this->getReportTypeName($reportType),
+                    'report_type' => $reportType,
+                    'file_path' => $filePath,
+                    'start_date' => $start,
+                    'end_date' => $end,
+                    'categories' => $categories,
+                    'managed_by' => $managedBy,
+                    'email_sent_to' => null,
+                    'file_size' => filesize($filePath),
+                    'summary_stats' => $summaryStats,
+                ]);
+            } catch (\Exception $e) {
+                \Log::error('Error saving streamed report to history: ' . $e->getMessage());
+            }
+        }, 200, [
+            'Content-Type' => ReportStreamWriter::CONTENT_TYPES[$format],
+            'Content-Disposition' => 'attachment; filename="' . $fileName . '"',
+            'Cache-Control' => 'no-cache, no-store, must-revalidate',
+            'Pragma' => 'no-cache',
+            'Expires' => '0',
+            'X-Accel-Buffering' => 'no', // Keep nginx from buffering the whole download
+        ]);
+    }
+    
+    /**
+     * Rows of an uptime, SLA or incident sheet, yielded STREAM_CHUNK at a time.
+     *
+     * Devices are read by id in chunks, and each chunk's range totals (and,
+     * for uptime, status intervals) are fetched for just those devices, so
+     * nothing scales with the total number of devices.
+     */
+    private function streamedRows($sheet, $branchId, $start, $end, $categories, $managedBy)
+    {
+        if ($sheet === 'incidents') {
+            $deviceIds = $this->reportDevicesQuery($branchId, $categories, $managedBy)->select('id');
+            $events = $this->statusChangesQuery($deviceIds, $start, $end)->lazy(self::STREAM_CHUNK);
+            foreach ($events->chunk(self::STREAM_CHUNK) as $chunk) {
+                yield $chunk->map(fn($event) => $this->incidentRow($event));
+            }
+            return;
+        }
+        
+        $devices = $this->reportDevicesQuery($branchId, $categories, $managedBy)
+            ->when($sheet === 'uptime', fn($query) => $query->with(['location.locationFolder', 'managedBy', 'managers']))
+            ->select('id', 'name', 'ip_address', 'category', 'status', 'uptime_percentage', 'sla_target', 'offline_duration_minutes', 'location_id', 'managed_by');
+        $archive = new MonitoringArchiveService();
+        $intervalService = new StatusIntervalService();
+        
+        foreach ($devices->lazyById(self::STREAM_CHUNK)->chunk(self::STREAM_CHUNK) as $chunk) {
+            $deviceIds = $chunk->pluck('id');
+            // Rollups, falling back to the monthly archive for ranges older than they keep
+            $allTotals = $archive->rangeTotals($deviceIds, $start, $end);
+            
+            if ($sheet === 'sla') {
+                yield $chunk->map(fn($device) => $this->slaRow($device, $allTotals->get($device->id)));
+                continue;
+            }
+            
+            $allIntervals = $intervalService->intervals($deviceIds, $start, $end);
+            yield $chunk->map(function ($device) use ($allTotals, $allIntervals, $intervalService, $start) {
+                $history = $intervalService->summarize($allIntervals->get($device->id, collect()), $start);
+                return $this->uptimeRow($device, $allTotals->get($device->id), $history);
+            });
+        }
+    }
+    
+    /**
+     * Add a streamed row to the running counts, sums and per-category device counts
+     */
+    private function tallyStreamedRow(array &$tally, $sheet, $row)
+    {
+        $add = function ($key, $amount = 1) use (&$tally) {
+            $tally[$key] = ($tally[$key] ?? 0) + $amount;
+        };
+        
+        if ($sheet === 'incidents') {
+            $add('total_incidents');
+            $add("incidents_{$row['eventType']}");
+        } elseif ($sheet === 'sla') {
+            $add('sla_devices');
+            $add('sla_sum', $row['actual_uptime']);
+            $add('sla_violations', $row['sla_violations']);
+            $add('sla_compliant_devices', $row['actual_uptime'] >= 99 ? 1 : 0);
+        } else {
+            $add('uptime_devices');
+            $add('uptime_sum', $row['uptime']);
+            $add('downtime_minutes', $row['downtime_minutes'] ?? 0);
+            $category = $row['category'] ?? 'unknown';
+            $tally['devices_by_category'][$category] = ($tally['devices_by_category'][$category] ?? 0) + 1;
+            $status = strtolower($row['status'] ?? 'unknown');
+            $add('devices_online', $status === 'online' ? 1 : 0);
+            $add('devices_offline', in_array($status, ['offline', 'offline_ack']) ? 1 : 0);
+            $add('devices_warning', $status === 'warning' ? 1 : 0);
+        }
+    }
+    
+    /**
+     * Summary figures from the tally, in calculateSummaryStats' keys
+     */
+    private function streamedSummary(array $tally)
+    {
+        $stats = ['total_devices' => $tally['uptime_devices'] ?? $tally['sla_devices'] ?? $tally['report_devices'] ?? 0];
+        if (isset($tally['uptime_devices'])) {
+            $stats['avg_uptime'] = round($tally['uptime_sum'] / $tally['uptime_devices'], 2);
+            foreach (['devices_online', 'devices_offline', 'devices_warning'] as $key) {
+                $stats[$key] = $tally[$key];
+            }
+            $stats['total_downtime_minutes'] = round($tally['downtime_minutes'], 2);
+            $stats['avg_downtime_minutes'] = round($tally['downtime_minutes'] / $tally['uptime_devices'], 2);
+            $stats['devices_by_category'] = $tally['devices_by_category'];
+        }
+        if (isset($tally['sla_devices'])) {
+            $stats['avg_sla'] = round($tally['sla_sum'] / $tally['sla_devices'], 2);
+            $stats['sla_compliant_devices'] = $tally['sla_compliant_devices'];
+            $stats['sla_violations'] = $tally['sla_violations'];
+        }
+        if (isset($tally['total_incidents'])) {
+            $stats['total_incidents'] = $tally['total_incidents'];
+            $stats['incidents_by_type'] = [
+                'up' => $tally['incidents_up'] ?? 0,
+                'down' => $tally['incidents_down'] ?? 0,
+            ];
+        }
+        
+        return $stats;
+    }
+    
     /**
      * Generate XLSX file from report data with nice formatting
      */
@@ -2528,115 +2686,21 @@ private function getReportTypeName($reportType)
      */
     private function generateUptimeReport($branchId, $start, $end, $categories, $managedBy = null)
     {
-        $devicesQuery = Device::where('branch_id', $branchId)
-            ->where('is_active', true);
-        
-        // Filter by multiple categories
-        if (!empty($categories) && is_array($categories)) {
-            $devicesQuery->whereIn('category', $categories);
-        }
-        
-        // Filter by managed_by if provided (can be array or single value)
-        if ($managedBy) {
-            $managedByArray = is_array($managedBy) ? $managedBy : [$managedBy];
-            $devicesQuery->where(function ($q) use ($managedByArray) {
-                $q->whereIn('managed_by', $managedByArray)
-                  ->orWhereHas('managers', function ($mq) use ($managedByArray) {
-                      $mq->whereIn('users.id', $managedByArray);
-                  });
-            });
-        }
+        $devicesQuery = $this->reportDevicesQuery($branchId, $categories, $managedBy);
         
         $devices = $devicesQuery->with(['location.locationFolder', 'managedBy', 'managers'])
             ->select('id', 'name', 'ip_address', 'category', 'status', 'uptime_percentage', 'offline_duration_minutes', 'location_id', 'managed_by')
             ->get();
         
         $deviceIds = $devices->pluck('id');
-        $allHistory = MonitoringHistory::whereIn('device_id', $deviceIds)
-            ->where('checked_at', '>=', $start)
-            ->where('checked_at', '<=', $end)
-            ->orderBy('device_id', 'asc')
-            ->orderBy('checked_at', 'asc')
-            ->select('device_id', 'status', 'checked_at')
-            ->get()
-            ->groupBy('device_id');
-        
-        $reportData = $devices->map(function ($device) use ($allHistory, $start, $end) {
-            $history = $allHistory->get($device->id, collect());
-            
-            $uptimePercentage = 0;
-            if ($history->count() > 0) {
-                // Calculate from actual monitoring history in the date range
-                $totalChecks = $history->count();
-                $onlineChecks = $history->where('status', 'online')->count();
-                $uptimePercentage = round((float) (($onlineChecks / $totalChecks) * 100), 2);
-                
-                // If device is currently offline and all checks in range are offline, ensure 0%
-                if (($device->status === 'offline' || $device->status === 'offline_ack') && $onlineChecks === 0) {
-                    $uptimePercentage = 0;
-                }
-            } else {
-                // No history in date range - use current device status
-                // If device is offline, uptime should be 0% regardless of stored value
-                if ($device->status === 'offline' || $device->status === 'offline_ack') {
-                    $uptimePercentage = 0;
-                } else {
-                    // Device is online but no history - could be newly added or no checks in range
-                    // Only use stored percentage if device is actually online
-                    $uptimePercentage = ($device->status === 'online') ? ($device->uptime_percentage ?? 100) : 0;
-                }
-            }
-            
-            $downtimeMinutes = $device->offline_duration_minutes ?? 0;
-            $downtimeStr = \App\Helpers\FormatHelper::formatOfflineDuration($downtimeMinutes);
-            
-            $incidents = 0;
-            $previousStatus = null;
-            $lastIncident = null;
-            foreach ($history as $record) {
-                if ($previousStatus === 'online' && $record->status === 'offline') {
-                    $incidents++;
-                    $lastIncident = $record->checked_at;
-                }
-                $previousStatus = $record->status;
-            }
-            
-            // Get location path (folder > location)
-            $locationPath = 'N/A';
-            if ($device->location) {
-                $parts = [];
-                if ($device->location->locationFolder) {
-                    $parts[] = $device->location->locationFolder->name;
-                }
-                $parts[] = $device->location->name;
-                $locationPath = implode(' > ', $parts);
-            }
-            
-            // Get managed by name
-            $managedByName = 'N/A';
-            if ($device->managedBy) {
-                $managedByName = $device->managedBy->name;
-            } elseif ($device->managers && $device->managers->count() > 0) {
-                $managedByName = $device->managers->pluck('name')->join(', ');
-            }
-            
-            return [
-                'device' => $device->name,
-                'ip_address' => $device->ip_address,
-                'category' => $this->formatCategory($device->category),
-                'status' => $device->status,
-                'uptime' => round($uptimePercentage, 2),
-                'uptime_percentage' => round($uptimePercentage, 2), // Also include for compatibility
-                'downtime' => $downtimeStr,
-                'downtime_minutes' => $downtimeMinutes, // Include raw minutes for summary calculation
-                'incidents' => $incidents,
-                'lastIncident' => $lastIncident ? $lastIncident->toDateString() : 'Never',
-                'location' => $locationPath,
-                'location_id' => $device->location_id,
-                'location_folder_id' => $device->location?->location_folder_id,
-                'managed_by' => $managedByName,
-                'managed_by_id' => $device->managed_by,
-            ];
+        // Rollups, falling back to the monthly archive for ranges older than they keep
+        $allTotals = (new MonitoringArchiveService())->rangeTotals($deviceIds, $start, $end);
+        $intervalService = new StatusIntervalService();
+        $allIntervals = $intervalService->intervals($deviceIds, $start, $end);
+        
+        $reportData = $devices->map(function ($device) use ($allTotals, $allIntervals, $intervalService, $start) {
+            $history = $intervalService->summarize($allIntervals->get($device->id, collect()), $start);
+            return $this->uptimeRow($device, $allTotals->get($device->id), $history);
         });
         
         // Calculate grouped summaries
@@ -2659,82 +2723,17 @@ private function generateUptimeReport($branchId, $start, $end, $categories, $man
      */
     private function generateSlaReport($branchId, $start, $end, $categories, $managedBy = null)
     {
-        $devicesQuery = Device::where('branch_id', $branchId)
-            ->where('is_active', true);
-        
-        // Filter by multiple categories
-        if (!empty($categories) && is_array($categories)) {
-            $devicesQuery->whereIn('category', $categories);
-        }
-        
-        // Filter by managed_by if provided (can be array or single value)
-        if ($managedBy) {
-            $managedByArray = is_array($managedBy) ? $managedBy : [$managedBy];
-            $devicesQuery->where(function ($q) use ($managedByArray) {
-                $q->whereIn('managed_by', $managedByArray)
-                  ->orWhereHas('managers', function ($mq) use ($managedByArray) {
-                      $mq->whereIn('users.id', $managedByArray);
-                  });
-            });
-        }
+        $devicesQuery = $this->reportDevicesQuery($branchId, $categories, $managedBy);
         
         $devices = $devicesQuery->select('id', 'name', 'ip_address', 'category', 'status', 'uptime_percentage', 'sla_target', 'offline_duration_minutes')
             ->get();
         
         $deviceIds = $devices->pluck('id');
-        $totalMinutes = $end->diffInMinutes($start);
         
-        $uptimeAggregates = MonitoringHistory::whereIn('device_id', $deviceIds)
-            ->where('checked_at', '>=', $start)
-            ->where('checked_at', '<=', $end)
-            ->select('device_id', DB::raw('COUNT(*) as total_checks'), DB::raw('SUM(CASE WHEN status = \'online\' THEN 1 ELSE 0 END) as online_checks'))
-            ->groupBy('device_id')
-            ->get()
-            ->keyBy('device_id');
+        // Rollups, falling back to the monthly archive for ranges older than they keep
+        $allTotals = (new MonitoringArchiveService())->rangeTotals($deviceIds, $start, $end);
         
-        $slaData = $devices->map(function ($device) use ($uptimeAggregates, $totalMinutes) {
-            $slaTarget = $device->sla_target ?? 99.9;
-            $aggregate = $uptimeAggregates->get($device->id);
-            
-            $actualUptime = 0;
-            if ($aggregate && $aggregate->total_checks > 0) {
-                $actualUptime = round((float) (($aggregate->online_checks / $aggregate->total_checks) * 100), 2);
-                
-                // If device is currently offline and all checks in range are offline, ensure 0%
-                if (($device->status === 'offline' || $device->status === 'offline_ack') && $aggregate->online_checks === 0) {
-                    $actualUptime = 0;
-                }
-            } else {
-                // No history in date range - use current device status
-                // If device is offline, uptime should be 0% regardless of stored value
-                if ($device->status === 'offline' || $device->status === 'offline_ack') {
-                    $actualUptime = 0;
-                } else {
-                    // Device is online but no history - use stored percentage or default to 100%
-                    $actualUptime = ($device->status === 'online') ? ($device->uptime_percentage ?? 100) : 0;
-                }
-            }
-            
-            $isCompliant = $actualUptime >= $slaTarget;
-            
-            // Calculate MTTR and MTBF (simplified)
-            $mttrHours = 0;
-            $mtbfDays = 0;
-            
-            return [
-                'device' => $device->name,
-                'ip_address' => $device->ip_address,
-                'category' => $this->formatCategory($device->category),
-                'status' => $device->status,
-                'sla_target' => round($slaTarget, 2),
-                'actual_uptime' => round($actualUptime, 2),
-                'sla_compliance' => round($actualUptime, 2), // Also include for compatibility
-                'is_compliant' => $isCompliant,
-                'mttr_hours' => round($mttrHours, 2),
-                'mtbf_days' => round($mtbfDays, 2),
-                'sla_violations' => $isCompliant ? 0 : 1,
-            ];
-        });
+        $slaData = $devices->map(fn($device) => $this->slaRow($device, $allTotals->get($device->id)));
         
         return response()->json(['devices' => $slaData]);
     }
@@ -2743,6 +2742,23 @@ private function generateSlaReport($branchId, $start, $end, $categories, $manage
      * Generate incident report for custom date range
      */
     private function generateIncidentReport($branchId, $start, $end, $categories, $managedBy = null)
+    {
+        $devicesQuery = $this->reportDevicesQuery($branchId, $categories, $managedBy);
+        
+        $deviceIds = $devicesQuery->pluck('id');
+        
+        // Status changes are where a new status interval starts
+        $statusChanges = $this->statusChangesQuery($deviceIds, $start, $end)->get();
+        
+        $events = $statusChanges->map(fn($event) => $this->incidentRow($event));
+        
+        return response()->json(['events' => $events]);
+    }
+    
+    /**
+     * Active devices of a branch, filtered by category and manager (managed_by or the managers relation)
+     */
+    private function reportDevicesQuery($branchId, $categories, $managedBy = null)
     {
         $devicesQuery = Device::where('branch_id', $branchId)
             ->where('is_active', true);
@@ -2763,49 +2779,158 @@ private function generateIncidentReport($branchId, $start, $end, $categories, $m
             });
         }
         
-        $deviceIds = $devicesQuery->pluck('id');
+        return $devicesQuery;
+    }
+    
+    /**
+     * Uptime report row for a device, from its range totals and StatusIntervalService::summarize figures
+     */
+    private function uptimeRow($device, $totals, $history)
+    {
+        $uptimePercentage = 0;
+        if ($totals && $totals->checks > 0) {
+            // Calculate from actual monitoring history in the date range
+            $uptimePercentage = MonitoringRollupService::uptime($totals);
+            
+            // If device is currently offline and all checks in range are offline, ensure 0%
+            if (($device->status === 'offline' || $device->status === 'offline_ack') && $totals->online_checks == 0) {
+                $uptimePercentage = 0;
+            }
+        } else {
+            // No history in date range - use current device status
+            // If device is offline, uptime should be 0% regardless of stored value
+            if ($device->status === 'offline' || $device->status === 'offline_ack') {
+                $uptimePercentage = 0;
+            } else {
+                // Device is online but no history - could be newly added or no checks in range
+                // Only use stored percentage if device is actually online
+                $uptimePercentage = ($device->status === 'online') ? ($device->uptime_percentage ?? 100) : 0;
+            }
+        }
         
-        $allHistory = MonitoringHistory::join('devices', 'monitoring_history.device_id', '=', 'devices.id')
-            ->whereIn('monitoring_history.device_id', $deviceIds)
-            ->where('monitoring_history.checked_at', '>=', $start)
-            ->where('monitoring_history.checked_at', '<=', $end)
-            ->orderBy('monitoring_history.device_id', 'asc')
-            ->orderBy('monitoring_history.checked_at', 'asc')
-            ->select(
-                'monitoring_history.id',
-                'monitoring_history.device_id',
-                'devices.name as device_name',
-                'devices.ip_address as device_ip',
-                'devices.category',
-                'monitoring_history.status',
-                'monitoring_history.checked_at'
-            )
-            ->get();
+        $downtimeMinutes = $device->offline_duration_minutes ?? 0;
+        $downtimeStr = \App\Helpers\FormatHelper::formatOfflineDuration($downtimeMinutes);
+        
+        $incidents = $history['incidents'];
+        $lastIncident = $history['last_incident'];
         
-        $statusChanges = collect();
-        $lastStatus = [];
+        // Get location path (folder > location)
+        $locationPath = 'N/A';
+        if ($device->location) {
+            $parts = [];
+            if ($device->location->locationFolder) {
+                $parts[] = $device->location->locationFolder->name;
+            }
+            $parts[] = $device->location->name;
+            $locationPath = implode(' > ', $parts);
+        }
+        
+        // Get managed by name
+        $managedByName = 'N/A';
+        if ($device->managedBy) {
+            $managedByName = $device->managedBy->name;
+        } elseif ($device->managers && $device->managers->count() > 0) {
+            $managedByName = $device->managers->pluck('name')->join(', ');
+        }
         
-        foreach ($allHistory as $entry) {
-            $deviceId = $entry->device_id;
-            $currentStatus = $entry->status;
+        return [
+            'device' => $device->name,
+            'ip_address' => $device->ip_address,
+            'category' => $this->formatCategory($device->category),
+            'status' => $device->status,
+            'uptime' => round($uptimePercentage, 2),
+            'uptime_percentage' => round($uptimePercentage, 2), // Also include for compatibility
+            'downtime' => $downtimeStr,
+            'downtime_minutes' => $downtimeMinutes, // Include raw minutes for summary calculation
+            'incidents' => $incidents,
+            'lastIncident' => $lastIncident ? $lastIncident->toDateString() : 'Never',
+            'location' => $locationPath,
+            'location_id' => $device->location_id,
+            'location_folder_id' => $device->location?->location_folder_id,
+            'managed_by' => $managedByName,
+            'managed_by_id' => $device->managed_by,
+        ];
+    }
+    
+    /**
+     * SLA report row for a device, from its range totals
+     */
+    private function slaRow($device, $totals)
+    {
+        $slaTarget = $device->sla_target ?? 99.9;
+        
+        $actualUptime = 0;
+        if ($totals && $totals->checks > 0) {
+            $actualUptime = MonitoringRollupService::uptime($totals);
             
-            if (!isset($lastStatus[$deviceId]) || $lastStatus[$deviceId] !== $currentStatus) {
-                $statusChanges->push($entry);
-                $lastStatus[$deviceId] = $currentStatus;
+            // If device is currently offline and all checks in range are offline, ensure 0%
+            if (($device->status === 'offline' || $device->status === 'offline_ack') && $totals->online_checks == 0) {
+                $actualUptime = 0;
+            }
+        } else {
+            // No history in date range - use current device status
+            // If device is offline, uptime should be 0% regardless of stored value
+            if ($device->status === 'offline' || $device->status === 'offline_ack') {
+                $actualUptime = 0;
+            } else {
+                // Device is online but no history - use stored percentage or default to 100%
+                $actualUptime = ($device->status === 'online') ? ($device->uptime_percentage ?? 100) : 0;
             }
         }
         
-        $events = $statusChanges->map(function ($event) {
-            return [
-                'deviceName' => $event->device_name ?? 'Unknown',
-                'deviceIp' => $event->device_ip ?? 'N/A',
-                'eventType' => ($event->status === 'online' || $event->status === 'warning') ? 'up' : 'down',
-                'timestamp' => Carbon::parse($event->checked_at)->toIso8601String(),
-                'category' => $this->formatCategory($event->category ?? 'switches'),
-            ];
-        });
+        $isCompliant = $actualUptime >= $slaTarget;
         
-        return response()->json(['events' => $events]);
+        // Calculate MTTR and MTBF (simplified)
+        $mttrHours = 0;
+        $mtbfDays = 0;
+        
+        return [
+            'device' => $device->name,
+            'ip_address' => $device->ip_address,
+            'category' => $this->formatCategory($device->category),
+            'status' => $device->status,
+            'sla_target' => round($slaTarget, 2),
+            'actual_uptime' => round($actualUptime, 2),
+            'sla_compliance' => round($actualUptime, 2), // Also include for compatibility
+            'is_compliant' => $isCompliant,
+            'mttr_hours' => round($mttrHours, 2),
+            'mtbf_days' => round($mtbfDays, 2),
+            'sla_violations' => $isCompliant ? 0 : 1,
+        ];
+    }
+    
+    /**
+     * Status changes in [$start, $end] for the devices with their name, IP and category, by device then time
+     */
+    private function statusChangesQuery($deviceIds, $start, $end)
+    {
+        return (new StatusIntervalService())->changes($deviceIds, $start, $end)
+            ->join('devices', 'device_status_intervals.device_id', '=', 'devices.id')
+            ->orderBy('device_status_intervals.device_id', 'asc')
+            ->orderBy('device_status_intervals.started_at', 'asc')
+            ->select(
+                'device_status_intervals.id',
+                'device_status_intervals.device_id',
+                'devices.name as device_name',
+                'devices.ip_address as device_ip',
+                'devices.category',
+                'device_status_intervals.status',
+                'device_status_intervals.started_at as checked_at'
+            );
+    }
+    
+    /**
+     * Incident report row for a status change
+     */
+    private function incidentRow($event)
+    {
+        return [
+            'deviceName' => $event->device_name ?? 'Unknown',
+            'deviceIp' => $event->device_ip ?? 'N/A',
+            'eventType' => ($event->status === 'online' || $event->status === 'warning') ? 'up' : 'down',
+            'timestamp' => Carbon::parse($event->checked_at)->toIso8601String(),
+            'category' => $this->formatCategory($event->category ?? 'switches'),
+        ];
     }
     
     /**
@@ -3170,8 +3295,10 @@ public function downloadReportHistory($id)
             return response()->json(['error' => 'Report file not found'], 404);
         }
         
+        // Streamed reports may also be CSV or NDJSON
+        $extension = pathinfo($report->file_path, PATHINFO_EXTENSION);
         return response()->download($report->file_path, basename($report->file_path), [
-            'Content-Type' => 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'Content-Type' => ReportStreamWriter::CONTENT_TYPES[$extension] ?? ReportStreamWriter::CONTENT_TYPES['xlsx'],
         ]);
     }
     
@@ -0,0 +1,110 @@
+<?php
+
+namespace App\Jobs;
+
+use App\Models\Device;
+use App\Services\EnterprisePingService;
+use Illuminate\Bus\Queueable;
+use Illuminate\Contracts\Queue\ShouldQueue;
+use Illuminate\Foundation\Bus\Dispatchable;
+use Illuminate\Queue\InteractsWithQueue;
+use Illuminate\Queue\SerializesModels;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\Log;
+
+class CollectProbeResultsJob implements ShouldQueue
+{
+    use Dispatchable, InteractsWithQueue, Queueable, SerializesModels;
+
+    /**
+     * The number of times the job may be attempted.
+     *
+     * @var int
+     */
+    public $tries = 3;
+
+    /**
+     * The number of seconds the job can run before timing out.
+     *
+     * @var int
+     */
+    public $timeout = 120;
+
+    /**
+     * Shard worker that probed these devices
+     *
+     * @var string
+     */
+    protected $workerId;
+
+    /**
+     * Ping results of one shard sweep
+     *
+     * @var array
+     */
+    protected $results;
+
+    /**
+     * Create a new job instance.
+     */
+    public function __construct(string $workerId, array $results)
+    {
+        $this->workerId = $workerId;
+        $this->results = $results;
+
+        // Shard workers only probe; this queue is the single writer to the database
+        $this->onQueue(config('monitoring.queues.collector', 'collector'));
+    }
+
+    /**
+     * Execute the job.
+     */
+    public function handle(): void
+    {
+        $startTime = microtime(true);
+
+        // Serialize writes even if more than one process consumes the collector queue
+        Cache::lock('monitoring.collector', $this->timeout)->block($this->timeout, function () {
+            $results = $this->freshResults();
+            if (empty($results)) {
+                return;
+            }
+
+            $pingService = new EnterprisePingService();
+            $pingService->updateDeviceStatusesBatch($results);
+            $pingService->storeMonitoringHistoryBatch($results);
+        });
+
+        Log::info("Collected shard results", [
+            'worker' => $this->workerId,
+            'devices' => count($this->results),
+            'duration' => round((microtime(true) - $startTime) * 1000, 2)
+        ]);
+    }
+
+    /**
+     * Drop results older than the device's last ping. Right after a rebalance
+     * a device's old and new owner may both have probed it; the newest wins.
+     */
+    private function freshResults()
+    {
+        $lastPings = Device::whereIn('id', array_column($this->results, 'device_id'))->pluck('last_ping', 'id');
+
+        return array_values(array_filter($this->results, function ($result) use ($lastPings) {
+            $lastPing = $lastPings[$result['device_id']] ?? null;
+            return $lastPing === null || $result['timestamp']->gte($lastPing);
+        }));
+    }
+
+    /**
+     * Handle a job failure.
+     */
+    public function failed(\Throwable $exception): void
+    {
+        Log::error("CollectProbeResultsJob failed permanently", [
+            'worker' => $this->workerId,
+            'devices' => count($this->results),
+            'error' => $exception->getMessage()
+        ]);
+    }
+}
@@ -2,7 +2,10 @@
 
 namespace App\Jobs;
 
+use App\Helpers\LatencyStats;
 use App\Models\Device;
+use App\Services\IcmpProbeService;
+use App\Services\ProbeConfirmationService;
 use Illuminate\Bus\Queueable;
 use Illuminate\Contracts\Queue\ShouldQueue;
 use Illuminate\Foundation\Bus\Dispatchable;
@@ -42,6 +45,18 @@ class PingDeviceBatchJob implements ShouldQueue
      */
     protected $warningThreshold = 1000; // 1 second
 
+    /**
+     * Devices that were up and missed this ping, waiting for the confirmation wave
+     *
+     * @var array
+     */
+    protected $suspects = [];
+
+    /**
+     * @var ProbeConfirmationService|null
+     */
+    protected $confirmation;
+
     /**
      * Create a new job instance.
      */
@@ -59,6 +74,8 @@ public function handle(): void
     {
         try {
             $startTime = microtime(true);
+            $this->confirmation = new ProbeConfirmationService();
+            $this->suspects = [];
             
             // Get devices for this batch
             $devices = Device::whereIn('id', $this->deviceIds)
@@ -76,20 +93,45 @@ public function handle(): void
             $warningCount = 0;
             $errorCount = 0;
             
+            // Each device gets a burst of packets so status and performance rest on
+            // loss and jitter, not one sample
+            $burst = max(1, (int) config('monitoring.prober.burst', 3));
+            $isWindows = strtoupper(substr(PHP_OS, 0, 3)) === 'WIN';
+            // ping's own minimum interval for non-root users is 0.2s; Windows always waits 1s
+            $burstInterval = $isWindows ? 1.0 : max(0.2, (float) config('monitoring.prober.burst_interval', 0.05));
+            
+            // One interleaved ICMP sweep for the whole batch when the prober is available
+            $prober = new IcmpProbeService();
+            $sweep = $prober->probe($prober->targets($devices), $pingTimeout / 1000);
+            
             // Process devices in parallel
             $processes = [];
             $deviceMap = [];
             
             // Start all ping processes in parallel
             foreach ($devices as $device) {
+                if ($sweep !== null && isset($sweep[$device->ip_address])) {
+                    $probe = $sweep[$device->ip_address];
+                    $this->settleDeviceStatus(
+                        $device,
+                        $probe['alive'],
+                        $probe['alive'] ? round($probe['rtt'], 2) : null,
+                        $onlineCount,
+                        $offlineCount,
+                        $warningCount,
+                        $probe['stats'] ?? null
+                    );
+                    continue;
+                }
+                
                 $ip = escapeshellarg($device->ip_address);
                 $deviceMap[$device->id] = $device;
                 
-                if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
-                    $pingCommand = "ping -n 2 -w {$pingTimeout} {$ip} 2>nul";
+                if ($isWindows) {
+                    $pingCommand = "ping -n {$burst} -w {$pingTimeout} {$ip} 2>nul";
                 } else {
                     $timeoutSeconds = round($pingTimeout / 1000, 1);
-                    $pingCommand = "ping -c 2 -W {$timeoutSeconds} {$ip} 2>/dev/null";
+                    $pingCommand = "ping -c {$burst} -i {$burstInterval} -W {$timeoutSeconds} {$ip} 2>/dev/null";
                 }
                 
                 $descriptorspec = [
@@ -116,19 +158,21 @@ public function handle(): void
                     $returnCode = 1;
                     exec($pingCommand, $output, $returnCode);
                     
-                    $this->updateDeviceStatus(
+                    $stats = $returnCode === 0 ? LatencyStats::fromPingOutput(implode("\n", $output), $burst) : null;
+                    $this->settleDeviceStatus(
                         $device,
-                        $returnCode === 0,
-                        $returnCode === 0 ? $this->parseResponseTime($output) : null,
+                        $stats !== null,
+                        $stats !== null ? round($stats['avg'], 2) : null,
                         $onlineCount,
                         $offlineCount,
-                        $warningCount
+                        $warningCount,
+                        $stats
                     );
                 }
             }
             
             // Wait for all processes to complete
-            $maxWaitTime = 2.5; // 2.5 seconds max wait (optimized for speed)
+            $maxWaitTime = 2.5 + ($burst - 1) * $burstInterval; // One timeout plus the burst's spacing
             $startWait = microtime(true);
             
             while (!empty($processes) && (microtime(true) - $startWait) < $maxWaitTime) {
@@ -145,26 +189,18 @@ public function handle(): void
                         proc_close($proc['process']);
                         
                         $returnCode = $status['exitcode'];
-                        $isOnline = ($returnCode === 0);
-                        $responseTime = null;
-                        
-                        if ($isOnline) {
-                            $responseTime = $this->parseResponseTime(explode("\n", $output));
-                            $processDuration = (microtime(true) - $proc['start_time']) * 1000;
-                            
-                            // Use process duration if we couldn't parse response time
-                            if ($responseTime === null) {
-                                $responseTime = round($processDuration, 2);
-                            }
-                        }
+                        $stats = $returnCode === 0 ? LatencyStats::fromPingOutput($output, $burst) : null;
                         
-                        $this->updateDeviceStatus(
+                        // Exit code 0 without any reply time (e.g. a localized ping) still
+                        // counts as up, but without a latency sample rather than the fork time
+                        $this->settleDeviceStatus(
                             $device,
-                            $isOnline,
-                            $responseTime,
+                            $returnCode === 0,
+                            $stats !== null ? round($stats['avg'], 2) : null,
                             $onlineCount,
                             $offlineCount,
-                            $warningCount
+                            $warningCount,
+                            $stats
                         );
                         
                         unset($processes[$key]);
@@ -185,7 +221,7 @@ public function handle(): void
                 proc_close($proc['process']);
                 
                 $device = $deviceMap[$proc['device_id']];
-                $this->updateDeviceStatus(
+                $this->settleDeviceStatus(
                     $device,
                     false,
                     null,
@@ -195,6 +231,27 @@ public function handle(): void
                 );
             }
             
+            // One re-probe wave for every device that was up and missed; only confirmed misses go offline
+            if (!empty($this->suspects)) {
+                $rtts = $this->confirmation->confirm(
+                    $prober->targets($this->suspects),
+                    $pingTimeout / 1000
+                );
+                
+                foreach ($this->suspects as $device) {
+                    $rtt = $rtts[$device->ip_address] ?? null;
+                    $this->updateDeviceStatus(
+                        $device,
+                        $rtt !== null,
+                        $rtt !== null ? round($rtt, 2) : null,
+                        $onlineCount,
+                        $offlineCount,
+                        $warningCount
+                    );
+                }
+                $this->suspects = [];
+            }
+            
             $duration = round((microtime(true) - $startTime) * 1000, 2);
             
             Log::info("PingDeviceBatchJob: Completed batch", [
@@ -214,18 +271,33 @@ public function handle(): void
     }
 
     /**
-     * Update device status based on ping result
+     * Update device status from a ping, holding back misses of devices that are
+     * up until the confirmation wave has re-probed them
      */
-    protected function updateDeviceStatus($device, $isOnline, $responseTime, &$onlineCount, &$offlineCount, &$warningCount)
+    protected function settleDeviceStatus($device, $isOnline, $responseTime, &$onlineCount, &$offlineCount, &$warningCount, $stats = null)
+    {
+        if (!$isOnline && $this->confirmation->needsConfirmation($device->status)) {
+            $this->suspects[$device->id] = $device;
+            return;
+        }
+        
+        $this->updateDeviceStatus($device, $isOnline, $responseTime, $onlineCount, $offlineCount, $warningCount, $stats);
+    }
+
+    /**
+     * Update device status based on ping result and, for a burst, its jitter and loss
+     */
+    protected function updateDeviceStatus($device, $isOnline, $responseTime, &$onlineCount, &$offlineCount, &$warningCount, $stats = null)
     {
         try {
             $previousStatus = $device->status;
             $newStatus = 'offline';
+            $latency = LatencyStats::deviceColumns($stats);
             
-            if ($isOnline && $responseTime !== null) {
-                // Device responded - check if it's slow (warning) or fast (online)
-                if ($responseTime > $this->warningThreshold) {
-                    $newStatus = 'warning'; // Slow response
+            if ($isOnline) {
+                // Device responded - check if it's slow, jittery or lossy (warning) or healthy (online)
+                if ($responseTime > $this->warningThreshold || LatencyStats::isDegraded($latency['jitter'], $latency['packet_loss'])) {
+                    $newStatus = 'warning'; // Slow or unstable response
                     $warningCount++;
                 } else {
                     $newStatus = 'online'; // Fast response
@@ -241,7 +313,7 @@ protected function updateDeviceStatus($device, $isOnline, $responseTime, &$onlin
                 'status' => $newStatus,
                 'response_time' => $responseTime,
                 'last_ping' => now(),
-            ];
+            ] + $latency;
             
             // Helper function to check if status is "online" (online or warning)
             $isOnlineStatus = function($status) {
@@ -289,17 +361,5 @@ protected function updateDeviceStatus($device, $isOnline, $responseTime, &$onlin
             Log::error("Failed to update device {$device->id}: " . $e->getMessage());
         }
     }
-
-    /**
-     * Parse response time from ping output
-     */
-    protected function parseResponseTime(array $output): ?int
-    {
-        $outputText = implode(' ', $output);
-        if (preg_match('/time[=<](\d+)ms/i', $outputText, $matches)) {
-            return (int)$matches[1];
-        }
-        return null;
-    }
 }
 
@@ -7,6 +7,9 @@
 use Illuminate\Database\Eloquent\Relations\BelongsToMany;
 use Illuminate\Database\Eloquent\Relations\HasMany;
 use Illuminate\Database\Eloquent\Factories\HasFactory;
+use App\Services\MonitoringRollupService;
+use App\Services\StatusIntervalService;
+use App\Services\UptimeWindowService;
 
 class Device extends Model
 {
@@ -18,6 +21,8 @@ class Device extends Model
         'hardware_detail_id',
         'name',
         'ip_address',
+        'probe_type',
+        'probe_target',
         'mac_address',
         'barcode',
         'managed_by',
@@ -31,6 +36,8 @@ class Device extends Model
         'uptime_minutes',
         'downtime_percentage',
         'response_time',
+        'jitter',
+        'packet_loss',
         'last_ping',
         'offline_reason',
         'offline_acknowledged_by',
@@ -51,6 +58,8 @@ class Device extends Model
         'sla_target' => 'decimal:2',
         'downtime_percentage' => 'decimal:2',
         'response_time' => 'decimal:2',
+        'jitter' => 'decimal:2',
+        'packet_loss' => 'integer',
         'last_ping' => 'datetime',
         'offline_acknowledged_at' => 'datetime',
         'offline_since' => 'datetime',
@@ -63,6 +72,14 @@ class Device extends Model
 
     protected $appends = ['brand', 'model'];
 
+    protected static function booted(): void
+    {
+        // Partitioned monitoring_history has no foreign key on MySQL/MariaDB, so its rows don't cascade
+        static::deleting(function (Device $device) {
+            $device->monitoringHistory()->delete();
+        });
+    }
+
     public function branch(): BelongsTo
     {
         return $this->belongsTo(Branch::class);
@@ -103,6 +120,11 @@ public function monitoringHistory(): HasMany
         return $this->hasMany(MonitoringHistory::class);
     }
 
+    public function statusIntervals(): HasMany
+    {
+        return $this->hasMany(DeviceStatusInterval::class);
+    }
+
     public function comments(): HasMany
     {
         return $this->hasMany(DeviceComment::class)->orderBy('created_at', 'desc');
@@ -211,36 +233,10 @@ public function getCalculatedUptimePercentage(): float
             return (float) $this->uptime_percentage;
         }
 
-        // Otherwise calculate from monitoring history or current status
-        $hasHistory = $this->monitoringHistory()->exists();
-        
-        if ($hasHistory) {
-            $startDate = now()->subHours(24);
-            
-            $totalChecks = $this->monitoringHistory()
-                ->where('checked_at', '>=', $startDate)
-                ->count();
-
-            if ($totalChecks === 0) {
-                // Use current status
-                return $this->status === 'online' ? 100 : 0;
-            }
-
-            $onlineChecks = $this->monitoringHistory()
-                ->where('checked_at', '>=', $startDate)
-                ->where('status', 'online')
-                ->count();
-
-            $percentage = round((float) (($onlineChecks / $totalChecks) * 100), 2);
-            
-            // Update the device with calculated percentage
-            // Disable timestamps to prevent updating updated_at when only uptime changes
-            $this->uptime_percentage = $percentage;
-            $this->timestamps = false;
-            $this->save();
-            $this->timestamps = true;
-            
-            return $percentage;
+        // Otherwise read the sliding 24h window counters
+        $uptime = (new UptimeWindowService())->uptime([$this->id])->get($this->id);
+        if ($uptime && $uptime['24h'] !== null) {
+            return $uptime['24h'];
         }
 
         // Fallback to minutes-based calculation
@@ -332,35 +328,10 @@ public function getCalculatedDowntimePercentage(): float
             return (float) $this->downtime_percentage;
         }
 
-        // Otherwise calculate from monitoring history or current status
-        $hasHistory = $this->monitoringHistory()->exists();
-        
-        if ($hasHistory) {
-            $startDate = now()->subHours(24);
-            
-            $totalChecks = $this->monitoringHistory()
-                ->where('checked_at', '>=', $startDate)
-                ->count();
-
-            if ($totalChecks === 0) {
-                // Use current status
-                return in_array($this->status, ['offline', 'offline_ack']) ? 100 : 0;
-            }
-
-            $offlineChecks = $this->monitoringHistory()
-                ->where('checked_at', '>=', $startDate)
-                ->whereIn('status', ['offline', 'offline_ack'])
-                ->count();
-
-            $percentage = round((float) (($offlineChecks / $totalChecks) * 100), 2);
-            
-            // Update the device with calculated percentage
-            $this->downtime_percentage = $percentage;
-            $this->timestamps = false;
-            $this->save();
-            $this->timestamps = true;
-            
-            return $percentage;
+        // Otherwise calculate from the last 24 hours of rollups
+        $totals = $this->recentTotals();
+        if ($totals && $totals->checks > 0) {
+            return round((float) (($totals->down_checks / $totals->checks) * 100), 2);
         }
 
         // Fallback to minutes-based calculation
@@ -435,16 +406,25 @@ public function calculateRealDowntimeMinutes(): float
         return 0;
     }
 
+    /**
+     * This device's rollup totals over the last 24 hours, or null without checks.
+     * Only used until DeviceUptimeService stores the percentages (every minute).
+     */
+    private function recentTotals()
+    {
+        return (new MonitoringRollupService())->totals([$this->id], now()->subHours(24), now())->get($this->id);
+    }
+
     /**
      * Record monitoring history
      */
     public function recordMonitoringHistory()
     {
-        MonitoringHistory::create([
+        (new StatusIntervalService())->record([[
             'device_id' => $this->id,
             'status' => $this->status,
             'response_time' => $this->response_time,
-            'checked_at' => now(),
-        ]);
+            'timestamp' => now(),
+        ]]);
     }
 }
\ No newline at end of file
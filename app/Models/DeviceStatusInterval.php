@@ -0,0 +1,49 @@
+<?php
+
+namespace App\Models;
+
+use Illuminate\Database\Eloquent\Model;
+use Illuminate\Database\Eloquent\Relations\BelongsTo;
+
+class DeviceStatusInterval extends Model
+{
+    public $timestamps = false;
+
+    protected $fillable = [
+        'device_id',
+        'status',
+        'previous_status',
+        'started_at',
+        'ended_at',
+        'samples',
+        'rtt_samples',
+        'rtt_min',
+        'rtt_max',
+        'rtt_sum',
+        'is_open',
+    ];
+
+    protected $casts = [
+        'started_at' => 'datetime',
+        'ended_at' => 'datetime',
+        'samples' => 'integer',
+        'rtt_samples' => 'integer',
+        'rtt_min' => 'decimal:2',
+        'rtt_max' => 'decimal:2',
+        'rtt_sum' => 'decimal:2',
+        'is_open' => 'boolean',
+    ];
+
+    public function device(): BelongsTo
+    {
+        return $this->belongsTo(Device::class);
+    }
+
+    /**
+     * Average RTT over the samples that answered
+     */
+    public function getRttAvgAttribute()
+    {
+        return $this->rtt_samples > 0 ? round($this->rtt_sum / $this->rtt_samples, 2) : null;
+    }
+}
@@ -13,12 +13,20 @@ class MonitoringHistory extends Model
         'device_id',
         'status',
         'response_time',
+        'rtt_min',
+        'rtt_max',
+        'jitter',
+        'packet_loss',
         'checked_at',
         'error_message',
     ];
 
     protected $casts = [
         'checked_at' => 'datetime',
+        'rtt_min' => 'decimal:2',
+        'rtt_max' => 'decimal:2',
+        'jitter' => 'decimal:2',
+        'packet_loss' => 'integer',
     ];
 
     public function device(): BelongsTo
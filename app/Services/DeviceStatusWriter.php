@@ -0,0 +1,173 @@
+<?php
+
+namespace App\Services;
+
+use App\Helpers\LatencyStats;
+use Illuminate\Support\Facades\DB;
+
+class DeviceStatusWriter
+{
+    const ONLINE_STATUSES = ['online', 'warning'];
+
+    // Per-row columns written from each result
+    const VALUE_COLUMNS = ['response_time', 'jitter', 'packet_loss', 'last_ping'];
+
+    private $chunkSize;
+
+    public function __construct()
+    {
+        $this->chunkSize = max(1, (int) config('monitoring.performance.status_write_chunk', 1000));
+    }
+
+    /**
+     * Write a sweep's results back to the devices table, one UPDATE per chunk.
+     *
+     * Takes ping results keyed either way (device_id, or id as in
+     * MonitoringController). The transition rules run in SQL against each
+     * row's current status, so nothing is read first:
+     * - crossing between up (online/warning) and down sets online_since or
+     *   offline_since, clears the other, resets offline_alert_sent and
+     *   touches updated_at; staying on the same side leaves them alone,
+     * - any status change records previous_status and last_status_change.
+     *
+     * Returns the number of rows updated.
+     */
+    public function write($results, $now = null)
+    {
+        $now = $now ?: now();
+        $rows = $this->rows($results, $now);
+        if (empty($rows)) {
+            return 0;
+        }
+
+        $postgres = DB::connection()->getDriverName() === 'pgsql';
+        $updated = 0;
+        foreach (array_chunk($rows, $this->chunkSize, true) as $chunk) {
+            [$sql, $bindings] = $postgres ? $this->valuesUpdate($chunk, $now) : $this->caseUpdate($chunk, $now);
+            $updated += DB::update($sql, $bindings);
+        }
+
+        return $updated;
+    }
+
+    /**
+     * [id => row] from ping results; a later result for the same device wins
+     */
+    private function rows($results, $now)
+    {
+        $rows = [];
+        foreach ($results as $result) {
+            $id = $result['device_id'] ?? $result['id'] ?? (isset($result['device']) ? $result['device']->id : null);
+            if (!$id || empty($result['status'])) {
+                continue;
+            }
+
+            $rows[(int) $id] = [
+                'status' => $result['status'],
+                'response_time' => $result['response_time'] ?? null,
+                'last_ping' => $result['timestamp'] ?? $now,
+            ] + LatencyStats::deviceColumns($result['stats'] ?? null);
+        }
+
+        return $rows;
+    }
+
+    /**
+     * PostgreSQL: UPDATE devices ... FROM (VALUES ...) joined on id
+     */
+    private function valuesUpdate(array $rows, $now)
+    {
+        $tuples = [];
+        $bindings = [];
+        foreach ($rows as $id => $row) {
+            $tuples[] = '(?::bigint, ?::varchar, ?::numeric, ?::numeric, ?::smallint, ?::timestamp)';
+            array_push($bindings, $id, $row['status'], $row['response_time'], $row['jitter'], $row['packet_loss'], $row['last_ping']);
+        }
+
+        [$assignments, $ruleBindings] = $this->transitionAssignments('v.status', [], $now);
+        foreach (self::VALUE_COLUMNS as $column) {
+            $assignments[] = "{$column} = v.{$column}";
+        }
+        $assignments[] = 'status = v.status';
+
+        $sql = 'UPDATE devices SET ' . implode(', ', $assignments) .
+            ' FROM (VALUES ' . implode(', ', $tuples) . ') AS v(id, status, ' . implode(', ', self::VALUE_COLUMNS) . ')' .
+            ' WHERE devices.id = v.id';
+
+        return [$sql, array_merge($ruleBindings, $bindings)];
+    }
+
+    /**
+     * MySQL/MariaDB/SQLite: CASE id WHEN ... per column, WHERE id IN (...)
+     */
+    private function caseUpdate(array $rows, $now)
+    {
+        $ids = array_keys($rows);
+
+        // The new status, grouped so each distinct status is bound once
+        $byStatus = [];
+        foreach ($rows as $id => $row) {
+            $byStatus[$row['status']][] = $id;
+        }
+        $statusSql = 'CASE';
+        $statusBindings = [];
+        foreach ($byStatus as $status => $statusIds) {
+            $statusSql .= ' WHEN devices.id IN (' . implode(',', $statusIds) . ') THEN ?';
+            $statusBindings[] = $status;
+        }
+        $statusSql .= ' END';
+
+        [$assignments, $bindings] = $this->transitionAssignments($statusSql, $statusBindings, $now);
+
+        foreach (self::VALUE_COLUMNS as $column) {
+            $values = array_column($rows, $column);
+            if (count(array_unique(array_map('json_encode', $values))) === 1) {
+                // Same value for the whole chunk (last_ping usually is)
+                $assignments[] = "{$column} = ?";
+                $bindings[] = $values[0];
+                continue;
+            }
+
+            $case = "{$column} = CASE devices.id";
+            foreach ($rows as $id => $row) {
+                $case .= " WHEN {$id} THEN ?";
+                $bindings[] = $row[$column];
+            }
+            $assignments[] = $case . " ELSE {$column} END";
+        }
+
+        // Last: MySQL evaluates SET left to right, so the rules above must still see the old status
+        $assignments[] = "status = {$statusSql}";
+        $bindings = array_merge($bindings, $statusBindings);
+
+        $sql = 'UPDATE devices SET ' . implode(', ', $assignments) .
+            ' WHERE id IN (' . implode(',', $ids) . ')';
+
+        return [$sql, $bindings];
+    }
+
+    /**
+     * SET clauses for the transition rules, given SQL for the new status.
+     * They read devices.status, so they must come before status is assigned.
+     */
+    private function transitionAssignments($newStatus, array $newStatusBindings, $now)
+    {
+        $online = "('" . implode("','", self::ONLINE_STATUSES) . "')";
+        $wasUp = "COALESCE(devices.status, '') IN {$online}";
+        $isUp = "{$newStatus} IN {$online}";
+        $changed = "COALESCE(devices.status, '') <> {$newStatus}";
+
+        // Each clause with its bindings in placeholder order; every use of the new status repeats its own
+        $s = $newStatusBindings;
+        $clauses = [
+            ["previous_status = CASE WHEN {$changed} THEN devices.status ELSE devices.previous_status END", $s],
+            ["last_status_change = CASE WHEN {$changed} THEN ? ELSE devices.last_status_change END", [...$s, $now]],
+            ["online_since = CASE WHEN {$isUp} AND NOT ({$wasUp}) THEN ? WHEN NOT ({$isUp}) AND {$wasUp} THEN NULL ELSE devices.online_since END", [...$s, $now, ...$s]],
+            ["offline_since = CASE WHEN NOT ({$isUp}) AND {$wasUp} THEN ? WHEN {$isUp} AND NOT ({$wasUp}) THEN NULL ELSE devices.offline_since END", [...$s, $now, ...$s]],
+            ["offline_alert_sent = CASE WHEN ({$isUp}) <> ({$wasUp}) THEN false ELSE devices.offline_alert_sent END", $s],
+            ["updated_at = CASE WHEN ({$isUp}) <> ({$wasUp}) THEN ? ELSE devices.updated_at END", [...$s, $now]],
+        ];
+
+        return [array_column($clauses, 0), array_merge(...array_column($clauses, 1))];
+    }
+}
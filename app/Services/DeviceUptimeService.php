@@ -4,50 +4,53 @@
 
 use App\Models\Device;
 use App\Models\MonitoringHistory;
+use App\Models\DeviceStatusInterval;
 use Illuminate\Support\Facades\DB;
 use Carbon\Carbon;
 
 class DeviceUptimeService
 {
     /**
-     * Calculate and update uptime percentage for all devices
+     * Recompute uptime and downtime for all active devices.
+     *
+     * One read of the devices, one grouped rollup aggregate over the last 24
+     * hours and one UPDATE per chunk of devices, however many devices there
+     * are. The rules match Device::updateUptime/updateDowntime:
+     * - up (online/warning): uptime_minutes counts from online_since (set now
+     *   if missing), capped at 1440; offline_duration_minutes is 0,
+     * - down (offline/offline_ack): the reverse, from offline_since,
+     * - percentages are online and down checks over all checks in the last
+     *   24 hours, keeping the stored value for devices without checks.
+     *
+     * Returns the number of devices whose figures changed.
      */
-    public function updateAllDeviceUptimes()
+    public function updateAllDeviceUptimes($now = null)
     {
-        $updatedBranchIds = [];
-        
-        // OPTIMIZED: Use smaller chunks and select only needed columns to reduce memory
-        Device::where('is_active', true)
-            ->select('id', 'branch_id', 'status', 'uptime_percentage', 'uptime_minutes', 'downtime_percentage', 'offline_duration_minutes', 'online_since', 'offline_since')
-            ->chunk(50, function ($devices) use (&$updatedBranchIds) {
-                foreach ($devices as $device) {
-                    // Reload device with minimal data for update
-                    $device = Device::find($device->id);
-                    $this->updateDeviceUptime($device);
-                    $this->updateDeviceDowntime($device);
-                    if ($device->branch_id && !in_array($device->branch_id, $updatedBranchIds)) {
-                        $updatedBranchIds[] = $device->branch_id;
-                    }
-                    // Free memory
-                    unset($device);
-                }
-                // Force garbage collection every chunk
-                if (function_exists('gc_collect_cycles')) {
-                    gc_collect_cycles();
-                }
-            });
-        
-        // OPTIMIZED: Only clear specific cache keys instead of flushing all
-        // Note: Cache tags require Redis or Memcached, so we'll use pattern-based clearing
-        if (!empty($updatedBranchIds)) {
-            // Clear only device-related caches, not all caches
-            // This is much faster and doesn't affect other cached data
-            foreach ($updatedBranchIds as $branchId) {
-                // Clear device list caches (they'll regenerate on next request)
-                // We don't need to manually clear - cache TTL will handle it
-                // This prevents memory issues from cache flushing
+        $now = $now ?: now();
+        $devices = DB::table('devices')
+            ->where('is_active', true)
+            ->get(['id', 'status', 'uptime_percentage', 'uptime_minutes', 'downtime_percentage', 'offline_duration_minutes', 'online_since', 'offline_since']);
+        if ($devices->isEmpty()) {
+            return 0;
+        }
+
+        $totals = (new MonitoringRollupService())->totals(null, $now->copy()->subHours(24), $now);
+
+        $rows = [];
+        foreach ($devices as $device) {
+            $row = $this->figures($device, $totals->get($device->id), $now);
+            if ($row !== null) {
+                $rows[$device->id] = $row;
             }
         }
+
+        $chunkSize = max(1, (int) config('monitoring.performance.status_write_chunk', 1000));
+        foreach (array_chunk($rows, $chunkSize, true) as $chunk) {
+            [$sql, $bindings] = $this->figuresUpdate($chunk, $now);
+            DB::update($sql, $bindings);
+        }
+
+        return count($rows);
     }
 
     /**
@@ -77,11 +80,10 @@ public function updateDeviceDowntime(Device $device)
      */
     public function calculateUptimeFromMinutes(Device $device): float
     {
-        // If we have monitoring history, use that for accurate calculation
-        $hasHistory = MonitoringHistory::where('device_id', $device->id)->exists();
-        
-        if ($hasHistory) {
-            return $this->calculateUptimeFromHistory($device);
+        // The sliding 24h window, read by primary key, when the device has checks in it
+        $uptime = (new UptimeWindowService())->uptime([$device->id])->get($device->id);
+        if ($uptime && $uptime['24h'] !== null) {
+            return $uptime['24h'];
         }
 
         // Fallback to minutes-based calculation
@@ -96,9 +98,9 @@ public function calculateUptimeFromMinutes(Device $device): float
     }
 
     /**
-     * Calculate uptime from monitoring history
+     * Calculate downtime from monitoring history
      */
-    private function calculateUptimeFromHistory(Device $device): float
+    public function calculateDowntimeFromHistory(Device $device): float
     {
         $startDate = Carbon::now()->subHours(24);
         
@@ -108,39 +110,104 @@ private function calculateUptimeFromHistory(Device $device): float
 
         if ($totalChecks === 0) {
             // No recent history - use current status
-            return $device->status === 'online' ? 100 : 0;
+            return in_array($device->status, ['offline', 'offline_ack']) ? 100 : 0;
         }
 
-        $onlineChecks = MonitoringHistory::where('device_id', $device->id)
+        $offlineChecks = MonitoringHistory::where('device_id', $device->id)
             ->where('checked_at', '>=', $startDate)
-            ->where('status', 'online')
+            ->whereIn('status', ['offline', 'offline_ack'])
             ->count();
 
-        return ($onlineChecks / $totalChecks) * 100;
+        return ($offlineChecks / $totalChecks) * 100;
     }
 
     /**
-     * Calculate downtime from monitoring history
+     * New uptime/downtime columns for one device, or null when nothing changed
      */
-    public function calculateDowntimeFromHistory(Device $device): float
+    private function figures($device, $totals, Carbon $now)
     {
-        $startDate = Carbon::now()->subHours(24);
-        
-        $totalChecks = MonitoringHistory::where('device_id', $device->id)
-            ->where('checked_at', '>=', $startDate)
-            ->count();
+        $isUp = in_array($device->status, DeviceStatusWriter::ONLINE_STATUSES);
+        $isDown = in_array($device->status, StatusIntervalService::DOWN_STATUSES);
+        $onlineSince = $device->online_since ? Carbon::parse($device->online_since) : null;
+        $offlineSince = $device->offline_since ? Carbon::parse($device->offline_since) : null;
+
+        $row = [
+            'online_since' => $isDown ? 'null' : ($isUp && !$onlineSince ? 'now' : 'keep'),
+            'offline_since' => $isUp ? 'null' : ($isDown && !$offlineSince ? 'now' : 'keep'),
+            'uptime_minutes' => $isUp && $onlineSince ? min(1440, (int) max(0, $onlineSince->diffInMinutes($now))) : 0,
+            'offline_duration_minutes' => $isDown && $offlineSince ? round(min(1440, max(0, $offlineSince->diffInMinutes($now))), 2) : 0,
+        ];
+
+        if ($totals && $totals->checks > 0) {
+            $row['uptime_percentage'] = round((float) (($totals->online_checks / $totals->checks) * 100), 2);
+            $row['downtime_percentage'] = round((float) (($totals->down_checks / $totals->checks) * 100), 2);
+        } else {
+            // No checks in the window: keep what is stored, or fall back to minutes
+            $row['uptime_percentage'] = $device->uptime_percentage !== null
+                ? (float) $device->uptime_percentage
+                : round(min(100, ($row['uptime_minutes'] / 1440) * 100), 2);
+            $row['downtime_percentage'] = $device->downtime_percentage !== null
+                ? (float) $device->downtime_percentage
+                : round(min(100, ($row['offline_duration_minutes'] / 1440) * 100), 2);
+        }
 
-        if ($totalChecks === 0) {
-            // No recent history - use current status
-            return in_array($device->status, ['offline', 'offline_ack']) ? 100 : 0;
+        $unchanged = ($row['online_since'] === 'keep' || ($row['online_since'] === 'null' && !$onlineSince))
+            && ($row['offline_since'] === 'keep' || ($row['offline_since'] === 'null' && !$offlineSince))
+            && (int) $device->uptime_minutes === $row['uptime_minutes']
+            && (float) $device->offline_duration_minutes == $row['offline_duration_minutes']
+            && $device->uptime_percentage !== null && (float) $device->uptime_percentage == $row['uptime_percentage']
+            && $device->downtime_percentage !== null && (float) $device->downtime_percentage == $row['downtime_percentage'];
+
+        return $unchanged ? null : $row;
+    }
+
+    /**
+     * One UPDATE writing [id => figures]. Values are computed here, so they are
+     * inlined and grouped: each distinct value is one WHEN over the ids that
+     * share it. The only bindings are the current time for online/offline_since.
+     */
+    private function figuresUpdate(array $rows, $now)
+    {
+        $assignments = [];
+        $bindings = [];
+        foreach (['uptime_minutes', 'offline_duration_minutes', 'uptime_percentage', 'downtime_percentage', 'online_since', 'offline_since'] as $column) {
+            $groups = [];
+            foreach ($rows as $id => $row) {
+                $value = $row[$column];
+                if ($value === 'keep') {
+                    continue;
+                }
+                $sql = match (true) {
+                    $value === 'null' => 'NULL',
+                    $value === 'now' => '?',
+                    is_int($value) => (string) $value,
+                    default => sprintf('%.2f', $value),
+                };
+                $groups[$sql][] = $id;
+            }
+            if (empty($groups)) {
+                continue;
+            }
+            if (isset($groups['?'])) {
+                $bindings[] = $now;
+            }
+
+            if (count($groups) === 1 && count(reset($groups)) === count($rows)) {
+                $assignments[] = "{$column} = " . array_key_first($groups);
+                continue;
+            }
+
+            $case = "{$column} = CASE";
+            foreach ($groups as $sql => $ids) {
+                $case .= ' WHEN id IN (' . implode(',', $ids) . ") THEN {$sql}";
+            }
+            $assignments[] = $case . " ELSE {$column} END";
         }
 
-        $offlineChecks = MonitoringHistory::where('device_id', $device->id)
-            ->where('checked_at', '>=', $startDate)
-            ->whereIn('status', ['offline', 'offline_ack'])
-            ->count();
+        $sql = 'UPDATE devices SET ' . implode(', ', $assignments) .
+            ' WHERE id IN (' . implode(',', array_keys($rows)) . ')';
 
-        return ($offlineChecks / $totalChecks) * 100;
+        return [$sql, $bindings];
     }
 
     /**
@@ -158,5 +225,8 @@ public function resetAllUptimes()
 
         // Clear monitoring history
         MonitoringHistory::query()->delete();
+        DeviceStatusInterval::query()->delete();
+        DB::table(MonitoringRollupService::TABLE)->delete();
+        (new UptimeWindowService())->rebuild();
     }
 }
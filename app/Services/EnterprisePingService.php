@@ -2,8 +2,8 @@
 
 namespace App\Services;
 
+use App\Helpers\LatencyStats;
 use App\Models\Device;
-use App\Models\MonitoringHistory;
 use Illuminate\Support\Facades\Log;
 use Illuminate\Support\Facades\Cache;
 use Illuminate\Support\Facades\DB;
@@ -14,6 +14,8 @@ class EnterprisePingService
     private $maxConcurrent;
     private $batchSize;
     private $cache;
+    private $prober;
+    private $sweep;
 
     public function __construct()
     {
@@ -21,6 +23,8 @@ public function __construct()
         $this->maxConcurrent = config('monitoring.max_concurrent', 100); // Higher concurrency
         $this->batchSize = config('monitoring.batch_size', 500); // Process in larger batches
         $this->cache = Cache::store(); // Use Laravel cache instead of Redis directly
+        $this->prober = new IcmpProbeService();
+        $this->sweep = null;
     }
 
     /**
@@ -47,6 +51,14 @@ public function monitorAllDevices()
                 return $this->emptyResult();
             }
 
+            // Probe every device once up front; executeOptimizedPing reads from the sweep
+            $this->sweep = $this->prober->probe(
+                $this->prober->targets(
+                    Device::where('is_active', true)->where('status', '!=', 'offline_ack')->get(['ip_address', 'probe_type', 'probe_target'])
+                ),
+                $this->timeout
+            );
+
             // Choose monitoring strategy based on device count
             if ($totalDevices > 1000) {
                 $result = $this->largeScaleMonitoring($monitoringId);
@@ -79,6 +91,8 @@ public function monitorAllDevices()
             ]);
 
             return $this->errorResult($e->getMessage());
+        } finally {
+            $this->sweep = null;
         }
     }
 
@@ -254,9 +268,33 @@ private function pingWithExec($devices)
     public function executeOptimizedPing($device)
     {
         $startTime = microtime(true);
+        $cacheKey = "ping_result_{$device->id}";
+
+        // Use this sweep's ICMP result when there is one
+        if ($this->sweep !== null && isset($this->sweep[$device->ip_address])) {
+            $probe = $this->sweep[$device->ip_address];
+            $latency = LatencyStats::deviceColumns($probe['stats'] ?? null);
+            $result = [
+                'device_id' => $device->id,
+                'ip_address' => $device->ip_address,
+                'name' => $device->name,
+                'status' => !$probe['alive'] ? 'offline'
+                    : (LatencyStats::isDegraded($latency['jitter'], $latency['packet_loss']) ? 'warning' : 'online'),
+                'response_time' => $probe['rtt'],
+                'stats' => $probe['stats'] ?? null,
+                'duration' => round((microtime(true) - $startTime) * 1000, 2),
+                'timestamp' => now(),
+                'batch_id' => uniqid('batch_', true)
+            ];
+            $this->cache->put($cacheKey, [
+                'data' => $result,
+                'timestamp' => time()
+            ], 30);
+
+            return $result;
+        }
         
         // Check cache first for very recent results
-        $cacheKey = "ping_result_{$device->id}";
         $cached = $this->cache->get($cacheKey);
         
         if ($cached) {
@@ -275,12 +313,17 @@ public function executeOptimizedPing($device)
             
             $duration = round((microtime(true) - $startTime) * 1000, 2);
             
-            if ($returnCode === 0) {
-                $responseTime = $this->parseResponseTime($output, $duration);
-                $status = 'online';
-            } else {
-                $responseTime = null;
+            // Exit code 0 without any reply time (e.g. a localized ping) still counts
+            // as up, but without a latency sample rather than the exec's wall-clock time
+            $stats = $returnCode === 0 ? LatencyStats::fromPingOutput(implode("\n", $output), $this->burstSize()) : null;
+            $latency = LatencyStats::deviceColumns($stats);
+
+            if ($returnCode !== 0) {
                 $status = 'offline';
+            } elseif (LatencyStats::isDegraded($latency['jitter'], $latency['packet_loss'])) {
+                $status = 'warning';
+            } else {
+                $status = 'online';
             }
 
             $result = [
@@ -288,7 +331,8 @@ public function executeOptimizedPing($device)
                 'ip_address' => $device->ip_address,
                 'name' => $device->name,
                 'status' => $status,
-                'response_time' => $responseTime,
+                'response_time' => $stats !== null ? round($stats['avg'], 2) : null,
+                'stats' => $stats,
                 'duration' => $duration,
                 'timestamp' => now(),
                 'batch_id' => uniqid('batch_', true)
@@ -323,36 +367,28 @@ public function executeOptimizedPing($device)
     }
 
     /**
-     * Build optimized ping command
+     * Packets per device, the same burst the ICMP sweep sends
      */
-    private function buildOptimizedPingCommand($ip)
+    private function burstSize()
     {
-        if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
-            // Windows: optimized for speed
-            return "ping -n 1 -w " . ($this->timeout * 1000) . " {$ip}";
-        } else {
-            // Linux/Mac: optimized for speed
-            return "ping -c 1 -W {$this->timeout} {$ip}";
-        }
+        return max(1, (int) config('monitoring.prober.burst', 3));
     }
 
     /**
-     * Parse response time efficiently
+     * Build optimized ping command
      */
-    private function parseResponseTime($output, $fallback)
+    private function buildOptimizedPingCommand($ip)
     {
-        $outputText = implode(' ', $output);
-        
-        // Optimized regex patterns
-        if (preg_match('/time[=<](\d+\.?\d*)\s*ms/i', $outputText, $matches)) {
-            return (float) $matches[1];
-        }
-        
-        if (preg_match('/(\d+\.?\d*)\s*ms/i', $outputText, $matches)) {
-            return (float) $matches[1];
+        $burst = $this->burstSize();
+
+        if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
+            // Windows: always 1s between packets
+            return "ping -n {$burst} -w " . ($this->timeout * 1000) . " {$ip}";
+        } else {
+            // Linux/Mac: 0.2s is ping's minimum interval for non-root users
+            $interval = max(0.2, (float) config('monitoring.prober.burst_interval', 0.05));
+            return "ping -c {$burst} -i {$interval} -W {$this->timeout} {$ip}";
         }
-        
-        return $fallback;
     }
 
     /**
@@ -360,122 +396,62 @@ private function parseResponseTime($output, $fallback)
      */
     public function updateDeviceStatusesBatch($results)
     {
-        $updateData = [];
-        
-        foreach ($results as $result) {
-            $device = Device::find($result['device_id']);
-            if (!$device) continue;
-            
-            $previousStatus = $device->status;
-            $newStatus = $result['status'];
-            
-            // Track offline timestamp
-            if ($newStatus === 'offline' && $previousStatus !== 'offline') {
-                // Device just went offline
-                $device->offline_since = now();
-                $device->online_since = null;
-                $device->offline_alert_sent = false;
-            } elseif ($newStatus === 'online' && $previousStatus === 'offline') {
-                // Device came back online
-                $device->online_since = now();
-                $device->offline_since = null;
-                $device->offline_alert_sent = false;
-            }
-            
-            $updateFields = [
-                'id' => $result['device_id'],
-                'status' => $result['status'],
-                'response_time' => $result['response_time'],
-                'last_ping' => $result['timestamp'],
-            ];
-            
-            // Helper function to check if status is "online" (online or warning)
-            $isOnlineStatus = function($status) {
-                return in_array($status, ['online', 'warning']);
-            };
-            
-            // Only update updated_at if transitioning between online and offline states
-            $wasOnline = $isOnlineStatus($previousStatus);
-            $isNowOnline = $isOnlineStatus($newStatus);
-            
-            if ($wasOnline !== $isNowOnline) {
-                // Status changed from online→offline or offline→online
-                $updateFields['updated_at'] = now();
-            }
-            
-            $updateData[] = $updateFields;
-            
-            // Check for 2-minute offline alert
-            if ($newStatus === 'offline' && !$device->offline_alert_sent) {
-                $offlineSince = $device->offline_since ?: $device->last_status_change ?: $device->updated_at;
-                $offlineMinutes = $offlineSince->diffInMinutes(now());
-                
-                if ($offlineMinutes >= 2) {
-                    // Create alert for device offline for 2+ minutes
-                    try {
-                        \App\Models\Alert::create([
-                            'device_id' => $device->id,
-                            'type' => 'device_offline',
-                            'severity' => 'high',
-                            'category' => 'connectivity',
-                            'title' => "Device Offline: {$device->name}",
-                            'message' => "Device {$device->name} ({$device->ip_address}) has been offline for {$offlineMinutes} minutes.",
-                            'status' => 'active',
-                            'triggered_at' => now(),
-                            'downtime' => "{$offlineMinutes} minutes",
-                        ]);
-                        
-                        $device->offline_alert_sent = true;
-                        Log::info("Created 2-minute offline alert", [
-                            'device_id' => $device->id,
-                            'device_name' => $device->name,
-                            'offline_minutes' => $offlineMinutes
-                        ]);
-                    } catch (\Exception $e) {
-                        Log::error("Failed to create offline alert", [
-                            'device_id' => $device->id,
-                            'error' => $e->getMessage()
-                        ]);
-                    }
-                }
-            }
-        }
+        $now = now();
 
-        // Use bulk update for performance
-        $this->bulkUpdateDevices($updateData);
-        
-        // Save devices with alert flags
-        foreach ($results as $result) {
-            $device = Device::find($result['device_id']);
-            if ($device && ($device->isDirty('offline_alert_sent') || $device->isDirty('offline_since') || $device->isDirty('online_since'))) {
-                $device->save();
-            }
-        }
+        // Statuses and transition timestamps in one statement per 1,000 devices
+        (new DeviceStatusWriter())->write($results, $now);
+
+        $this->createOfflineAlerts(array_column($results, 'device_id'), $now);
     }
 
     /**
-     * Bulk update devices for better performance
+     * Alert once for devices among $deviceIds that have been offline for 2+ minutes.
+     * The status writer resets offline_alert_sent on every transition.
      */
-    private function bulkUpdateDevices($updateData)
+    private function createOfflineAlerts($deviceIds, $now)
     {
-        foreach ($updateData as $data) {
-            $device = Device::find($data['id']);
-            if (!$device) continue;
-            
-            // Always update these fields
-            $device->status = $data['status'];
-            $device->response_time = $data['response_time'];
-            $device->last_ping = $data['last_ping'];
-            
-            // Only include updated_at if it was set (status changed)
-            if (isset($data['updated_at'])) {
-                $device->updated_at = $data['updated_at'];
-                $device->save();
-            } else {
-                // Disable timestamps to prevent auto-update of updated_at
-                $device->timestamps = false;
-                $device->save();
-                $device->timestamps = true;
+        foreach (array_chunk($deviceIds, 1000) as $ids) {
+            $devices = Device::whereIn('id', $ids)
+                ->where('status', 'offline')
+                ->where('offline_alert_sent', false)
+                ->whereRaw('COALESCE(offline_since, last_status_change, updated_at) <= ?', [$now->copy()->subMinutes(2)])
+                ->get(['id', 'name', 'ip_address', 'offline_since', 'last_status_change', 'updated_at']);
+
+            $alerted = [];
+            foreach ($devices as $device) {
+                $offlineSince = $device->offline_since ?: $device->last_status_change ?: $device->updated_at;
+                $offlineMinutes = $offlineSince->diffInMinutes($now);
+
+                try {
+                    \App\Models\Alert::create([
+                        'device_id' => $device->id,
+                        'type' => 'device_offline',
+                        'severity' => 'high',
+                        'category' => 'connectivity',
+                        'title' => "Device Offline: {$device->name}",
+                        'message' => "Device {$device->name} ({$device->ip_address}) has been offline for {$offlineMinutes} minutes.",
+                        'status' => 'active',
+                        'triggered_at' => $now,
+                        'downtime' => "{$offlineMinutes} minutes",
+                    ]);
+
+                    $alerted[] = $device->id;
+                    Log::info("Created 2-minute offline alert", [
+                        'device_id' => $device->id,
+                        'device_name' => $device->name,
+                        'offline_minutes' => $offlineMinutes
+                    ]);
+                } catch (\Exception $e) {
+                    Log::error("Failed to create offline alert", [
+                        'device_id' => $device->id,
+                        'error' => $e->getMessage()
+                    ]);
+                }
+            }
+
+            if (!empty($alerted)) {
+                // Query builder, not Eloquent: updated_at only moves on transitions
+                DB::table('devices')->whereIn('id', $alerted)->update(['offline_alert_sent' => true]);
             }
         }
     }
@@ -485,26 +461,7 @@ private function bulkUpdateDevices($updateData)
      */
     public function storeMonitoringHistoryBatch($results)
     {
-        $historyData = [];
-        
-        foreach ($results as $result) {
-            $historyData[] = [
-                'device_id' => $result['device_id'],
-                'status' => $result['status'],
-                'response_time' => $result['response_time'],
-                'checked_at' => $result['timestamp'],
-                'created_at' => now(),
-                'updated_at' => now()
-            ];
-        }
-
-        // Insert in large chunks for performance
-        if (!empty($historyData)) {
-            $chunks = array_chunk($historyData, 1000);
-            foreach ($chunks as $chunk) {
-                MonitoringHistory::insert($chunk);
-            }
-        }
+        (new StatusIntervalService())->record($results);
     }
 
     /**
@@ -543,7 +500,7 @@ private function formatResults($results)
     {
         $stats = [
             'total' => count($results),
-            'online' => count(array_filter($results, fn($r) => $r['status'] === 'online')),
+            'online' => count(array_filter($results, fn($r) => in_array($r['status'], ['online', 'warning']))),
             'offline' => count(array_filter($results, fn($r) => $r['status'] === 'offline')),
             'duration' => 0 // Will be calculated by caller
         ];
@@ -2,8 +2,8 @@
 
 namespace App\Services;
 
+use App\Helpers\LatencyStats;
 use App\Models\Device;
-use App\Models\MonitoringHistory;
 use Illuminate\Support\Facades\Log;
 use Illuminate\Support\Facades\Cache;
 use Illuminate\Support\Facades\DB;
@@ -13,12 +13,18 @@ class FastPingService
     private $timeout;
     private $maxConcurrent;
     private $results;
+    private $prober;
+    private $sweep;
+    private $confirmation;
 
     public function __construct()
     {
         $this->timeout = 0.5; // 0.5 second timeout for maximum speed
         $this->maxConcurrent = 100; // Maximum concurrent pings for fastest processing
         $this->results = [];
+        $this->prober = new IcmpProbeService();
+        $this->sweep = null;
+        $this->confirmation = new ProbeConfirmationService();
     }
 
     /**
@@ -49,32 +55,13 @@ public function pingAllDevices()
 
         Log::info("Starting fast ping for {$devices->count()} devices");
 
-        // Process devices in batches for optimal performance
-        $batches = $devices->chunk($this->maxConcurrent);
-        $allResults = [];
-        $batchCount = 0;
-
-        foreach ($batches as $batch) {
-            $batchCount++;
-            Log::info("Processing batch {$batchCount} of " . $batches->count() . " ({$batch->count()} devices)");
-            
-            $batchResults = $this->pingBatch($batch);
-            $allResults = array_merge($allResults, $batchResults);
-            
-            // No delay between batches for maximum speed
-        }
-
-        // Update device statuses in database
-        $this->updateDeviceStatuses($allResults);
-
-        // Store monitoring history
-        $this->storeMonitoringHistory($allResults);
+        $allResults = $this->pingDevices($devices);
 
         $duration = round((microtime(true) - $startTime) * 1000, 2);
         
         $stats = [
             'total' => count($allResults),
-            'online' => count(array_filter($allResults, fn($r) => $r['status'] === 'online')),
+            'online' => count(array_filter($allResults, fn($r) => in_array($r['status'], ['online', 'warning']))),
             'offline' => count(array_filter($allResults, fn($r) => $r['status'] === 'offline')),
             'duration' => $duration
         ];
@@ -93,6 +80,79 @@ public function pingAllDevices()
         ];
     }
 
+    /**
+     * Ping the given devices, update their statuses and store history
+     */
+    public function pingDevices($devices)
+    {
+        // One ICMP sweep for every device; batches below read their results from it
+        // and only fall back to exec ping if the prober is unavailable
+        $this->sweep = $this->prober->probe($this->prober->targets($devices), $this->timeout);
+
+        // Process devices in batches for optimal performance
+        $batches = $devices->chunk($this->maxConcurrent);
+        $allResults = [];
+        $batchCount = 0;
+
+        foreach ($batches as $batch) {
+            $batchCount++;
+            Log::info("Processing batch {$batchCount} of " . $batches->count() . " ({$batch->count()} devices)");
+            
+            $batchResults = $this->pingBatch($batch);
+            $allResults = array_merge($allResults, $batchResults);
+            
+            // No delay between batches for maximum speed
+        }
+
+        $this->sweep = null;
+
+        // A single lost packet doesn't take a device down: confirm the misses first
+        $allResults = $this->confirmOffline($allResults, $devices);
+
+        // Update device statuses in database, a few bulk statements per sweep
+        (new DeviceStatusWriter())->write($allResults);
+
+        // Store monitoring history as status intervals
+        (new StatusIntervalService())->record($allResults);
+
+        return $allResults;
+    }
+
+    /**
+     * Re-probe devices that were up and just missed, all in one wave.
+     * Suspects that answer any re-probe stay online.
+     */
+    private function confirmOffline($results, $devices)
+    {
+        $devicesById = $devices->keyBy('id');
+        $suspects = [];
+        $targets = [];
+
+        foreach ($results as $index => $result) {
+            $device = $devicesById[$result['device_id']] ?? null;
+            if ($device && $result['status'] === 'offline' && $this->confirmation->needsConfirmation($device->status)) {
+                $suspects[$index] = $result['ip_address'];
+                $targets[] = $device;
+            }
+        }
+
+        if (empty($suspects)) {
+            return $results;
+        }
+
+        $rtts = $this->confirmation->confirm($this->prober->targets($targets), $this->timeout);
+        foreach ($suspects as $index => $ip) {
+            if (($rtts[$ip] ?? null) !== null) {
+                // The sweep's stats describe the missed burst; keep the reply that answered instead
+                $results[$index]['status'] = 'online';
+                $results[$index]['response_time'] = $rtts[$ip];
+                $results[$index]['stats'] = LatencyStats::fromRtts([$rtts[$ip]], 1);
+            }
+        }
+
+        return $results;
+    }
+
     /**
      * Ping a batch of devices concurrently
      */
@@ -102,6 +162,11 @@ private function pingBatch($devices)
         $processes = [];
 
         foreach ($devices as $device) {
+            if ($this->sweep !== null && isset($this->sweep[$device->ip_address])) {
+                $results[] = $this->sweepResult($device, $this->sweep[$device->ip_address]);
+                continue;
+            }
+
             // Use native ping command for fastest performance
             $cmd = $this->buildPingCommand($device->ip_address);
             
@@ -122,17 +187,61 @@ private function pingBatch($devices)
         return $results;
     }
 
+    /**
+     * Build a ping result from the ICMP sweep
+     */
+    private function sweepResult($device, $probe)
+    {
+        $stats = $probe['stats'] ?? null;
+
+        return [
+            'device_id' => $device->id,
+            'ip_address' => $device->ip_address,
+            'name' => $device->name,
+            'status' => $this->burstStatus($probe['alive'], $stats),
+            'response_time' => $probe['rtt'],
+            'stats' => $stats,
+            'duration' => $probe['alive'] ? $probe['rtt'] : $this->timeout * 1000,
+            'timestamp' => now()
+        ];
+    }
+
+    /**
+     * Status for a burst: up but jittery or lossy counts as warning, as in PingDeviceBatchJob
+     */
+    private function burstStatus($alive, $stats)
+    {
+        if (!$alive) {
+            return 'offline';
+        }
+
+        $latency = LatencyStats::deviceColumns($stats);
+
+        return LatencyStats::isDegraded($latency['jitter'], $latency['packet_loss']) ? 'warning' : 'online';
+    }
+
+    /**
+     * Packets per device, the same burst the ICMP sweep sends
+     */
+    private function burstSize()
+    {
+        return max(1, (int) config('monitoring.prober.burst', 3));
+    }
+
     /**
      * Build optimized ping command based on OS
      */
     private function buildPingCommand($ip)
     {
+        $burst = $this->burstSize();
+
         if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
-            // Windows ping command
-            return "ping -n 1 -w " . ($this->timeout * 1000) . " {$ip}";
+            // Windows ping command (always 1s between packets)
+            return "ping -n {$burst} -w " . ($this->timeout * 1000) . " {$ip}";
         } else {
-            // Linux/Mac ping command
-            return "ping -c 1 -W {$this->timeout} {$ip}";
+            // Linux/Mac ping command; 0.2s is ping's minimum interval for non-root users
+            $interval = max(0.2, (float) config('monitoring.prober.burst_interval', 0.05));
+            return "ping -c {$burst} -i {$interval} -W {$this->timeout} {$ip}";
         }
     }
 
@@ -152,33 +261,21 @@ private function executePing($command, $device)
             
             $duration = round((microtime(true) - $startTime) * 1000, 2);
             
-            if ($returnCode === 0) {
-                // Device is online - parse response time
-                $responseTime = $this->parseResponseTime($output, $duration);
-                
-                return [
-                    'device_id' => $device->id,
-                    'ip_address' => $device->ip_address,
-                    'name' => $device->name,
-                    'status' => 'online',
-                    'response_time' => $responseTime,
-                    'duration' => $duration,
-                    'timestamp' => now(),
-                    'raw_output' => implode("\n", $output)
-                ];
-            } else {
-                // Device is offline
-                return [
-                    'device_id' => $device->id,
-                    'ip_address' => $device->ip_address,
-                    'name' => $device->name,
-                    'status' => 'offline',
-                    'response_time' => null,
-                    'duration' => $duration,
-                    'timestamp' => now(),
-                    'raw_output' => implode("\n", $output)
-                ];
-            }
+            // Exit code 0 without any reply time (e.g. a localized ping) still counts
+            // as up, but without a latency sample rather than the exec's wall-clock time
+            $stats = $returnCode === 0 ? LatencyStats::fromPingOutput(implode("\n", $output), $this->burstSize()) : null;
+
+            return [
+                'device_id' => $device->id,
+                'ip_address' => $device->ip_address,
+                'name' => $device->name,
+                'status' => $this->burstStatus($returnCode === 0, $stats),
+                'response_time' => $stats !== null ? round($stats['avg'], 2) : null,
+                'stats' => $stats,
+                'duration' => $duration,
+                'timestamp' => now(),
+                'raw_output' => implode("\n", $output)
+            ];
         } catch (\Exception $e) {
             Log::error("Ping error for {$device->ip_address}: " . $e->getMessage());
             
@@ -195,93 +292,6 @@ private function executePing($command, $device)
         }
     }
 
-    /**
-     * Parse response time from ping output
-     */
-    private function parseResponseTime($output, $fallback)
-    {
-        $outputText = implode(' ', $output);
-        
-        // Try to extract response time from ping output
-        if (preg_match('/time[=<](\d+\.?\d*)\s*ms/i', $outputText, $matches)) {
-            return (float) $matches[1];
-        }
-        
-        if (preg_match('/(\d+\.?\d*)\s*ms/i', $outputText, $matches)) {
-            return (float) $matches[1];
-        }
-        
-        // Return fallback duration if we can't parse response time
-        return $fallback;
-    }
-
-    /**
-     * Update device statuses in database
-     */
-    private function updateDeviceStatuses($results)
-    {
-        foreach ($results as $result) {
-            $device = Device::find($result['device_id']);
-            if (!$device) continue;
-            
-            $previousStatus = $device->status;
-            $newStatus = $result['status'];
-            
-            // Helper function to check if status is "online" (online or warning)
-            $isOnlineStatus = function($status) {
-                return in_array($status, ['online', 'warning']);
-            };
-            
-            // Only update updated_at if transitioning between online and offline states
-            $wasOnline = $isOnlineStatus($previousStatus);
-            $isNowOnline = $isOnlineStatus($newStatus);
-            
-            // Always update these fields
-            $device->status = $newStatus;
-            $device->response_time = $result['response_time'];
-            $device->last_ping = $result['timestamp'];
-            
-            if ($wasOnline !== $isNowOnline) {
-                // Status changed from online→offline or offline→online
-                $device->updated_at = now();
-                $device->save();
-            } else {
-                // Status stayed in same category (online→online or offline→offline)
-                // Disable timestamps to prevent auto-update of updated_at
-                $device->timestamps = false;
-                $device->save();
-                $device->timestamps = true;
-            }
-        }
-    }
-
-    /**
-     * Store monitoring history for analytics
-     */
-    private function storeMonitoringHistory($results)
-    {
-        $historyData = [];
-        
-        foreach ($results as $result) {
-            $historyData[] = [
-                'device_id' => $result['device_id'],
-                'status' => $result['status'],
-                'response_time' => $result['response_time'],
-                'checked_at' => $result['timestamp'],
-                'created_at' => now(),
-                'updated_at' => now()
-            ];
-        }
-        
-        // Insert in batches for better performance
-        if (!empty($historyData)) {
-            $chunks = array_chunk($historyData, 100);
-            foreach ($chunks as $chunk) {
-                MonitoringHistory::insert($chunk);
-            }
-        }
-    }
-
     /**
      * Get latest ping results from cache
      */
@@ -342,12 +352,7 @@ public function pingSingle($deviceId)
         }
         
         // Store history
-        MonitoringHistory::create([
-            'device_id' => $deviceId,
-            'status' => $result['status'],
-            'response_time' => $result['response_time'],
-            'checked_at' => $result['timestamp']
-        ]);
+        (new StatusIntervalService())->record([['device_id' => $deviceId] + $result]);
         
         return $result;
     }
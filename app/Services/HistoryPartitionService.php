@@ -0,0 +1,169 @@
+<?php
+
+namespace App\Services;
+
+use App\Models\MonitoringHistory;
+use Carbon\Carbon;
+use Illuminate\Support\Facades\DB;
+
+class HistoryPartitionService
+{
+    const TABLE = 'monitoring_history';
+
+    // Catch-all partitions for rows outside the daily ranges
+    const PGSQL_DEFAULT = 'monitoring_history_default';
+    const MYSQL_MAXVALUE = 'pmax';
+
+    private $driver;
+    private $daysAhead;
+    private $partitioned;
+
+    public function __construct()
+    {
+        $this->driver = DB::connection()->getDriverName();
+        $this->daysAhead = max(1, (int) config('monitoring.history.partition_days_ahead', 3));
+    }
+
+    /**
+     * Whether monitoring_history is split into daily partitions.
+     *
+     * PostgreSQL uses declarative range partitions, MySQL/MariaDB native
+     * RANGE partitioning; SQLite has neither, so there it stays one table
+     * and retention falls back to a row DELETE.
+     */
+    public function isPartitioned()
+    {
+        if ($this->partitioned === null) {
+            $this->partitioned = match ($this->driver) {
+                'pgsql' => DB::selectOne("SELECT COUNT(*) AS n FROM pg_partitioned_table WHERE partrelid = to_regclass(?)", [self::TABLE])->n > 0,
+                'mysql', 'mariadb' => DB::selectOne(
+                    "SELECT COUNT(*) AS n FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ? AND PARTITION_NAME IS NOT NULL",
+                    [self::TABLE]
+                )->n > 0,
+                default => false,
+            };
+        }
+
+        return $this->partitioned;
+    }
+
+    /**
+     * Daily partitions as ['Ymd' => partition name], oldest first
+     */
+    public function partitions()
+    {
+        if (!$this->isPartitioned()) {
+            return [];
+        }
+
+        $names = $this->driver === 'pgsql'
+            ? DB::select("SELECT c.relname AS name FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(?)", [self::TABLE])
+            : DB::select("SELECT PARTITION_NAME AS name FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ? AND PARTITION_NAME IS NOT NULL", [self::TABLE]);
+
+        $partitions = [];
+        foreach ($names as $row) {
+            if (preg_match('/p(\d{8})$/', $row->name, $match)) {
+                $partitions[$match[1]] = $row->name;
+            }
+        }
+        ksort($partitions);
+
+        return $partitions;
+    }
+
+    /**
+     * Create the daily partitions from $from (default today) through partition_days_ahead days from now.
+     * Returns the number created.
+     */
+    public function ensure($from = null, $now = null)
+    {
+        if (!$this->isPartitioned()) {
+            return 0;
+        }
+
+        $now = $now ?: now();
+        $existing = $this->partitions();
+        $days = [];
+        $last = $now->copy()->startOfDay()->addDays($this->daysAhead);
+        for ($day = Carbon::parse($from ?: $now)->startOfDay(); $day->lte($last); $day->addDay()) {
+            if (!isset($existing[$day->format('Ymd')])) {
+                $days[] = $day->copy();
+            }
+        }
+
+        if ($this->driver === 'pgsql') {
+            foreach ($days as $day) {
+                DB::statement(sprintf(
+                    "CREATE TABLE IF NOT EXISTS %s PARTITION OF %s FOR VALUES FROM ('%s') TO ('%s')",
+                    self::TABLE . '_p' . $day->format('Ymd'),
+                    self::TABLE,
+                    $day->format('Y-m-d H:i:s'),
+                    $day->copy()->addDay()->format('Y-m-d H:i:s')
+                ));
+            }
+
+            return count($days);
+        }
+
+        // MySQL ranges must ascend, so new days are split off the MAXVALUE partition after the newest one
+        $newest = array_key_last($existing);
+        $days = array_values(array_filter($days, fn($day) => $newest === null || $day->format('Ymd') > $newest));
+        if (empty($days)) {
+            return 0;
+        }
+
+        $definitions = array_map(fn($day) => sprintf(
+            "PARTITION p%s VALUES LESS THAN (UNIX_TIMESTAMP('%s'))",
+            $day->format('Ymd'),
+            $day->copy()->addDay()->format('Y-m-d H:i:s')
+        ), $days);
+        $definitions[] = 'PARTITION ' . self::MYSQL_MAXVALUE . ' VALUES LESS THAN MAXVALUE';
+        DB::statement('ALTER TABLE ' . self::TABLE . ' REORGANIZE PARTITION ' . self::MYSQL_MAXVALUE . ' INTO (' . implode(', ', $definitions) . ')');
+
+        return count($days);
+    }
+
+    /**
+     * Drop every daily partition that ends at or before $cutoff.
+     *
+     * Dropping a partition is a metadata change however many rows it holds,
+     * so retention no longer scans, locks or bloats the table. Partitions
+     * are whole days, so up to a day past the cutoff is kept. Unpartitioned
+     * tables delete the rows instead.
+     *
+     * Returns the number of partitions dropped, or rows deleted when unpartitioned.
+     */
+    public function prune(Carbon $cutoff)
+    {
+        if (!$this->isPartitioned()) {
+            return MonitoringHistory::where('checked_at', '<', $cutoff)->delete();
+        }
+
+        $expired = $this->expired($cutoff);
+        if (empty($expired)) {
+            return 0;
+        }
+
+        if ($this->driver === 'pgsql') {
+            foreach ($expired as $name) {
+                DB::statement("DROP TABLE IF EXISTS {$name}");
+            }
+        } else {
+            DB::statement('ALTER TABLE ' . self::TABLE . ' DROP PARTITION ' . implode(', ', $expired));
+        }
+
+        return count($expired);
+    }
+
+    /**
+     * Names of the daily partitions that end at or before $cutoff
+     */
+    public function expired(Carbon $cutoff)
+    {
+        return array_values(array_filter(
+            $this->partitions(),
+            fn($name, $day) => Carbon::createFromFormat('Ymd', (string) $day)->startOfDay()->addDay()->lte($cutoff),
+            ARRAY_FILTER_USE_BOTH
+        ));
+    }
+}
@@ -0,0 +1,241 @@
+<?php
+
+namespace App\Services;
+
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\Log;
+
+class IcmpProbeService
+{
+    private $enabled;
+    private $python;
+    private $concurrency;
+    private $daemon;
+    private $burst;
+    private $burstInterval;
+
+    public function __construct()
+    {
+        $this->enabled = (bool) config('monitoring.prober.enabled', true);
+        $this->python = config('monitoring.prober.python', 'python3');
+        $this->concurrency = (int) config('monitoring.prober.concurrency', 1000);
+        $this->daemon = config('monitoring.prober.daemon');
+        $this->burst = max(1, (int) config('monitoring.prober.burst', 3));
+        $this->burstInterval = (float) config('monitoring.prober.burst_interval', 0.05);
+    }
+
+    /**
+     * Probe targets for devices: the bare IP for ICMP devices, otherwise the
+     * device's probe_type (tcp, http, https, snmp) and probe_target
+     */
+    public function targets($devices)
+    {
+        return collect($devices)->map(function ($device) {
+            $type = $device->probe_type ?: 'icmp';
+            if ($type === 'icmp') {
+                return $device->ip_address;
+            }
+            return ['ip' => $device->ip_address, 'probe' => $type, 'target' => $device->probe_target];
+        })->values()->all();
+    }
+
+    /**
+     * Ping every IP: through the probe daemon if it is running, otherwise
+     * with a one-off hostmonitor.icmp process (one process, one ICMP socket).
+     *
+     * $ips may mix plain IPs with targets() entries; TCP, HTTP(S) and SNMP
+     * probes run in the same sweep and concurrency limit, once per sweep.
+     *
+     * A sweep sends each IP a burst of monitoring.prober.burst echoes,
+     * interleaved across hosts, and its 'rtt' is the burst average. With
+     * $attempts > 1 each IP is instead re-probed every $spacing seconds until
+     * it answers, which is how suspected outages are confirmed in one wave.
+     *
+     * Returns [ip => ['alive' => bool, 'rtt' => float|null, 'stats' => array|null]]
+     * (stats: sent, received, loss %, min, avg, max, stddev ms; bursts only),
+     * or null when the prober is disabled or unavailable so callers can fall
+     * back to exec ping.
+     */
+    public function probe(array $ips, $timeout, $attempts = 1, $spacing = 0.2)
+    {
+        // One target per IP, results are keyed by IP
+        $targets = [];
+        foreach ($ips as $target) {
+            $ip = is_array($target) ? ($target['ip'] ?? null) : $target;
+            if ($ip) {
+                $targets[$ip] = $target;
+            }
+        }
+        $ips = array_values($targets);
+        if (empty($ips) || !$this->enabled) {
+            return null;
+        }
+
+        $count = $attempts > 1 ? 1 : $this->burst;
+        $results = $this->probeViaDaemon($ips, $timeout, $attempts, $spacing, $count);
+        if ($results !== null || !$this->isAvailable()) {
+            return $results;
+        }
+
+        return $this->probeViaProcess($ips, $timeout, $attempts, $spacing, $count);
+    }
+
+    /**
+     * Send one request to the hostmonitor.probed daemon and collect its NDJSON stream.
+     * Returns null if the daemon isn't listening or the stream ends early.
+     */
+    public function probeViaDaemon(array $ips, $timeout, $attempts = 1, $spacing = 0.2, $count = 1)
+    {
+        if (!$this->daemon) {
+            return null;
+        }
+
+        $startTime = microtime(true);
+        $socket = @stream_socket_client($this->daemon, $errno, $errstr, 0.5);
+        if (!$socket) {
+            return null;
+        }
+
+        stream_set_timeout($socket, (int) ceil($timeout + $attempts * $spacing + $count * $this->burstInterval) + 10);
+        fwrite($socket, json_encode([
+            'op' => 'probe',
+            'timeout' => $timeout,
+            'attempts' => $attempts,
+            'spacing' => $spacing,
+            'count' => $count,
+            'interval' => $this->burstInterval,
+            'targets' => $ips
+        ]) . "\n");
+
+        $results = [];
+        $summary = null;
+        while (($line = fgets($socket)) !== false) {
+            $row = json_decode($line, true);
+            if (!is_array($row) || isset($row['done'])) {
+                $summary = $row;
+                break;
+            }
+            if (isset($row['ip'])) {
+                $results[$row['ip']] = ['alive' => $row['alive'], 'rtt' => $row['rtt'], 'stats' => $row['stats'] ?? null];
+            }
+        }
+        fclose($socket);
+
+        if (!is_array($summary)) {
+            Log::warning("Probe daemon stream ended early", ['received' => count($results)]);
+            return null;
+        }
+
+        Log::info("ICMP sweep completed via probe daemon", [
+            'hosts' => count($ips),
+            'alive' => $summary['alive'] ?? null,
+            'duration' => round((microtime(true) - $startTime) * 1000, 2)
+        ]);
+
+        return $results;
+    }
+
+    /**
+     * Run hostmonitor.icmp once for the whole sweep
+     */
+    private function probeViaProcess(array $ips, $timeout, $attempts = 1, $spacing = 0.2, $count = 1)
+    {
+        $command = [
+            $this->python, '-m', 'hostmonitor.icmp',
+            '--timeout', (string) $timeout,
+            '--concurrency', (string) $this->concurrency,
+            '--attempts', (string) $attempts,
+            '--spacing', (string) $spacing,
+            '--count', (string) $count,
+            '--interval', (string) $this->burstInterval,
+        ];
+        // stderr goes to a file: a warning per misconfigured target can outgrow a pipe
+        // buffer, and the child would block on it while stdout is read to EOF
+        $errorFile = tempnam(sys_get_temp_dir(), 'icmp');
+        $descriptorspec = [
+            0 => ['pipe', 'r'],
+            1 => ['pipe', 'w'],
+            2 => ['file', $errorFile, 'w']
+        ];
+
+        $startTime = microtime(true);
+        $process = @proc_open($command, $descriptorspec, $pipes, base_path());
+        if (!is_resource($process)) {
+            @unlink($errorFile);
+            $this->markUnavailable('could not start ' . $this->python);
+            return null;
+        }
+
+        // The whole sweep takes about one timeout; don't hang past a generous bound
+        stream_set_timeout($pipes[1], (int) ceil($timeout + $attempts * $spacing + $count * $this->burstInterval) + 30);
+        fwrite($pipes[0], implode("\n", array_map([$this, 'targetLine'], $ips)) . "\n");
+        fclose($pipes[0]);
+
+        $output = stream_get_contents($pipes[1]);
+        fclose($pipes[1]);
+        $exitCode = proc_close($process);
+        $errors = (string) @file_get_contents($errorFile);
+        @unlink($errorFile);
+
+        $decoded = $exitCode === 0 ? json_decode($output, true) : null;
+        if (!is_array($decoded) || !isset($decoded['results'])) {
+            $this->markUnavailable(trim($errors) ?: "exit code {$exitCode}");
+            return null;
+        }
+
+        Log::info("ICMP sweep completed", [
+            'hosts' => count($ips),
+            'alive' => count(array_filter($decoded['results'], fn($r) => $r['alive'])),
+            'socket' => $decoded['socket'] ?? null,
+            'duration' => round((microtime(true) - $startTime) * 1000, 2)
+        ]);
+
+        return $decoded['results'];
+    }
+
+    /**
+     * hostmonitor.icmp stdin line: "IP" or "IP TYPE [ARGUMENT]"
+     */
+    private function targetLine($target)
+    {
+        if (!is_array($target)) {
+            return $target;
+        }
+
+        return trim("{$target['ip']} {$target['probe']} " . ($target['target'] ?? ''));
+    }
+
+    /**
+     * Whether the probe daemon is accepting connections
+     */
+    public function daemonListening()
+    {
+        if (!$this->enabled || !$this->daemon) {
+            return false;
+        }
+
+        $socket = @stream_socket_client($this->daemon, $errno, $errstr, 0.5);
+        if (!$socket) {
+            return false;
+        }
+        fclose($socket);
+        return true;
+    }
+
+    /**
+     * Whether the prober is enabled and hasn't failed recently
+     */
+    public function isAvailable()
+    {
+        return $this->enabled && !Cache::get('monitoring.prober.unavailable', false);
+    }
+
+    /**
+     * Stop trying the prober for a few minutes after it fails (no ICMP socket, no python)
+     */
+    private function markUnavailable($reason)
+    {
+        Log::warning("ICMP prober unavailable, falling back to ping: {$reason}");
+        Cache::put('monitoring.prober.unavailable', true, 300);
+    }
+}
@@ -0,0 +1,303 @@
+<?php
+
+namespace App\Services;
+
+use Carbon\Carbon;
+use Illuminate\Support\Facades\DB;
+
+class MonitoringArchiveService
+{
+    const MAGIC = 'MHA1';
+
+    // Column order in the file; online/down only hold the MIXED rows
+    const COLUMNS = ['device', 'delta', 'state', 'checks', 'transitions', 'rtt_count', 'rtt', 'online', 'down'];
+
+    // Per-bucket state, two bits each
+    const ALL_ONLINE = 0;
+    const ALL_DOWN = 1;
+    const MIXED = 2;
+
+    // RTT is stored in tenths of a millisecond; this marks a bucket without RTT samples
+    const NO_RTT = 0xFFFF;
+
+    // Rows decoded at a time when scanning (a multiple of 4, so state bytes split evenly)
+    const BLOCK = 65536;
+
+    private $path;
+    private $rollups;
+
+    public function __construct()
+    {
+        $this->path = rtrim(config('monitoring.archive.path', storage_path('app/monitoring-archive')), '/');
+        $this->rollups = new MonitoringRollupService();
+    }
+
+    /**
+     * Archive every complete month that still has rollups but no archive file.
+     * Returns the months written as Y-m.
+     */
+    public function archivePending($now = null)
+    {
+        $now = $now ?: now();
+        $oldest = DB::table(MonitoringRollupService::TABLE)->whereIn('resolution', ['hour', 'day'])->min('bucket_start');
+        if ($oldest === null) {
+            return [];
+        }
+
+        $written = [];
+        $current = $now->copy()->startOfMonth();
+        for ($month = Carbon::parse($oldest)->startOfMonth(); $month->lt($current); $month->addMonth()) {
+            if (!file_exists($this->file($month)) && $this->archive($month, $now) > 0) {
+                $written[] = $month->format('Y-m');
+            }
+        }
+
+        return $written;
+    }
+
+    /**
+     * Write one month of rollups to its archive file, returning the rows written.
+     *
+     * Hour buckets are used while the whole month is still kept at that
+     * resolution, day buckets after. Rows are sorted by device and time and
+     * stored column by column, then gzipped:
+     * - bucket times as the delta in hours from the previous row,
+     * - a 2-bit state per bucket (all online, all down, mixed); only mixed
+     *   buckets store their online and down counts,
+     * - average RTT as a 16-bit count of tenths of a millisecond.
+     * Runs of the same device, one-hour steps and steady counts compress to
+     * almost nothing, so a month of 3,000 devices is a few megabytes.
+     */
+    public function archive(Carbon $month, $now = null)
+    {
+        $start = $month->copy()->startOfMonth();
+        $end = $start->copy()->addMonth();
+        $resolution = $start->gte($this->rollups->retainedSince('hour', $now)) ? 'hour' : 'day';
+        $count = $resolution === 'hour' ? 'v' : 'V';
+
+        $rows = DB::table(MonitoringRollupService::TABLE)
+            ->where('resolution', $resolution)
+            ->where('bucket_start', '>=', $start)
+            ->where('bucket_start', '<', $end)
+            ->orderBy('device_id')
+            ->orderBy('bucket_start')
+            ->cursor();
+
+        $columns = array_fill_keys(self::COLUMNS, '');
+        $written = 0;
+        $previous = 0;
+        $stateByte = 0;
+        foreach ($rows as $row) {
+            $hour = intdiv(Carbon::parse($row->bucket_start)->getTimestamp() - $start->getTimestamp(), 3600);
+            $columns['device'] .= pack('V', $row->device_id);
+            $columns['delta'] .= pack('v', ($hour - $previous) & 0xFFFF);
+            $previous = $hour;
+
+            $checks = (int) $row->checks;
+            if ((int) $row->online_checks === $checks) {
+                $state = self::ALL_ONLINE;
+            } elseif ((int) $row->down_checks === $checks) {
+                $state = self::ALL_DOWN;
+            } else {
+                $state = self::MIXED;
+                $columns['online'] .= pack($count, $row->online_checks);
+                $columns['down'] .= pack($count, $row->down_checks);
+            }
+            $stateByte |= $state << (2 * ($written % 4));
+            if ($written % 4 === 3) {
+                $columns['state'] .= chr($stateByte);
+                $stateByte = 0;
+            }
+
+            $columns['checks'] .= pack($count, $checks);
+            $columns['transitions'] .= pack($count, $row->transitions);
+            $columns['rtt_count'] .= pack($count, $row->rtt_count);
+            $columns['rtt'] .= pack('v', $row->rtt_count > 0
+                ? min(self::NO_RTT - 1, (int) round($row->rtt_sum / $row->rtt_count * 10))
+                : self::NO_RTT);
+            $written++;
+        }
+
+        if ($written === 0) {
+            return 0;
+        }
+        if ($written % 4 !== 0) {
+            $columns['state'] .= chr($stateByte);
+        }
+
+        $data = self::MAGIC . pack('VVC', $written, $start->getTimestamp(), $resolution === 'hour' ? 1 : 24);
+        foreach (self::COLUMNS as $column) {
+            $data .= pack('V', strlen($columns[$column])) . $columns[$column];
+        }
+
+        if (!is_dir($this->path)) {
+            mkdir($this->path, 0755, true);
+        }
+        // Write then rename, so readers never see a half-written month
+        $file = $this->file($start);
+        file_put_contents($file . '.tmp', gzencode($data, 9));
+        rename($file . '.tmp', $file);
+
+        return $written;
+    }
+
+    /**
+     * Per-device totals over [$start, $end) from the archive files, keyed by
+     * device_id like MonitoringRollupService::totals. A null $deviceIds covers
+     * every device. rtt_min/rtt_max are the extremes of the bucket averages.
+     */
+    public function totals($deviceIds, $start, $end)
+    {
+        $start = Carbon::parse($start);
+        $end = Carbon::parse($end);
+        $wanted = $deviceIds === null ? null : array_flip(array_map('intval', collect($deviceIds)->all()));
+
+        $totals = [];
+        for ($month = $start->copy()->startOfMonth(); $month->lt($end); $month->addMonth()) {
+            $this->scan($month, $wanted, $start->getTimestamp(), $end->getTimestamp(), $totals);
+        }
+
+        return collect($totals)->map(fn($row) => (object) $row);
+    }
+
+    /**
+     * Totals over [$start, $end] from the rollups, with the part older than
+     * the rollups keep read from the archive instead
+     */
+    public function rangeTotals($deviceIds, $start, $end)
+    {
+        $start = Carbon::parse($start);
+        $end = Carbon::parse($end);
+        $liveSince = $this->rollups->retainedSince('day');
+        if ($start->gte($liveSince)) {
+            return $this->rollups->totals($deviceIds, $start, $end);
+        }
+
+        $totals = $this->totals($deviceIds, $start, $end->lt($liveSince) ? $end : $liveSince);
+        if ($end->lte($liveSince)) {
+            return $totals;
+        }
+
+        foreach ($this->rollups->totals($deviceIds, $liveSince, $end) as $deviceId => $live) {
+            $archived = $totals->get($deviceId);
+            if (!$archived) {
+                $totals->put($deviceId, $live);
+                continue;
+            }
+            foreach (['checks', 'online_checks', 'down_checks', 'transitions', 'rtt_count', 'rtt_sum'] as $column) {
+                $archived->$column += $live->$column;
+            }
+            $archived->rtt_min = $this->extreme('min', $archived->rtt_min, $live->rtt_min);
+            $archived->rtt_max = $this->extreme('max', $archived->rtt_max, $live->rtt_max);
+        }
+
+        return $totals;
+    }
+
+    public function file(Carbon $month)
+    {
+        return $this->path . '/' . $month->format('Y-m') . '.mha.gz';
+    }
+
+    /**
+     * Add one month's buckets in [$from, $to) to $totals, a block of rows at a time
+     */
+    private function scan(Carbon $month, $wanted, $from, $to, array &$totals)
+    {
+        $file = $this->file($month);
+        if (!is_file($file)) {
+            return;
+        }
+        $data = gzdecode(file_get_contents($file));
+        if ($data === false || strncmp($data, self::MAGIC, 4) !== 0) {
+            return;
+        }
+
+        $header = unpack('Vrows/Vstart/Cstep', $data, 4);
+        $position = 13;
+        $columns = [];
+        foreach (self::COLUMNS as $column) {
+            $length = unpack('V', $data, $position)[1];
+            $columns[$column] = $position + 4;
+            $position += 4 + $length;
+        }
+
+        [$format, $width] = $header['step'] === 1 ? ['v*', 2] : ['V*', 4];
+        $slice = fn($column, $first, $n, $size) => substr($data, $columns[$column] + $first * $size, $n * $size);
+
+        $hour = 0;
+        $mixedSeen = 0;
+        for ($first = 0; $first < $header['rows']; $first += self::BLOCK) {
+            $n = min(self::BLOCK, $header['rows'] - $first);
+            $stateBytes = substr($data, $columns['state'] + intdiv($first, 4), intdiv($n + 3, 4));
+            $states = [];
+            $mixed = 0;
+            for ($i = 0; $i < $n; $i++) {
+                $states[$i] = (ord($stateBytes[$i >> 2]) >> (2 * ($i & 3))) & 3;
+                $mixed += $states[$i] === self::MIXED ? 1 : 0;
+            }
+
+            $devices = unpack('V*', $slice('device', $first, $n, 4));
+            $deltas = unpack('v*', $slice('delta', $first, $n, 2));
+            $checks = unpack($format, $slice('checks', $first, $n, $width));
+            $transitions = unpack($format, $slice('transitions', $first, $n, $width));
+            $rttCounts = unpack($format, $slice('rtt_count', $first, $n, $width));
+            $rtts = unpack('v*', $slice('rtt', $first, $n, 2));
+            $online = $mixed ? unpack($format, $slice('online', $mixedSeen, $mixed, $width)) : [];
+            $down = $mixed ? unpack($format, $slice('down', $mixedSeen, $mixed, $width)) : [];
+            $mixedSeen += $mixed;
+
+            $j = 0;
+            for ($i = 1; $i <= $n; $i++) {
+                $delta = $deltas[$i];
+                $hour += $delta >= 0x8000 ? $delta - 0x10000 : $delta;
+                $state = $states[$i - 1];
+                if ($state === self::MIXED) {
+                    $j++;
+                }
+
+                $deviceId = $devices[$i];
+                $bucket = $header['start'] + $hour * 3600;
+                if (($wanted !== null && !isset($wanted[$deviceId])) || $bucket < $from || $bucket >= $to) {
+                    continue;
+                }
+
+                $count = $checks[$i];
+                $row = &$totals[$deviceId];
+                $row ??= [
+                    'checks' => 0, 'online_checks' => 0, 'down_checks' => 0, 'transitions' => 0,
+                    'rtt_count' => 0, 'rtt_sum' => 0.0, 'rtt_min' => null, 'rtt_max' => null,
+                ];
+                $row['checks'] += $count;
+                $row['online_checks'] += match ($state) {
+                    self::ALL_ONLINE => $count,
+                    self::ALL_DOWN => 0,
+                    default => $online[$j],
+                };
+                $row['down_checks'] += match ($state) {
+                    self::ALL_ONLINE => 0,
+                    self::ALL_DOWN => $count,
+                    default => $down[$j],
+                };
+                $row['transitions'] += $transitions[$i];
+                if ($rtts[$i] !== self::NO_RTT) {
+                    $rtt = $rtts[$i] / 10;
+                    $row['rtt_count'] += $rttCounts[$i];
+                    $row['rtt_sum'] += $rtt * $rttCounts[$i];
+                    $row['rtt_min'] = $this->extreme('min', $row['rtt_min'], $rtt);
+                    $row['rtt_max'] = $this->extreme('max', $row['rtt_max'], $rtt);
+                }
+                unset($row);
+            }
+        }
+    }
+
+    private function extreme($function, $a, $b)
+    {
+        if ($a === null || $b === null) {
+            return $a ?? $b;
+        }
+
+        return $function((float) $a, (float) $b);
+    }
+}
@@ -0,0 +1,271 @@
+<?php
+
+namespace App\Services;
+
+use Carbon\Carbon;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\DB;
+
+class MonitoringRollupService
+{
+    const RESOLUTIONS = ['minute', 'hour', 'day'];
+
+    const TABLE = 'device_status_rollups';
+
+    private $minuteWidth;
+    private $retentionDays;
+    private $chunkSize;
+
+    public function __construct()
+    {
+        // The finest tier is aggregation_interval minutes wide; 1 gives true minute buckets
+        $this->minuteWidth = max(1, min(60, (int) config('monitoring.analytics.aggregation_interval', 5)));
+        $this->retentionDays = array_merge(
+            ['minute' => 2, 'hour' => 90, 'day' => 730],
+            (array) config('monitoring.analytics.rollup_retention_days', [])
+        );
+        $this->chunkSize = max(1, (int) config('monitoring.performance.status_write_chunk', 1000));
+    }
+
+    /**
+     * Add samples to their minute, hour and day buckets.
+     *
+     * $samples is [device_id => [status, rtt, timestamp, transition]], one
+     * sample per device as StatusIntervalService records them. Each tier is
+     * an upsert that increments the bucket's counters in SQL, so a sweep
+     * costs three statements per chunk of devices whatever the bucket width.
+     */
+    public function add(array $samples)
+    {
+        if (empty($samples)) {
+            return;
+        }
+
+        $update = $this->increments();
+        foreach (self::RESOLUTIONS as $resolution) {
+            $rows = [];
+            foreach ($samples as $deviceId => $sample) {
+                $rtt = $sample['rtt'];
+                $rows[] = [
+                    'device_id' => $deviceId,
+                    'resolution' => $resolution,
+                    'bucket_start' => $this->floor($sample['timestamp'], $resolution),
+                    'checks' => 1,
+                    'online_checks' => $sample['status'] === 'online' ? 1 : 0,
+                    'down_checks' => in_array($sample['status'], StatusIntervalService::DOWN_STATUSES) ? 1 : 0,
+                    'transitions' => empty($sample['transition']) ? 0 : 1,
+                    'rtt_count' => $rtt !== null ? 1 : 0,
+                    'rtt_sum' => $rtt ?? 0,
+                    'rtt_min' => $rtt,
+                    'rtt_max' => $rtt,
+                ];
+            }
+
+            foreach (array_chunk($rows, $this->chunkSize) as $chunk) {
+                DB::table(self::TABLE)->upsert($chunk, ['device_id', 'resolution', 'bucket_start'], $update);
+            }
+        }
+
+        // Buckets past their tier's retention, at most hourly
+        if (Cache::add('monitoring.rollups.pruned', true, 3600)) {
+            $this->prune();
+        }
+    }
+
+    /**
+     * Per-device totals over [$start, $end], keyed by device_id.
+     *
+     * Reads the coarsest buckets that fit: whole days from day buckets, the
+     * whole hours around them from hour buckets and only the ragged edges
+     * from minute buckets, so a 30-day range is about 30 day rows per device
+     * plus the edges. Edges older than a tier's retention widen to the next
+     * tier's bucket. A null $deviceIds covers every device.
+     */
+    public function totals($deviceIds, $start, $end)
+    {
+        return $this->query($start, $end)
+            ->when($deviceIds !== null, fn($query) => $query->whereIn('device_id', $deviceIds))
+            ->groupBy('device_id')
+            ->select('device_id', ...$this->aggregates())
+            ->get()
+            ->keyBy('device_id');
+    }
+
+    /**
+     * Totals over [$start, $end] across all devices
+     */
+    public function overall($start, $end)
+    {
+        return $this->query($start, $end)->select($this->aggregates())->first();
+    }
+
+    /**
+     * Uptime percentage from a totals row, or null without checks
+     */
+    public static function uptime($totals)
+    {
+        if (!$totals || $totals->checks <= 0) {
+            return null;
+        }
+
+        return round((float) (($totals->online_checks / $totals->checks) * 100), 2);
+    }
+
+    /**
+     * Delete buckets older than their tier's retention
+     */
+    public function prune($now = null)
+    {
+        $now = $now ?: now();
+        $deleted = 0;
+        foreach (self::RESOLUTIONS as $resolution) {
+            $deleted += DB::table(self::TABLE)
+                ->where('resolution', $resolution)
+                ->where('bucket_start', '<', $now->copy()->subDays($this->retentionDays[$resolution]))
+                ->delete();
+        }
+
+        return $deleted;
+    }
+
+    /**
+     * Start of the oldest $resolution bucket still kept
+     */
+    public function retainedSince($resolution, $now = null)
+    {
+        return $this->ceil(($now ?: now())->copy()->subDays($this->retentionDays[$resolution]), $resolution);
+    }
+
+    /**
+     * [resolution, from, to] ranges of bucket_start covering [$start, $end]
+     */
+    public function segments($start, $end, $now = null)
+    {
+        $now = $now ?: now();
+        $start = $this->floor(Carbon::parse($start), 'minute');
+        $end = $this->ceil(Carbon::parse($end), 'minute');
+
+        // Finer tiers are pruned first: widen edges that fall before their retention
+        foreach (['minute' => 'hour', 'hour' => 'day'] as $tier => $coarser) {
+            $cutoff = $now->copy()->subDays($this->retentionDays[$tier]);
+            if ($start->lt($cutoff)) {
+                $start = $this->floor($start, $coarser);
+            }
+            if ($end->lt($cutoff)) {
+                $end = $this->ceil($end, $coarser);
+            }
+        }
+
+        if ($start->gte($end)) {
+            return [];
+        }
+
+        $hourStart = $this->ceil($start, 'hour');
+        $hourEnd = $this->floor($end, 'hour');
+        if ($hourStart->gte($hourEnd)) {
+            return [['minute', $start, $end]];
+        }
+
+        $segments = [];
+        $dayStart = $this->ceil($hourStart, 'day');
+        $dayEnd = $this->floor($hourEnd, 'day');
+        if ($dayStart->lt($dayEnd)) {
+            $segments[] = ['day', $dayStart, $dayEnd];
+            $segments[] = ['hour', $hourStart, $dayStart];
+            $segments[] = ['hour', $dayEnd, $hourEnd];
+        } else {
+            $segments[] = ['hour', $hourStart, $hourEnd];
+        }
+        $segments[] = ['minute', $start, $hourStart];
+        $segments[] = ['minute', $hourEnd, $end];
+
+        return array_values(array_filter($segments, fn($segment) => $segment[1]->lt($segment[2])));
+    }
+
+    /**
+     * Builder over the buckets covering [$start, $end]
+     */
+    private function query($start, $end)
+    {
+        $segments = $this->segments($start, $end);
+
+        return DB::table(self::TABLE)->where(function ($query) use ($segments) {
+            if (empty($segments)) {
+                $query->whereRaw('1 = 0');
+            }
+            foreach ($segments as [$resolution, $from, $to]) {
+                $query->orWhere(function ($q) use ($resolution, $from, $to) {
+                    $q->where('resolution', $resolution)
+                      ->where('bucket_start', '>=', $from)
+                      ->where('bucket_start', '<', $to);
+                });
+            }
+        });
+    }
+
+    private function aggregates()
+    {
+        return [
+            DB::raw('SUM(checks) as checks'),
+            DB::raw('SUM(online_checks) as online_checks'),
+            DB::raw('SUM(down_checks) as down_checks'),
+            DB::raw('SUM(transitions) as transitions'),
+            DB::raw('SUM(rtt_count) as rtt_count'),
+            DB::raw('SUM(rtt_sum) as rtt_sum'),
+            DB::raw('MIN(rtt_min) as rtt_min'),
+            DB::raw('MAX(rtt_max) as rtt_max'),
+        ];
+    }
+
+    /**
+     * ON CONFLICT / ON DUPLICATE KEY assignments adding the incoming row to the bucket
+     */
+    private function increments()
+    {
+        $driver = DB::connection()->getDriverName();
+        $incoming = fn($column) => in_array($driver, ['mysql', 'mariadb']) ? "VALUES({$column})" : "excluded.{$column}";
+        // SQLite spells the scalar forms MIN/MAX; all three return NULL if either side is NULL
+        $least = $driver === 'sqlite' ? 'MIN' : 'LEAST';
+        $greatest = $driver === 'sqlite' ? 'MAX' : 'GREATEST';
+        $table = self::TABLE;
+
+        $update = [];
+        foreach (['checks', 'online_checks', 'down_checks', 'transitions', 'rtt_count', 'rtt_sum'] as $column) {
+            $update[$column] = DB::raw("{$table}.{$column} + {$incoming($column)}");
+        }
+        foreach (['rtt_min' => $least, 'rtt_max' => $greatest] as $column => $function) {
+            $update[$column] = DB::raw("COALESCE({$function}({$table}.{$column}, {$incoming($column)}), {$table}.{$column}, {$incoming($column)})");
+        }
+
+        return $update;
+    }
+
+    /**
+     * Start of the $resolution bucket containing $time
+     */
+    public function floor(Carbon $time, $resolution)
+    {
+        return match ($resolution) {
+            'day' => $time->copy()->startOfDay(),
+            'hour' => $time->copy()->startOfHour(),
+            default => $time->copy()->startOfHour()->addMinutes(intdiv($time->minute, $this->minuteWidth) * $this->minuteWidth),
+        };
+    }
+
+    /**
+     * Start of the first $resolution bucket at or after $time
+     */
+    public function ceil(Carbon $time, $resolution)
+    {
+        $floor = $this->floor($time, $resolution);
+        if ($floor->eq($time)) {
+            return $floor;
+        }
+
+        return match ($resolution) {
+            'day' => $floor->addDay(),
+            'hour' => $floor->addHour(),
+            default => $floor->addMinutes($this->minuteWidth),
+        };
+    }
+}
@@ -0,0 +1,116 @@
+<?php
+
+namespace App\Services;
+
+use Illuminate\Support\Facades\Log;
+
+class ProbeConfirmationService
+{
+    private $prober;
+    private $failures;
+    private $spacing;
+
+    public function __construct()
+    {
+        $this->prober = new IcmpProbeService();
+        $this->failures = max(1, (int) config('monitoring.alerts.consecutive_failures', 3));
+        $this->spacing = (float) config('monitoring.alerts.retry_spacing', 0.2);
+    }
+
+    /**
+     * Whether a missed probe needs confirming: only devices that are currently
+     * up flip on a miss, devices already down just stay down
+     */
+    public function needsConfirmation($previousStatus)
+    {
+        return $this->failures > 1 && in_array($previousStatus, ['online', 'warning']);
+    }
+
+    /**
+     * Re-probe suspects that missed one probe, all in a single wave.
+     *
+     * Each IP gets up to consecutive_failures - 1 more probes, retry_spacing
+     * apart, stopping at the first reply. $targets are IPs or
+     * IcmpProbeService::targets() entries, so devices are re-probed with their
+     * own probe type. Returns [ip => rtt|null]: a null rtt means every probe
+     * failed and the device may be marked offline.
+     */
+    public function confirm(array $targets, $timeout)
+    {
+        $ips = array_values(array_unique(array_filter(array_map(
+            fn($target) => is_array($target) ? ($target['ip'] ?? null) : $target,
+            $targets
+        ))));
+        if (empty($ips)) {
+            return [];
+        }
+
+        $attempts = $this->failures - 1;
+        $startTime = microtime(true);
+
+        $results = $this->prober->probe($targets, $timeout, $attempts, $this->spacing);
+        if ($results !== null) {
+            $rtts = [];
+            foreach ($ips as $ip) {
+                $rtts[$ip] = isset($results[$ip]) && $results[$ip]['alive'] ? $results[$ip]['rtt'] : null;
+            }
+        } else {
+            $rtts = $this->confirmWithPing($ips, $timeout, $attempts);
+        }
+
+        $recovered = count(array_filter($rtts, fn($rtt) => $rtt !== null));
+        Log::info("Confirmation wave completed", [
+            'suspects' => count($ips),
+            'recovered' => $recovered,
+            'confirmed_offline' => count($ips) - $recovered,
+            'duration' => round((microtime(true) - $startTime) * 1000, 2)
+        ]);
+
+        return $rtts;
+    }
+
+    /**
+     * Fallback wave without the prober: one multi-packet ping per suspect, all started at once
+     * (ICMP only, whatever the device's probe type)
+     */
+    private function confirmWithPing(array $ips, $timeout, $attempts)
+    {
+        $isWindows = strtoupper(substr(PHP_OS, 0, 3)) === 'WIN';
+        $descriptorspec = [
+            0 => ['pipe', 'r'],
+            1 => ['pipe', 'w'],
+            2 => ['pipe', 'w']
+        ];
+
+        $processes = [];
+        $rtts = [];
+        foreach ($ips as $ip) {
+            $arg = escapeshellarg($ip);
+            $command = $isWindows
+                ? "ping -n {$attempts} -w " . (int) ($timeout * 1000) . " {$arg}"
+                : "ping -c {$attempts} -i {$this->spacing} -W " . max(1, (int) ceil($timeout)) . " {$arg}";
+
+            $process = @proc_open($command, $descriptorspec, $pipes);
+            if (!is_resource($process)) {
+                $rtts[$ip] = null;
+                continue;
+            }
+            fclose($pipes[0]);
+            $processes[$ip] = [$process, $pipes];
+        }
+
+        foreach ($processes as $ip => [$process, $pipes]) {
+            $output = stream_get_contents($pipes[1]);
+            fclose($pipes[1]);
+            fclose($pipes[2]);
+            $exitCode = proc_close($process);
+
+            $rtts[$ip] = null;
+            if ($exitCode === 0) {
+                $rtts[$ip] = preg_match('/time[=<](\d+\.?\d*)\s*ms/i', $output, $matches) ? (float) $matches[1] : 0.0;
+            }
+        }
+
+        return $rtts;
+    }
+}
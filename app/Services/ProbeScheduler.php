@@ -0,0 +1,227 @@
+<?php
+
+namespace App\Services;
+
+use SplMinHeap;
+
+class ProbeScheduler
+{
+    const CRITICAL = 'critical';
+    const HIGH = 'high';
+    const NORMAL = 'normal';
+    const LOW = 'low';
+
+    private $intervals;
+    private $categoryTiers;
+    private $criticalSla;
+    private $flapWindow;
+    private $flapChanges;
+
+    private $heap;
+    private $due = [];
+    private $tiers = [];
+    private $devices = [];
+    private $changes = [];
+    private $lastStatus = [];
+
+    public function __construct()
+    {
+        $this->intervals = [
+            self::CRITICAL => (int) config('monitoring.scheduling.critical_frequency', 10),
+            self::HIGH => (int) config('monitoring.scheduling.high_frequency', 30),
+            self::NORMAL => (int) config('monitoring.scheduling.normal_frequency', 120),
+            self::LOW => (int) config('monitoring.scheduling.low_frequency', 300),
+        ];
+        $this->categoryTiers = config('monitoring.scheduling.categories', []);
+        $this->criticalSla = (float) config('monitoring.scheduling.critical_sla', 99.95);
+        $this->flapWindow = (int) config('monitoring.scheduling.flap_window', 600);
+        $this->flapChanges = (int) config('monitoring.scheduling.flap_changes', 3);
+
+        // [due, device id] pairs; entries whose due no longer matches $this->due are stale
+        $this->heap = new SplMinHeap();
+    }
+
+    /**
+     * Probe tier for a device: SLA and flapping override the category's base tier
+     */
+    public function tierFor($device, $now)
+    {
+        if ($this->isFlapping($device->id, $now) || (float) $device->sla_target >= $this->criticalSla) {
+            return self::CRITICAL;
+        }
+
+        return $this->categoryTiers[$device->category] ?? self::NORMAL;
+    }
+
+    public function interval($tier)
+    {
+        return $this->intervals[$tier];
+    }
+
+    /**
+     * Bring the schedule in line with the current device set.
+     *
+     * New devices get a due time spread across their interval by a hash of
+     * their id, so a cold start doesn't probe everything at once. Devices
+     * that are gone, inactive or offline_ack are dropped (acknowledged
+     * devices are never probed, like everywhere else). Devices whose tier
+     * got faster are pulled forward.
+     */
+    public function sync($devices, $now)
+    {
+        $seen = [];
+        foreach ($devices as $device) {
+            if (!$device->is_active || $device->status === 'offline_ack') {
+                continue;
+            }
+
+            $id = $device->id;
+            $seen[$id] = true;
+            $this->devices[$id] = $device;
+            // Status changes made elsewhere (Ping All, other workers) count towards flapping too
+            if (isset($this->lastStatus[$id]) && $this->lastStatus[$id] !== $device->status) {
+                $this->changes[$id][] = $now;
+            }
+            $this->lastStatus[$id] = $device->status;
+
+            $tier = $this->tierFor($device, $now);
+            if (!isset($this->due[$id])) {
+                $this->schedule($id, $tier, $now + $this->phase($id, $this->intervals[$tier]));
+            } elseif ($tier !== $this->tiers[$id]) {
+                $sooner = $now + $this->phase($id, $this->intervals[$tier]);
+                $this->schedule($id, $tier, min($this->due[$id], $sooner));
+            }
+        }
+
+        foreach (array_keys($this->due) as $id) {
+            if (!isset($seen[$id])) {
+                unset($this->due[$id], $this->tiers[$id], $this->devices[$id], $this->changes[$id], $this->lastStatus[$id]);
+            }
+        }
+    }
+
+    /**
+     * Pop every device due at or before $now and reschedule it one interval on
+     */
+    public function due($now)
+    {
+        $devices = [];
+        while (!$this->heap->isEmpty()) {
+            [$due, $id] = $this->heap->top();
+            if ($due > $now) {
+                break;
+            }
+            $this->heap->extract();
+            if (($this->due[$id] ?? null) !== $due) {
+                continue; // Rescheduled or removed since this entry was pushed
+            }
+
+            $devices[$id] = $this->devices[$id];
+
+            // Keep the device's phase: step from its due time, not from now
+            $interval = $this->intervals[$this->tiers[$id]];
+            $next = $due + $interval;
+            if ($next <= $now) {
+                $next += (floor(($now - $next) / $interval) + 1) * $interval;
+            }
+            $this->schedule($id, $this->tiers[$id], $next);
+        }
+
+        return $devices;
+    }
+
+    /**
+     * Seconds until the earliest due device (0 if one is already due, null if none)
+     */
+    public function secondsUntilNext($now)
+    {
+        while (!$this->heap->isEmpty()) {
+            [$due, $id] = $this->heap->top();
+            if (($this->due[$id] ?? null) === $due) {
+                return max(0, $due - $now);
+            }
+            $this->heap->extract();
+        }
+
+        return null;
+    }
+
+    /**
+     * Feed probe results back: status changes are counted for flap detection,
+     * and a device that starts or stops flapping changes tier right away
+     */
+    public function record(array $results, $now)
+    {
+        foreach ($results as $result) {
+            $id = $result['device_id'];
+            if (!isset($this->due[$id])) {
+                continue;
+            }
+
+            // The cached model is what the next probe of this device sees (FastPingService
+            // reads its status to decide on a confirmation wave), so keep it current until the next sync
+            $this->devices[$id]->status = $result['status'];
+
+            $previous = $this->lastStatus[$id] ?? null;
+            $this->lastStatus[$id] = $result['status'];
+            if ($previous === null || $previous === $result['status']) {
+                continue;
+            }
+
+            $this->changes[$id][] = $now;
+            $tier = $this->tierFor($this->devices[$id], $now);
+            if ($tier !== $this->tiers[$id]) {
+                $this->schedule($id, $tier, min($this->due[$id], $now + $this->intervals[$tier]));
+            }
+        }
+    }
+
+    public function isFlapping($id, $now)
+    {
+        if (empty($this->changes[$id])) {
+            return false;
+        }
+
+        $cutoff = $now - $this->flapWindow;
+        $this->changes[$id] = array_values(array_filter($this->changes[$id], fn($at) => $at >= $cutoff));
+
+        return count($this->changes[$id]) >= $this->flapChanges;
+    }
+
+    /**
+     * Devices per tier and the resulting probes per minute
+     */
+    public function stats()
+    {
+        $counts = array_fill_keys(array_keys($this->intervals), 0);
+        foreach ($this->tiers as $tier) {
+            $counts[$tier]++;
+        }
+
+        $perMinute = 0;
+        foreach ($counts as $tier => $count) {
+            $perMinute += $count * 60 / $this->intervals[$tier];
+        }
+
+        return [
+            'devices' => count($this->due),
+            'tiers' => $counts,
+            'probes_per_minute' => round($perMinute, 1),
+        ];
+    }
+
+    private function schedule($id, $tier, $due)
+    {
+        $this->tiers[$id] = $tier;
+        $this->due[$id] = $due;
+        $this->heap->insert([$due, $id]);
+    }
+
+    /**
+     * Stable offset in [0, interval) so devices of one tier are spread evenly
+     */
+    private function phase($id, $interval)
+    {
+        return (crc32((string) $id) % ($interval * 1000)) / 1000;
+    }
+}
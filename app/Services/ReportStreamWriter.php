@@ -0,0 +1,282 @@
+<?php
+
+namespace App\Services;
+
+class ReportStreamWriter
+{
+    const CONTENT_TYPES = [
+        'xlsx' => 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'csv' => 'text/csv; charset=UTF-8',
+        'ndjson' => 'application/x-ndjson',
+    ];
+
+    private $format;
+    private $sinks;
+    private $sheets = [];
+    private $columns = [];
+    private $rowNumber = 0;
+
+    // Zip state: entries written so far, bytes emitted and the entry being written
+    private $entries = [];
+    private $offset = 0;
+    private $entry;
+
+    /**
+     * $sinks are open streams that all receive the same bytes, e.g. php://output and a copy on disk
+     */
+    public function __construct($format, array $sinks)
+    {
+        if (!isset(self::CONTENT_TYPES[$format])) {
+            throw new \InvalidArgumentException("Unsupported report format: {$format}");
+        }
+
+        $this->format = $format;
+        $this->sinks = $sinks;
+    }
+
+    /**
+     * Start a sheet with [key => header] columns; rows are matched to them by key.
+     *
+     * XLSX sheets are separate zip entries, CSV sheets are separated by a
+     * blank line and a name row, NDJSON rows carry their sheet's name.
+     */
+    public function startSheet($name, array $columns)
+    {
+        $this->endSheet();
+        $this->sheets[] = $name = mb_substr(preg_replace('/[\[\]:*?\/\\\\]/', ' ', $name), 0, 31);
+        $this->columns = $columns;
+        $this->rowNumber = 0;
+
+        if ($this->format === 'xlsx') {
+            $this->openEntry('xl/worksheets/sheet' . count($this->sheets) . '.xml');
+            $this->entryWrite('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>' . "\n" .
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>');
+            $this->xlsxRow(array_values($columns), 1);
+        } elseif ($this->format === 'csv') {
+            if (count($this->sheets) > 1) {
+                $this->emit("\r\n");
+            }
+            $this->emit($this->csvLine([$name]) . $this->csvLine(array_values($columns)));
+        }
+    }
+
+    /**
+     * Write one row of the current sheet
+     */
+    public function writeRow(array $row)
+    {
+        $values = [];
+        foreach (array_keys($this->columns) as $key) {
+            $values[$key] = $row[$key] ?? null;
+        }
+
+        match ($this->format) {
+            'xlsx' => $this->xlsxRow(array_values($values)),
+            'csv' => $this->emit($this->csvLine(array_values($values))),
+            'ndjson' => $this->emit(json_encode(['sheet' => end($this->sheets)] + $values, JSON_UNESCAPED_UNICODE | JSON_UNESCAPED_SLASHES) . "\n"),
+        };
+    }
+
+    /**
+     * Push what has been written so far to the client
+     */
+    public function flush()
+    {
+        foreach ($this->sinks as $sink) {
+            fflush($sink);
+        }
+        flush();
+    }
+
+    /**
+     * End the last sheet and, for XLSX, write the workbook parts and the zip directory
+     */
+    public function finish()
+    {
+        $this->endSheet();
+
+        if ($this->format === 'xlsx') {
+            $this->xlsxParts();
+            $this->zipDirectory();
+        }
+
+        $this->flush();
+    }
+
+    private function endSheet()
+    {
+        if ($this->format === 'xlsx' && $this->entry) {
+            $this->entryWrite('</sheetData></worksheet>');
+            $this->closeEntry();
+        }
+    }
+
+    private function xlsxRow(array $values, $style = 0)
+    {
+        $this->rowNumber++;
+        $xml = '<row r="' . $this->rowNumber . '">';
+        foreach ($values as $value) {
+            $s = $style ? ' s="' . $style . '"' : '';
+            if ($value === null || $value === '') {
+                $xml .= "<c{$s}/>";
+            } elseif (is_bool($value)) {
+                $xml .= "<c t=\"b\"{$s}><v>" . (int) $value . '</v></c>';
+            } elseif (is_int($value) || is_float($value)) {
+                $xml .= "<c{$s}><v>{$value}</v></c>";
+            } else {
+                $xml .= "<c t=\"inlineStr\"{$s}><is><t xml:space=\"preserve\">" . $this->xml($value) . '</t></is></c>';
+            }
+        }
+        $this->entryWrite($xml . '</row>');
+    }
+
+    private function xlsxParts()
+    {
+        $declaration = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>' . "\n";
+        $main = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main';
+        $relationships = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships';
+
+        $overrides = '';
+        $sheets = '';
+        $sheetRels = '';
+        foreach ($this->sheets as $index => $name) {
+            $id = $index + 1;
+            $overrides .= "<Override PartName=\"/xl/worksheets/sheet{$id}.xml\" ContentType=\"application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml\"/>";
+            $sheets .= '<sheet name="' . $this->xml($name) . "\" sheetId=\"{$id}\" r:id=\"rId{$id}\"/>";
+            $sheetRels .= "<Relationship Id=\"rId{$id}\" Type=\"{$relationships}/worksheet\" Target=\"worksheets/sheet{$id}.xml\"/>";
+        }
+        $stylesId = count($this->sheets) + 1;
+
+        $this->addEntry('[Content_Types].xml', $declaration .
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">' .
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>' .
+            '<Default Extension="xml" ContentType="application/xml"/>' .
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>' .
+            '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>' .
+            $overrides . '</Types>');
+        $this->addEntry('_rels/.rels', $declaration .
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' .
+            "<Relationship Id=\"rId1\" Type=\"{$relationships}/officeDocument\" Target=\"xl/workbook.xml\"/></Relationships>");
+        $this->addEntry('xl/workbook.xml', $declaration .
+            "<workbook xmlns=\"{$main}\" xmlns:r=\"{$relationships}\"><sheets>{$sheets}</sheets></workbook>");
+        $this->addEntry('xl/_rels/workbook.xml.rels', $declaration .
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' . $sheetRels .
+            "<Relationship Id=\"rId{$stylesId}\" Type=\"{$relationships}/styles\" Target=\"styles.xml\"/></Relationships>");
+        // Style 1 is the header row: bold white on the reports' emerald green
+        $this->addEntry('xl/styles.xml', $declaration .
+            "<styleSheet xmlns=\"{$main}\">" .
+            '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font></fonts>' .
+            '<fills count="3"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill>' .
+            '<fill><patternFill patternType="solid"><fgColor rgb="FF10B981"/><bgColor indexed="64"/></patternFill></fill></fills>' .
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>' .
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>' .
+            '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>' .
+            '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1"/></cellXfs>' .
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>');
+    }
+
+    private function addEntry($name, $contents)
+    {
+        $this->openEntry($name);
+        $this->entryWrite($contents);
+        $this->closeEntry();
+    }
+
+    /**
+     * Local file header for a deflated entry whose CRC and sizes follow in a data descriptor
+     */
+    private function openEntry($name)
+    {
+        [$time, $date] = $this->dosTime();
+        $this->entry = [
+            'name' => $name,
+            'offset' => $this->offset,
+            'time' => $time,
+            'date' => $date,
+            'crc' => hash_init('crc32b'),
+            'deflate' => deflate_init(ZLIB_ENCODING_RAW, ['level' => 6]),
+            'size' => 0,
+            'compressed' => 0,
+        ];
+
+        // Flags: bit 3 = sizes in a data descriptor, bit 11 = UTF-8 names
+        $this->emit(pack('VvvvvvVVVvv', 0x04034b50, 20, 0x0808, 8, $time, $date, 0, 0, 0, strlen($name), 0) . $name);
+    }
+
+    private function entryWrite($data)
+    {
+        hash_update($this->entry['crc'], $data);
+        $this->entry['size'] += strlen($data);
+        $this->entryEmit(deflate_add($this->entry['deflate'], $data, ZLIB_NO_FLUSH));
+    }
+
+    private function closeEntry()
+    {
+        $this->entryEmit(deflate_add($this->entry['deflate'], '', ZLIB_FINISH));
+        $this->entry['crc'] = unpack('N', hash_final($this->entry['crc'], true))[1];
+        unset($this->entry['deflate']);
+
+        $this->emit(pack('VVVV', 0x08074b50, $this->entry['crc'], $this->entry['compressed'], $this->entry['size']));
+        $this->entries[] = $this->entry;
+        $this->entry = null;
+    }
+
+    private function entryEmit($compressed)
+    {
+        $this->entry['compressed'] += strlen($compressed);
+        $this->emit($compressed);
+    }
+
+    private function zipDirectory()
+    {
+        $start = $this->offset;
+        foreach ($this->entries as $entry) {
+            $this->emit(pack(
+                'VvvvvvvVVVvvvvvVV',
+                0x02014b50, 20, 20, 0x0808, 8, $entry['time'], $entry['date'],
+                $entry['crc'], $entry['compressed'], $entry['size'],
+                strlen($entry['name']), 0, 0, 0, 0, 0, $entry['offset']
+            ) . $entry['name']);
+        }
+
+        $count = count($this->entries);
+        $this->emit(pack('VvvvvVVv', 0x06054b50, 0, 0, $count, $count, $this->offset - $start, $start, 0));
+    }
+
+    private function dosTime()
+    {
+        $now = getdate();
+
+        return [
+            ($now['hours'] << 11) | ($now['minutes'] << 5) | ($now['seconds'] >> 1),
+            (($now['year'] - 1980) << 9) | ($now['mon'] << 5) | $now['mday'],
+        ];
+    }
+
+    private function csvLine(array $values)
+    {
+        return implode(',', array_map(function ($value) {
+            $value = is_bool($value) ? ($value ? 'Yes' : 'No') : (string) $value;
+            return preg_match('/[",\r\n]/', $value) ? '"' . str_replace('"', '""', $value) . '"' : $value;
+        }, $values)) . "\r\n";
+    }
+
+    private function xml($value)
+    {
+        // Control characters other than tab/newline are not allowed in XML
+        $value = preg_replace('/[\x00-\x08\x0B\x0C\x0E-\x1F]/', '', (string) $value);
+
+        return htmlspecialchars($value, ENT_XML1 | ENT_QUOTES, 'UTF-8');
+    }
+
+    private function emit($bytes)
+    {
+        if ($bytes === '') {
+            return;
+        }
+        foreach ($this->sinks as $sink) {
+            fwrite($sink, $bytes);
+        }
+        $this->offset += strlen($bytes);
+    }
+}
@@ -0,0 +1,103 @@
+<?php
+
+namespace App\Services;
+
+use App\Models\Device;
+use Illuminate\Support\Facades\Cache;
+
+class ShardCoordinator
+{
+    const WORKERS_KEY = 'monitoring.shards.workers';
+
+    private $heartbeatTtl;
+    private $virtualNodes;
+
+    public function __construct()
+    {
+        $this->heartbeatTtl = (int) config('monitoring.sharding.heartbeat_ttl', 90);
+        $this->virtualNodes = (int) config('monitoring.sharding.virtual_nodes', 128);
+    }
+
+    /**
+     * Register a worker or keep it registered; workers missing heartbeats
+     * for heartbeat_ttl seconds drop out and their devices move to the rest
+     */
+    public function heartbeat($workerId)
+    {
+        $this->updateWorkers(function ($workers) use ($workerId) {
+            $workers[$workerId] = time();
+            return $workers;
+        });
+    }
+
+    /**
+     * Deregister a worker that is shutting down, so its devices move right away
+     */
+    public function leave($workerId)
+    {
+        $this->updateWorkers(function ($workers) use ($workerId) {
+            unset($workers[$workerId]);
+            return $workers;
+        });
+    }
+
+    /**
+     * Ids of live workers, sorted
+     */
+    public function workers()
+    {
+        $workers = array_keys($this->liveWorkers(Cache::get(self::WORKERS_KEY, [])));
+        sort($workers);
+
+        return $workers;
+    }
+
+    public function ring(?array $workers = null)
+    {
+        return new ShardRing($workers ?? $this->workers(), $this->virtualNodes);
+    }
+
+    /**
+     * Active, probeable devices that the ring assigns to a worker
+     */
+    public function assignedDevices($workerId, ?ShardRing $ring = null)
+    {
+        $ring = $ring ?? $this->ring();
+
+        return Device::where('is_active', true)
+            ->where('status', '!=', 'offline_ack')
+            ->get(['id', 'name', 'ip_address', 'status', 'probe_type', 'probe_target'])
+            ->filter(fn($device) => $ring->workerFor($device->id) === $workerId)
+            ->values();
+    }
+
+    /**
+     * Devices per live worker, for status output
+     */
+    public function distribution()
+    {
+        $ring = $this->ring();
+        $ids = Device::where('is_active', true)->where('status', '!=', 'offline_ack')->pluck('id');
+
+        return array_map('count', $ring->partition($ids));
+    }
+
+    private function liveWorkers(array $workers)
+    {
+        $cutoff = time() - $this->heartbeatTtl;
+
+        return array_filter($workers, fn($seen) => $seen >= $cutoff);
+    }
+
+    /**
+     * Read-modify-write of the worker map under a lock, since workers on
+     * several boxes share it through the cache store
+     */
+    private function updateWorkers(callable $update)
+    {
+        Cache::lock(self::WORKERS_KEY . '.lock', 10)->block(5, function () use ($update) {
+            $workers = $update($this->liveWorkers(Cache::get(self::WORKERS_KEY, [])));
+            Cache::forever(self::WORKERS_KEY, $workers);
+        });
+    }
+}
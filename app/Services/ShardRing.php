@@ -0,0 +1,86 @@
+<?php
+
+namespace App\Services;
+
+class ShardRing
+{
+    private $workers;
+    private $points = [];
+    private $owners = [];
+
+    /**
+     * Consistent hash ring over the given worker ids.
+     *
+     * Each worker is placed on the ring $virtualNodes times so shards come out
+     * even. When a worker joins or leaves, only the devices in the arcs it
+     * gains or gives up change owner (about 1/N of them); everyone else keeps
+     * probing the same devices.
+     */
+    public function __construct(array $workers, $virtualNodes = 128)
+    {
+        $this->workers = array_values(array_unique($workers));
+        sort($this->workers);
+
+        foreach ($this->workers as $worker) {
+            for ($i = 0; $i < $virtualNodes; $i++) {
+                $this->owners[$this->hash("{$worker}#{$i}")] = $worker;
+            }
+        }
+        ksort($this->owners);
+        $this->points = array_keys($this->owners);
+    }
+
+    public function workers()
+    {
+        return $this->workers;
+    }
+
+    /**
+     * Worker owning a key (device id): the first ring point at or after the key's hash
+     */
+    public function workerFor($key)
+    {
+        if (empty($this->points)) {
+            return null;
+        }
+
+        $hash = $this->hash((string) $key);
+        $low = 0;
+        $high = count($this->points);
+        while ($low < $high) {
+            $mid = ($low + $high) >> 1;
+            if ($this->points[$mid] < $hash) {
+                $low = $mid + 1;
+            } else {
+                $high = $mid;
+            }
+        }
+
+        // Past the last point wraps around to the first
+        return $this->owners[$this->points[$low % count($this->points)]];
+    }
+
+    /**
+     * Split keys into [worker => [key, ...]]; every worker is present, possibly empty
+     */
+    public function partition($keys)
+    {
+        $shards = array_fill_keys($this->workers, []);
+        foreach ($keys as $key) {
+            $worker = $this->workerFor($key);
+            if ($worker !== null) {
+                $shards[$worker][] = $key;
+            }
+        }
+
+        return $shards;
+    }
+
+    /**
+     * 32-bit position on the ring (md5 spreads sequential ids better than crc32)
+     */
+    private function hash($value)
+    {
+        return hexdec(substr(md5($value), 0, 8));
+    }
+}
@@ -0,0 +1,322 @@
+<?php
+
+namespace App\Services;
+
+use App\Helpers\LatencyStats;
+use App\Models\DeviceStatusInterval;
+use App\Models\MonitoringHistory;
+use Carbon\Carbon;
+use Illuminate\Contracts\Cache\LockTimeoutException;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Log;
+
+class StatusIntervalService
+{
+    const DOWN_STATUSES = ['offline', 'offline_ack'];
+
+    private $maxGap;
+    private $rawSamples;
+    private $rawRetentionHours;
+    private $chunkSize;
+    private $rollups;
+    private $windows;
+
+    public function __construct()
+    {
+        $this->maxGap = (int) config('monitoring.history.max_gap', 900);
+        $this->rawSamples = (bool) config('monitoring.history.raw_samples', true);
+        $this->rawRetentionHours = (int) config('monitoring.history.raw_retention_hours', 48);
+        $this->chunkSize = max(1, (int) config('monitoring.performance.status_write_chunk', 1000));
+        $this->rollups = new MonitoringRollupService();
+        $this->windows = new UptimeWindowService();
+    }
+
+    /**
+     * Record a sweep's results as status intervals.
+     *
+     * Each device has one open interval. A sample with the same status
+     * extends it in place (end time, sample count, RTT min/max/sum); a new
+     * status, or a sample after more than max_gap seconds without one, closes
+     * it and opens the next. A sweep costs one read and a few bulk writes per
+     * chunk of devices instead of a row per device. Every sample is also added
+     * to the minute/hour/day rollups and the 24h/7d/30d uptime windows, and
+     * goes to monitoring_history when raw_samples is on, kept for
+     * raw_retention_hours. A sweep that can't get the writer lock is
+     * dropped whole and 0 returned.
+     */
+    public function record($results, $now = null)
+    {
+        $now = $now ?: now();
+        $samples = [];
+        $at = null;
+        foreach ($results as $result) {
+            $id = $result['device_id'] ?? $result['id'] ?? (isset($result['device']) ? $result['device']->id : null);
+            if (!$id || empty($result['status'])) {
+                continue;
+            }
+
+            $timestamp = $result['timestamp'] ?? $now;
+            $timestamp = $timestamp instanceof Carbon ? $timestamp : Carbon::parse($timestamp);
+            $samples[(int) $id] = [
+                'status' => $result['status'],
+                'rtt' => isset($result['response_time']) ? (float) $result['response_time'] : null,
+                'stats' => $result['stats'] ?? null,
+                'timestamp' => $timestamp,
+            ];
+            // One sample time per sweep, so extended intervals share a single end time
+            if ($at === null || $timestamp->gt($at)) {
+                $at = $timestamp;
+            }
+        }
+
+        if (empty($samples)) {
+            return 0;
+        }
+
+        try {
+            // A single writer at a time, or two sweeps could both open an interval for a device
+            Cache::lock('monitoring.status_intervals', 60)->block(15, function () use ($samples, $at) {
+                $this->windows->advance($at);
+                foreach (array_chunk($samples, $this->chunkSize, true) as $chunk) {
+                    $this->recordChunk($chunk, $at);
+                }
+            });
+        } catch (LockTimeoutException $e) {
+            // Skip the raw samples too, so monitoring_history never holds a sweep the intervals and rollups lack
+            Log::warning("Status intervals busy, sweep not recorded", ['devices' => count($samples)]);
+            return 0;
+        }
+
+        if ($this->rawSamples) {
+            $this->storeRawSamples($samples, $now);
+        }
+
+        return count($samples);
+    }
+
+    /**
+     * Intervals overlapping [$start, $end], grouped by device_id and ordered by start
+     */
+    public function intervals($deviceIds, $start, $end)
+    {
+        return DeviceStatusInterval::whereIn('device_id', $deviceIds)
+            ->where('started_at', '<=', $end)
+            ->where('ended_at', '>=', $start)
+            ->orderBy('device_id', 'asc')
+            ->orderBy('started_at', 'asc')
+            ->get(['id', 'device_id', 'status', 'previous_status', 'started_at', 'ended_at'])
+            ->groupBy('device_id');
+    }
+
+    /**
+     * Incident figures for one device's intervals from $start on.
+     *
+     * An incident is an online interval followed by a down one that starts
+     * inside the window; outages are the minutes from an incident until the
+     * device is next online, and down_since is set when it hasn't been yet.
+     * Uptime comes from MonitoringRollupService.
+     */
+    public function summarize($intervals, $start)
+    {
+        $summary = [
+            'incidents' => 0,
+            'last_incident' => null,
+            'outages' => [],
+            'down_since' => null,
+        ];
+
+        $outageStart = null;
+        foreach ($intervals as $interval) {
+            $isDown = in_array($interval->status, self::DOWN_STATUSES);
+            if ($isDown && $interval->previous_status === 'online' && $interval->started_at->gte($start)) {
+                $summary['incidents']++;
+                $summary['last_incident'] = $interval->started_at;
+                $outageStart = $interval->started_at;
+            } elseif ($interval->status === 'online' && $outageStart) {
+                $summary['outages'][] = $outageStart->diffInMinutes($interval->started_at);
+                $outageStart = null;
+            }
+        }
+
+        $summary['down_since'] = $outageStart;
+
+        return $summary;
+    }
+
+    /**
+     * Status changes in [$start, $end]: intervals that start there with a new status
+     */
+    public function changes($deviceIds, $start, $end)
+    {
+        return DeviceStatusInterval::whereIn('device_status_intervals.device_id', $deviceIds)
+            ->where('device_status_intervals.started_at', '>=', $start)
+            ->where('device_status_intervals.started_at', '<=', $end)
+            ->where(function ($query) {
+                $query->whereNull('device_status_intervals.previous_status')
+                      ->orWhereColumn('device_status_intervals.previous_status', '<>', 'device_status_intervals.status');
+            });
+    }
+
+    /**
+     * Online-to-down transitions in [$start, $end], counted in SQL
+     */
+    public function incidentCount($deviceIds, $start, $end = null)
+    {
+        return DeviceStatusInterval::whereIn('device_id', $deviceIds)
+            ->where('started_at', '>=', $start)
+            ->where('started_at', '<=', $end ?: now())
+            ->whereIn('status', self::DOWN_STATUSES)
+            ->where('previous_status', 'online')
+            ->count();
+    }
+
+    /**
+     * Trim the raw sample ring buffer to raw_retention_hours: whole daily
+     * partitions are dropped where monitoring_history is partitioned
+     */
+    public function pruneRawSamples($now = null)
+    {
+        $cutoff = ($now ?: now())->copy()->subHours($this->rawRetentionHours);
+
+        return (new HistoryPartitionService())->prune($cutoff);
+    }
+
+    private function recordChunk(array $samples, $at)
+    {
+        $open = DeviceStatusInterval::whereIn('device_id', array_keys($samples))
+            ->where('is_open', true)
+            ->get(['id', 'device_id', 'status', 'ended_at', 'rtt_samples', 'rtt_min', 'rtt_max', 'rtt_sum'])
+            ->keyBy('device_id');
+
+        $extended = [];
+        $changed = [];
+        $gapped = [];
+        $opened = [];
+        $rolled = [];
+        foreach ($samples as $deviceId => $sample) {
+            $interval = $open->get($deviceId);
+            if ($interval && $at->lt($interval->ended_at)) {
+                // Older than what is already recorded (a late shard result)
+                continue;
+            }
+
+            $rolled[$deviceId] = $sample + ['transition' => $interval && $interval->status !== $sample['status']];
+
+            $contiguous = $interval && $at->getTimestamp() - $interval->ended_at->getTimestamp() <= $this->maxGap;
+            if ($contiguous && $interval->status === $sample['status']) {
+                $extended[$interval->id] = $this->extend($interval, $sample['rtt']);
+                continue;
+            }
+
+            if ($interval) {
+                // Status changed: the old interval runs up to this sample. After a gap it ends at its last sample.
+                if ($contiguous) {
+                    $changed[] = $interval->id;
+                } else {
+                    $gapped[] = $interval->id;
+                }
+            }
+
+            $opened[] = [
+                'device_id' => $deviceId,
+                'status' => $sample['status'],
+                'previous_status' => $interval ? $interval->status : null,
+                'started_at' => $at,
+                'ended_at' => $at,
+                'samples' => 1,
+                'rtt_samples' => $sample['rtt'] !== null ? 1 : 0,
+                'rtt_min' => $sample['rtt'],
+                'rtt_max' => $sample['rtt'],
+                'rtt_sum' => $sample['rtt'],
+                'is_open' => true,
+            ];
+        }
+
+        if (!empty($extended)) {
+            [$sql, $bindings] = $this->extendUpdate($extended, $at);
+            DB::update($sql, $bindings);
+        }
+        if (!empty($changed)) {
+            DB::table('device_status_intervals')->whereIn('id', $changed)->update(['is_open' => false, 'ended_at' => $at]);
+        }
+        if (!empty($gapped)) {
+            DB::table('device_status_intervals')->whereIn('id', $gapped)->update(['is_open' => false]);
+        }
+        if (!empty($opened)) {
+            DeviceStatusInterval::insert($opened);
+        }
+
+        $this->rollups->add($rolled);
+        $this->windows->add($rolled);
+    }
+
+    /**
+     * New RTT aggregates for an interval gaining a sample, or null when the sample has no RTT
+     */
+    private function extend($interval, $rtt)
+    {
+        if ($rtt === null) {
+            return null;
+        }
+
+        return [
+            'rtt_min' => $interval->rtt_min === null ? $rtt : min((float) $interval->rtt_min, $rtt),
+            'rtt_max' => $interval->rtt_max === null ? $rtt : max((float) $interval->rtt_max, $rtt),
+            'rtt_sum' => (float) $interval->rtt_sum + $rtt,
+        ];
+    }
+
+    /**
+     * One UPDATE extending every interval in [id => rtt aggregates|null]
+     */
+    private function extendUpdate(array $extended, $at)
+    {
+        $assignments = ['ended_at = ?', 'samples = samples + 1'];
+        $bindings = [$at];
+
+        $withRtt = array_filter($extended);
+        if (!empty($withRtt)) {
+            $assignments[] = 'rtt_samples = rtt_samples + CASE WHEN id IN (' . implode(',', array_keys($withRtt)) . ') THEN 1 ELSE 0 END';
+            // CAST keeps PostgreSQL from typing the bound values as text
+            foreach (['rtt_min' => 'DECIMAL(8,2)', 'rtt_max' => 'DECIMAL(8,2)', 'rtt_sum' => 'DECIMAL(14,2)'] as $column => $type) {
+                $case = "{$column} = CASE id";
+                foreach ($withRtt as $id => $values) {
+                    $case .= " WHEN {$id} THEN CAST(? AS {$type})";
+                    $bindings[] = $values[$column];
+                }
+                $assignments[] = $case . " ELSE {$column} END";
+            }
+        }
+
+        $sql = 'UPDATE device_status_intervals SET ' . implode(', ', $assignments) .
+            ' WHERE id IN (' . implode(',', array_keys($extended)) . ')';
+
+        return [$sql, $bindings];
+    }
+
+    private function storeRawSamples(array $samples, $now)
+    {
+        $rows = [];
+        foreach ($samples as $deviceId => $sample) {
+            $rows[] = [
+                'device_id' => $deviceId,
+                'status' => $sample['status'],
+                'response_time' => $sample['rtt'],
+                'checked_at' => $sample['timestamp'],
+                'created_at' => $now,
+                'updated_at' => $now
+            ] + LatencyStats::historyColumns($sample['stats']);
+        }
+
+        foreach (array_chunk($rows, 1000) as $chunk) {
+            MonitoringHistory::insert($chunk);
+        }
+
+        // Ring buffer: partitions for the days ahead and trim what has aged out, at most every five minutes
+        if (Cache::add('monitoring.history.raw_pruned', true, 300)) {
+            (new HistoryPartitionService())->ensure(null, $now);
+            $this->pruneRawSamples($now);
+        }
+    }
+}
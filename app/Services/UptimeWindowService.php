@@ -0,0 +1,206 @@
+<?php
+
+namespace App\Services;
+
+use Carbon\Carbon;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\DB;
+
+class UptimeWindowService
+{
+    const TABLE = 'device_uptime_windows';
+
+    // Window => [rollup tier whose buckets are its slots, length in days]
+    const WINDOWS = [
+        '24h' => ['minute', 1],
+        '7d' => ['hour', 7],
+        '30d' => ['day', 30],
+    ];
+
+    // When the windows were last advanced; missing means they must be rebuilt
+    const ADVANCED_KEY = 'monitoring.uptime_windows.advanced_at';
+
+    private $rollups;
+    private $chunkSize;
+
+    public function __construct()
+    {
+        $this->rollups = new MonitoringRollupService();
+        $this->chunkSize = max(1, (int) config('monitoring.performance.status_write_chunk', 1000));
+    }
+
+    /**
+     * Count samples into every window of their device.
+     *
+     * $samples is [device_id => [status, ...]] as StatusIntervalService
+     * records them; the same samples go to the rollups, which is what lets
+     * advance() take them out again when their slot leaves a window.
+     */
+    public function add(array $samples)
+    {
+        if (empty($samples)) {
+            return;
+        }
+
+        $rows = [];
+        foreach ($samples as $deviceId => $sample) {
+            $online = $sample['status'] === 'online' ? 1 : 0;
+            $row = ['device_id' => $deviceId];
+            foreach (array_keys(self::WINDOWS) as $window) {
+                $row["checks_{$window}"] = 1;
+                $row["online_{$window}"] = $online;
+            }
+            $rows[] = $row;
+        }
+
+        $update = $this->increments();
+        foreach (array_chunk($rows, $this->chunkSize) as $chunk) {
+            DB::table(self::TABLE)->upsert($chunk, ['device_id'], $update);
+        }
+    }
+
+    /**
+     * Slide every window up to $at.
+     *
+     * Each window is the last N buckets of its rollup tier: 288 five-minute
+     * buckets for 24h at the default aggregation_interval, 168 hour buckets
+     * for 7d and 30 day buckets for 30d. When the oldest buckets fall out,
+     * their counts are subtracted in one UPDATE per window, so this costs
+     * nothing until a slot boundary passes. Without a record of the last
+     * advance (a fresh cache) the counters are rebuilt from the rollups.
+     */
+    public function advance($at = null)
+    {
+        $at = $at ?: now();
+        $advancedAt = Cache::get(self::ADVANCED_KEY);
+        if ($advancedAt === null) {
+            return $this->rebuild($at);
+        }
+
+        $advancedAt = Carbon::parse($advancedAt);
+        if ($at->lte($advancedAt)) {
+            return 0;
+        }
+
+        $expired = 0;
+        foreach (self::WINDOWS as $window => [$tier]) {
+            $from = $this->windowStart($window, $advancedAt);
+            $to = $this->windowStart($window, $at);
+            if ($from->lt($to)) {
+                $expired += $this->expire($window, $tier, $from, $to);
+            }
+        }
+
+        Cache::forever(self::ADVANCED_KEY, $at->toIso8601String());
+
+        return $expired;
+    }
+
+    /**
+     * Recount every window from the rollups: three grouped aggregates and a bulk insert
+     */
+    public function rebuild($at = null)
+    {
+        $at = $at ?: now();
+        $empty = [];
+        foreach (array_keys(self::WINDOWS) as $window) {
+            $empty["checks_{$window}"] = 0;
+            $empty["online_{$window}"] = 0;
+        }
+
+        $rows = [];
+        foreach (array_keys(self::WINDOWS) as $window) {
+            foreach ($this->rollups->totals(null, $this->windowStart($window, $at), $at) as $deviceId => $totals) {
+                $rows[$deviceId] = $rows[$deviceId] ?? ['device_id' => $deviceId] + $empty;
+                $rows[$deviceId]["checks_{$window}"] = (int) $totals->checks;
+                $rows[$deviceId]["online_{$window}"] = (int) $totals->online_checks;
+            }
+        }
+
+        DB::transaction(function () use ($rows) {
+            DB::table(self::TABLE)->delete();
+            foreach (array_chunk(array_values($rows), $this->chunkSize) as $chunk) {
+                DB::table(self::TABLE)->insert($chunk);
+            }
+        });
+
+        Cache::forever(self::ADVANCED_KEY, $at->toIso8601String());
+
+        return count($rows);
+    }
+
+    /**
+     * Uptime per window for each device: [device_id => ['24h' => %, '7d' => %, '30d' => %]]
+     */
+    public function uptime($deviceIds)
+    {
+        return DB::table(self::TABLE)
+            ->whereIn('device_id', $deviceIds)
+            ->get()
+            ->keyBy('device_id')
+            ->map(fn($row) => self::percentages($row));
+    }
+
+    /**
+     * Uptime percentages from a window row, null for a window without checks
+     */
+    public static function percentages($row)
+    {
+        $uptime = [];
+        foreach (array_keys(self::WINDOWS) as $window) {
+            $checks = $row ? (int) $row->{"checks_{$window}"} : 0;
+            $uptime[$window] = $checks > 0
+                ? round((float) ((max(0, (int) $row->{"online_{$window}"}) / $checks) * 100), 2)
+                : null;
+        }
+
+        return $uptime;
+    }
+
+    /**
+     * Subtract the $tier buckets in [$from, $to) from $window's counters
+     */
+    private function expire($window, $tier, $from, $to)
+    {
+        $table = self::TABLE;
+        $rollups = MonitoringRollupService::TABLE;
+        $expiring = "FROM {$rollups} WHERE resolution = ? AND bucket_start >= ? AND bucket_start < ?";
+        $sum = fn($column) => "COALESCE((SELECT SUM({$column}) {$expiring} AND {$rollups}.device_id = {$table}.device_id), 0)";
+
+        return DB::update(
+            "UPDATE {$table} SET checks_{$window} = checks_{$window} - {$sum('checks')}, " .
+            "online_{$window} = online_{$window} - {$sum('online_checks')} " .
+            "WHERE device_id IN (SELECT device_id {$expiring})",
+            [$tier, $from, $to, $tier, $from, $to, $tier, $from, $to]
+        );
+    }
+
+    /**
+     * Start of the oldest bucket still inside $window at $at
+     */
+    private function windowStart($window, Carbon $at)
+    {
+        [$tier, $days] = self::WINDOWS[$window];
+
+        return $this->rollups->ceil($at->copy()->subDays($days), $tier);
+    }
+
+    /**
+     * ON CONFLICT / ON DUPLICATE KEY assignments adding the incoming row to the counters
+     */
+    private function increments()
+    {
+        $mysql = in_array(DB::connection()->getDriverName(), ['mysql', 'mariadb']);
+        $table = self::TABLE;
+
+        $update = [];
+        foreach (array_keys(self::WINDOWS) as $window) {
+            foreach (["checks_{$window}", "online_{$window}"] as $column) {
+                $incoming = $mysql ? "VALUES({$column})" : "excluded.{$column}";
+                $update[$column] = DB::raw("{$table}.{$column} + {$incoming}");
+            }
+        }
+
+        return $update;
+    }
+}
@@ -39,6 +39,9 @@
         // Send device offline notifications every 5 minutes
         $schedule->command('devices:send-notifications')->everyFiveMinutes();
         
+        // Archive completed months of rollups to the cold tier
+        $schedule->command('monitoring:archive')->dailyAt('02:30');
+        
         // DISABLED: Ping all devices every 5 minutes
         // $schedule->command('devices:ping-all')
         //          ->everyFiveMinutes()
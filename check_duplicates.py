@@ -1,6 +1,7 @@
 import re
 import csv
-from collections import defaultdict
+
+from hostmonitor.ipindex import IPv4Index
 
 # Read the HTML file
 with open(r'c:\Users\hyper\Downloads\switch13-11.html', 'r', encoding='utf-8') as f:
@@ -69,20 +70,19 @@ for button_html in button_matches:
             'ip_address': ip_address
         })
 
-# Count by IP
-ip_count = defaultdict(list)
-for device in devices:
-    ip_count[device['ip_address']].append(device['device_name'])
+# Index by IP
+index = IPv4Index()
+for i, device in enumerate(devices):
+    index.add(device['ip_address'], i)
 
-# Find duplicates
-duplicates = {ip: names for ip, names in ip_count.items() if len(names) > 1}
+# Find duplicates (same IP, different device names)
+duplicates = list(index.duplicates())
 
 print(f"Total devices found: {len(devices)}")
-print(f"Unique IPs: {len(ip_count)}")
+print(f"Unique IPs: {index.unique_count() + index.invalid}")
 print(f"IPs with multiple devices: {len(duplicates)}")
 print(f"\nDuplicate IPs (same IP, different device names):")
-for ip, names in sorted(duplicates.items(), key=lambda x: tuple(map(int, x[0].split('.')))):
+for ip, refs in duplicates:
     print(f"\n  {ip}:")
-    for name in names:
-        print(f"    - {name}")
-
+    for ref in refs:
+        print(f"    - {devices[ref]['device_name']}")
@@ -17,7 +17,19 @@
     'batch_size' => env('MONITORING_BATCH_SIZE', 500), // Devices per batch
     
     'cache_duration' => env('MONITORING_CACHE_DURATION', 60), // Cache duration in seconds
-    
+
+    'prober' => [
+        'enabled' => env('MONITORING_PROBER_ENABLED', true), // One ICMP sweep per run instead of one ping per device
+        'python' => env('MONITORING_PROBER_PYTHON', 'python3'),
+        'concurrency' => env('MONITORING_PROBER_CONCURRENCY', 1000), // Echo requests in flight at once
+        'burst' => env('MONITORING_PROBE_BURST', 3), // Echoes per host per sweep, for min/avg/max/jitter/loss
+        'burst_interval' => env('MONITORING_PROBE_BURST_INTERVAL', 0.05), // Seconds between a host's echoes
+        // hostmonitor.probed address; used first when it is listening (asyncio has no Unix sockets on Windows)
+        'daemon' => env('MONITORING_PROBED_ADDRESS', PHP_OS_FAMILY === 'Windows'
+            ? 'tcp://127.0.0.1:7071'
+            : 'unix://' . storage_path('app/probed.sock')),
+    ],
+
     'strategies' => [
         'small_scale' => [
             'max_devices' => 100,
@@ -35,7 +47,7 @@
             'concurrent' => 20,
         ],
         'enterprise_scale' => [
-            'max_devices' => 10000,
+            'max_devices' => 10000, // Beyond this, split probing across devices:probe-shard workers (see sharding)
             'batch_size' => 200,
             'concurrent' => 25,
         ],
@@ -45,6 +57,8 @@
         'memory_limit' => env('MONITORING_MEMORY_LIMIT', '512M'),
         'max_execution_time' => env('MONITORING_MAX_EXECUTION_TIME', 300),
         'gc_frequency' => env('MONITORING_GC_FREQUENCY', 100), // Garbage collect every N devices
+        'status_write_chunk' => env('MONITORING_STATUS_WRITE_CHUNK', 1000), // Devices per bulk status UPDATE
+        'report_stream_threshold' => env('MONITORING_REPORT_STREAM_THRESHOLD', 2000), // Devices above which XLSX reports stream instead of being built in memory (0 = only on request)
     ],
 
     'redis' => [
@@ -57,23 +71,63 @@
         'monitoring' => env('MONITORING_QUEUE', 'monitoring'),
         'notifications' => env('MONITORING_NOTIFICATIONS_QUEUE', 'notifications'),
         'analytics' => env('MONITORING_ANALYTICS_QUEUE', 'analytics'),
+        'collector' => env('MONITORING_COLLECTOR_QUEUE', 'collector'), // Shard results; run exactly one worker on it
+    ],
+
+    'sharding' => [
+        'interval' => env('MONITORING_SHARD_INTERVAL', 30), // Seconds between a shard worker's sweeps
+        'heartbeat_ttl' => env('MONITORING_SHARD_HEARTBEAT_TTL', 90), // Seconds without a sweep before a worker's devices move
+        'virtual_nodes' => env('MONITORING_SHARD_VIRTUAL_NODES', 128), // Ring points per worker; more = more even shards
+        'devices_per_worker' => env('MONITORING_SHARD_DEVICES_PER_WORKER', 5000), // Warn above this shard size
     ],
 
     'alerts' => [
         'offline_threshold' => env('MONITORING_OFFLINE_THRESHOLD', 2), // Minutes
         'response_time_threshold' => env('MONITORING_RESPONSE_TIME_THRESHOLD', 1000), // Milliseconds
-        'consecutive_failures' => env('MONITORING_CONSECUTIVE_FAILURES', 3),
+        'jitter_threshold' => env('MONITORING_JITTER_THRESHOLD', 100), // Milliseconds of RTT deviation within a burst that mean 'warning'
+        'packet_loss_threshold' => env('MONITORING_PACKET_LOSS_THRESHOLD', 50), // Percent of a burst lost that means 'warning'
+        'consecutive_failures' => env('MONITORING_CONSECUTIVE_FAILURES', 3), // Failed probes in a row before a device that was up goes offline
+        'retry_spacing' => env('MONITORING_RETRY_SPACING', 0.2), // Seconds between confirmation re-probes
     ],
 
     'scheduling' => [
         'high_frequency' => env('MONITORING_HIGH_FREQUENCY', 30), // Seconds
         'normal_frequency' => env('MONITORING_NORMAL_FREQUENCY', 120), // Seconds
         'low_frequency' => env('MONITORING_LOW_FREQUENCY', 300), // Seconds
+        'critical_frequency' => env('MONITORING_CRITICAL_FREQUENCY', 10), // Seconds, also the scheduler's resolution
+
+        // Base tier per category (devices:monitor --adaptive); unknown categories use normal
+        'categories' => [
+            'servers' => 'high',
+            'switches' => 'high',
+            'wifi' => 'normal',
+            'cctv' => 'normal',
+            'tas' => 'low',
+        ],
+        'critical_sla' => env('MONITORING_CRITICAL_SLA', 99.95), // sla_target at or above this is probed at critical frequency
+        'flap_window' => env('MONITORING_FLAP_WINDOW', 600), // Seconds
+        'flap_changes' => env('MONITORING_FLAP_CHANGES', 3), // Status changes within the window that count as flapping
+    ],
+
+    'history' => [
+        'max_gap' => env('MONITORING_HISTORY_MAX_GAP', 900), // Seconds without a sample before a status interval is closed (above low_frequency)
+        'raw_samples' => env('MONITORING_HISTORY_RAW_SAMPLES', true), // Also keep every sample in monitoring_history
+        'raw_retention_hours' => env('MONITORING_HISTORY_RAW_RETENTION_HOURS', 48), // Ring buffer length for raw samples
+        'partition_days_ahead' => env('MONITORING_HISTORY_PARTITION_DAYS_AHEAD', 3), // Daily monitoring_history partitions created in advance (PostgreSQL/MySQL)
     ],
 
     'analytics' => [
         'retention_days' => env('MONITORING_RETENTION_DAYS', 30),
-        'aggregation_interval' => env('MONITORING_AGGREGATION_INTERVAL', 5), // Minutes
+        'aggregation_interval' => env('MONITORING_AGGREGATION_INTERVAL', 5), // Minutes per finest rollup bucket (a divisor of 60)
+        'rollup_retention_days' => [
+            'minute' => env('MONITORING_ROLLUP_MINUTE_RETENTION_DAYS', 2),
+            'hour' => env('MONITORING_ROLLUP_HOUR_RETENTION_DAYS', 90),
+            'day' => env('MONITORING_ROLLUP_DAY_RETENTION_DAYS', 730),
+        ],
         'cleanup_frequency' => env('MONITORING_CLEANUP_FREQUENCY', 24), // Hours
     ],
+
+    'archive' => [
+        'path' => env('MONITORING_ARCHIVE_PATH', storage_path('app/monitoring-archive')), // One compressed columnar file per month
+    ],
 ];
@@ -0,0 +1,41 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        // response_time keeps the burst average; these describe the rest of the burst
+        Schema::table('monitoring_history', function (Blueprint $table) {
+            $table->decimal('rtt_min', 8, 2)->nullable()->after('response_time');
+            $table->decimal('rtt_max', 8, 2)->nullable()->after('rtt_min');
+            $table->decimal('jitter', 8, 2)->nullable()->after('rtt_max')->comment('RTT standard deviation within the burst (ms)');
+            $table->unsignedTinyInteger('packet_loss')->nullable()->after('jitter')->comment('Lost probes of the burst (%)');
+        });
+
+        Schema::table('devices', function (Blueprint $table) {
+            $table->decimal('jitter', 8, 2)->nullable()->after('response_time');
+            $table->unsignedTinyInteger('packet_loss')->nullable()->after('jitter');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::table('monitoring_history', function (Blueprint $table) {
+            $table->dropColumn(['rtt_min', 'rtt_max', 'jitter', 'packet_loss']);
+        });
+
+        Schema::table('devices', function (Blueprint $table) {
+            $table->dropColumn(['jitter', 'packet_loss']);
+        });
+    }
+};
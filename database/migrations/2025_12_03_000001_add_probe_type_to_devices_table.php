@@ -0,0 +1,29 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        Schema::table('devices', function (Blueprint $table) {
+            $table->string('probe_type', 16)->default('icmp')->after('ip_address')->comment('icmp, tcp, http, https or snmp');
+            $table->string('probe_target')->nullable()->after('probe_type')->comment('Ports, path/URL or SNMP community for the probe type');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::table('devices', function (Blueprint $table) {
+            $table->dropColumn(['probe_type', 'probe_target']);
+        });
+    }
+};
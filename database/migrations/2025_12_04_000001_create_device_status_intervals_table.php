@@ -0,0 +1,36 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    public function up(): void
+    {
+        // One row per device per contiguous status, extended in place by every sweep that sees the same status
+        Schema::create('device_status_intervals', function (Blueprint $table) {
+            $table->id();
+            $table->foreignId('device_id')->constrained()->onDelete('cascade');
+            $table->string('status');
+            $table->string('previous_status')->nullable()->comment('Status of the interval this one follows, also across a gap; null for a new device');
+            $table->timestamp('started_at');
+            $table->timestamp('ended_at')->comment('Last sample while open; the next interval\'s start once closed');
+            $table->unsignedInteger('samples')->default(1);
+            $table->unsignedInteger('rtt_samples')->default(0);
+            $table->decimal('rtt_min', 8, 2)->nullable();
+            $table->decimal('rtt_max', 8, 2)->nullable();
+            $table->decimal('rtt_sum', 14, 2)->nullable();
+            $table->boolean('is_open')->default(true);
+
+            $table->index(['device_id', 'started_at']);
+            $table->index(['device_id', 'is_open']);
+            $table->index('ended_at');
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::dropIfExists('device_status_intervals');
+    }
+};
@@ -0,0 +1,35 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    public function up(): void
+    {
+        // Per-device check counters per time bucket, incremented as samples arrive
+        Schema::create('device_status_rollups', function (Blueprint $table) {
+            $table->id();
+            $table->foreignId('device_id')->constrained()->onDelete('cascade');
+            $table->string('resolution', 8)->comment('minute (aggregation_interval wide), hour or day');
+            $table->timestamp('bucket_start');
+            $table->unsignedInteger('checks')->default(0);
+            $table->unsignedInteger('online_checks')->default(0);
+            $table->unsignedInteger('down_checks')->default(0);
+            $table->unsignedInteger('transitions')->default(0);
+            $table->unsignedInteger('rtt_count')->default(0);
+            $table->decimal('rtt_sum', 14, 2)->default(0);
+            $table->decimal('rtt_min', 8, 2)->nullable();
+            $table->decimal('rtt_max', 8, 2)->nullable();
+
+            $table->unique(['device_id', 'resolution', 'bucket_start']);
+            $table->index(['resolution', 'bucket_start']);
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::dropIfExists('device_status_rollups');
+    }
+};
@@ -0,0 +1,27 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    public function up(): void
+    {
+        // Running check counts per device over the sliding 24h/7d/30d windows
+        Schema::create('device_uptime_windows', function (Blueprint $table) {
+            $table->foreignId('device_id')->primary()->constrained()->onDelete('cascade');
+            $table->integer('checks_24h')->default(0);
+            $table->integer('online_24h')->default(0);
+            $table->integer('checks_7d')->default(0);
+            $table->integer('online_7d')->default(0);
+            $table->integer('checks_30d')->default(0);
+            $table->integer('online_30d')->default(0);
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::dropIfExists('device_uptime_windows');
+    }
+};
@@ -0,0 +1,71 @@
+<?php
+
+use App\Services\HistoryPartitionService;
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Support\Facades\DB;
+
+return new class extends Migration
+{
+    /**
+     * Split monitoring_history into daily range partitions on checked_at.
+     * SQLite has no partitioning and keeps the plain table.
+     *
+     * MySQL/MariaDB can't keep the device_id foreign key on a partitioned
+     * table, so deleting a device no longer cascades to its history there.
+     * Device's deleting event removes the rows instead: devices must be
+     * deleted as models, not with a bulk query, or their history is left
+     * behind until the raw retention prunes it.
+     */
+    public function up(): void
+    {
+        $driver = DB::connection()->getDriverName();
+        $oldest = DB::table('monitoring_history')->min('checked_at');
+
+        if ($driver === 'pgsql') {
+            DB::statement('ALTER TABLE monitoring_history RENAME TO monitoring_history_unpartitioned');
+            DB::statement('CREATE TABLE monitoring_history (LIKE monitoring_history_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (checked_at)');
+            DB::statement('ALTER SEQUENCE monitoring_history_id_seq OWNED BY monitoring_history.id');
+            DB::statement('CREATE TABLE ' . HistoryPartitionService::PGSQL_DEFAULT . ' PARTITION OF monitoring_history DEFAULT');
+            (new HistoryPartitionService())->ensure($oldest);
+
+            DB::statement('INSERT INTO monitoring_history SELECT * FROM monitoring_history_unpartitioned');
+            DB::statement('DROP TABLE monitoring_history_unpartitioned');
+
+            // The partition key must be part of the primary key; indexes cascade to every partition
+            DB::statement('ALTER TABLE monitoring_history ADD PRIMARY KEY (id, checked_at)');
+            DB::statement('ALTER TABLE monitoring_history ADD CONSTRAINT monitoring_history_device_id_foreign FOREIGN KEY (device_id) REFERENCES devices (id) ON DELETE CASCADE');
+            DB::statement('CREATE INDEX monitoring_history_device_id_checked_at_index ON monitoring_history (device_id, checked_at)');
+            DB::statement('CREATE INDEX idx_monitoring_device_status_time ON monitoring_history (device_id, status, checked_at)');
+            DB::statement('CREATE INDEX idx_monitoring_status ON monitoring_history (status)');
+            DB::statement('CREATE INDEX monitoring_history_checked_at_index ON monitoring_history (checked_at)');
+        } elseif (in_array($driver, ['mysql', 'mariadb'])) {
+            // Partitioned InnoDB tables can't have foreign keys, and every unique key needs the partition column
+            DB::statement('ALTER TABLE monitoring_history DROP FOREIGN KEY monitoring_history_device_id_foreign');
+            DB::statement('ALTER TABLE monitoring_history DROP PRIMARY KEY, ADD PRIMARY KEY (id, checked_at)');
+            DB::statement('ALTER TABLE monitoring_history PARTITION BY RANGE (UNIX_TIMESTAMP(checked_at)) (PARTITION ' . HistoryPartitionService::MYSQL_MAXVALUE . ' VALUES LESS THAN MAXVALUE)');
+            (new HistoryPartitionService())->ensure($oldest);
+        }
+    }
+
+    public function down(): void
+    {
+        $driver = DB::connection()->getDriverName();
+
+        if ($driver === 'pgsql') {
+            DB::statement('CREATE TABLE monitoring_history_unpartitioned (LIKE monitoring_history INCLUDING DEFAULTS)');
+            DB::statement('INSERT INTO monitoring_history_unpartitioned SELECT * FROM monitoring_history');
+            DB::statement('ALTER SEQUENCE monitoring_history_id_seq OWNED BY monitoring_history_unpartitioned.id');
+            DB::statement('DROP TABLE monitoring_history CASCADE');
+            DB::statement('ALTER TABLE monitoring_history_unpartitioned RENAME TO monitoring_history');
+            DB::statement('ALTER TABLE monitoring_history ADD PRIMARY KEY (id)');
+            DB::statement('ALTER TABLE monitoring_history ADD CONSTRAINT monitoring_history_device_id_foreign FOREIGN KEY (device_id) REFERENCES devices (id) ON DELETE CASCADE');
+            DB::statement('CREATE INDEX monitoring_history_device_id_checked_at_index ON monitoring_history (device_id, checked_at)');
+            DB::statement('CREATE INDEX idx_monitoring_device_status_time ON monitoring_history (device_id, status, checked_at)');
+            DB::statement('CREATE INDEX idx_monitoring_status ON monitoring_history (status)');
+        } elseif (in_array($driver, ['mysql', 'mariadb'])) {
+            DB::statement('ALTER TABLE monitoring_history REMOVE PARTITIONING');
+            DB::statement('ALTER TABLE monitoring_history DROP PRIMARY KEY, ADD PRIMARY KEY (id)');
+            DB::statement('ALTER TABLE monitoring_history ADD CONSTRAINT monitoring_history_device_id_foreign FOREIGN KEY (device_id) REFERENCES devices (id) ON DELETE CASCADE');
+        }
+    }
+};
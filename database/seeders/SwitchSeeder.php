@@ -15,7 +15,8 @@ class SwitchSeeder extends Seeder
     public function run(): void
     {
         // Clear existing switches from devices table
-        Device::where('category', 'switch')->delete();
+        // One model at a time, so each device's monitoring history goes with it
+        Device::where('category', 'switch')->get()->each->delete();
         
         // Load switch data from JSON file
         $jsonPath = database_path('seeders/data/switches.json');
@@ -1,9 +1,13 @@
 import csv
 import os
-from collections import defaultdict
+import sys
 
-def check_cross_file_duplicates():
-    """Check for duplicate IPs across all CSV files."""
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+
+from hostmonitor.ipindex import IPv4Index
+
+def check_cross_file_duplicates(networks=()):
+    """Check for duplicate IPs across all CSV files, optionally listing networks."""
     
     print("🔍 Checking for duplicate IPs across all CSV files...")
     print("=" * 60)
@@ -16,8 +20,9 @@ def check_cross_file_duplicates():
         'tas.csv',
     ]
     
-    # Track IPs and which files they appear in
-    ip_to_files = defaultdict(list)
+    # Index every IP against its (file, row) occurrence
+    occurrences = []
+    index = IPv4Index()
     
     for csv_file in csv_files:
         if not os.path.exists(csv_file):
@@ -44,24 +49,36 @@ def check_cross_file_duplicates():
                 ip_address = row[ip_col_index].strip().strip('"')
                 
                 if ip_address and ip_address != '0.0.0.0':
-                    ip_to_files[ip_address].append((csv_file, row))
+                    if index.add(ip_address, len(occurrences)):
+                        occurrences.append((csv_file, row))
     
     # Find duplicates
-    duplicates = {ip: files for ip, files in ip_to_files.items() if len(files) > 1}
+    duplicates = list(index.duplicates())
     
     if duplicates:
         print(f"\n❌ Found {len(duplicates)} duplicate IPs across files:\n")
-        for ip, occurrences in sorted(duplicates.items()):
+        for ip, refs in duplicates:
             print(f"   IP: {ip}")
-            for file, row in occurrences:
+            for ref in refs:
+                file, row = occurrences[ref]
                 print(f"      - {file}: {row[1] if len(row) > 1 else 'N/A'}")
             print()
     else:
         print("\n✅ No duplicate IPs found across files!")
     
+    for network in networks:
+        refs = index.cidr(network)
+        print(f"\n🌐 {network}: {len(refs)} devices")
+        for ref in refs:
+            file, row = occurrences[ref]
+            print(f"      - {file}: {row[1] if len(row) > 1 else 'N/A'}")
+    
     print("=" * 60)
-    print(f"📊 Total unique IPs: {len(ip_to_files)}")
+    print(f"📊 Total unique IPs: {index.unique_count()}")
+    if index.invalid:
+        print(f"⚠️  Malformed IPs skipped: {index.invalid}")
     print(f"📊 Total files checked: {len(csv_files)}")
 
 if __name__ == '__main__':
-    check_cross_file_duplicates()
+    # Optional CIDR networks to list, e.g. 10.8.24.0/22
+    check_cross_file_duplicates(sys.argv[1:])
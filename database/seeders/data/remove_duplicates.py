@@ -1,5 +1,10 @@
 import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+
+from hostmonitor.ipindex import IPv4Index
 
 def remove_duplicates_from_csv(input_file, output_file=None):
     """Remove duplicate entries based on IP address from CSV file."""
@@ -31,10 +36,9 @@ def remove_duplicates_from_csv(input_file, output_file=None):
             print(f"   ⚠️  No IP address column found, skipping...")
             return
         
-        # Track seen IPs and keep first occurrence
-        seen_ips = set()
-        unique_rows = []
-        duplicate_count = 0
+        # Index every row by IP and keep the first occurrence
+        rows = []
+        index = IPv4Index()
         
         for row in reader:
             if len(row) <= ip_col_index:
@@ -46,13 +50,16 @@ def remove_duplicates_from_csv(input_file, output_file=None):
             if not ip_address or ip_address == '0.0.0.0':
                 continue
             
-            # Check if IP already seen
-            if ip_address in seen_ips:
-                duplicate_count += 1
-                continue
-            
-            seen_ips.add(ip_address)
-            unique_rows.append(row)
+            index.add(ip_address, len(rows))
+            rows.append(row)
+        
+        # Rows with a malformed IP are kept as they are
+        keep = bytearray([1]) * len(rows)
+        for ref in index.repeated_refs():
+            keep[ref] = 0
+        
+        unique_rows = [row for row, kept in zip(rows, keep) if kept]
+        duplicate_count = len(rows) - len(unique_rows)
         
         # Write cleaned data
         with open(output_file, 'w', encoding='utf-8', newline='') as outfile:
@@ -60,7 +67,7 @@ def remove_duplicates_from_csv(input_file, output_file=None):
             writer.writerow(header)
             writer.writerows(unique_rows)
         
-        print(f"   ✅ Original: {len(seen_ips) + duplicate_count} rows")
+        print(f"   ✅ Original: {len(rows)} rows")
         print(f"   ✅ Unique: {len(unique_rows)} rows")
         print(f"   ❌ Removed: {duplicate_count} duplicates")
 
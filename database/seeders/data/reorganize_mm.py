@@ -1,44 +1,11 @@
 import csv
+import os
 import re
+import sys
 
-def extract_location(device_name):
-    """Extract location from device name."""
-    # Try to extract building/location code from the beginning
-    # Examples: KBANDAR, KKTSN, D2, A18, Masjid, FPTV, FKAAB, etc.
-    
-    # Common patterns
-    patterns = [
-        r'^([A-Z]+\d+)',  # A18, D2, E16, etc.
-        r'^(KBANDAR|KKTSN|KB|KK)',  # Kolej Kediaman
-        r'^(Masjid)',
-        r'^(FKAAB|FPTV|FKAAS|FKEE|FKMP|FSKTM|FPTP|FPTV|FK)',  # Faculties
-        r'^(Library|LIB)',
-        r'^(Perwira)',
-        r'^(HEP)',
-        r'^(RECESS)',
-        r'^(Biodesel)',
-        r'^(TDI|TF)',
-        r'^(ATM)',
-        r'^(PMU|PKU)',
-        r'^([A-Z]\d+)',  # Single letter + number (A5, B1, C2, etc.)
-        r'^([A-Z]{1,2})-',  # Single/double letter followed by dash
-    ]
-    
-    for pattern in patterns:
-        match = re.match(pattern, device_name)
-        if match:
-            return match.group(1)
-    
-    # If no pattern matches, try to get first segment before dash or underscore
-    parts = re.split(r'[-_]', device_name)
-    if parts and parts[0]:
-        # Check if first part looks like a location code
-        first_part = parts[0]
-        if len(first_part) > 0 and len(first_part) <= 10 and (first_part[0].isupper() or first_part.isalnum()):
-            return first_part
-    
-    # Default fallback
-    return 'General'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+
+from hostmonitor.location import LocationClassifier, extract_location, print_rule_stats
 
 def determine_status(uptime_str):
     """Determine status based on uptime string."""
@@ -100,12 +67,6 @@ def reorganize_mm_csv(input_file, output_file):
             if not ip_address or ip_address == '0.0.0.0' or ':' in ip_address:
                 continue
             
-            # Extract location from device name
-            location = extract_location(device_name)
-            
-            # Track location usage
-            location_counts[location] = location_counts.get(location, 0) + 1
-            
             # Determine status
             status = determine_status(uptime)
             
@@ -113,7 +74,15 @@ def reorganize_mm_csv(input_file, output_file):
             response_time = '1'
             
             # New format: location, name, ip_address, status, response_time
-            output_data.append([location, device_name, ip_address, status, response_time])
+            output_data.append([None, device_name, ip_address, status, response_time])
+        
+        # Extract locations from the whole name column at once
+        classifier = LocationClassifier()
+        for row, location in zip(output_data, classifier.classify_all(row[1] for row in output_data)):
+            row[0] = location
+            
+            # Track location usage
+            location_counts[location] = location_counts.get(location, 0) + 1
         
         # Write output file
         with open(output_file, 'w', encoding='utf-8', newline='') as outfile:
@@ -130,6 +99,8 @@ def reorganize_mm_csv(input_file, output_file):
         print(f"\n📍 Locations found ({len(location_counts)}):")
         for loc, count in sorted(location_counts.items(), key=lambda x: x[1], reverse=True):
             print(f"   {loc}: {count} devices")
+        
+        print_rule_stats(classifier)
 
 if __name__ == '__main__':
     input_file = 'MM.csv'
@@ -1,43 +1,28 @@
-import csv
-from collections import defaultdict
+from hostmonitor.diff import diff, read_records
+from hostmonitor.ipindex import ip_key
 
-# Read existing switches.csv
-existing_devices = {}
-with open('database/seeders/data/switches.csv', 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        ip = row['ip_address']
-        name = row['name']
-        existing_devices[ip] = name
+# Read existing switches.csv and the newly extracted switches
+existing_records = list(read_records('database/seeders/data/switches.csv'))
+new_records = list(read_records('switches_final_complete.csv', 'switches'))
+existing_devices = {record['ip_address']: record['name'] for record in existing_records}
+new_devices = {record['ip_address']: record['name'] for record in new_records}
 
-# Read newly extracted switches
-new_devices = {}
-with open('switches_final_complete.csv', 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        ip = row['ip_address']
-        name = row['device_name']
-        new_devices[ip] = name
-
-# Find differences
+# Find differences; IP moves are reported as removed + added here
+changeset = diff(existing_records, new_records, detect_moves=False)
 existing_ips = set(existing_devices.keys())
 new_ips = set(new_devices.keys())
 
 # Devices only in existing CSV
-only_in_existing = existing_ips - new_ips
+only_in_existing = {c['ip_address'] for c in changeset['changes'] if c['type'] == 'removed'}
 
 # Devices only in new HTML
-only_in_new = new_ips - existing_ips
+only_in_new = {c['ip_address'] for c in changeset['changes'] if c['type'] == 'added'}
 
 # Devices in both but with different names
-name_changes = []
-for ip in existing_ips & new_ips:
-    if existing_devices[ip] != new_devices[ip]:
-        name_changes.append({
-            'ip': ip,
-            'old_name': existing_devices[ip],
-            'new_name': new_devices[ip]
-        })
+name_changes = [
+    {'ip': c['ip_address'], 'old_name': c['old_name'], 'new_name': c['name']}
+    for c in changeset['changes'] if c['type'] == 'renamed'
+]
 
 # Print results
 print("=" * 80)
@@ -51,7 +36,7 @@ print("\n" + "=" * 80)
 print(f"NEW DEVICES IN HTML (Not in existing CSV) - {len(only_in_new)} devices")
 print("=" * 80)
 if only_in_new:
-    for ip in sorted(only_in_new, key=lambda x: tuple(map(int, x.split('.')))):
+    for ip in sorted(only_in_new, key=ip_key):
         print(f"  {new_devices[ip]:<60} {ip}")
 else:
     print("  None")
@@ -60,7 +45,7 @@ print("\n" + "=" * 80)
 print(f"DEVICES ONLY IN EXISTING CSV (Not in HTML) - {len(only_in_existing)} devices")
 print("=" * 80)
 if only_in_existing:
-    for ip in sorted(only_in_existing, key=lambda x: tuple(map(int, x.split('.')))):
+    for ip in sorted(only_in_existing, key=ip_key):
         print(f"  {existing_devices[ip]:<60} {ip}")
 else:
     print("  None")
@@ -70,7 +55,7 @@ print(f"NAME CHANGES (Same IP, Different Name) - {len(name_changes)} devices")
 print("=" * 80)
 if name_changes:
     print("Showing first 30 name changes:")
-    for change in sorted(name_changes[:30], key=lambda x: tuple(map(int, x['ip'].split('.')))):
+    for change in sorted(name_changes[:30], key=lambda x: ip_key(x['ip'])):
         print(f"  IP: {change['ip']}")
         print(f"    Old: {change['old_name']}")
         print(f"    New: {change['new_name']}")
@@ -98,17 +83,17 @@ with open('final_comparison_report.txt', 'w', encoding='utf-8') as f:
     
     f.write(f"NEW DEVICES IN HTML ({len(only_in_new)} devices):\n")
     f.write("-" * 80 + "\n")
-    for ip in sorted(only_in_new, key=lambda x: tuple(map(int, x.split('.')))):
+    for ip in sorted(only_in_new, key=ip_key):
         f.write(f"{new_devices[ip]},{ip}\n")
     
     f.write(f"\n\nDEVICES ONLY IN EXISTING CSV ({len(only_in_existing)} devices):\n")
     f.write("-" * 80 + "\n")
-    for ip in sorted(only_in_existing, key=lambda x: tuple(map(int, x.split('.')))):
+    for ip in sorted(only_in_existing, key=ip_key):
         f.write(f"{existing_devices[ip]},{ip}\n")
     
     f.write(f"\n\nNAME CHANGES ({len(name_changes)} devices):\n")
     f.write("-" * 80 + "\n")
-    for change in sorted(name_changes, key=lambda x: tuple(map(int, x['ip'].split('.')))):
+    for change in sorted(name_changes, key=lambda x: ip_key(x['ip'])):
         f.write(f"{change['ip']}\n")
         f.write(f"  Old: {change['old_name']}\n")
         f.write(f"  New: {change['new_name']}\n\n")
@@ -0,0 +1,3 @@
+"""
+Shared helpers for working with Advanced Host Monitor HTML exports and for probing the devices they list
+"""
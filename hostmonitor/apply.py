@@ -0,0 +1,336 @@
+"""
+Apply a hostmonitor.diff changeset to the ``devices`` table in bulk.
+
+Only the rows named in the changeset are written, with one multi-row
+statement per batch and everything inside a single transaction:
+
+    added           INSERT ... ON CONFLICT (ip_address) upsert
+    removed         is_active = false (history rows are kept)
+    renamed         name = CASE ip_address WHEN ... END
+    ip_moved        ip_address = CASE ip_address WHEN ... END (and an
+                    HM-<ip> barcode with it)
+    status_flipped  status plus online_since/offline_since transitions
+
+uptime_minutes, online_since and the other monitoring columns of devices
+that did not change are never written.
+
+The connection comes from --sqlite or from the Laravel .env (DB_CONNECTION
+sqlite, pgsql or mysql). Postgres needs psycopg2 and MySQL needs pymysql.
+
+Usage:
+    python -m hostmonitor.apply CHANGESET.json [--sqlite FILE | --env .env]
+                                [--branch-id N] [--batch-size N] [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+DEFAULT_BATCH_SIZE = 500
+
+# Bound parameters per statement stay below the SQLite and driver limits
+MAX_PARAMETERS = 30000
+
+# HostMonitor button class -> devices.status; anything else (WaitForMaster,
+# Unknown, a blank state) says nothing about reachability and maps to unknown
+DEVICE_STATUSES = {
+    'Alive': 'online',
+    'Bad': 'offline',
+    'NoAnswer': 'offline',
+    'UnknownHost': 'offline',
+    'ACK': 'offline_ack',
+}
+
+DOWN_STATUSES = ('offline', 'offline_ack')
+
+# Barcode given to devices added from HostMonitor, derived from their IP
+BARCODE_PREFIX = 'HM-'
+
+INSERT_COLUMNS = [
+    'branch_id', 'name', 'ip_address', 'barcode', 'category', 'status',
+    'is_active', 'online_since', 'offline_since', 'created_at', 'updated_at',
+]
+
+# Columns an upsert may overwrite on a device that already exists
+UPSERT_COLUMNS = ['name', 'category', 'is_active', 'updated_at']
+
+
+class Dialect:
+    """SQL differences between the supported database drivers"""
+
+    def __init__(self, name, placeholder):
+        self.name = name
+        self.placeholder = placeholder
+
+    def placeholders(self, count):
+        return ', '.join([self.placeholder] * count)
+
+    def upsert_clause(self, key, columns):
+        if self.name == 'mysql':
+            return 'ON DUPLICATE KEY UPDATE ' + ', '.join(f'{c} = VALUES({c})' for c in columns)
+        return f'ON CONFLICT ({key}) DO UPDATE SET ' + ', '.join(f'{c} = excluded.{c}' for c in columns)
+
+
+SQLITE = Dialect('sqlite', '?')
+PGSQL = Dialect('pgsql', '%s')
+MYSQL = Dialect('mysql', '%s')
+
+
+def read_env(path):
+    """Parse KEY=VALUE lines of a Laravel .env file"""
+    env = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            env[key.strip()] = value.strip().strip('"\'')
+    return env
+
+
+def connect(env, base_dir='.'):
+    """Open a DB-API connection for a Laravel DB_* configuration"""
+    driver = env.get('DB_CONNECTION', 'sqlite')
+
+    if driver == 'sqlite':
+        database = env.get('DB_DATABASE') or os.path.join(base_dir, 'database', 'database.sqlite')
+        return sqlite3.connect(database), SQLITE
+
+    if driver == 'pgsql':
+        try:
+            import psycopg2
+        except ImportError:
+            raise RuntimeError('psycopg2 is required for DB_CONNECTION=pgsql (pip install psycopg2-binary)')
+        connection = psycopg2.connect(
+            host=env.get('DB_HOST', '127.0.0.1'),
+            port=int(env.get('DB_PORT', 5432)),
+            dbname=env.get('DB_DATABASE', 'laravel'),
+            user=env.get('DB_USERNAME', 'root'),
+            password=env.get('DB_PASSWORD', ''),
+        )
+        return connection, PGSQL
+
+    if driver in ('mysql', 'mariadb'):
+        try:
+            import pymysql
+        except ImportError:
+            raise RuntimeError('pymysql is required for DB_CONNECTION=mysql (pip install pymysql)')
+        connection = pymysql.connect(
+            host=env.get('DB_HOST', '127.0.0.1'),
+            port=int(env.get('DB_PORT', 3306)),
+            database=env.get('DB_DATABASE', 'laravel'),
+            user=env.get('DB_USERNAME', 'root'),
+            password=env.get('DB_PASSWORD', ''),
+            charset='utf8mb4',
+        )
+        return connection, MYSQL
+
+    raise RuntimeError(f'Unsupported DB_CONNECTION: {driver}')
+
+
+def device_status(state):
+    return DEVICE_STATUSES.get(state, 'unknown')
+
+
+def _batches(rows, batch_size, columns):
+    size = max(1, min(batch_size, MAX_PARAMETERS // max(columns, 1)))
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class ChangesetApplier:
+    """Write the changes of one changeset through a DB-API connection.
+
+    Statements are only executed by apply(); each ``_*`` method returns the
+    (sql, params) pairs it would run so --dry-run can count them.
+    """
+
+    def __init__(self, connection, dialect, branch_id=1, batch_size=DEFAULT_BATCH_SIZE):
+        self.connection = connection
+        self.dialect = dialect
+        self.branch_id = branch_id
+        self.batch_size = batch_size
+        self.now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def statements(self, changes):
+        by_type = {}
+        for change in changes:
+            by_type.setdefault(change['type'], []).append(change)
+
+        # Moves first: a moved device takes its HM- barcode along, so a
+        # device added on its old address gets that address and barcode
+        yield from self._moves(by_type.get('ip_moved', []))
+        yield from self._renames(by_type.get('renamed', []))
+        yield from self._upserts(by_type.get('added', []))
+        yield from self._deactivations(by_type.get('removed', []))
+        yield from self._status_flips(by_type.get('status_flipped', []))
+
+    def apply(self, changes, dry_run=False):
+        """Run every statement in one transaction and return per-type row counts"""
+        started = time.perf_counter()
+        statements = 0
+        rows = {}
+        cursor = self.connection.cursor()
+        try:
+            for change_type, sql, params in self.statements(changes):
+                statements += 1
+                if dry_run:
+                    continue
+                cursor.execute(sql, params)
+                rows[change_type] = rows.get(change_type, 0) + max(cursor.rowcount, 0)
+            if dry_run:
+                self.connection.rollback()
+            else:
+                self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        return {
+            'statements': statements,
+            'rows': rows,
+            'dry_run': dry_run,
+            'seconds': round(time.perf_counter() - started, 4),
+        }
+
+    def _case_update(self, change_type, column, pairs):
+        """UPDATE one column from an ip_address -> value map, one statement per batch"""
+        p = self.dialect.placeholder
+        for batch in _batches(pairs, self.batch_size, 3):
+            whens = ' '.join(f'WHEN {p} THEN {p}' for _ in batch)
+            sql = (f'UPDATE devices SET {column} = CASE ip_address {whens} END, updated_at = {p} '
+                   f'WHERE ip_address IN ({self.dialect.placeholders(len(batch))})')
+            params = [value for pair in batch for value in pair]
+            params.append(self.now)
+            params.extend(ip_address for ip_address, _ in batch)
+            yield change_type, sql, params
+
+    def _moves(self, changes):
+        """Rewrite ip_address, and a barcode still in the HM-<ip> form, one statement per batch"""
+        p = self.dialect.placeholder
+        pairs = [(c['old_ip_address'], c['ip_address']) for c in changes]
+        for batch in _batches(pairs, self.batch_size, 5):
+            whens = ' '.join(f'WHEN {p} THEN {p}' for _ in batch)
+            sql = (f'UPDATE devices SET ip_address = CASE ip_address {whens} END, '
+                   f'barcode = CASE barcode {whens} ELSE barcode END, updated_at = {p} '
+                   f'WHERE ip_address IN ({self.dialect.placeholders(len(batch))})')
+            params = [value for pair in batch for value in pair]
+            params.extend(BARCODE_PREFIX + value for pair in batch for value in pair)
+            params.append(self.now)
+            params.extend(old_ip for old_ip, _ in batch)
+            yield 'ip_moved', sql, params
+
+    def _renames(self, changes):
+        pairs = [(c['ip_address'], c['name']) for c in changes]
+        return self._case_update('renamed', 'name', pairs)
+
+    def _upserts(self, changes):
+        rows = []
+        for c in changes:
+            status = device_status(c.get('state', ''))
+            rows.append([
+                self.branch_id,
+                c['name'],
+                c['ip_address'],
+                BARCODE_PREFIX + c['ip_address'],
+                c['category'],
+                status,
+                True,
+                self.now if status == 'online' else None,
+                self.now if status in DOWN_STATUSES else None,
+                self.now,
+                self.now,
+            ])
+
+        row_placeholders = f'({self.dialect.placeholders(len(INSERT_COLUMNS))})'
+        for batch in _batches(rows, self.batch_size, len(INSERT_COLUMNS)):
+            sql = (f"INSERT INTO devices ({', '.join(INSERT_COLUMNS)}) "
+                   f"VALUES {', '.join([row_placeholders] * len(batch))} "
+                   f"{self.dialect.upsert_clause('ip_address', UPSERT_COLUMNS)}")
+            yield 'added', sql, [value for row in batch for value in row]
+
+    def _deactivations(self, changes):
+        p = self.dialect.placeholder
+        ips = [c['ip_address'] for c in changes]
+        for batch in _batches(ips, self.batch_size, 1):
+            sql = (f'UPDATE devices SET is_active = {p}, updated_at = {p} '
+                   f'WHERE ip_address IN ({self.dialect.placeholders(len(batch))}) AND is_active = {p}')
+            yield 'removed', sql, [False, self.now, *batch, True]
+
+    def _status_flips(self, changes):
+        p = self.dialect.placeholder
+        by_status = {}
+        for c in changes:
+            by_status.setdefault(device_status(c['state']), []).append(c['ip_address'])
+
+        for status, ips in by_status.items():
+            # Coming up starts online_since; going down (or from offline to
+            # offline_ack) keeps an outage's offline_since; unknown touches neither
+            if status == 'online':
+                since, since_params = f', online_since = {p}, offline_since = NULL', [self.now]
+            elif status in DOWN_STATUSES:
+                since, since_params = f', online_since = NULL, offline_since = COALESCE(offline_since, {p})', [self.now]
+            else:
+                since, since_params = '', []
+            for batch in _batches(ips, self.batch_size, 1):
+                # Devices already in the target status keep their timestamps
+                sql = (f'UPDATE devices SET previous_status = status, status = {p}, '
+                       f'last_status_change = {p}{since}, updated_at = {p} '
+                       f'WHERE ip_address IN ({self.dialect.placeholders(len(batch))}) AND status <> {p}')
+                yield 'status_flipped', sql, [status, self.now, *since_params, self.now, *batch, status]
+
+
+def apply_changeset(changeset, connection, dialect, branch_id=1, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    applier = ChangesetApplier(connection, dialect, branch_id, batch_size)
+    return applier.apply(changeset['changes'], dry_run=dry_run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply an extraction changeset to the devices table')
+    parser.add_argument('changeset', help='changeset JSON written by python -m hostmonitor.diff')
+    parser.add_argument('--sqlite', help='SQLite database file (overrides --env)')
+    parser.add_argument('--env', default='.env', help='Laravel .env holding the DB_* settings')
+    parser.add_argument('--branch-id', type=int, default=1, help='branch for newly added devices')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='rows per statement')
+    parser.add_argument('--dry-run', action='store_true', help='build the statements without running them')
+    args = parser.parse_args(argv)
+
+    with open(args.changeset, 'r', encoding='utf-8') as f:
+        changeset = json.load(f)
+
+    if args.sqlite:
+        env = {'DB_CONNECTION': 'sqlite', 'DB_DATABASE': args.sqlite}
+    else:
+        env = read_env(args.env)
+
+    try:
+        connection, dialect = connect(env, os.path.dirname(os.path.abspath(args.env)))
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
+
+    try:
+        result = apply_changeset(changeset, connection, dialect, args.branch_id, args.batch_size, args.dry_run)
+    finally:
+        connection.close()
+
+    print("=" * 80)
+    print("CHANGESET APPLIED" if not args.dry_run else "CHANGESET DRY RUN")
+    print("=" * 80)
+    for change_type, count in changeset['summary'].items():
+        written = result['rows'].get(change_type, 0)
+        print(f"  {change_type:15}: {count:5} in changeset, {written:5} rows written")
+    print(f"\nStatements: {result['statements']} ({dialect.name}, one transaction)")
+    print(f"Time: {result['seconds']:.3f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
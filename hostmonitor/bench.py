@@ -0,0 +1,299 @@
+"""
+Benchmark and golden-output regression harness for the extractors.
+
+Every extractor is run against the checked-in exports (Switch.html,
+Server.html, Cctv.html, Wifi.html, Tas.html) and against copies whose
+button section is repeated 10 and 100 times. Each run happens in a fresh
+subprocess so peak RSS belongs to that run alone. The harness records
+buttons/sec, peak RSS and a digest of the output rows, and fails when:
+
+  * the rows differ from the golden CSV in hostmonitor/golden/<extractor>/
+    (the scaled copies only repeat buttons, so every extractor, which keys
+    devices by IP, must produce exactly the 1x output), or
+  * throughput drops more than --threshold below the recorded baseline in
+    hostmonitor/golden/benchmarks.json (runs under MIN_PERF_SECONDS are
+    reported but not compared). Re-record it with --update on the machine
+    that runs the checks.
+
+Usage:
+    python -m hostmonitor.bench [--scales 1,10,100] [--repeat N] [--threshold 0.4]
+                                [--extractor NAME ...] [--no-perf] [--update]
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from hostmonitor.extract import FALLBACK_ENCODING, detect_encoding, iter_buttons
+from hostmonitor.pipeline import CATEGORY_EXPORTS, DATA_DIR
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+BASELINE_NAME = 'benchmarks.json'
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_THRESHOLD = 0.4
+
+# Runs shorter than this are too noisy to compare against the baseline
+MIN_PERF_SECONDS = 0.25
+
+EXPORT_CATEGORIES = {html_name: category for html_name, category, _ in CATEGORY_EXPORTS}
+
+
+def _read_export(html_file):
+    encoding = detect_encoding(html_file)
+    try:
+        with open(html_file, 'r', encoding=encoding) as f:
+            return f.read(), encoding
+    except UnicodeDecodeError:
+        with open(html_file, 'r', encoding=FALLBACK_ENCODING) as f:
+            return f.read(), FALLBACK_ENCODING
+
+
+def run_extract_all_devices_v2(html_file):
+    from extract_all_devices_v2 import extract_devices_from_html
+    html_content, _ = _read_export(html_file)
+    category = EXPORT_CATEGORIES.get(os.path.basename(html_file), 'switches')
+    devices = extract_devices_from_html(html_content, category)
+    return [[name, ip_address] for ip_address, name in devices.items()]
+
+
+def run_parse_switch_data(html_file):
+    from parse_switches_ultimate import parse_switch_data
+    return [[switch['name'], switch['ip_address']] for switch in parse_switch_data(html_file)]
+
+
+def run_pipeline(html_file):
+    from hostmonitor.pipeline import extract_export
+    category = EXPORT_CATEGORIES.get(os.path.basename(html_file), 'switches')
+    result = extract_export(html_file, category)
+    return [[device['name'], device['ip_address'], device['state']] for device in result['devices']]
+
+
+EXTRACTORS = {
+    'extract_all_devices_v2': run_extract_all_devices_v2,
+    'parse_switch_data': run_parse_switch_data,
+    'pipeline': run_pipeline,
+}
+
+
+def rows_csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    return buffer.getvalue()
+
+
+def rows_digest(rows):
+    return hashlib.sha256(rows_csv(rows).encode('utf-8')).hexdigest()
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def worker(extractor, html_file, repeat):
+    """Run one extractor ``repeat`` times in this process and report the best time"""
+    run = EXTRACTORS[extractor]
+    best = None
+    rows = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = run(html_file)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {'seconds': best, 'rows': rows, 'peak_rss_kb': peak_rss_kb()}
+
+
+def scale_export(html_file, factor, output_dir):
+    """Write a copy of an export whose button section is repeated ``factor`` times"""
+    output_file = os.path.join(output_dir, f'x{factor}', os.path.basename(html_file))
+    if factor == 1:
+        return html_file
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+    html_content, encoding = _read_export(html_file)
+    lower = html_content.lower()
+    start = lower.find('<input')
+    end = lower.rfind('<input')
+    end = html_content.find('>', end) + 1 if end >= 0 else -1
+    if start < 0 or end <= 0:
+        raise ValueError(f'{html_file} has no <input> tags to scale')
+
+    with open(output_file, 'w', encoding=encoding, newline='') as f:
+        f.write(html_content[:start])
+        for _ in range(factor):
+            f.write(html_content[start:end])
+        f.write(html_content[end:])
+    return output_file
+
+
+def count_buttons(html_file):
+    encoding = detect_encoding(html_file)
+    try:
+        return sum(1 for _ in iter_buttons(html_file, encoding=encoding))
+    except UnicodeDecodeError:
+        return sum(1 for _ in iter_buttons(html_file, encoding=FALLBACK_ENCODING))
+
+
+def run_case(extractor, html_file, repeat):
+    """Run a worker subprocess and return its JSON result"""
+    completed = subprocess.run(
+        [sys.executable, '-m', 'hostmonitor.bench', '--worker', extractor, html_file, '--repeat', str(repeat)],
+        capture_output=True, text=True, encoding='utf-8',
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'{extractor} failed on {html_file}:\n{completed.stderr}')
+    return json.loads(completed.stdout)
+
+
+def golden_path(extractor, html_name):
+    return os.path.join(GOLDEN_DIR, extractor, os.path.splitext(html_name)[0] + '.csv')
+
+
+def load_baseline():
+    path = os.path.join(GOLDEN_DIR, BASELINE_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run_benchmarks(data_dir, extractors, scales, repeat, threshold, check_perf=True, update=False):
+    """Run every case; returns (results, failures)"""
+    baseline = load_baseline()
+    exports = [name for name, _, _ in CATEGORY_EXPORTS if os.path.exists(os.path.join(data_dir, name))]
+    results = []
+    failures = []
+
+    with tempfile.TemporaryDirectory() as scaled_dir:
+        for html_name in exports:
+            for factor in scales:
+                html_file = scale_export(os.path.join(data_dir, html_name), factor, scaled_dir)
+                buttons = count_buttons(html_file)
+                case = f'{html_name}@x{factor}'
+
+                for extractor in extractors:
+                    outcome = run_case(extractor, html_file, repeat)
+                    rows = outcome['rows']
+                    seconds = outcome['seconds']
+                    result = {
+                        'extractor': extractor,
+                        'case': case,
+                        'buttons': buttons,
+                        'rows': len(rows),
+                        'seconds': round(seconds, 4),
+                        'buttons_per_sec': round(buttons / seconds) if seconds else None,
+                        'peak_rss_kb': outcome['peak_rss_kb'],
+                        'digest': rows_digest(rows),
+                        'status': 'ok',
+                    }
+                    results.append(result)
+
+                    golden = golden_path(extractor, html_name)
+                    if update and factor == 1:
+                        os.makedirs(os.path.dirname(golden), exist_ok=True)
+                        with open(golden, 'w', encoding='utf-8', newline='') as f:
+                            f.write(rows_csv(rows))
+                    elif not os.path.exists(golden):
+                        result['status'] = 'no golden'
+                    else:
+                        with open(golden, 'r', encoding='utf-8', newline='') as f:
+                            expected = f.read()
+                        if rows_csv(rows) != expected:
+                            result['status'] = 'DIVERGED'
+                            failures.append(f'{extractor} {case}: output differs from {golden}')
+                            continue
+
+                    if update:
+                        baseline.setdefault(extractor, {})[case] = result['buttons_per_sec']
+                        continue
+
+                    recorded = baseline.get(extractor, {}).get(case)
+                    if check_perf and recorded and seconds >= MIN_PERF_SECONDS:
+                        if result['buttons_per_sec'] < recorded * (1 - threshold):
+                            result['status'] = 'SLOWER'
+                            failures.append(f"{extractor} {case}: {result['buttons_per_sec']} buttons/sec, "
+                                            f"baseline {recorded} (-{threshold:.0%} allowed)")
+
+    if update:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(os.path.join(GOLDEN_DIR, BASELINE_NAME), 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    return results, failures
+
+
+def print_results(results, failures):
+    print("=" * 100)
+    print("EXTRACTOR BENCHMARKS")
+    print("=" * 100)
+    print(f"{'extractor':24} {'case':18} {'buttons':>8} {'rows':>6} {'seconds':>9} "
+          f"{'buttons/s':>10} {'peak RSS':>10}  {'digest':12} status")
+    print("-" * 100)
+    for r in results:
+        rss = f"{r['peak_rss_kb'] / 1024:.1f} MB" if r['peak_rss_kb'] else 'n/a'
+        print(f"{r['extractor']:24} {r['case']:18} {r['buttons']:8} {r['rows']:6} {r['seconds']:9.4f} "
+              f"{r['buttons_per_sec'] or 0:10} {rss:>10}  {r['digest'][:12]} {r['status']}")
+    print()
+    if failures:
+        print(f"❌ {len(failures)} failure(s):")
+        for failure in failures:
+            print(f"   - {failure}")
+    else:
+        print("✅ All outputs match the golden CSVs")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the extractors and check them against golden output')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory holding the *.html exports')
+    parser.add_argument('--extractor', action='append', choices=sorted(EXTRACTORS),
+                        help='extractor to run (repeatable, default: all)')
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help='comma-separated scale factors')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case, the best time counts')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed throughput drop against the baseline (0.4 = 40%%)')
+    parser.add_argument('--no-perf', action='store_true', help='only check outputs')
+    parser.add_argument('--update', action='store_true', help='rewrite the golden CSVs and the baseline')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--worker', nargs=2, metavar=('EXTRACTOR', 'HTML'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        json.dump(worker(args.worker[0], args.worker[1], args.repeat), sys.stdout)
+        return 0
+
+    scales = [int(s) for s in args.scales.split(',') if s]
+    results, failures = run_benchmarks(
+        args.data_dir,
+        args.extractor or sorted(EXTRACTORS),
+        scales,
+        args.repeat,
+        args.threshold,
+        check_perf=not args.no_perf,
+        update=args.update,
+    )
+    print_results(results, failures)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'failures': failures}, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Content-hash cache for parsed HostMonitor exports.
+
+Parsed records are stored in a SQLite file keyed first by the digest of the
+whole export, so an unchanged file is answered from one lookup. Exports
+larger than BLOCK_CACHE_MIN_BYTES are also cached per ``<input>`` tag:
+when the file changed, only tags whose digest has not been seen before are
+parsed and every other record is reused.
+
+Entries are scoped by a namespace (which parser produced them) and a
+version derived from the parser's source, so editing the extraction code
+invalidates the cache on its own.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from hostmonitor.extract import (
+    FALLBACK_ENCODING,
+    Button,
+    detect_encoding,
+    is_button,
+    iter_button_batches,
+    iter_tag_batches,
+    tag_attrs,
+)
+
+DEFAULT_CACHE_PATH = os.path.join('storage', 'framework', 'cache', 'hostmonitor', 'extract_cache.sqlite3')
+
+# Smaller exports are parsed whole; per-tag bookkeeping would cost more
+# than it saves
+BLOCK_CACHE_MIN_BYTES = 32 * 1024
+
+# Blocks not seen for this long are dropped
+BLOCK_TTL_SECONDS = 30 * 24 * 3600
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    namespace TEXT NOT NULL,
+    version TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    buttons INTEGER NOT NULL,
+    records TEXT NOT NULL,
+    seen_at INTEGER NOT NULL,
+    PRIMARY KEY (namespace, version, digest)
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    namespace TEXT NOT NULL,
+    version TEXT NOT NULL,
+    digest BLOB NOT NULL,
+    button INTEGER NOT NULL,
+    record TEXT,
+    seen_at INTEGER NOT NULL,
+    PRIMARY KEY (namespace, version, digest)
+);
+"""
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def block_digest(tag):
+    return hashlib.blake2b(tag.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def code_version(*paths):
+    """Digest of the source files a parser depends on"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class ExtractionCache:
+    """Cache of per-button records produced by ``parse_batch``.
+
+    ``parse_batch`` receives a list of Button tuples and returns one
+    JSON-serializable record (or None) per button, in the same order.
+    extract() returns ``(records, stats)`` where records is a list of
+    ``[button_index, record]`` pairs for the buttons that produced one.
+    """
+
+    def __init__(self, path, namespace, version):
+        self.path = path
+        self.namespace = namespace
+        self.version = version
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def extract(self, html_file, parse_batch):
+        started = time.perf_counter()
+        digest = file_digest(html_file)
+        now = int(time.time())
+
+        row = self._db.execute(
+            'SELECT buttons, records FROM files WHERE namespace = ? AND version = ? AND digest = ?',
+            (self.namespace, self.version, digest),
+        ).fetchone()
+        if row:
+            with self._db:
+                self._db.execute(
+                    'UPDATE files SET seen_at = ? WHERE namespace = ? AND version = ? AND digest = ?',
+                    (now, self.namespace, self.version, digest),
+                )
+            records = json.loads(row[1])
+            return records, self._stats(True, row[0], 0, 0, started)
+
+        use_blocks = os.path.getsize(html_file) >= BLOCK_CACHE_MIN_BYTES
+        encoding = detect_encoding(html_file)
+        try:
+            buttons, records, tags, hits = self._parse(html_file, encoding, parse_batch, use_blocks, now)
+        except UnicodeDecodeError:
+            # Non-ASCII text appeared after the sampled bytes
+            buttons, records, tags, hits = self._parse(html_file, FALLBACK_ENCODING, parse_batch, use_blocks, now)
+
+        with self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO files (namespace, version, digest, buttons, records, seen_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (self.namespace, self.version, digest, buttons, json.dumps(records), now),
+            )
+            cutoff = now - BLOCK_TTL_SECONDS
+            self._db.execute('DELETE FROM files WHERE seen_at < ?', (cutoff,))
+            self._db.execute('DELETE FROM blocks WHERE seen_at < ?', (cutoff,))
+
+        return records, self._stats(False, buttons, tags, hits, started)
+
+    def _parse(self, html_file, encoding, parse_batch, use_blocks, now):
+        if not use_blocks:
+            records = []
+            buttons = 0
+            for batch in iter_button_batches(html_file, encoding=encoding):
+                buttons += len(batch)
+                for button, record in zip(batch, parse_batch(batch)):
+                    if record is not None:
+                        records.append([button.index, record])
+            return buttons, records, 0, 0
+
+        records = []
+        buttons = 0
+        tags = 0
+        hits = 0
+        for batch in iter_tag_batches(html_file, encoding=encoding):
+            digests = [block_digest(tag) for tag in batch]
+            known = self._lookup(digests)
+            tags += len(batch)
+            hits += sum(1 for digest in digests if digest in known)
+
+            # Number the buttons and collect the tags that need parsing
+            entries = []
+            missing = []
+            for tag, digest in zip(batch, digests):
+                if digest in known:
+                    button, record = known[digest]
+                    if button:
+                        buttons += 1
+                    entries.append((digest, buttons if button else 0, record))
+                    continue
+
+                attrs = tag_attrs(tag)
+                if is_button(attrs):
+                    buttons += 1
+                    missing.append(Button(buttons, attrs))
+                    entries.append((digest, buttons, None))
+                else:
+                    entries.append((digest, 0, None))
+
+            parsed = {}
+            if missing:
+                for button, record in zip(missing, parse_batch(missing)):
+                    parsed[button.index] = record
+
+            new_blocks = []
+            for digest, index, record in entries:
+                if digest not in known:
+                    record = parsed.get(index)
+                    new_blocks.append((self.namespace, self.version, digest, 1 if index else 0,
+                                       None if record is None else json.dumps(record), now))
+                if index and record is not None:
+                    records.append([index, record])
+
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO blocks (namespace, version, digest, button, record, seen_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    new_blocks,
+                )
+                self._db.executemany(
+                    'UPDATE blocks SET seen_at = ? WHERE namespace = ? AND version = ? AND digest = ?',
+                    [(now, self.namespace, self.version, digest) for digest in known],
+                )
+
+        return buttons, records, tags, hits
+
+    def _lookup(self, digests):
+        """Map digest -> (is_button, record) for the digests already cached"""
+        known = {}
+        unique = list(dict.fromkeys(digests))
+        for start in range(0, len(unique), _LOOKUP_BATCH):
+            chunk = unique[start:start + _LOOKUP_BATCH]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = self._db.execute(
+                f'SELECT digest, button, record FROM blocks '
+                f'WHERE namespace = ? AND version = ? AND digest IN ({placeholders})',
+                (self.namespace, self.version, *chunk),
+            )
+            for digest, button, record in rows:
+                known[digest] = (bool(button), None if record is None else json.loads(record))
+        return known
+
+    @staticmethod
+    def _stats(file_hit, buttons, tags, hits, started):
+        return {
+            'file_hit': file_hit,
+            'buttons': buttons,
+            'blocks': tags,
+            'block_hits': hits,
+            'hit_ratio': 1.0 if file_hit else round(hits / tags, 4) if tags else 0.0,
+            'seconds': round(time.perf_counter() - started, 4),
+        }
@@ -0,0 +1,306 @@
+"""
+Remove duplicate IPs within and across the category CSVs in one pass.
+
+The rows of all category files are merged by packed IP address
+(heapq.merge). Rows sharing an address arrive together, ordered by
+category priority and then by position in their file, so the first one is
+kept and the rest are dropped:
+
+    server.csv > switches.csv > cctv.csv > wifi.csv > tas.csv
+
+Rows whose IP isn't a dotted quad are kept like the old scripts kept them,
+deduplicated by the exact string in the same priority order. Rows without
+an IP (or 0.0.0.0) are dropped.
+
+The merge only decides which lines survive: each file is then copied to a
+temp file next to it with its kept rows in their original order, and the
+CSVs are only replaced (os.replace) once every file has been written, so an
+interrupted run leaves the originals untouched. A JSON report lists every
+dropped row and why.
+
+Usage:
+    python -m hostmonitor.dedup [--data-dir DIR] [--report FILE] [--presorted] [--dry-run]
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+from hostmonitor.ipindex import pack_ip
+
+DATA_DIR = os.path.join('database', 'seeders', 'data')
+REPORT_NAME = 'dedup_report.json'
+
+# Highest priority first
+PRIORITY = ['server.csv', 'switches.csv', 'cctv.csv', 'wifi.csv', 'tas.csv']
+
+# Drop reasons
+MISSING_IP = 'missing_ip'
+DUPLICATE_IN_FILE = 'duplicate_in_file'
+DUPLICATE_ACROSS_FILES = 'duplicate_across_files'
+
+
+def find_column(header, *needles):
+    for i, col in enumerate(header):
+        col_clean = col.strip('\ufeff').lower()
+        if any(needle in col_clean for needle in needles):
+            return i
+    return None
+
+
+class CategoryFile:
+    """One input CSV: its header, IP/name columns, the lines to keep and per-file counters"""
+
+    def __init__(self, path, priority):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.priority = priority
+        self.header = None
+        self.ip_col = None
+        self.name_col = None
+        self.read = 0
+        self.kept = 0
+        self.dropped = 0
+        self.keep_lines = set()
+        self.malformed = []
+
+    def rows(self, presorted, drops):
+        """Yield (packed_ip, priority, line, row) sorted by address.
+
+        Rows without an IP are recorded in ``drops`` and rows with a
+        malformed one are set aside in ``malformed`` instead. With
+        ``presorted`` the file is streamed and must already be in IP order;
+        otherwise it is read whole and sorted.
+        """
+        entries = self._entries(drops)
+        if not presorted:
+            yield from sorted(entries)
+            return
+
+        previous = None
+        for entry in entries:
+            if previous is not None and entry[0] < previous:
+                raise ValueError(f"{self.path} is not sorted by IP at line {entry[2]}")
+            previous = entry[0]
+            yield entry
+
+    def _entries(self, drops):
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            self.header = next(reader, [])
+            self.ip_col = find_column(self.header, 'ip', 'address')
+            self.name_col = find_column(self.header, 'name')
+            if self.name_col is None and len(self.header) > 1:
+                self.name_col = 1
+            if self.ip_col is None:
+                return
+
+            for row in reader:
+                self.read += 1
+                line = reader.line_num
+                ip_address = row[self.ip_col].strip().strip('"') if len(row) > self.ip_col else ''
+                if not ip_address or ip_address == '0.0.0.0':
+                    drops.append(self.drop(row, line, ip_address, MISSING_IP))
+                    continue
+                try:
+                    packed = pack_ip(ip_address)
+                except ValueError:
+                    self.malformed.append((line, ip_address, row))
+                    continue
+                yield packed, self.priority, line, row
+
+    def keep(self, line):
+        self.kept += 1
+        self.keep_lines.add(line)
+
+    def write_kept(self, writer):
+        """Copy the kept lines to ``writer`` in file order"""
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if reader.line_num in self.keep_lines:
+                    writer.writerow(row)
+
+    def device_name(self, row):
+        if self.name_col is not None and len(row) > self.name_col:
+            return row[self.name_col]
+        return ''
+
+    def drop(self, row, line, ip_address, reason, kept_by=None):
+        self.dropped += 1
+        entry = {
+            'file': self.name,
+            'line': line,
+            'ip_address': ip_address,
+            'name': self.device_name(row),
+            'reason': reason,
+        }
+        if kept_by:
+            entry['kept_file'], entry['kept_line'], entry['kept_name'] = kept_by
+        return entry
+
+
+def _keep_mode(path, tmp_path):
+    """Give a temp file the mode of the file it will replace; mkstemp creates it 0600"""
+    if os.path.exists(path):
+        shutil.copymode(path, tmp_path)
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+
+
+def _write_json_atomic(data, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        _keep_mode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _open_output(source):
+    """Temp file beside ``source`` with its header already written"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(source.path)),
+                                    prefix='.' + source.name, suffix='.tmp')
+    _keep_mode(source.path, tmp_path)
+    handle = os.fdopen(fd, 'w', encoding='utf-8', newline='')
+    writer = csv.writer(handle)
+    writer.writerow(source.header)
+    return handle, tmp_path, writer
+
+
+def _keep_first(drops, key, kept, source, line, row, ip_address):
+    """Keep the first row seen for ``key`` and drop later ones, naming the kept row"""
+    winner = kept.get(key)
+    if winner is None:
+        kept[key] = (source, line, row)
+        source.keep(line)
+        return
+    kept_file, kept_line, kept_row = winner
+    reason = DUPLICATE_IN_FILE if kept_file is source else DUPLICATE_ACROSS_FILES
+    kept_by = (kept_file.name, kept_line, kept_file.device_name(kept_row))
+    drops.append(source.drop(row, line, ip_address, reason, kept_by))
+
+
+def dedup_files(paths, report_path=None, presorted=False, dry_run=False):
+    """Dedup CSV ``paths`` (highest priority first) in place; returns the report dict"""
+    files = [CategoryFile(path, priority) for priority, path in enumerate(paths)]
+    drops = []
+    outputs = {}
+
+    try:
+        # Which lines survive: rows merged by address, so only the current address's winner is held
+        streams = [f.rows(presorted, drops) for f in files]
+        kept = {}
+        for packed, priority, line, row in heapq.merge(*streams):
+            source = files[priority]
+            if packed not in kept:
+                kept.clear()
+            _keep_first(drops, packed, kept, source, line, row, row[source.ip_col].strip().strip('"'))
+
+        # Malformed addresses by their exact string, in priority then file order
+        kept = {}
+        for source in files:
+            for line, ip_address, row in source.malformed:
+                _keep_first(drops, ip_address, kept, source, line, row, ip_address)
+
+        if not dry_run:
+            for priority, source in enumerate(files):
+                if source.ip_col is None:
+                    continue
+                outputs[priority] = _open_output(source)
+                source.write_kept(outputs[priority][2])
+            for handle, _, _ in outputs.values():
+                handle.flush()
+                os.fsync(handle.fileno())
+                handle.close()
+            # Every output is complete; swap them in
+            for priority in list(outputs):
+                os.replace(outputs[priority][1], files[priority].path)
+                del outputs[priority]
+    finally:
+        for handle, tmp_path, _ in outputs.values():
+            handle.close()
+            os.unlink(tmp_path)
+
+    file_priority = {f.name: f.priority for f in files}
+    drops.sort(key=lambda d: (file_priority[d['file']], d['line']))
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'dry_run': dry_run,
+        'priority': [f.name for f in files],
+        'files': {
+            f.name: {
+                'read': f.read,
+                'kept': f.kept,
+                'dropped': f.dropped,
+                'skipped': f.ip_col is None,
+            }
+            for f in files
+        },
+        'dropped': drops,
+    }
+    if report_path:
+        _write_json_atomic(report, report_path)
+    return report
+
+
+def priority_paths(data_dir, names=PRIORITY):
+    return [os.path.join(data_dir, name) for name in names if os.path.exists(os.path.join(data_dir, name))]
+
+
+def print_report(report):
+    print("=" * 60)
+    print("DEDUP SUMMARY" + (" (dry run)" if report['dry_run'] else ""))
+    print("=" * 60)
+    for name, info in report['files'].items():
+        if info['skipped']:
+            print(f"  ⚠️  {name:14}: no IP column found, left as is")
+            continue
+        print(f"  📄 {name:14}: read {info['read']:5}, kept {info['kept']:5}, dropped {info['dropped']:4}")
+    reasons = {}
+    for drop in report['dropped']:
+        reasons[drop['reason']] = reasons.get(drop['reason'], 0) + 1
+    for reason, count in sorted(reasons.items()):
+        print(f"  ❌ {reason:24}: {count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Remove duplicate IPs within and across category CSVs')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory holding the category CSVs')
+    parser.add_argument('--report', help=f'JSON report path (default: DATA_DIR/{REPORT_NAME})')
+    parser.add_argument('--presorted', action='store_true',
+                        help='CSVs are already sorted by IP; stream them instead of sorting each file')
+    parser.add_argument('--dry-run', action='store_true', help='write the report only, leave the CSVs alone')
+    args = parser.parse_args(argv)
+
+    paths = priority_paths(args.data_dir)
+    if not paths:
+        print(f"No category CSVs found in {args.data_dir}")
+        return 1
+
+    try:
+        report = dedup_files(paths, args.report or os.path.join(args.data_dir, REPORT_NAME),
+                             args.presorted, args.dry_run)
+    except ValueError as e:
+        print(f"Error: {e} (drop --presorted to sort each file in memory)")
+        return 1
+
+    print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
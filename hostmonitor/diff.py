@@ -0,0 +1,272 @@
+"""
+Diff two HostMonitor extractions into a typed changeset.
+
+Inputs are device records ({category, ip_address, name, state}) read from
+an extraction manifest, a category CSV or a directory of category CSVs.
+Records sorted by (category, IP) are compared with a single merge pass,
+so memory is bounded by the number of changes rather than the number of
+devices. Unsorted inputs are sorted first.
+
+Change types:
+    added           device only in the new export
+    removed         device only in the old export
+    renamed         same category and IP, different name
+    ip_moved        same category and name, the IP changed
+    status_flipped  same category and IP, HostMonitor state changed
+
+State comes from the manifest, or from a CSV's state/status column (the
+pipeline's own CSVs write 'unknown' there, so they never flip).
+
+Usage:
+    python -m hostmonitor.diff OLD NEW [--output changeset.json] [--category CAT]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from hostmonitor.ipindex import pack_ip
+from hostmonitor.pipeline import CATEGORY_EXPORTS
+
+CHANGE_TYPES = ['added', 'removed', 'renamed', 'ip_moved', 'status_flipped']
+
+
+def sort_key(record):
+    return record['category'], pack_ip(record['ip_address'])
+
+
+def _csv_state(row):
+    """HostMonitor state from a CSV's state or status column.
+
+    Curated CSVs such as tas.csv keep the export's state (Alive, ...) in
+    status; the pipeline writes 'unknown' there, which carries no state.
+    """
+    state = (row.get('state') or row.get('status') or '').strip()
+    return '' if state.lower() == 'unknown' else state
+
+
+def _csv_records(path, category):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            ip_address = (row.get('ip_address') or '').strip()
+            if not ip_address:
+                continue
+            yield {
+                'category': row.get('category') or category,
+                'ip_address': ip_address,
+                'name': row.get('name') or row.get('device_name') or '',
+                'state': _csv_state(row),
+            }
+
+
+def read_records(path, category=None):
+    """Yield device records from a manifest, a CSV or a directory of CSVs.
+
+    CSV rows without a category column get ``category`` (or, for the
+    pipeline's own file names, the category that file belongs to).
+    """
+    if os.path.isdir(path):
+        for _, csv_category, csv_name in sorted(CATEGORY_EXPORTS, key=lambda x: x[1]):
+            csv_path = os.path.join(path, csv_name)
+            if os.path.exists(csv_path):
+                yield from _csv_records(csv_path, category or csv_category)
+        return
+
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        for device in manifest['devices']:
+            yield {
+                'category': device.get('category') or category or '',
+                'ip_address': device['ip_address'],
+                'name': device.get('name', ''),
+                'state': device.get('state', ''),
+            }
+        return
+
+    if category is None:
+        csv_name = os.path.basename(path)
+        category = next((c for _, c, name in CATEGORY_EXPORTS if name == csv_name), '')
+    yield from _csv_records(path, category)
+
+
+def _ordered(records, label):
+    """Check the sort order and collapse duplicate keys (the last one wins)"""
+    previous_key = None
+    previous = None
+    for record in records:
+        key = sort_key(record)
+        if previous_key is not None:
+            if key < previous_key:
+                raise ValueError(f"{label} input is not sorted by (category, IP) at {record['ip_address']}")
+            if key != previous_key:
+                yield previous_key, previous
+        previous_key, previous = key, record
+    if previous_key is not None:
+        yield previous_key, previous
+
+
+def diff_sorted(old_records, new_records, detect_moves=True):
+    """Yield changes between two record streams sorted by sort_key().
+
+    Added and removed devices are held back until both streams are
+    exhausted so they can be paired into ip_moved changes.
+    """
+    old_iter = _ordered(old_records, 'old')
+    new_iter = _ordered(new_records, 'new')
+    old_item = next(old_iter, None)
+    new_item = next(new_iter, None)
+    added = []
+    removed = []
+
+    while old_item is not None or new_item is not None:
+        if new_item is None or (old_item is not None and old_item[0] < new_item[0]):
+            removed.append(old_item[1])
+            old_item = next(old_iter, None)
+            continue
+        if old_item is None or new_item[0] < old_item[0]:
+            added.append(new_item[1])
+            new_item = next(new_iter, None)
+            continue
+
+        old, new = old_item[1], new_item[1]
+        if old['name'] != new['name']:
+            yield {
+                'type': 'renamed',
+                'category': new['category'],
+                'ip_address': new['ip_address'],
+                'old_name': old['name'],
+                'name': new['name'],
+            }
+        if old['state'] and new['state'] and old['state'] != new['state']:
+            yield {
+                'type': 'status_flipped',
+                'category': new['category'],
+                'ip_address': new['ip_address'],
+                'name': new['name'],
+                'old_state': old['state'],
+                'state': new['state'],
+            }
+        old_item = next(old_iter, None)
+        new_item = next(new_iter, None)
+
+    if detect_moves:
+        # Pair removed and added devices that kept their name, in IP order
+        vacated = defaultdict(list)
+        for record in removed:
+            if record['name']:
+                vacated[(record['category'], record['name'])].append(record)
+        moved = set()
+        for record in added:
+            candidates = vacated.get((record['category'], record['name']))
+            if not candidates:
+                continue
+            old = candidates.pop(0)
+            moved.add(id(old))
+            moved.add(id(record))
+            yield {
+                'type': 'ip_moved',
+                'category': record['category'],
+                'name': record['name'],
+                'old_ip_address': old['ip_address'],
+                'ip_address': record['ip_address'],
+                'state': record['state'],
+            }
+        removed = [record for record in removed if id(record) not in moved]
+        added = [record for record in added if id(record) not in moved]
+
+    for change_type, records in (('removed', removed), ('added', added)):
+        for record in records:
+            yield {
+                'type': change_type,
+                'category': record['category'],
+                'ip_address': record['ip_address'],
+                'name': record['name'],
+                'state': record['state'],
+            }
+
+
+def diff(old_records, new_records, presorted=False, detect_moves=True):
+    """Build a changeset dict from two record iterables"""
+    if not presorted:
+        old_records = sorted(old_records, key=sort_key)
+        new_records = sorted(new_records, key=sort_key)
+
+    changes = list(diff_sorted(old_records, new_records, detect_moves))
+    changes.sort(key=lambda change: (CHANGE_TYPES.index(change['type']), sort_key(change)))
+    summary = Counter(change['type'] for change in changes)
+
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'summary': {change_type: summary.get(change_type, 0) for change_type in CHANGE_TYPES},
+        'changes': changes,
+    }
+
+
+def diff_paths(old_path, new_path, category=None, presorted=False, detect_moves=True):
+    changeset = diff(
+        read_records(old_path, category),
+        read_records(new_path, category),
+        presorted=presorted,
+        detect_moves=detect_moves,
+    )
+    changeset['old'] = old_path
+    changeset['new'] = new_path
+    return changeset
+
+
+def print_changeset(changeset, limit=20):
+    print("=" * 80)
+    print("EXTRACTION CHANGESET")
+    print("=" * 80)
+    print(f"Old: {changeset['old']}")
+    print(f"New: {changeset['new']}")
+    for change_type in CHANGE_TYPES:
+        changes = [c for c in changeset['changes'] if c['type'] == change_type]
+        print(f"\n{change_type.upper()} - {len(changes)}")
+        print("-" * 80)
+        for change in changes[:limit]:
+            if change_type == 'renamed':
+                print(f"  [{change['category']}] {change['ip_address']}: {change['old_name']} -> {change['name']}")
+            elif change_type == 'ip_moved':
+                print(f"  [{change['category']}] {change['name']}: {change['old_ip_address']} -> {change['ip_address']}")
+            elif change_type == 'status_flipped':
+                print(f"  [{change['category']}] {change['name']:<50} {change['ip_address']}: "
+                      f"{change['old_state']} -> {change['state']}")
+            else:
+                print(f"  [{change['category']}] {change['name']:<50} {change['ip_address']}")
+        if len(changes) > limit:
+            print(f"  ... and {len(changes) - limit} more")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Diff two HostMonitor extractions')
+    parser.add_argument('old', help='previous manifest, CSV or CSV directory')
+    parser.add_argument('new', help='current manifest, CSV or CSV directory')
+    parser.add_argument('--output', help='write the changeset JSON here')
+    parser.add_argument('--category', help='category for CSV rows that do not carry one')
+    parser.add_argument('--presorted', action='store_true',
+                        help='inputs are already sorted by (category, IP); stream them')
+    parser.add_argument('--no-moves', action='store_true', help='report IP moves as removed + added')
+    args = parser.parse_args(argv)
+
+    try:
+        changeset = diff_paths(args.old, args.new, args.category, args.presorted, not args.no_moves)
+    except ValueError as e:
+        print(f"Error: {e} (drop --presorted to sort in memory)")
+        return 1
+    print_changeset(changeset)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(changeset, f, indent=2, ensure_ascii=False)
+        print(f"\nChangeset saved to: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
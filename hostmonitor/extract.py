@@ -0,0 +1,305 @@
+"""
+Single-pass streaming extractor for HostMonitor HTML exports.
+
+The exports (Switch.html, Server.html, Cctv.html, Wifi.html, Tas.html) render
+every test as an ``<input type=button>`` whose value/title/onclick attributes
+carry the device name and IP address. ButtonTokenizer is fed the file in
+chunks and emits each button tag with its raw (still entity-encoded)
+attributes, so memory stays flat regardless of the export size.
+"""
+
+import codecs
+import re
+from collections import namedtuple
+from functools import partial
+
+from hostmonitor import normalize
+
+CHUNK_SIZE = 64 * 1024
+
+# Bytes read up front to decide how an export is encoded
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# HostMonitor writes single-byte Windows text when a test name is not ASCII.
+# latin-1 decodes any byte, which is what the trial-decoding scripts ended
+# up with for those files.
+FALLBACK_ENCODING = 'latin-1'
+
+# A tag that grows beyond this without closing is treated as malformed
+MAX_TAG_SIZE = 64 * 1024
+
+UI_BUTTON_IDS = frozenset({'btn1g', 'btn2b', 'btn3u', 'jsBtnOk'})
+
+Button = namedtuple('Button', ['index', 'attrs'])
+
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w-]+)', re.IGNORECASE)
+
+_INPUT_START = re.compile(r'<input\b', re.IGNORECASE)
+_INPUT_TAG = re.compile(r'''<input\b((?:[^>'"]|'[^']*'|"[^"]*")*)>''', re.IGNORECASE)
+_ATTR = re.compile(r'''([^\s=>'"/]+)(?:\s*=\s*(?:'([^']*)'|"([^"]*)"|([^\s>'"]*)))?''')
+
+IP_PATTERN = re.compile(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b')
+_SHOWINFO = re.compile(r'javascript:showInfo\((.*)\)', re.DOTALL | re.IGNORECASE)
+_SHOWINFO_ARGS = re.compile(r"(['\"])(.*?)\1\s*,\s*(['\"])(.*?)\3", re.DOTALL)
+_FIRST_ARG = re.compile(r"(['\"])(.*?)\1")
+
+
+def _parse_attrs(body):
+    """Parse the attribute section of a tag into a dict of raw values"""
+    attrs = {}
+    for match in _ATTR.finditer(body):
+        name = match.group(1).lower()
+        if name in attrs:
+            continue
+        value = match.group(2)
+        if value is None:
+            value = match.group(3)
+        if value is None:
+            value = match.group(4) or ''
+        attrs[name] = value
+    return attrs
+
+
+def tag_attrs(tag):
+    """Parse the attributes of a raw ``<input ...>`` tag"""
+    return _parse_attrs(tag[len('<input'):-1])
+
+
+def is_button(attrs):
+    return attrs.get('type', '').lower() == 'button'
+
+
+class InputTagTokenizer:
+    """Incremental tokenizer that emits the raw text of ``<input>`` tags.
+
+    Call feed() with successive chunks of the document and close() once the
+    input is exhausted. Both return the tags completed by that call. Only an
+    unfinished tag is kept between calls.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+
+    def feed(self, data):
+        self._buffer += data
+        return self._scan(final=False)
+
+    def close(self):
+        tags = self._scan(final=True)
+        self._buffer = ''
+        return tags
+
+    def _scan(self, final):
+        buffer = self._buffer
+        tags = []
+        pos = 0
+        keep = None
+
+        while True:
+            start_match = _INPUT_START.search(buffer, pos)
+            if not start_match:
+                break
+
+            start = start_match.start()
+            tag_match = _INPUT_TAG.match(buffer, start)
+            if not tag_match:
+                if not final and len(buffer) - start < MAX_TAG_SIZE:
+                    keep = start
+                    break
+                pos = start_match.end()
+                continue
+
+            pos = tag_match.end()
+            tags.append(tag_match.group(0))
+
+        if keep is None:
+            # Hold back enough characters to complete a split "<input"
+            keep = max(pos, len(buffer) - len('<input'))
+        self._buffer = buffer[keep:]
+        return tags
+
+
+class ButtonTokenizer:
+    """Incremental tokenizer that emits ``<input type=button>`` tags.
+
+    Same interface as InputTagTokenizer, but returns Button tuples with
+    the raw (still entity-encoded) attributes, numbered from 1.
+    """
+
+    def __init__(self):
+        self._tags = InputTagTokenizer()
+        self._count = 0
+
+    def feed(self, data):
+        return self._buttons(self._tags.feed(data))
+
+    def close(self):
+        return self._buttons(self._tags.close())
+
+    def _buttons(self, tags):
+        buttons = []
+        for tag in tags:
+            attrs = tag_attrs(tag)
+            if is_button(attrs):
+                self._count += 1
+                buttons.append(Button(self._count, attrs))
+        return buttons
+
+
+def detect_encoding(html_file_path, sample_size=ENCODING_SAMPLE_SIZE):
+    """Pick the encoding of an export from a sample of its first bytes.
+
+    A BOM or a <meta charset> wins; otherwise the sample is tried as UTF-8
+    and anything that does not decode falls back to FALLBACK_ENCODING.
+    """
+    with open(html_file_path, 'rb') as f:
+        sample = f.read(sample_size)
+
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    meta = _META_CHARSET.search(sample)
+    if meta:
+        try:
+            return codecs.lookup(meta.group(1).decode('ascii')).name
+        except LookupError:
+            pass
+
+    try:
+        # A multi-byte sequence may be cut at the end of the sample
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    return 'utf-8'
+
+
+def _iter_batches(tokenizer, html_file_path, encoding, chunk_size):
+    with open(html_file_path, 'r', encoding=encoding) as f:
+        for chunk in iter(partial(f.read, chunk_size), ''):
+            items = tokenizer.feed(chunk)
+            if items:
+                yield items
+    items = tokenizer.close()
+    if items:
+        yield items
+
+
+def iter_tag_batches(html_file_path, encoding='utf-8', chunk_size=CHUNK_SIZE):
+    """Yield the raw ``<input>`` tags completed by each chunk of an export file"""
+    return _iter_batches(InputTagTokenizer(), html_file_path, encoding, chunk_size)
+
+
+def iter_button_batches(html_file_path, encoding='utf-8', chunk_size=CHUNK_SIZE):
+    """Yield the buttons completed by each chunk read from an export file"""
+    return _iter_batches(ButtonTokenizer(), html_file_path, encoding, chunk_size)
+
+
+def iter_buttons(html_file_path, encoding='utf-8', chunk_size=CHUNK_SIZE):
+    """Yield every button in an export file without loading it whole"""
+    for buttons in iter_button_batches(html_file_path, encoding, chunk_size):
+        yield from buttons
+
+
+def buttons_from_string(html_content):
+    """Tokenize an export that is already in memory"""
+    tokenizer = ButtonTokenizer()
+    return tokenizer.feed(html_content) + tokenizer.close()
+
+
+def showinfo_content(button):
+    """Return the argument list of the javascript:showInfo(...) onclick handler"""
+    match = _SHOWINFO.search(button.attrs.get('onclick', ''))
+    return match.group(1) if match else ''
+
+
+def _raw_device(button):
+    """Pick the raw name and IP address of a button before any cleanup.
+
+    The IP is looked up in the title, then the value, then the showInfo()
+    arguments, and the name is taken from the same place.
+    """
+    value_attr = button.attrs.get('value', '')
+    title_attr = button.attrs.get('title', '')
+
+    for source in (title_attr, value_attr):
+        ip_match = IP_PATTERN.search(source)
+        if ip_match:
+            return source, ip_match.group(0)
+
+    onclick_content = showinfo_content(button)
+    ip_match = IP_PATTERN.search(onclick_content)
+    if not ip_match:
+        return None
+
+    name_match = _SHOWINFO_ARGS.match(onclick_content) or _FIRST_ARG.match(onclick_content)
+    if name_match:
+        return name_match.group(2).strip(), ip_match.group(0)
+    return (value_attr or title_attr).strip(), ip_match.group(0)
+
+
+def parse_devices(buttons):
+    """Derive (button, device_name, ip_address) for every button with an IP.
+
+    Names are cleaned in one batch per rule set. Names HostMonitor truncated
+    with "..." are recovered from the longer title or from the first
+    showInfo() argument.
+    """
+    found = []
+    for button in buttons:
+        raw = _raw_device(button)
+        if raw and raw[0]:
+            found.append((button, raw[1], raw[0]))
+
+    names = normalize.DEVICE_NAME.apply_all(raw_name for _, _, raw_name in found)
+
+    from_title = []
+    from_onclick = []
+    for i, name in enumerate(names):
+        if not name.endswith("..."):
+            continue
+        button = found[i][0]
+        title_attr = button.attrs.get('title', '')
+        if title_attr and len(title_attr) > len(button.attrs.get('value', '')):
+            from_title.append((i, title_attr))
+        else:
+            first_arg = _FIRST_ARG.match(showinfo_content(button))
+            if first_arg:
+                from_onclick.append((i, first_arg.group(2)))
+
+    for rules, recovered in ((normalize.TITLE_NAME, from_title), (normalize.PING_NAME, from_onclick)):
+        cleaned = rules.apply_all(text for _, text in recovered)
+        for (i, _), name in zip(recovered, cleaned):
+            names[i] = name
+
+    return [
+        (button, name, ip_address)
+        for (button, ip_address, _), name in zip(found, names)
+        if name
+    ]
+
+
+def parse_device(button):
+    """Derive (device_name, ip_address) from a single button, or None"""
+    parsed = parse_devices([button])
+    if not parsed:
+        return None
+    _, device_name, ip_address = parsed[0]
+    return device_name, ip_address
+
+
+def iter_devices(html_file_path, encoding='utf-8', chunk_size=CHUNK_SIZE):
+    """Yield a device record for every button that carries an IP address"""
+    for buttons in iter_button_batches(html_file_path, encoding, chunk_size):
+        for button, device_name, ip_address in parse_devices(buttons):
+            yield {
+                'name': device_name,
+                'ip_address': ip_address,
+                'status': button.attrs.get('class', ''),
+                'button_index': button.index,
+            }
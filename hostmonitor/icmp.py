@@ -0,0 +1,422 @@
+"""
+Asyncio ICMP echo prober: one socket, thousands of requests in flight.
+
+Every echo request of a sweep goes out on the same socket and replies are
+matched back to their host by (source address, sequence number), so a
+3,000-device sweep costs one process and roughly one timeout instead of
+3,000 ``ping`` forks run one after another.
+
+The socket is an unprivileged ICMP datagram socket where the kernel
+allows it (Linux with net.ipv4.ping_group_range covering our group,
+macOS). The kernel then owns the echo identifier and only hands us our
+own replies. Otherwise a raw socket is used, which needs root or
+CAP_NET_RAW and sees every ICMP packet on the host, so replies are also
+filtered by identifier. Destination-unreachable and time-exceeded
+messages end a probe early on raw sockets.
+
+With --count N every host gets a burst of N echoes, ``interval`` seconds
+apart and interleaved with every other host's burst. Its result then also
+carries "stats": min/avg/max/stddev RTT and packet loss, and "rtt" is the
+average.
+
+A host line may also name another probe type from hostmonitor.probes,
+e.g. "10.8.4.20 tcp 80,554" or "10.8.5.3 https /health". Those probes run
+on the same event loop under the same concurrency limit, once per sweep
+(no bursts).
+
+Usage:
+    python -m hostmonitor.icmp [--timeout S] [--concurrency N] [--attempts N --spacing S]
+                               [--count N --interval S] [HOST ...] < hosts.txt
+
+Prints {"socket": ..., "seconds": ..., "results": {ip: {"alive": bool, "rtt": ms}}}
+as JSON. Exit code 2 means no ICMP socket could be opened.
+"""
+
+import argparse
+import asyncio
+import errno
+import json
+import math
+import os
+import socket
+import struct
+import sys
+import time
+
+from hostmonitor.ipindex import pack_ip, unpack_ip
+
+ICMP_ECHO_REPLY = 0
+ICMP_UNREACHABLE = 3
+ICMP_ECHO_REQUEST = 8
+ICMP_TIME_EXCEEDED = 11
+
+DEFAULT_TIMEOUT = 1.0
+DEFAULT_CONCURRENCY = 1000
+DEFAULT_SPACING = 0.2
+DEFAULT_INTERVAL = 0.05
+PAYLOAD = b'hostmonitor-probe'.ljust(32, b'\0')
+
+_HEADER = struct.Struct('!BBHHH')
+
+# ICMP errors some kernels queue on the socket and report from recvfrom();
+# they are skipped, any other error ends the read
+_QUEUED_ERRNOS = frozenset({
+    errno.ECONNREFUSED, errno.EHOSTUNREACH, errno.ENETUNREACH,
+    errno.EHOSTDOWN, errno.ENETDOWN, errno.EMSGSIZE,
+})
+
+# Packets read per readable callback, so a flood cannot starve the event loop
+_MAX_READS = 1024
+
+
+def checksum(data):
+    """RFC 1071 ones' complement checksum"""
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def echo_request(ident, seq, payload=PAYLOAD):
+    header = _HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    return _HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum(header + payload), ident, seq) + payload
+
+
+def open_socket():
+    """Non-blocking ICMP socket; returns (socket, kind) with kind 'dgram' or 'raw'"""
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        kind = 'dgram'
+    except OSError:
+        # PermissionError without ping_group_range, or unsupported platform
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        kind = 'raw'
+    sock.setblocking(False)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    except OSError:
+        pass
+    return sock, kind
+
+
+async def _unanswered(ip_address, timeout=None):
+    return None
+
+
+def _strip_ip_header(packet):
+    return packet[(packet[0] & 0x0F) * 4:]
+
+
+class IcmpProber:
+    """Owns one ICMP socket and resolves echo replies into per-host RTTs.
+
+    Use it as an async context manager (or call open()/close()) so the
+    socket can stay open across sweeps:
+
+        async with IcmpProber(timeout=1.0) as prober:
+            rtts = await prober.probe_many(['10.8.2.11', '10.8.2.12'])
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY):
+        self.timeout = timeout
+        # Sequence numbers are 16 bits; keep fewer than that in flight
+        self.concurrency = min(concurrency, 0xFFFF)
+        self.kind = None
+        self.sent = 0
+        self.received = 0
+        self._sock = None
+        self._loop = None
+        self._ident = os.getpid() & 0xFFFF
+        self._seq = 0
+        self._pending = {}
+        # Shared by every probe type so TCP/HTTP/SNMP probes count against the same limit
+        self.slots = None
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def open(self):
+        if self._sock is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._sock, self.kind = open_socket()
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+
+    def close(self):
+        if self._sock is None:
+            return
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+    def _on_readable(self):
+        for _ in range(_MAX_READS):
+            if self._sock is None:
+                return
+            try:
+                packet, address = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                if e.errno in _QUEUED_ERRNOS:
+                    continue
+                # EBADF, ENOTSOCK and the like will not clear by reading again
+                return
+            received_at = time.perf_counter()
+            if self.kind == 'raw':
+                packet = _strip_ip_header(packet)
+            if len(packet) < _HEADER.size:
+                continue
+
+            icmp_type, _, _, ident, seq = _HEADER.unpack_from(packet)
+            if icmp_type == ICMP_ECHO_REPLY:
+                if self.kind == 'raw' and ident != self._ident:
+                    continue
+                self._resolve((address[0], seq), received_at)
+            elif icmp_type in (ICMP_UNREACHABLE, ICMP_TIME_EXCEEDED) and self.kind == 'raw':
+                # The error quotes our IP header and the first 8 bytes of our request
+                quoted = packet[_HEADER.size:]
+                if len(quoted) < 28:
+                    continue
+                destination = socket.inet_ntoa(quoted[16:20])
+                original = _HEADER.unpack_from(_strip_ip_header(quoted))
+                if original[0] == ICMP_ECHO_REQUEST and original[3] == self._ident:
+                    self._resolve((destination, original[4]), None)
+
+    def _resolve(self, key, received_at):
+        future = self._pending.pop(key, None)
+        if future is not None and not future.done():
+            self.received += received_at is not None
+            future.set_result(received_at)
+
+    async def _send(self, packet, ip_address):
+        while True:
+            try:
+                self._sock.sendto(packet, (ip_address, 0))
+                return
+            except (BlockingIOError, InterruptedError):
+                # Send buffer full: let replies drain, then retry
+                await asyncio.sleep(0.001)
+
+    async def probe(self, ip_address, timeout=None):
+        """RTT in milliseconds, or None on timeout, error or malformed address"""
+        try:
+            # Replies come from the canonical dotted quad, match on that
+            ip_address = unpack_ip(pack_ip(ip_address))
+        except ValueError:
+            return None
+
+        async with self.slots:
+            self._seq = (self._seq + 1) & 0xFFFF
+            seq = self._seq
+            key = (ip_address, seq)
+            future = self._loop.create_future()
+            self._pending[key] = future
+            try:
+                sent_at = time.perf_counter()
+                await self._send(echo_request(self._ident, seq), ip_address)
+                self.sent += 1
+                received_at = await asyncio.wait_for(future, timeout or self.timeout)
+            except (asyncio.TimeoutError, OSError):
+                return None
+            finally:
+                self._pending.pop(key, None)
+
+        if received_at is None:
+            return None
+        return round((received_at - sent_at) * 1000, 3)
+
+    def target_probe(self, target):
+        """(ip, probe coroutine function) for an IP or an (ip, probe type, argument) tuple"""
+        if isinstance(target, str):
+            return target, self.probe
+        ip_address, probe_type, argument = target
+        # Other probe types (and their plug-ins) are only loaded when a sweep asks for them
+        from hostmonitor.probes import probe_function
+        try:
+            return ip_address, probe_function(self, probe_type, argument)
+        except ValueError as e:
+            # One misconfigured device shouldn't fail the whole sweep
+            print(f"⚠️  {ip_address}: {e}", file=sys.stderr)
+            return ip_address, _unanswered
+
+    async def probe_confirm(self, ip_address, attempts, spacing=DEFAULT_SPACING, timeout=None, probe=None):
+        """First RTT out of up to ``attempts`` probes sent ``spacing`` seconds apart, or None.
+
+        Later probes are only sent while no earlier one has been answered, so
+        a host that replies costs one packet and a dead one ``attempts``.
+        ``probe`` is an ICMP echo unless another probe function is given.
+        """
+        probe = probe or self.probe
+        tasks = []
+        next_send = self._loop.time()
+        try:
+            while True:
+                if len(tasks) < attempts and self._loop.time() >= next_send:
+                    tasks.append(asyncio.ensure_future(probe(ip_address, timeout)))
+                    next_send += spacing
+                for task in tasks:
+                    if task.done() and task.result() is not None:
+                        return task.result()
+
+                running = [task for task in tasks if not task.done()]
+                if len(tasks) == attempts and not running:
+                    return None
+                wait = max(0, next_send - self._loop.time()) if len(tasks) < attempts else None
+                if running:
+                    await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    await asyncio.sleep(wait)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def probe_burst(self, ip_address, count, interval=DEFAULT_INTERVAL, timeout=None):
+        """burst_stats() of ``count`` probes sent ``interval`` seconds apart.
+
+        Probes are in flight together, so a burst takes about
+        (count - 1) * interval plus one RTT or timeout.
+        """
+        tasks = []
+        for i in range(count):
+            if i:
+                await asyncio.sleep(interval)
+            tasks.append(asyncio.ensure_future(self.probe(ip_address, timeout)))
+        return burst_stats(await asyncio.gather(*tasks))
+
+    async def probe_many(self, targets, timeout=None, attempts=1, spacing=DEFAULT_SPACING):
+        """{ip: rtt_ms or None} for every distinct target, all probed concurrently.
+
+        Targets are IPs (ICMP) or (ip, probe type, argument) tuples. With
+        ``attempts`` > 1 every target gets probe_confirm(), so a batch of
+        suspects is re-probed as one wave.
+        """
+        targets = [self.target_probe(target) for target in dict.fromkeys(targets)]
+        if attempts > 1:
+            probes = (self.probe_confirm(ip_address, attempts, spacing, timeout, probe)
+                      for ip_address, probe in targets)
+        else:
+            probes = (probe(ip_address, timeout) for ip_address, probe in targets)
+        rtts = await asyncio.gather(*probes)
+        return dict(zip((ip_address for ip_address, _ in targets), rtts))
+
+    async def burst_many(self, targets, count, interval=DEFAULT_INTERVAL, timeout=None):
+        """{ip: burst_stats} for every distinct target (a plain RTT for non-ICMP probes).
+
+        All bursts start together, so the i-th echo of every host goes out
+        before anyone's next one and a slow or lossy moment on the network
+        is spread across hosts rather than landing on one host's burst.
+        """
+        targets = [self.target_probe(target) for target in dict.fromkeys(targets)]
+        results = await asyncio.gather(*(
+            self.probe_burst(ip_address, count, interval, timeout) if probe == self.probe else probe(ip_address, timeout)
+            for ip_address, probe in targets))
+        return dict(zip((ip_address for ip_address, _ in targets), results))
+
+
+def burst_stats(rtts):
+    """min/avg/max/stddev (ms) and loss (%) of one burst; RTTs are None for lost probes"""
+    received = [rtt for rtt in rtts if rtt is not None]
+    stats = {
+        'sent': len(rtts),
+        'received': len(received),
+        'loss': round(100 * (len(rtts) - len(received)) / len(rtts), 1) if rtts else 100.0,
+        'min': None,
+        'avg': None,
+        'max': None,
+        'stddev': None,
+    }
+    if received:
+        avg = sum(received) / len(received)
+        stats.update(
+            min=min(received),
+            avg=round(avg, 3),
+            max=max(received),
+            # Population deviation, as ping's mdev
+            stddev=round(math.sqrt(sum((rtt - avg) ** 2 for rtt in received) / len(received)), 3),
+        )
+    return stats
+
+
+def parse_target(line):
+    """'IP' -> IP; 'IP TYPE [ARGUMENT]' -> (IP, TYPE, ARGUMENT or None); ICMP lines stay plain IPs"""
+    parts = line.split()
+    if len(parts) < 2 or parts[1].lower() == 'icmp':
+        return parts[0]
+    return parts[0], parts[1].lower(), parts[2] if len(parts) > 2 else None
+
+
+def sweep(ip_addresses, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY, attempts=1, spacing=DEFAULT_SPACING,
+          count=1, interval=DEFAULT_INTERVAL):
+    """Probe every address (up to ``attempts`` times, or a burst of ``count``); returns (results, socket kind)"""
+    async def run():
+        async with IcmpProber(timeout, concurrency) as prober:
+            if count > 1:
+                return await prober.burst_many(ip_addresses, count, interval), prober.kind
+            return await prober.probe_many(ip_addresses, attempts=attempts, spacing=spacing), prober.kind
+
+    return asyncio.run(run())
+
+
+def format_result(result):
+    """{alive, rtt} for an RTT, plus the stats for a burst (rtt is then its average)"""
+    if isinstance(result, dict):
+        return {'alive': result['received'] > 0, 'rtt': result['avg'], 'stats': result}
+    return {'alive': result is not None, 'rtt': result}
+
+
+def format_results(results):
+    return {ip: format_result(result) for ip, result in results.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ping many hosts at once over a single ICMP socket')
+    parser.add_argument('hosts', nargs='*',
+                        help='IPv4 addresses (default: one per line on stdin, optionally "IP TYPE ARGUMENT")')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds to wait for each reply')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='echo requests in flight at once')
+    parser.add_argument('--attempts', type=int, default=1,
+                        help='probes per host until one is answered (confirmation re-probes)')
+    parser.add_argument('--spacing', type=float, default=DEFAULT_SPACING, help='seconds between attempts')
+    parser.add_argument('--count', type=int, default=1,
+                        help='echoes per host; above 1 adds min/avg/max/stddev/loss stats')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help='seconds between the echoes of a burst')
+    args = parser.parse_args(argv)
+
+    hosts = args.hosts or [parse_target(line) for line in sys.stdin if line.strip()]
+    started = time.perf_counter()
+    try:
+        results, kind = sweep(hosts, args.timeout, max(1, args.concurrency), max(1, args.attempts), args.spacing,
+                              max(1, args.count), args.interval)
+    except PermissionError as e:
+        print(f"Error: cannot open an ICMP socket ({e}); allow ping_group_range or run with CAP_NET_RAW",
+              file=sys.stderr)
+        return 2
+
+    json.dump({
+        'socket': kind,
+        'seconds': round(time.perf_counter() - started, 3),
+        'results': format_results(results),
+    }, sys.stdout)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        # add_reader needs the selector loop
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    sys.exit(main())
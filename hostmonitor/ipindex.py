@@ -0,0 +1,159 @@
+"""
+Sorted, integer-packed IPv4 index.
+
+Addresses are stored as 32-bit integers in an ``array('I')`` with a
+parallel array of row references (whatever integer the caller uses to find
+the row again, usually its position in a list). Both arrays are sorted by
+address once, keeping insertion order among equal addresses, and every
+query is a binary search:
+
+    index = IPv4Index()
+    for row_number, row in enumerate(rows):
+        index.add(row['ip_address'], row_number)
+
+    '10.8.2.11' in index
+    index.find('10.8.2.11')        # row refs with that address
+    index.cidr('10.8.24.0/22')     # row refs inside the network
+    index.duplicates()             # (address, [refs]) for repeated addresses
+"""
+
+import socket
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+_PACKED = struct.Struct('!I')
+
+
+def pack_ip(ip_address):
+    """Dotted-quad string -> 32-bit integer; raises ValueError if malformed"""
+    if ip_address.count('.') != 3:
+        raise ValueError(f'Not an IPv4 address: {ip_address!r}')
+    try:
+        return _PACKED.unpack(socket.inet_aton(ip_address))[0]
+    except OSError:
+        raise ValueError(f'Not an IPv4 address: {ip_address!r}')
+
+
+def unpack_ip(packed):
+    return socket.inet_ntoa(_PACKED.pack(packed))
+
+
+def ip_key(ip_address):
+    """Sort key giving numeric IP order; malformed addresses sort last"""
+    try:
+        return pack_ip(ip_address)
+    except ValueError:
+        return 1 << 32
+
+
+def cidr_bounds(network):
+    """'10.8.24.0/22' -> (first, last) packed addresses, inclusive"""
+    address, _, prefix = network.partition('/')
+    prefix = int(prefix) if prefix else 32
+    if not 0 <= prefix <= 32:
+        raise ValueError(f'Bad prefix length: {network!r}')
+    mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+    first = pack_ip(address) & mask
+    return first, first | (~mask & 0xFFFFFFFF)
+
+
+class IPv4Index:
+    """Packed addresses plus parallel row references, sorted on first query"""
+
+    def __init__(self, pairs=()):
+        self.addresses = array('I')
+        self.refs = array('I')
+        self.invalid = 0
+        self._sorted = True
+        for ip_address, ref in pairs:
+            self.add(ip_address, ref)
+
+    def add(self, ip_address, ref):
+        """Index ``ref`` under ``ip_address``; returns False (and counts it) if malformed"""
+        try:
+            packed = pack_ip(ip_address)
+        except ValueError:
+            self.invalid += 1
+            return False
+        if self._sorted and self.addresses and packed < self.addresses[-1]:
+            self._sorted = False
+        self.addresses.append(packed)
+        self.refs.append(ref)
+        return True
+
+    def _sort(self):
+        if self._sorted:
+            return
+        # Address in the high word and position in the low word: one sort of
+        # plain integers, stable for equal addresses
+        keys = sorted((address << 32) | position for position, address in enumerate(self.addresses))
+        refs = self.refs
+        self.addresses = array('I', (key >> 32 for key in keys))
+        self.refs = array('I', (refs[key & 0xFFFFFFFF] for key in keys))
+        self._sorted = True
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __contains__(self, ip_address):
+        return self.count(ip_address) > 0
+
+    def _span(self, first, last):
+        self._sort()
+        return bisect_left(self.addresses, first), bisect_right(self.addresses, last)
+
+    def count(self, ip_address):
+        try:
+            packed = pack_ip(ip_address)
+        except ValueError:
+            return 0
+        start, end = self._span(packed, packed)
+        return end - start
+
+    def find(self, ip_address):
+        """Row refs indexed under one address, in insertion order"""
+        packed = pack_ip(ip_address)
+        start, end = self._span(packed, packed)
+        return self.refs[start:end].tolist()
+
+    def range(self, first_ip, last_ip):
+        """Row refs for every address between first_ip and last_ip inclusive"""
+        start, end = self._span(pack_ip(first_ip), pack_ip(last_ip))
+        return self.refs[start:end].tolist()
+
+    def cidr(self, network):
+        """Row refs for every address inside a network such as '10.8.24.0/22'"""
+        start, end = self._span(*cidr_bounds(network))
+        return self.refs[start:end].tolist()
+
+    def runs(self):
+        """Yield (packed_address, start, end) for each distinct address in order"""
+        self._sort()
+        addresses = self.addresses
+        total = len(addresses)
+        start = 0
+        while start < total:
+            end = bisect_right(addresses, addresses[start], start)
+            yield addresses[start], start, end
+            start = end
+
+    def unique_count(self):
+        return sum(1 for _ in self.runs())
+
+    def duplicates(self):
+        """Yield (ip_address, [refs]) for every address indexed more than once"""
+        for packed, start, end in self.runs():
+            if end - start > 1:
+                yield unpack_ip(packed), self.refs[start:end].tolist()
+
+    def first_refs(self):
+        """The earliest-added ref of every distinct address"""
+        return [self.refs[start] for _, start, _ in self.runs()]
+
+    def repeated_refs(self):
+        """Refs of every occurrence after the first one of its address"""
+        repeated = []
+        for _, start, end in self.runs():
+            repeated.extend(self.refs[start + 1:end])
+        return repeated
@@ -0,0 +1,212 @@
+"""
+Infer a location (building) code from device names.
+
+The rules that reorganize_mm.py used to try one by one are compiled into a
+single anchored alternation with one named group per rule. Alternatives
+are tried left to right at the start of the name, so the first rule that
+matches wins exactly as before. A rule only ever looks at the name up to
+its first '-' or '_', so results are cached by that prefix and a batch
+only runs the pattern over prefixes it has not seen, joined into one
+string and scanned once.
+
+Usage:
+    python -m hostmonitor.location FILE.csv [FILE.csv ...] [--overwrite]
+"""
+
+import argparse
+import csv
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import Counter
+
+DEFAULT_LOCATION = 'General'
+
+# (rule name, captured code, required tail) in priority order
+LOCATION_RULES = [
+    ('building_number', r'[A-Z]+\d+', ''),  # A18, D2, E16, etc.
+    ('kolej_kediaman', r'KBANDAR|KKTSN|KB|KK', ''),
+    ('masjid', r'Masjid', ''),
+    ('faculty', r'FKAAB|FPTV|FKAAS|FKEE|FKMP|FSKTM|FPTP|FK', ''),
+    ('library', r'Library|LIB', ''),
+    ('perwira', r'Perwira', ''),
+    ('hep', r'HEP', ''),
+    ('recess', r'RECESS', ''),
+    ('biodesel', r'Biodesel', ''),
+    ('tdi', r'TDI|TF', ''),
+    ('atm', r'ATM', ''),
+    ('pmu_pku', r'PMU|PKU', ''),
+    ('block_number', r'[A-Z]\d+', ''),  # Single letter + number (A5, B1, C2, etc.)
+    ('block_dash', r'[A-Z]{1,2}', '-'),  # Single/double letter followed by dash
+]
+
+FALLBACK = 'first_segment'
+DEFAULT = 'default'
+
+_SEPARATOR = '\n'
+_SEGMENT = re.compile(r'[-_]')
+
+
+def compile_rules(rules):
+    """One pattern matching every line of a newline-joined batch exactly once.
+
+    The trailing empty alternative makes lines that no rule matches produce
+    an empty match, so matches line up with input rows.
+    """
+    alternatives = [f'(?P<{name}>{code}){tail}' for name, code, tail in rules]
+    return re.compile('^(?:' + '|'.join(alternatives) + '|)', re.MULTILINE)
+
+
+def cache_key(device_name):
+    """The part of a name the rules can see: up to and including the first '-' or '_'"""
+    match = _SEGMENT.search(device_name)
+    return device_name[:match.end()] if match else device_name
+
+
+def first_segment(device_name):
+    """Fallback: the first segment before a dash or underscore, if it looks like a code"""
+    first_part = _SEGMENT.split(device_name, 1)[0]
+    if first_part and len(first_part) <= 10 and (first_part[0].isupper() or first_part.isalnum()):
+        return first_part
+    return None
+
+
+class LocationClassifier:
+    """Classify device names into location codes, one column at a time.
+
+    ``stats`` counts the rule that decided each classified name (plus
+    FALLBACK and DEFAULT), and ``cache_hits``/``cache_misses`` count how
+    many names were answered from the prefix cache.
+    """
+
+    def __init__(self, rules=LOCATION_RULES, default=DEFAULT_LOCATION):
+        self.rules = rules
+        self.default = default
+        self.pattern = compile_rules(rules)
+        self.stats = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = {}
+
+    def classify(self, device_name):
+        return self.classify_all([device_name])[0]
+
+    def classify_all(self, device_names):
+        keys = [cache_key(name) for name in device_names]
+        pending = [key for key in dict.fromkeys(keys) if key not in self._cache]
+        self._resolve(pending)
+
+        locations = []
+        for key in keys:
+            location, rule = self._cache[key]
+            self.stats[rule] += 1
+            locations.append(location)
+        self.cache_misses += len(pending)
+        self.cache_hits += len(keys) - len(pending)
+        return locations
+
+    def _resolve(self, keys):
+        if not keys:
+            return
+        joined = _SEPARATOR.join(keys)
+        if joined.count(_SEPARATOR) != len(keys) - 1:
+            # A name contains the separator itself, match it on its own
+            for key in keys:
+                self._resolve_one(key, self.pattern.match(key))
+            return
+
+        for key, match in zip(keys, self.pattern.finditer(joined)):
+            self._resolve_one(key, match)
+
+    def _resolve_one(self, key, match):
+        rule = match.lastgroup
+        if rule:
+            self._cache[key] = (match.group(rule), rule)
+            return
+        location = first_segment(key)
+        if location:
+            self._cache[key] = (location, FALLBACK)
+        else:
+            self._cache[key] = (self.default, DEFAULT)
+
+    def rule_stats(self):
+        """Hits per rule in rule order, followed by the fallback and default"""
+        names = [name for name, _, _ in self.rules] + [FALLBACK, DEFAULT]
+        return {name: self.stats.get(name, 0) for name in names}
+
+
+_default_classifier = LocationClassifier()
+
+
+def extract_location(device_name):
+    """Location code of a single device name"""
+    return _default_classifier.classify(device_name)
+
+
+def fill_locations(csv_path, classifier=None, overwrite=False):
+    """Fill the ``location`` column of a seeder CSV from its ``name`` column.
+
+    Only empty locations are filled unless ``overwrite`` is set. The file
+    is rewritten through a temp file. Returns the number of rows filled.
+    """
+    classifier = classifier or LocationClassifier()
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+
+    if 'name' not in fieldnames or 'location' not in fieldnames:
+        raise ValueError(f'{csv_path} has no name/location columns')
+
+    targets = [row for row in rows if overwrite or not row['location']]
+    for row, location in zip(targets, classifier.classify_all(row['name'] for row in targets)):
+        row['location'] = location
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(csv_path)),
+                                    prefix='.' + os.path.basename(csv_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        # mkstemp creates the file 0600; keep the CSV readable as before
+        shutil.copymode(csv_path, tmp_path)
+        os.replace(tmp_path, csv_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(targets)
+
+
+def print_rule_stats(classifier):
+    print(f"\n📐 Location rule hits:")
+    for name, hits in classifier.rule_stats().items():
+        if hits:
+            print(f"   {name:16}: {hits}")
+    total = classifier.cache_hits + classifier.cache_misses
+    if total:
+        print(f"   prefix cache    : {classifier.cache_hits}/{total} hits")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fill the location column of seeder CSVs from device names')
+    parser.add_argument('csv_files', nargs='+', help='CSV files with name and location columns')
+    parser.add_argument('--overwrite', action='store_true', help='replace locations that are already set')
+    args = parser.parse_args(argv)
+
+    classifier = LocationClassifier()
+    for csv_path in args.csv_files:
+        try:
+            filled = fill_locations(csv_path, classifier, args.overwrite)
+        except ValueError as e:
+            print(f"⚠️  {e}")
+            continue
+        print(f"📄 {csv_path}: {filled} locations filled")
+    print_rule_stats(classifier)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
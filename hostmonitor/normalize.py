@@ -0,0 +1,118 @@
+"""
+Precompiled, table-driven cleanup rules for device names and IP addresses.
+
+A rule set is an ordered list of substitution steps. Each step is compiled
+once at import time in two variants: one for a single string and one for a
+batch of strings joined with newlines, where anchors and whitespace classes
+stop at the separator. apply_all() therefore runs every step as a single
+scan over the whole batch instead of once per row.
+"""
+
+import re
+
+IP = r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}'
+IP_LOOSE = r'\d+\.\d+\.\d+\.\d+'
+
+ENTITIES = {
+    '&amp;': '&',
+    '&lt;': '<',
+    '&gt;': '>',
+}
+
+_SEPARATOR = '\n'
+_IPV4 = re.compile(IP)
+
+
+def _decode(match):
+    """Replacement that decodes table entities and drops anything else"""
+    return ENTITIES.get(match.group(0), '')
+
+
+def sub(template, repl='', flags=0):
+    """Build a substitution step.
+
+    ``{s}`` in the template stands for a whitespace class and ``{x}`` for
+    extra characters excluded from negated classes, so the same rule can be
+    compiled for single strings and for newline-joined batches.
+    """
+    single = re.compile(template.replace('{s}', r'\s').replace('{x}', ''), flags)
+    batch = re.compile(template.replace('{s}', r'[^\S\n]').replace('{x}', r'\n'), flags | re.MULTILINE)
+    return single, batch, repl
+
+
+STRIP = (None, re.compile(r'^[^\S\n]+|[^\S\n]+$', re.MULTILINE), '')
+
+
+class NormalizationRules:
+    """An ordered set of cleanup steps that can run on one string or a batch"""
+
+    def __init__(self, *steps):
+        self.steps = steps
+
+    def apply(self, text):
+        for single, batch, repl in self.steps:
+            text = text.strip() if single is None else single.sub(repl, text)
+        return text
+
+    def apply_all(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+
+        joined = _SEPARATOR.join(texts)
+        if joined.count(_SEPARATOR) != len(texts) - 1:
+            # A value contains the separator itself, fall back to per-row
+            return [self.apply(text) for text in texts]
+
+        for single, batch, repl in self.steps:
+            joined = batch.sub(repl, joined)
+        return joined.split(_SEPARATOR)
+
+
+# Device names from extract.parse_device: drop every "Ping: IP" style
+# suffix HostMonitor appends to test names and decode &amp;
+DEVICE_NAME = NormalizationRules(
+    sub(r' (?:Ping: |: Ping |Ping )?' + IP + r'|&amp;', _decode),
+    STRIP,
+)
+
+# Recovering a truncated ("...") name from the full title attribute
+TITLE_NAME = NormalizationRules(
+    sub(r'{s}*:?{s}*Ping(?::|{s})+' + IP + r'$|&amp;', _decode),
+    STRIP,
+)
+
+# Recovering a truncated name from the first showInfo() argument
+PING_NAME = NormalizationRules(
+    STRIP,
+    sub(r' (?:Ping: |: Ping |Ping )' + IP + r'|&amp;', _decode),
+    STRIP,
+)
+
+# Names written to switches_updated.csv by import_352_devices.py; only
+# the Ping suffix is case-insensitive, entities are decoded as written
+SWITCH_CSV_NAME = NormalizationRules(
+    sub(r'(?:{s}+' + IP_LOOSE + r')?(?:{s}+(?i:Ping):?{s}*)?$|&amp;|&lt;|&gt;', _decode),
+    STRIP,
+    sub(r'\.+$'),
+)
+
+# Names written to switches.json by parse_switches_ultimate.py
+SWITCH_JSON_NAME = NormalizationRules(
+    sub(r'&amp;', '&'),
+    sub(r'<[^>{x}]*>'),
+    sub(r'&[a-zA-Z]+;'),
+    sub(r'{s}+', ' '),
+    STRIP,
+)
+
+# IP addresses scraped from attributes that may still carry markup
+IP_ADDRESS = NormalizationRules(
+    sub(r'<[^>{x}]*>'),
+    STRIP,
+)
+
+
+def valid_ips(ips):
+    """Blank out anything that is not a dotted-quad address"""
+    return [ip if _IPV4.fullmatch(ip) else '' for ip in ips]
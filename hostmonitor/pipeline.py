@@ -0,0 +1,234 @@
+"""
+Extract every HostMonitor category export in parallel.
+
+Each export is streamed through hostmonitor.extract in its own worker
+process, so a full refresh takes about as long as the largest file. The
+results are written as per-category CSVs plus one combined JSON manifest,
+under storage/app/hostmonitor unless --output-dir says otherwise.
+
+Usage:
+    python -m hostmonitor.pipeline [--data-dir DIR] [--output-dir DIR] [--workers N]
+                                   [--cache FILE | --no-cache]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from hostmonitor import extract, normalize
+from hostmonitor.cache import DEFAULT_CACHE_PATH, ExtractionCache, code_version
+from hostmonitor.extract import FALLBACK_ENCODING, detect_encoding, iter_button_batches, parse_devices
+from hostmonitor.ipindex import ip_key
+
+DATA_DIR = os.path.join('database', 'seeders', 'data')
+# Kept apart from DATA_DIR so a plain run never overwrites the curated seeder CSVs
+OUTPUT_DIR = os.path.join('storage', 'app', 'hostmonitor')
+MANIFEST_NAME = 'extraction_manifest.json'
+
+# (export file, device category, output CSV)
+CATEGORY_EXPORTS = [
+    ('Switch.html', 'switches', 'switches.csv'),
+    ('Server.html', 'servers', 'server.csv'),
+    ('Cctv.html', 'cctv', 'cctv.csv'),
+    ('Wifi.html', 'wifi', 'wifi.csv'),
+    ('Tas.html', 'tas', 'tas.csv'),
+]
+
+CSV_HEADER = ['name', 'ip_address', 'category', 'status', 'location', 'brand']
+
+
+def device_records(buttons):
+    """Per-button [name, ip_address, state] records, None for buttons without an IP"""
+    parsed = {
+        button.index: [device_name, ip_address, button.attrs.get('class', '')]
+        for button, device_name, ip_address in parse_devices(buttons)
+    }
+    return [parsed.get(button.index) for button in buttons]
+
+
+def _extract(html_file, encoding):
+    buttons = 0
+    records = []
+    for batch in iter_button_batches(html_file, encoding=encoding):
+        buttons += len(batch)
+        records.extend(record for record in device_records(batch) if record)
+    return buttons, records
+
+
+def extract_export(html_file, category, cache_path=None):
+    """Worker: extract one export file and return a picklable result"""
+    started = time.perf_counter()
+    cache_stats = None
+    encoding = detect_encoding(html_file)
+
+    if cache_path:
+        version = code_version(extract.__file__, normalize.__file__, __file__)
+        with ExtractionCache(cache_path, 'devices', version) as cache:
+            indexed, cache_stats = cache.extract(html_file, device_records)
+        buttons = cache_stats['buttons']
+        records = [record for _, record in indexed]
+    else:
+        try:
+            buttons, records = _extract(html_file, encoding)
+        except UnicodeDecodeError:
+            # Non-ASCII text appeared after the sampled bytes
+            encoding = FALLBACK_ENCODING
+            buttons, records = _extract(html_file, encoding)
+
+    # Use IP as key to handle duplicates, the last button wins
+    devices = {}
+    for device_name, ip_address, state in records:
+        devices[ip_address] = (device_name, state)
+
+    return {
+        'category': category,
+        'source': html_file,
+        'encoding': encoding,
+        'buttons': buttons,
+        'devices': [
+            {'name': name, 'ip_address': ip, 'category': category, 'state': state}
+            for ip, (name, state) in devices.items()
+        ],
+        'cache': cache_stats,
+        'seconds': round(time.perf_counter() - started, 4),
+    }
+
+
+def write_category_csv(devices, output_csv_path, category):
+    """Write devices ({'name', 'ip_address'} dicts) in the seeder CSV layout"""
+    rows = [{
+        'name': device['name'],
+        'ip_address': device['ip_address'],
+        'category': category,
+        'status': 'unknown',
+        'location': '',
+        'brand': ''
+    } for device in devices]
+
+    # Sort by IP address for consistency
+    rows.sort(key=lambda x: ip_key(x['ip_address']))
+
+    with open(output_csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_HEADER)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return len(rows)
+
+
+def run_pipeline(jobs, output_dir, manifest_name=MANIFEST_NAME, max_workers=None, cache_path=None):
+    """Extract (html_file, category, csv_name) jobs concurrently.
+
+    Missing exports are reported and skipped. With a cache_path, unchanged
+    exports and button tags are served from hostmonitor.cache. Returns the
+    manifest dict.
+    """
+    started = time.perf_counter()
+    present = []
+    missing = []
+    for html_file, category, csv_name in jobs:
+        if os.path.exists(html_file):
+            present.append((html_file, category, csv_name))
+        else:
+            missing.append(html_file)
+
+    results = []
+    if present:
+        workers = max_workers or min(len(present), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(extract_export, html_file, category, cache_path)
+                for html_file, category, _ in present
+            ]
+            # Merge in job order so the outputs do not depend on scheduling
+            results = [future.result() for future in futures]
+
+    os.makedirs(output_dir, exist_ok=True)
+    categories = {}
+    devices = []
+    for (html_file, category, csv_name), result in zip(present, results):
+        output_csv = os.path.join(output_dir, csv_name)
+        count = write_category_csv(result['devices'], output_csv, category)
+        categories[category] = {
+            'source': html_file,
+            'encoding': result['encoding'],
+            'csv': output_csv,
+            'buttons': result['buttons'],
+            'devices': count,
+            'cache': result['cache'],
+            'seconds': result['seconds'],
+        }
+        devices.extend(result['devices'])
+
+    # Sorted by (category, IP) so manifests can be diffed in one pass
+    devices.sort(key=lambda x: (x['category'], ip_key(x['ip_address'])))
+
+    manifest = {
+        'generated_at': datetime.now().isoformat(),
+        'seconds': round(time.perf_counter() - started, 4),
+        'missing': missing,
+        'categories': categories,
+        'devices': devices,
+    }
+    with open(os.path.join(output_dir, manifest_name), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    return manifest
+
+
+def category_jobs(data_dir):
+    return [
+        (os.path.join(data_dir, html_name), category, csv_name)
+        for html_name, category, csv_name in CATEGORY_EXPORTS
+    ]
+
+
+def print_summary(manifest):
+    print(f"\n{'='*80}")
+    print(f"EXTRACTION SUMMARY")
+    print(f"{'='*80}")
+    for html_file in manifest['missing']:
+        print(f"  ! missing export: {html_file}")
+    for category, info in manifest['categories'].items():
+        print(f"  • {category:10} : {info['devices']:4} devices from {info['buttons']:4} buttons "
+              f"({info['encoding']}, {info['seconds']:.3f}s) -> {info['csv']}")
+        if info['cache']:
+            cache = info['cache']
+            if cache['file_hit']:
+                source = 'whole file'
+            elif cache['blocks']:
+                source = f"{cache['block_hits']}/{cache['blocks']} tags"
+            else:
+                source = 'parsed whole'
+            print(f"      cache hit ratio {cache['hit_ratio']:.1%} ({source})")
+    print(f"\nTotal devices extracted: {len(manifest['devices'])}")
+    print(f"Wall-clock time: {manifest['seconds']:.3f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract all HostMonitor category exports in parallel')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory holding the *.html exports')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR,
+                        help=f'where to write the CSVs and manifest (default: {OUTPUT_DIR})')
+    parser.add_argument('--workers', type=int, help='number of worker processes')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help='extraction cache file')
+    parser.add_argument('--no-cache', action='store_true', help='parse every export from scratch')
+    args = parser.parse_args(argv)
+
+    manifest = run_pipeline(
+        category_jobs(args.data_dir),
+        args.output_dir,
+        max_workers=args.workers,
+        cache_path=None if args.no_cache else args.cache,
+    )
+    print_summary(manifest)
+    return 0 if manifest['categories'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
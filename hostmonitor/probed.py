@@ -0,0 +1,336 @@
+"""
+Long-running probe daemon with a local socket API.
+
+Keeps one IcmpProber (and its ICMP socket) open, plus an id -> IP map of
+active devices, and serves newline-delimited JSON over a Unix socket (or
+127.0.0.1 TCP where Unix sockets are not available to asyncio, i.e.
+Windows). Each request is one line:
+
+    {"op": "probe", "timeout": 0.3, "targets": [12, "10.8.2.11", {"id": 40, "ip": "10.8.3.7"}]}
+
+Targets are device IDs (looked up in the device table, which also
+supplies each device's probe_type/probe_target), IP strings, or objects
+with "id" and/or "ip" and optionally "probe" and "target" (see
+hostmonitor.probes). "attempts" (default 1) and "spacing" re-probe each target until it
+answers, for confirming suspected outages in one wave. "count" (default 1)
+and "interval" send a burst per target instead; its lines then carry
+"stats" (min/avg/max/stddev/loss) and "rtt" is the average. Results
+stream back one line per target as replies arrive, followed by a summary
+line:
+
+    {"id": 12, "ip": "10.8.2.4", "alive": true, "rtt": 0.81}
+    {"id": null, "ip": "10.8.2.11", "alive": false, "rtt": null}
+    {"done": true, "count": 2, "alive": 1, "seconds": 0.302}
+
+Other ops: {"op": "status"} and {"op": "reload"} (re-read the device
+table). A connection may send any number of requests. A request that
+can't be served gets a single {"error": ...} line.
+
+Unknown device IDs re-read the device table at most once per
+RELOAD_INTERVAL seconds, off the event loop; IDs still missing after a
+reload are remembered and fail fast until the next one.
+
+Usage:
+    python -m hostmonitor.probed [--listen unix://storage/app/probed.sock | tcp://127.0.0.1:7071]
+                                 [--env .env] [--timeout S] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import sys
+import time
+
+from hostmonitor.apply import connect, read_env
+from hostmonitor.icmp import (DEFAULT_CONCURRENCY, DEFAULT_INTERVAL, DEFAULT_SPACING, DEFAULT_TIMEOUT, IcmpProber,
+                              format_result)
+
+DEFAULT_LISTEN = 'unix://' + os.path.join('storage', 'app', 'probed.sock')
+
+# Longest request line accepted (a few hundred thousand targets)
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+# Shortest time between device table reloads triggered by unknown IDs
+RELOAD_INTERVAL = 10.0
+
+# Probe request options: (type, default); ints are raised to at least 1,
+# floats must be finite and not negative
+PROBE_OPTIONS = {
+    'timeout': (float, None),
+    'attempts': (int, 1),
+    'spacing': (float, DEFAULT_SPACING),
+    'count': (int, 1),
+    'interval': (float, DEFAULT_INTERVAL),
+}
+
+
+def parse_listen(address):
+    """'unix://PATH' -> ('unix', PATH); 'tcp://HOST:PORT' -> ('tcp', (HOST, PORT))"""
+    scheme, _, rest = address.partition('://')
+    if scheme == 'unix' and rest:
+        return 'unix', rest
+    if scheme == 'tcp' and ':' in rest:
+        host, _, port = rest.rpartition(':')
+        return 'tcp', (host, int(port))
+    raise ValueError(f'Bad listen address: {address!r} (use unix://PATH or tcp://HOST:PORT)')
+
+
+def probe_target(ip_address, probe_type=None, argument=None):
+    """Prober target: the plain IP for ICMP, else (ip, probe type, argument)"""
+    if not ip_address or not probe_type or probe_type == 'icmp':
+        return ip_address
+    return ip_address, probe_type, argument
+
+
+def probe_options(request):
+    """Validated PROBE_OPTIONS of a probe request; ValueError names the bad field"""
+    options = {}
+    for name, (kind, default) in PROBE_OPTIONS.items():
+        value = request.get(name, default)
+        if value is None and default is None:
+            options[name] = None
+            continue
+        try:
+            if isinstance(value, bool):
+                raise TypeError
+            value = kind(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f'{name} must be a number')
+        if kind is int:
+            value = max(1, value)
+        elif not math.isfinite(value) or value < 0:
+            raise ValueError(f'{name} must be a non-negative number')
+        options[name] = value
+
+    if not isinstance(request.get('targets', []), list):
+        raise ValueError('targets must be a list')
+    return options
+
+
+def load_devices(env_path, base_dir):
+    """{device_id: probe target} for every active device"""
+    connection, _ = connect(read_env(env_path), base_dir)
+    try:
+        cursor = connection.cursor()
+        cursor.execute('SELECT id, ip_address, probe_type, probe_target FROM devices WHERE is_active = true')
+        return {int(device_id): probe_target(ip_address, probe_type, argument)
+                for device_id, ip_address, probe_type, argument in cursor.fetchall() if ip_address}
+    finally:
+        connection.close()
+
+
+class ProbeDaemon:
+    """Serves probe requests from one warm prober and device table"""
+
+    def __init__(self, prober, env_path=None, base_dir='.'):
+        self.prober = prober
+        self.env_path = env_path
+        self.base_dir = base_dir
+        self.devices = {}
+        self.loaded_at = None
+        # IDs a reload did not find, answered without another one until the next reload
+        self.missing = set()
+        self._reloading = asyncio.Lock()
+        self.started_at = time.time()
+        self.requests = 0
+
+    def reload(self):
+        if not self.env_path:
+            return 0
+        self.devices = load_devices(self.env_path, self.base_dir)
+        self.loaded_at = time.time()
+        self.missing = set()
+        return len(self.devices)
+
+    async def reload_async(self):
+        """reload() in a worker thread, so the DB query doesn't block other connections"""
+        async with self._reloading:
+            return await asyncio.get_running_loop().run_in_executor(None, self.reload)
+
+    async def resolve(self, targets):
+        """Targets -> [(device_id or None, probe target or None)].
+
+        Unknown IDs trigger a reload, at most once per RELOAD_INTERVAL; IDs
+        that reload did not find are cached as missing until the next one.
+        """
+        resolved = []
+        for target in targets:
+            if isinstance(target, dict):
+                device_id = target.get('id')
+                resolved.append((device_id, probe_target(target.get('ip'), target.get('probe'), target.get('target'))))
+            elif isinstance(target, int):
+                resolved.append((target, None))
+            else:
+                resolved.append((None, str(target)))
+
+        unknown = {device_id for device_id, target in resolved
+                   if target is None and device_id not in self.devices and device_id not in self.missing}
+        if unknown and self.env_path and (self.loaded_at is None or time.time() - self.loaded_at >= RELOAD_INTERVAL):
+            try:
+                await self.reload_async()
+                self.missing |= unknown - self.devices.keys()
+            except Exception as e:
+                # Don't retry on every request while the database is down
+                self.loaded_at = time.time()
+                print(f"⚠️  Device table reload failed: {e}", file=sys.stderr)
+        return [(device_id, target or self.devices.get(device_id)) for device_id, target in resolved]
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    await self._send(writer, {'error': 'request must be a JSON object'})
+                    continue
+                await self.serve(request, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, request, writer):
+        op = request.get('op', 'probe')
+        if op == 'status':
+            await self._send(writer, {
+                'socket': self.prober.kind,
+                'devices': len(self.devices),
+                'loaded_at': self.loaded_at,
+                'uptime': round(time.time() - self.started_at),
+                'requests': self.requests,
+                'sent': self.prober.sent,
+                'received': self.prober.received,
+            })
+        elif op == 'reload':
+            try:
+                await self._send(writer, {'devices': await self.reload_async()})
+            except Exception as e:
+                await self._send(writer, {'error': f'reload failed: {e}'})
+        elif op == 'probe':
+            await self.probe(request, writer)
+        else:
+            await self._send(writer, {'error': f'unknown op {op!r}'})
+
+    async def probe(self, request, writer):
+        self.requests += 1
+        started = time.perf_counter()
+        try:
+            options = probe_options(request)
+        except ValueError as e:
+            await self._send(writer, {'error': str(e)})
+            return
+        timeout, attempts, spacing, count, interval = (options[name] for name in PROBE_OPTIONS)
+        targets = await self.resolve(request.get('targets', []))
+
+        async def probe_one(device_id, target):
+            if not target:
+                return device_id, None, None
+            ip_address, probe = self.prober.target_probe(target)
+            if count > 1 and probe == self.prober.probe:
+                outcome = await self.prober.probe_burst(ip_address, count, interval, timeout)
+            elif attempts > 1:
+                outcome = await self.prober.probe_confirm(ip_address, attempts, spacing, timeout, probe)
+            else:
+                outcome = await probe(ip_address, timeout)
+            return device_id, ip_address, outcome
+
+        alive = 0
+        for next_result in asyncio.as_completed([probe_one(*target) for target in targets]):
+            device_id, ip_address, outcome = await next_result
+            result = {'id': device_id, 'ip': ip_address, **format_result(outcome)}
+            alive += result['alive']
+            if ip_address is None:
+                result['error'] = 'unknown device'
+            await self._send(writer, result)
+
+        await self._send(writer, {
+            'done': True,
+            'count': len(targets),
+            'alive': alive,
+            'seconds': round(time.perf_counter() - started, 3),
+        })
+
+    async def _send(self, writer, message):
+        writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        await writer.drain()
+
+
+async def serve_forever(daemon, listen):
+    kind, address = parse_listen(listen)
+    # Open the ICMP socket first so a permission error leaves no socket file behind
+    async with daemon.prober:
+        await _serve(daemon, listen, kind, address)
+
+
+async def _serve(daemon, listen, kind, address):
+    if kind == 'unix':
+        directory = os.path.dirname(os.path.abspath(address))
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(address):
+            # Left behind by a daemon that didn't shut down cleanly
+            os.unlink(address)
+        server = await asyncio.start_unix_server(daemon.handle, address, limit=MAX_REQUEST_BYTES)
+        # PHP-FPM and the queue workers usually share our group, not our user
+        os.chmod(address, 0o660)
+    else:
+        server = await asyncio.start_server(daemon.handle, *address, limit=MAX_REQUEST_BYTES)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    print(f"🛰️  Probe daemon listening on {listen} ({daemon.prober.kind} ICMP socket, "
+          f"{len(daemon.devices)} devices)", flush=True)
+    async with server:
+        await stop.wait()
+    if kind == 'unix' and os.path.exists(address):
+        os.unlink(address)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve ICMP probe requests over a local socket')
+    parser.add_argument('--listen', default=DEFAULT_LISTEN, help='unix://PATH or tcp://127.0.0.1:PORT')
+    parser.add_argument('--env', help='Laravel .env to load the device table from (enables probing by device ID)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='default seconds to wait for a reply')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='echo requests in flight at once')
+    args = parser.parse_args(argv)
+
+    base_dir = os.path.dirname(os.path.abspath(args.env)) if args.env else '.'
+    daemon = ProbeDaemon(IcmpProber(args.timeout, max(1, args.concurrency)), args.env, base_dir)
+    try:
+        parse_listen(args.listen)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    try:
+        daemon.reload()
+    except Exception as e:
+        # Still useful for IP targets; IDs retry the load on demand
+        print(f"⚠️  Could not load the device table: {e}", file=sys.stderr)
+
+    try:
+        asyncio.run(serve_forever(daemon, args.listen))
+    except PermissionError as e:
+        print(f"Error: cannot open an ICMP socket ({e}); allow ping_group_range or run with CAP_NET_RAW",
+              file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    sys.exit(main())
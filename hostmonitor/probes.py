@@ -0,0 +1,159 @@
+"""
+Non-ICMP probe types for devices that drop pings (CCTV, hardened servers).
+
+Every probe runs on the IcmpProber's event loop and takes one of its
+``slots``, so a mixed sweep keeps a single concurrency limit. A probe
+function takes (ip, timeout) and returns the RTT in milliseconds or None,
+exactly like IcmpProber.probe:
+
+    icmp                 echo request (the default)
+    tcp   [PORTS]        TCP connect to each port (default 22,80,443); up if any accepts.
+                         A full connect rather than a half-open SYN, which would need a raw TCP socket
+    http  [PATH|URL]     GET, up when the status is below 400; RTT is time to the status line
+    https [PATH|URL]     same over TLS; certificates are not verified (devices use self-signed ones)
+    snmp  [COMMUNITY]    SNMPv2c GET of sysUpTime, from the hostmonitor.snmp plug-in
+
+Plug-ins are modules that call register() when imported; PLUGINS maps a
+probe type to the module that provides it so it is only imported when a
+sweep uses that type.
+"""
+
+import asyncio
+import importlib
+import ssl
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_TCP_PORTS = (22, 80, 443)
+HTTP_OK_BELOW = 400
+
+PROBE_TYPES = {}
+PLUGINS = {'snmp': 'hostmonitor.snmp'}
+
+
+def register(name):
+    """Decorator for a factory(prober, argument) returning an async probe(ip, timeout)"""
+    def decorator(factory):
+        PROBE_TYPES[name] = factory
+        return factory
+    return decorator
+
+
+def probe_function(prober, probe_type, argument=None):
+    probe_type = (probe_type or 'icmp').lower()
+    if probe_type not in PROBE_TYPES and probe_type in PLUGINS:
+        importlib.import_module(PLUGINS[probe_type])
+    if probe_type not in PROBE_TYPES:
+        raise ValueError(f'unknown probe type {probe_type!r}')
+    return PROBE_TYPES[probe_type](prober, argument)
+
+
+def parse_ports(argument):
+    if not argument:
+        return DEFAULT_TCP_PORTS
+    try:
+        ports = tuple(int(port) for port in str(argument).replace(' ', '').split(',') if port)
+    except ValueError:
+        raise ValueError(f'bad TCP port list {argument!r}')
+    if not ports or not all(0 < port < 65536 for port in ports):
+        raise ValueError(f'bad TCP port list {argument!r}')
+    return ports
+
+
+async def _close(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (OSError, ssl.SSLError):
+        pass
+
+
+async def connect_time(ip_address, port, timeout):
+    """Milliseconds for a TCP handshake, or None if refused or timed out"""
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip_address, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    rtt = round((time.perf_counter() - started) * 1000, 3)
+    await _close(writer)
+    return rtt
+
+
+@register('icmp')
+def icmp_probe(prober, argument):
+    return prober.probe
+
+
+@register('tcp')
+def tcp_probe(prober, argument):
+    ports = parse_ports(argument)
+
+    async def probe(ip_address, timeout=None):
+        async with prober.slots:
+            rtts = await asyncio.gather(*(connect_time(ip_address, port, timeout or prober.timeout)
+                                          for port in ports))
+        answered = [rtt for rtt in rtts if rtt is not None]
+        return min(answered) if answered else None
+
+    return probe
+
+
+def _http_probe(prober, argument, tls):
+    # A path ("/health") is requested from the device's IP; a full URL may also set the port and Host
+    url = urlsplit(argument) if argument and '://' in argument else None
+    if url is not None:
+        path = (url.path or '/') + ('?' + url.query if url.query else '')
+        port = url.port or (443 if tls else 80)
+        hostname = url.hostname
+    else:
+        path = argument or '/'
+        port = 443 if tls else 80
+        hostname = None
+    context = None
+    if tls:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+    async def probe(ip_address, timeout=None):
+        host = hostname or ip_address
+        async with prober.slots:
+            started = time.perf_counter()
+            try:
+                return await asyncio.wait_for(
+                    _get_status(ip_address, port, host, path, context, started), timeout or prober.timeout)
+            except (OSError, ssl.SSLError, asyncio.TimeoutError, ValueError):
+                return None
+
+    return probe
+
+
+async def _get_status(ip_address, port, host, path, context, started):
+    reader, writer = await asyncio.open_connection(
+        ip_address, port, ssl=context, server_hostname=host if context else None)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: hostmonitor-probe\r\n'
+                     f'Connection: close\r\n\r\n'.encode('latin-1'))
+        await writer.drain()
+        status_line = await reader.readline()
+    finally:
+        await _close(writer)
+
+    # "HTTP/1.1 200 OK"
+    parts = status_line.split()
+    if len(parts) < 2 or not parts[0].startswith(b'HTTP/'):
+        return None
+    if int(parts[1]) >= HTTP_OK_BELOW:
+        return None
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+@register('http')
+def http_probe(prober, argument):
+    return _http_probe(prober, argument, tls=False)
+
+
+@register('https')
+def https_probe(prober, argument):
+    return _http_probe(prober, argument, tls=True)
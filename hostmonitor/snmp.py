@@ -0,0 +1,141 @@
+"""
+SNMP probe plug-in: SNMPv2c GET of sysUpTime.0 over UDP/161.
+
+Imported by hostmonitor.probes only when a sweep has a device with
+probe_type "snmp"; the argument is the community (default "public").
+The device is up when it answers with a sysUpTime value. Requests are
+encoded by hand (a single GET needs a few lines of BER), so there is no
+dependency on an SNMP library.
+"""
+
+import asyncio
+import os
+import time
+
+from hostmonitor.probes import register
+
+SNMP_PORT = 161
+DEFAULT_COMMUNITY = 'public'
+SYS_UPTIME = '1.3.6.1.2.1.1.3.0'
+
+_SEQUENCE = 0x30
+_INTEGER = 0x02
+_OCTET_STRING = 0x04
+_NULL = 0x05
+_OID = 0x06
+_TIMETICKS = 0x43
+_GET_REQUEST = 0xA0
+_RESPONSE = 0xA2
+
+
+def _tlv(tag, value):
+    length = len(value)
+    if length < 0x80:
+        return bytes([tag, length]) + value
+    encoded = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([tag, 0x80 | len(encoded)]) + encoded + value
+
+
+def _integer(value):
+    return _tlv(_INTEGER, value.to_bytes(max(1, (value.bit_length() + 8) // 8), 'big', signed=True))
+
+
+def _oid(dotted):
+    first, second, *rest = (int(part) for part in dotted.split('.'))
+    encoded = bytearray([first * 40 + second])
+    for part in rest:
+        chunk = [part & 0x7F]
+        part >>= 7
+        while part:
+            chunk.append(0x80 | (part & 0x7F))
+            part >>= 7
+        encoded.extend(reversed(chunk))
+    return _tlv(_OID, bytes(encoded))
+
+
+def get_request(community, request_id, oid=SYS_UPTIME):
+    varbind = _tlv(_SEQUENCE, _oid(oid) + _tlv(_NULL, b''))
+    pdu = _tlv(_GET_REQUEST, _integer(request_id) + _integer(0) + _integer(0) + _tlv(_SEQUENCE, varbind))
+    return _tlv(_SEQUENCE, _integer(1) + _tlv(_OCTET_STRING, community.encode('utf-8')) + pdu)
+
+
+def _decode(data):
+    """Flatten BER into [(tag, value bytes)], descending into constructed types (sequences, PDUs)"""
+    items = []
+    offset = 0
+    while offset + 2 <= len(data):
+        tag, length = data[offset], data[offset + 1]
+        offset += 2
+        if length & 0x80:
+            size = length & 0x7F
+            length = int.from_bytes(data[offset:offset + size], 'big')
+            offset += size
+        value = data[offset:offset + length]
+        offset += length
+        if tag & 0x20:
+            items.append((tag, b''))
+            items.extend(_decode(value))
+        else:
+            items.append((tag, value))
+    return items
+
+
+def parse_response(data, request_id):
+    """sysUpTime in hundredths of a second from a GetResponse to ``request_id``, or None"""
+    items = _decode(data)
+    tags = [tag for tag, _ in items]
+    if _RESPONSE not in tags:
+        return None
+    # GetResponse-PDU: request-id, error-status, error-index, then the varbinds
+    pdu = tags.index(_RESPONSE)
+    fields = [value for tag, value in items[pdu + 1:] if tag == _INTEGER]
+    if len(fields) < 2 or int.from_bytes(fields[0], 'big', signed=True) != request_id or any(fields[1]):
+        return None
+    for tag, value in items[pdu + 1:]:
+        if tag == _TIMETICKS:
+            return int.from_bytes(value, 'big')
+    return None
+
+
+class _Reply(asyncio.DatagramProtocol):
+    def __init__(self, future):
+        self.future = future
+
+    def datagram_received(self, data, address):
+        if not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc):
+        # ICMP port unreachable: no agent listening
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+@register('snmp')
+def snmp_probe(prober, argument):
+    community = argument or DEFAULT_COMMUNITY
+
+    async def probe(ip_address, timeout=None):
+        loop = asyncio.get_running_loop()
+        request_id = int.from_bytes(os.urandom(3), 'big')
+        async with prober.slots:
+            future = loop.create_future()
+            try:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _Reply(future), remote_addr=(ip_address, SNMP_PORT))
+            except OSError:
+                return None
+            try:
+                started = time.perf_counter()
+                transport.sendto(get_request(community, request_id))
+                data = await asyncio.wait_for(future, timeout or prober.timeout)
+            except (asyncio.TimeoutError, OSError):
+                return None
+            finally:
+                transport.close()
+
+        if data is None or parse_response(data, request_id) is None:
+            return None
+        return round((time.perf_counter() - started) * 1000, 3)
+
+    return probe
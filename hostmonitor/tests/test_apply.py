@@ -0,0 +1,161 @@
+"""
+Apply changesets to an in-memory SQLite ``devices`` table.
+
+Run with:  python -m unittest discover -s hostmonitor/tests -t .
+"""
+
+import sqlite3
+import unittest
+
+from hostmonitor.apply import SQLITE, apply_changeset, device_status
+
+# The columns of the Laravel devices table the applier reads or writes
+DEVICES_TABLE = """
+CREATE TABLE devices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    branch_id INTEGER NOT NULL,
+    name VARCHAR NOT NULL,
+    ip_address VARCHAR NOT NULL UNIQUE,
+    barcode VARCHAR UNIQUE,
+    category VARCHAR NOT NULL,
+    status VARCHAR NOT NULL DEFAULT 'offline',
+    previous_status VARCHAR,
+    last_status_change DATETIME,
+    is_active BOOLEAN NOT NULL DEFAULT 1,
+    online_since DATETIME,
+    offline_since DATETIME,
+    created_at DATETIME,
+    updated_at DATETIME
+)
+"""
+
+SEEDED = '2025-01-01 00:00:00'
+
+
+def changeset(*changes):
+    summary = {}
+    for change in changes:
+        summary[change['type']] = summary.get(change['type'], 0) + 1
+    return {'summary': summary, 'changes': list(changes)}
+
+
+class ApplyChangesetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = sqlite3.connect(':memory:')
+        self.db.row_factory = sqlite3.Row
+        self.db.execute(DEVICES_TABLE)
+        self.seed('Library', '10.0.0.1', 'HM-10.0.0.1', 'online')
+        self.seed('Core', '10.0.0.2', 'SW-002', 'online')
+        self.seed('Lab', '10.0.0.3', 'HM-10.0.0.3', 'offline')
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def seed(self, name, ip_address, barcode, status):
+        self.db.execute(
+            'INSERT INTO devices (branch_id, name, ip_address, barcode, category, status, online_since, offline_since) '
+            'VALUES (1, ?, ?, ?, ?, ?, ?, ?)',
+            [name, ip_address, barcode, 'switches', status,
+             SEEDED if status == 'online' else None, SEEDED if status != 'online' else None],
+        )
+
+    def device(self, name):
+        return self.db.execute('SELECT * FROM devices WHERE name = ?', [name]).fetchone()
+
+    def apply(self, *changes):
+        return apply_changeset(changeset(*changes), self.db, SQLITE)
+
+    def test_moved_device_takes_its_barcode_and_frees_the_old_address(self):
+        self.apply(
+            {'type': 'ip_moved', 'category': 'switches', 'name': 'Library',
+             'old_ip_address': '10.0.0.1', 'ip_address': '10.0.0.9'},
+            {'type': 'added', 'category': 'switches', 'name': 'Kiosk', 'ip_address': '10.0.0.1', 'state': 'Alive'},
+        )
+
+        moved = self.device('Library')
+        self.assertEqual(moved['ip_address'], '10.0.0.9')
+        self.assertEqual(moved['barcode'], 'HM-10.0.0.9')
+        self.assertEqual(moved['online_since'], SEEDED)
+
+        added = self.device('Kiosk')
+        self.assertEqual(added['ip_address'], '10.0.0.1')
+        self.assertEqual(added['barcode'], 'HM-10.0.0.1')
+        self.assertEqual(added['status'], 'online')
+
+    def test_re_adding_a_moved_address_in_a_later_changeset(self):
+        self.apply({'type': 'ip_moved', 'category': 'switches', 'name': 'Library',
+                    'old_ip_address': '10.0.0.1', 'ip_address': '10.0.0.9'})
+        self.apply({'type': 'added', 'category': 'switches', 'name': 'Kiosk', 'ip_address': '10.0.0.1', 'state': 'Bad'})
+
+        added = self.device('Kiosk')
+        self.assertEqual(added['barcode'], 'HM-10.0.0.1')
+        self.assertEqual(added['status'], 'offline')
+        self.assertIsNotNone(added['offline_since'])
+
+    def test_custom_barcode_is_kept_on_move(self):
+        self.apply({'type': 'ip_moved', 'category': 'switches', 'name': 'Core',
+                    'old_ip_address': '10.0.0.2', 'ip_address': '10.0.0.20'})
+
+        moved = self.device('Core')
+        self.assertEqual(moved['ip_address'], '10.0.0.20')
+        self.assertEqual(moved['barcode'], 'SW-002')
+
+    def test_deactivate_keeps_the_row_and_re_add_reactivates_it(self):
+        result = self.apply({'type': 'removed', 'category': 'switches', 'name': 'Lab', 'ip_address': '10.0.0.3'})
+        self.assertEqual(result['rows'], {'removed': 1})
+        self.assertEqual(self.device('Lab')['is_active'], 0)
+
+        self.apply({'type': 'added', 'category': 'switches', 'name': 'Lab 2', 'ip_address': '10.0.0.3', 'state': 'Alive'})
+        readded = self.db.execute("SELECT * FROM devices WHERE ip_address = '10.0.0.3'").fetchall()
+        self.assertEqual(len(readded), 1)
+        self.assertEqual(readded[0]['name'], 'Lab 2')
+        self.assertEqual(readded[0]['is_active'], 1)
+        self.assertEqual(readded[0]['barcode'], 'HM-10.0.0.3')
+
+    def test_status_flips(self):
+        self.apply(
+            {'type': 'status_flipped', 'category': 'switches', 'name': 'Library', 'ip_address': '10.0.0.1',
+             'old_state': 'Alive', 'state': 'NoAnswer'},
+            {'type': 'status_flipped', 'category': 'switches', 'name': 'Lab', 'ip_address': '10.0.0.3',
+             'old_state': 'NoAnswer', 'state': 'ACK'},
+            {'type': 'status_flipped', 'category': 'switches', 'name': 'Core', 'ip_address': '10.0.0.2',
+             'old_state': 'Alive', 'state': 'WaitForMaster'},
+        )
+
+        down = self.device('Library')
+        self.assertEqual((down['status'], down['previous_status']), ('offline', 'online'))
+        self.assertIsNone(down['online_since'])
+        self.assertIsNotNone(down['offline_since'])
+
+        # Acknowledging an outage keeps when it started
+        acked = self.device('Lab')
+        self.assertEqual(acked['status'], 'offline_ack')
+        self.assertEqual(acked['offline_since'], SEEDED)
+
+        # WaitForMaster says nothing about reachability
+        waiting = self.device('Core')
+        self.assertEqual(waiting['status'], 'unknown')
+        self.assertEqual(waiting['online_since'], SEEDED)
+
+    def test_failed_statement_rolls_back_the_whole_changeset(self):
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.apply(
+                {'type': 'renamed', 'category': 'switches', 'name': 'Renamed', 'ip_address': '10.0.0.1'},
+                # Moves onto an address that is taken
+                {'type': 'ip_moved', 'category': 'switches', 'name': 'Core',
+                 'old_ip_address': '10.0.0.2', 'ip_address': '10.0.0.3'},
+            )
+        self.assertIsNotNone(self.device('Library'))
+
+    def test_device_status(self):
+        self.assertEqual(device_status('Alive'), 'online')
+        self.assertEqual(device_status('NoAnswer'), 'offline')
+        self.assertEqual(device_status('ACK'), 'offline_ack')
+        self.assertEqual(device_status('Unknown'), 'unknown')
+        self.assertEqual(device_status(''), 'unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Dedup category CSVs in a temporary data directory.
+
+Run with:  python -m unittest discover -s hostmonitor/tests -t .
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+
+from hostmonitor.dedup import dedup_files
+
+
+class DedupFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.server = self.write('server.csv', [
+            ['Core', '10.0.0.20'],
+            ['Mail', '10.0.0.5'],
+        ])
+        self.tas = self.write('tas.csv', [
+            ['Zeta', '10.0.0.9'],
+            ['Alpha', '10.0.0.20'],
+            ['Gate', 'gate-01'],
+            ['Beta', '10.0.0.1'],
+            ['Gate copy', 'gate-01'],
+            ['Blank', ''],
+            ['Zeta copy', '10.0.0.9'],
+            ['Mid', '10.0.0.10'],
+        ])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, rows):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'ip_address'])
+            writer.writerows(rows)
+        return path
+
+    def names(self, path):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return [row[0] for row in list(csv.reader(f))[1:]]
+
+    def test_kept_rows_stay_in_file_order(self):
+        dedup_files([self.server, self.tas])
+
+        self.assertEqual(self.names(self.server), ['Core', 'Mail'])
+        # Not IP order: the survivors keep the lines they had
+        self.assertEqual(self.names(self.tas), ['Zeta', 'Gate', 'Beta', 'Mid'])
+
+    def test_priority_then_first_line_wins(self):
+        report = dedup_files([self.server, self.tas])
+
+        dropped = {(d['file'], d['name']): d for d in report['dropped']}
+        self.assertEqual(set(dropped), {
+            ('tas.csv', 'Alpha'), ('tas.csv', 'Zeta copy'), ('tas.csv', 'Gate copy'), ('tas.csv', 'Blank'),
+        })
+        across = dropped[('tas.csv', 'Alpha')]
+        self.assertEqual(across['reason'], 'duplicate_across_files')
+        self.assertEqual((across['kept_file'], across['kept_line'], across['kept_name']), ('server.csv', 2, 'Core'))
+        within = dropped[('tas.csv', 'Zeta copy')]
+        self.assertEqual(within['reason'], 'duplicate_in_file')
+        self.assertEqual((within['kept_file'], within['kept_line']), ('tas.csv', 2))
+        self.assertEqual(dropped[('tas.csv', 'Gate copy')]['reason'], 'duplicate_in_file')
+        self.assertEqual(dropped[('tas.csv', 'Blank')]['reason'], 'missing_ip')
+        self.assertEqual(report['files']['tas.csv'], {'read': 8, 'kept': 4, 'dropped': 4, 'skipped': False})
+
+    def test_lower_priority_file_loses_even_when_listed_first_in_the_file(self):
+        switches = self.write('switches.csv', [['Edge', '10.0.0.9']])
+
+        dedup_files([self.server, switches, self.tas])
+
+        self.assertEqual(self.names(switches), ['Edge'])
+        self.assertEqual(self.names(self.tas), ['Gate', 'Beta', 'Mid'])
+
+    def test_dry_run_leaves_the_files_alone(self):
+        with open(self.tas, 'rb') as f:
+            before = f.read()
+
+        report = dedup_files([self.server, self.tas], dry_run=True)
+
+        with open(self.tas, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(len(report['dropped']), 4)
+
+    def test_presorted_input_must_be_in_ip_order(self):
+        with self.assertRaises(ValueError):
+            dedup_files([self.tas], presorted=True)
+        self.assertEqual(len(self.names(self.tas)), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Classify changes between two extractions.
+
+Run with:  python -m unittest discover -s hostmonitor/tests -t .
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+
+from hostmonitor.diff import diff, diff_paths
+
+
+def record(ip_address, name, state='', category='switches'):
+    return {'category': category, 'ip_address': ip_address, 'name': name, 'state': state}
+
+
+def changes_of(changeset, change_type):
+    return [change for change in changeset['changes'] if change['type'] == change_type]
+
+
+class DiffTest(unittest.TestCase):
+
+    def test_classifies_each_change_type(self):
+        old = [
+            record('10.0.0.1', 'Library', 'Alive'),
+            record('10.0.0.2', 'Core'),
+            record('10.0.0.3', 'Lab'),
+            record('10.0.0.4', 'Gate', 'Alive'),
+        ]
+        new = [
+            record('10.0.0.1', 'Library', 'NoAnswer'),
+            record('10.0.0.2', 'Core Switch'),
+            record('10.0.0.9', 'Lab'),
+            record('10.0.0.5', 'Hall'),
+        ]
+
+        changeset = diff(old, new)
+
+        self.assertEqual(changeset['summary'], {
+            'added': 1, 'removed': 1, 'renamed': 1, 'ip_moved': 1, 'status_flipped': 1,
+        })
+        self.assertEqual(changes_of(changeset, 'added')[0]['ip_address'], '10.0.0.5')
+        self.assertEqual(changes_of(changeset, 'removed')[0]['ip_address'], '10.0.0.4')
+        renamed = changes_of(changeset, 'renamed')[0]
+        self.assertEqual((renamed['old_name'], renamed['name']), ('Core', 'Core Switch'))
+        moved = changes_of(changeset, 'ip_moved')[0]
+        self.assertEqual((moved['name'], moved['old_ip_address'], moved['ip_address']), ('Lab', '10.0.0.3', '10.0.0.9'))
+        flipped = changes_of(changeset, 'status_flipped')[0]
+        self.assertEqual((flipped['old_state'], flipped['state']), ('Alive', 'NoAnswer'))
+
+    def test_moves_stay_within_a_category(self):
+        old = [record('10.0.0.3', 'Lab', category='switches')]
+        new = [record('10.0.0.9', 'Lab', category='wifi')]
+
+        changeset = diff(old, new)
+
+        self.assertEqual(changeset['summary']['ip_moved'], 0)
+        self.assertEqual(changeset['summary']['added'], 1)
+        self.assertEqual(changeset['summary']['removed'], 1)
+
+    def test_no_moves_reports_removed_and_added(self):
+        changeset = diff([record('10.0.0.3', 'Lab')], [record('10.0.0.9', 'Lab')], detect_moves=False)
+
+        self.assertEqual(changeset['summary']['ip_moved'], 0)
+        self.assertEqual([c['type'] for c in changeset['changes']], ['added', 'removed'])
+
+    def test_missing_state_never_flips(self):
+        changeset = diff([record('10.0.0.1', 'Library', 'Alive')], [record('10.0.0.1', 'Library', '')])
+
+        self.assertEqual(changeset['changes'], [])
+
+    def test_duplicate_keys_keep_the_last_record(self):
+        old = [record('10.0.0.1', 'Library')]
+        new = [record('10.0.0.1', 'Old Name'), record('10.0.0.1', 'Library')]
+
+        self.assertEqual(diff(old, new)['changes'], [])
+
+    def test_presorted_input_must_be_sorted(self):
+        unsorted = [record('10.0.0.2', 'B'), record('10.0.0.1', 'A')]
+
+        with self.assertRaises(ValueError):
+            diff([], unsorted, presorted=True)
+        self.assertEqual(diff([], unsorted)['summary']['added'], 2)
+
+    def test_pipeline_csv_unknown_status_carries_no_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for label, status in (('old', 'Alive'), ('new', 'unknown')):
+                path = os.path.join(directory, f'{label}.csv')
+                with open(path, 'w', encoding='utf-8', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['name', 'ip_address', 'status'])
+                    writer.writerow(['Library', '10.0.0.1', status])
+                paths.append(path)
+
+            changeset = diff_paths(*paths, category='switches')
+
+        self.assertEqual(changeset['changes'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
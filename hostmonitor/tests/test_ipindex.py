@@ -0,0 +1,88 @@
+"""
+Query the packed IPv4 index.
+
+Run with:  python -m unittest discover -s hostmonitor/tests -t .
+"""
+
+import unittest
+
+from hostmonitor.ipindex import IPv4Index, cidr_bounds, ip_key, pack_ip, unpack_ip
+
+ROWS = [
+    '10.8.24.10',
+    '10.8.2.11',
+    '10.8.27.255',
+    '10.8.24.10',
+    'not-an-ip',
+    '10.8.28.0',
+    '10.8.2.11',
+    '10.8.24.10',
+]
+
+
+class IPv4IndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = IPv4Index((ip_address, ref) for ref, ip_address in enumerate(ROWS))
+
+    def test_malformed_addresses_are_counted_not_indexed(self):
+        self.assertEqual(len(self.index), 7)
+        self.assertEqual(self.index.invalid, 1)
+        self.assertFalse(self.index.add('10.8.2', 99))
+        self.assertEqual(self.index.invalid, 2)
+
+    def test_membership_and_find(self):
+        self.assertIn('10.8.2.11', self.index)
+        self.assertNotIn('10.8.2.12', self.index)
+        self.assertNotIn('not-an-ip', self.index)
+        self.assertEqual(self.index.count('10.8.24.10'), 3)
+        # Refs come back in insertion order among equal addresses
+        self.assertEqual(self.index.find('10.8.24.10'), [0, 3, 7])
+        self.assertEqual(self.index.find('10.9.0.1'), [])
+
+    def test_duplicates(self):
+        self.assertEqual(list(self.index.duplicates()), [
+            ('10.8.2.11', [1, 6]),
+            ('10.8.24.10', [0, 3, 7]),
+        ])
+        self.assertEqual(self.index.unique_count(), 4)
+        self.assertEqual(self.index.first_refs(), [1, 0, 2, 5])
+        self.assertEqual(sorted(self.index.repeated_refs()), [3, 6, 7])
+
+    def test_cidr_and_range(self):
+        # /22 covers 10.8.24.0 - 10.8.27.255, both ends inclusive
+        self.assertEqual(self.index.cidr('10.8.24.0/22'), [0, 3, 7, 2])
+        self.assertEqual(self.index.cidr('10.8.26.77/22'), [0, 3, 7, 2])
+        self.assertEqual(self.index.cidr('10.8.28.0'), [5])
+        self.assertEqual(self.index.cidr('0.0.0.0/0'), self.index.refs.tolist())
+        self.assertEqual(self.index.range('10.8.2.11', '10.8.24.10'), [1, 6, 0, 3, 7])
+
+    def test_adding_after_a_query_resorts(self):
+        self.assertEqual(self.index.find('10.8.2.11'), [1, 6])
+        self.index.add('10.8.2.11', 8)
+        self.index.add('10.0.0.1', 9)
+        self.assertEqual(self.index.find('10.8.2.11'), [1, 6, 8])
+        self.assertEqual(self.index.first_refs()[0], 9)
+
+
+class PackingTest(unittest.TestCase):
+
+    def test_round_trip_and_numeric_order(self):
+        self.assertEqual(unpack_ip(pack_ip('192.168.1.20')), '192.168.1.20')
+        self.assertLess(ip_key('10.0.0.9'), ip_key('10.0.0.10'))
+        self.assertGreater(ip_key('bogus'), ip_key('255.255.255.255'))
+
+    def test_rejects_malformed(self):
+        for ip_address in ('10.0.0', '10.0.0.256', '', 'a.b.c.d'):
+            with self.assertRaises(ValueError):
+                pack_ip(ip_address)
+        with self.assertRaises(ValueError):
+            cidr_bounds('10.0.0.0/33')
+
+    def test_cidr_bounds(self):
+        self.assertEqual(cidr_bounds('10.8.24.0/22'), (pack_ip('10.8.24.0'), pack_ip('10.8.27.255')))
+        self.assertEqual(cidr_bounds('10.8.24.5'), (pack_ip('10.8.24.5'), pack_ip('10.8.24.5')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Classify device names into location codes.
+
+Run with:  python -m unittest discover -s hostmonitor/tests -t .
+"""
+
+import csv
+import os
+import re
+import stat
+import tempfile
+import unittest
+
+from hostmonitor.location import (
+    DEFAULT, DEFAULT_LOCATION, FALLBACK, LOCATION_RULES, LocationClassifier, first_segment, fill_locations,
+)
+
+NAMES = [
+    'A18-SW01', 'KK12-SW', 'LIB2-AP', 'KBANDAR-1', 'KB-AP', 'KKTSN_AP2', 'FKEE-Lab', 'FK-AP',
+    'Library_AP', 'Masjid-AP', 'TFX-1', 'ATMOS-1', 'PKU-CCTV', 'AB-CCTV', 'AB', 'switch01',
+    'server room 1', 'A5', 'Perwira\nX', '', '-AP',
+]
+
+
+def rule_by_rule(device_name):
+    """The rules tried one at a time, as reorganize_mm.py did"""
+    for _, code, tail in LOCATION_RULES:
+        match = re.match(f'({code}){tail}', device_name)
+        if match:
+            return match.group(1)
+    return first_segment(device_name) or DEFAULT_LOCATION
+
+
+class LocationClassifierTest(unittest.TestCase):
+
+    def test_rule_precedence(self):
+        classifier = LocationClassifier()
+        cases = {
+            'A18-SW01': ('A18', 'building_number'),
+            # Letters and digits beat the named codes they start with
+            'KK12-SW': ('KK12', 'building_number'),
+            'LIB2-AP': ('LIB2', 'building_number'),
+            # The longer alternative of a rule is listed, and wins, first
+            'KBANDAR-1': ('KBANDAR', 'kolej_kediaman'),
+            'KB-AP': ('KB', 'kolej_kediaman'),
+            'FKEE-Lab': ('FKEE', 'faculty'),
+            'FK-AP': ('FK', 'faculty'),
+            # Codes are prefixes, not whole segments
+            'TFX-1': ('TF', 'tdi'),
+            'ATMOS-1': ('ATM', 'atm'),
+            'AB-CCTV': ('AB', 'block_dash'),
+            'AB': ('AB', FALLBACK),
+            'switch01': ('switch01', FALLBACK),
+            'server room 1': (DEFAULT_LOCATION, DEFAULT),
+        }
+        for name, (location, rule) in cases.items():
+            with self.subTest(name=name):
+                classifier.stats.clear()
+                self.assertEqual(classifier.classify(name), location)
+                self.assertEqual(dict(classifier.stats), {rule: 1})
+
+    def test_batch_matches_rules_tried_one_by_one(self):
+        classifier = LocationClassifier()
+
+        self.assertEqual(classifier.classify_all(NAMES), [rule_by_rule(name) for name in NAMES])
+
+    def test_names_sharing_a_prefix_hit_the_cache(self):
+        classifier = LocationClassifier()
+
+        classifier.classify_all(['A18-SW01', 'A18-SW02', 'A18_AP', 'Masjid-AP'])
+
+        self.assertEqual((classifier.cache_misses, classifier.cache_hits), (3, 1))
+        self.assertEqual(classifier.rule_stats()['building_number'], 3)
+
+
+class FillLocationsTest(unittest.TestCase):
+
+    def test_fills_empty_locations_and_keeps_the_file_mode(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'switches.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['location', 'name', 'ip_address'])
+                writer.writerows([['', 'A18-SW01', '10.0.0.1'], ['Kept', 'FKEE-Lab', '10.0.0.2']])
+            os.chmod(path, 0o644)
+
+            self.assertEqual(fill_locations(path), 1)
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                self.assertEqual([row['location'] for row in csv.DictReader(f)], ['A18', 'Kept'])
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o644)
+
+            self.assertEqual(fill_locations(path, overwrite=True), 2)
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                self.assertEqual([row['location'] for row in csv.DictReader(f)], ['A18', 'FKEE'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import csv
-import re
+
+from hostmonitor.normalize import SWITCH_CSV_NAME
 
 # Read the extracted devices
 extracted_devices = []
@@ -11,30 +12,10 @@ with open('all_355_devices_complete.csv', 'r', encoding='utf-8') as f:
             'ip_address': row['ip_address']
         })
 
-# Clean up device names - remove "Ping:" suffixes and extra formatting
-ip_pattern = r'(\d+\.\d+\.\d+\.\d+)'
-
-for device in extracted_devices:
-    name = device['name']
-    
-    # Remove "Ping:" or "Ping" at the end
-    name = re.sub(r'\s+Ping:?\s*$', '', name, flags=re.IGNORECASE)
-    
-    # Remove trailing IP addresses
-    name = re.sub(r'\s+' + ip_pattern + r'$', '', name)
-    
-    # Remove HTML entities
-    name = name.replace('&amp;', '&')
-    name = name.replace('&lt;', '<')
-    name = name.replace('&gt;', '>')
-    
-    # Clean up whitespace
-    name = name.strip()
-    
-    # Remove trailing dots/ellipsis
-    name = re.sub(r'\.{2,}$', '', name)
-    name = name.rstrip('.')
-    
+# Clean up device names - remove "Ping:"/IP suffixes, HTML entities and
+# trailing dots/ellipsis in one batch
+names = SWITCH_CSV_NAME.apply_all(device['name'] for device in extracted_devices)
+for device, name in zip(extracted_devices, names):
     device['name'] = name
 
 # Sort by IP address
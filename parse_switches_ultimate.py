@@ -8,105 +8,102 @@ import re
 import json
 from datetime import datetime
 
+from hostmonitor import extract, normalize
+from hostmonitor.cache import DEFAULT_CACHE_PATH, ExtractionCache, code_version
+from hostmonitor.extract import FALLBACK_ENCODING, detect_encoding, iter_button_batches
+from hostmonitor.normalize import IP_ADDRESS, SWITCH_JSON_NAME, valid_ips
+
 def clean_name(name):
     """Clean switch name by removing HTML artifacts and standardizing"""
     
     if not name:
         return ""
     
-    # Remove HTML entities
-    name = name.replace('&amp;', '&')
-    
-    # Remove HTML tags
-    name = re.sub(r'<[^>]*>', '', name)
-    
-    # Remove everything after <br> tags
-    name = re.sub(r'<br[^>]*>.*$', '', name, flags=re.IGNORECASE)
-    
-    # Remove HTML entities
-    name = re.sub(r'&[a-zA-Z]+;', '', name)
-    
-    # Remove multiple spaces and trim
-    name = re.sub(r'\s+', ' ', name).strip()
-    
-    return name
+    return SWITCH_JSON_NAME.apply(name)
 
 def clean_ip(ip_address):
     """Clean IP address by removing HTML artifacts"""
     if not ip_address:
         return ""
     
-    # Remove HTML tags and artifacts from IP
-    ip = re.sub(r'<[^>]*>', '', ip_address)
-    ip = re.sub(r'<br[^>]*>.*$', '', ip, flags=re.IGNORECASE)
-    ip = ip.strip()
-    
-    # Validate IP format (basic check for x.x.x.x)
-    if re.match(r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$', ip):
-        return ip
-    
-    return ""
+    return valid_ips([IP_ADDRESS.apply(ip_address)])[0]
 
-def parse_switch_data(html_file_path):
-    """Parse switch data from the HTML file"""
-    
-    # Read the HTML file
-    with open(html_file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
+# Attribute forms that carry "name Ping: IP"
+TITLE_PING = re.compile(r"([^\"]*Ping:\s*([^\"]+))")
+VALUE_PING = re.compile(r"([^'\"]*Ping:\s*([^'\"]+))")
+HINT_PING = re.compile(r"javascript:showHint\('([^']*Ping:\s*([^'\"]+))[^']*'\)")
+
+SOURCES = [
+    ('title', TITLE_PING),
+    ('value', VALUE_PING),
+    ('onmouseover', HINT_PING),
+]
+
+def switch_hits(buttons):
+    """Cleaned [ip, name] per source attribute for each button (None if no hit)"""
+    
+    # Collect the raw hits of every source, then clean each source in one batch
+    raw = {attr: ([], [], []) for attr, _ in SOURCES}
+    for pos, button in enumerate(buttons):
+        for attr, pattern in SOURCES:
+            match = pattern.fullmatch(button.attrs.get(attr, ''))
+            if match:
+                positions, ips, names = raw[attr]
+                positions.append(pos)
+                ips.append(match.group(2))
+                # Name is everything before "Ping:"
+                names.append(match.group(1).split(' Ping:')[0].strip())
+    
+    hits = [None] * len(buttons)
+    for attr, (positions, ips, names) in raw.items():
+        cleaned = zip(positions, valid_ips(IP_ADDRESS.apply_all(ips)), SWITCH_JSON_NAME.apply_all(names))
+        for pos, clean_ip_addr, name in cleaned:
+            if hits[pos] is None:
+                hits[pos] = {}
+            hits[pos][attr] = [clean_ip_addr, name]
+    
+    return hits
+
+def _read_switch_hits(html_file_path, encoding):
+    records = []
+    for batch in iter_button_batches(html_file_path, encoding=encoding):
+        records.extend(hit for hit in switch_hits(batch) if hit)
+    return records
+
+def load_switch_hits(html_file_path, cache_path=None):
+    """Per-button hits in file order, from the extraction cache when given one"""
+    
+    if not cache_path:
+        try:
+            return _read_switch_hits(html_file_path, detect_encoding(html_file_path)), None
+        except UnicodeDecodeError:
+            # Non-ASCII text appeared after the sampled bytes
+            return _read_switch_hits(html_file_path, FALLBACK_ENCODING), None
+    
+    version = code_version(__file__, extract.__file__, normalize.__file__)
+    with ExtractionCache(cache_path, 'switches_json', version) as cache:
+        indexed, stats = cache.extract(html_file_path, switch_hits)
+    return [hit for _, hit in indexed], stats
+
+def build_switch_list(hits):
+    """Merge per-button hits into the sorted switch list"""
     
+    # Titles are the cleanest source, then values, then onmouseover hints
+    # (backup source)
     switches = {}
-    
-    # Pattern 1: Extract from title attribute (cleanest source)
-    pattern1 = r"title=\"([^\"]*Ping:\s*([^\"]+))\""
-    matches1 = re.findall(pattern1, content)
-    
-    for match in matches1:
-        title_text = match[0]
-        ip_address = match[1]
-        
-        # Clean the IP address
-        clean_ip_addr = clean_ip(ip_address)
-        
-        # Extract name from title text (everything before "Ping:")
-        name = clean_name(title_text.split(' Ping:')[0].strip())
-        
-        # Skip if no valid IP or name
-        if not clean_ip_addr or not name:
-            continue
+    for attr, _ in SOURCES:
+        for hit in hits:
+            if attr not in hit:
+                continue
+            clean_ip_addr, name = hit[attr]
             
-        # Use cleaned IP as key to avoid duplicates
-        if clean_ip_addr not in switches:
-            switches[clean_ip_addr] = {
-                'name': name,
-                'ip_address': clean_ip_addr,
-                'category': 'switch',
-                'status': 'unknown',
-                'location': '',
-                'brand': '',
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-    
-    # Pattern 2: Extract from value attribute (complete IPs only)
-    pattern2 = r"<input[^>]*value=['\"]([^'\"]*Ping:\s*([^'\"]+))['\"][^>]*>"
-    matches2 = re.findall(pattern2, content)
-    
-    for match in matches2:
-        full_value = match[0]
-        ip_address = match[1]
-        
-        # Clean the IP address
-        clean_ip_addr = clean_ip(ip_address)
-        
-        # Extract name (everything before "Ping:")
-        name = clean_name(full_value.split(' Ping:')[0].strip())
-        
-        # Skip if no valid IP, incomplete IP, or no name
-        if not clean_ip_addr or not name:
-            continue
+            # Skip if no valid IP, already have it, or no name (hints are
+            # accepted without one)
+            if not clean_ip_addr or clean_ip_addr in switches:
+                continue
+            if not name and attr != 'onmouseover':
+                continue
             
-        # Use cleaned IP as key to avoid duplicates
-        if clean_ip_addr not in switches:
             switches[clean_ip_addr] = {
                 'name': name,
                 'ip_address': clean_ip_addr,
@@ -118,42 +115,18 @@ def parse_switch_data(html_file_path):
                 'updated_at': datetime.now().isoformat()
             }
     
-    # Pattern 3: Extract from onmouseover (backup source)
-    pattern3 = r"onmouseover=\"javascript:showHint\('([^']*Ping:\s*([^'\"]+))[^']*'\)\""
-    matches3 = re.findall(pattern3, content)
-    
-    for match in matches3:
-        hint_text = match[0]
-        ip_address = match[1]
-        
-        # Clean the IP address
-        clean_ip_addr = clean_ip(ip_address)
-        
-        # Extract name from hint text (everything before "Ping:")
-        name = clean_name(hint_text.split(' Ping:')[0].strip())
-        
-        # Skip if no valid IP or already have it
-        if not clean_ip_addr or clean_ip_addr in switches:
-            continue
-            
-        # Use cleaned IP as key to avoid duplicates
-        switches[clean_ip_addr] = {
-            'name': name,
-            'ip_address': clean_ip_addr,
-            'category': 'switch',
-            'status': 'unknown',
-            'location': '',
-            'brand': '',
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        }
-    
     # Convert to list and sort
     switch_list = list(switches.values())
     switch_list.sort(key=lambda x: (x['name'], x['ip_address']))
     
     return switch_list
 
+def parse_switch_data(html_file_path, cache_path=None):
+    """Parse switch data from the HTML file"""
+    
+    hits, _ = load_switch_hits(html_file_path, cache_path)
+    return build_switch_list(hits)
+
 def main():
     """Main function to parse and save switch data"""
     
@@ -161,8 +134,9 @@ def main():
     output_file = 'database/seeders/data/switches.json'
     
     try:
-        # Parse the switch data
-        switches = parse_switch_data(input_file)
+        # Parse the switch data, reusing unchanged buttons from the cache
+        hits, cache_stats = load_switch_hits(input_file, DEFAULT_CACHE_PATH)
+        switches = build_switch_list(hits)
         
         # Save to JSON file
         with open(output_file, 'w', encoding='utf-8') as file:
@@ -171,6 +145,11 @@ def main():
         # Print summary
         print(f"✅ Successfully parsed {len(switches)} unique switches from {input_file}")
         print(f"📁 Data saved to {output_file}")
+        if cache_stats['file_hit']:
+            print("♻️  Export unchanged, served from the extraction cache")
+        else:
+            print(f"♻️  Cache hit ratio: {cache_stats['hit_ratio']:.1%} "
+                  f"({cache_stats['block_hits']}/{cache_stats['blocks']} tags reused)")
         print("\n📊 Summary:")
         print(f"   Total unique switches: {len(switches)}")
         
@@ -75,6 +75,11 @@
             ]);
         }
 
+        // With the probe daemon running the whole sweep is one round-trip, answer synchronously
+        if ((new \App\Services\IcmpProbeService())->daemonListening()) {
+            return app(\App\Http\Controllers\Api\MonitoringController::class)->pingAllDevices();
+        }
+
         // Dispatch main job which will create batch jobs
         \App\Jobs\PingAllDevicesJob::dispatch();
         
@@ -1,27 +1,64 @@
 # PowerShell script to start multiple queue workers for faster ping processing
 # This will run 4 workers in parallel for maximum speed
+#
+# With -Sharded it starts devices:probe-shard workers instead: active devices are
+# split across every shard worker on every box by consistent hash of device ID,
+# and one collector writes their results to the database. Run it on each box;
+# pass -NoCollector on all boxes but one.
+#   .\start_ping_workers.ps1 -Sharded -Workers 4
+#   .\start_ping_workers.ps1 -Sharded -Workers 4 -NoCollector   # additional boxes
+
+param(
+    [int]$Workers = 4,
+    [switch]$Sharded,
+    [switch]$NoCollector
+)
 
 Write-Host "🚀 Starting Multiple Queue Workers for Fast Ping Processing" -ForegroundColor Green
 Write-Host "=" * 60
 
-$workerCount = 4
+$workerCount = $Workers
 $jobs = @()
 
 Write-Host "`n📊 Configuration:" -ForegroundColor Cyan
 Write-Host "   Workers: $workerCount"
-Write-Host "   Queue: default"
-Write-Host "   Tries: 1 (no retries)"
+if ($Sharded) {
+    Write-Host "   Mode: sharded probing (devices:probe-shard)"
+    Write-Host "   Collector: $(if ($NoCollector) { 'on another box' } else { 'this box (queue: collector)' })"
+} else {
+    Write-Host "   Queue: default"
+    Write-Host "   Tries: 1 (no retries)"
+}
 Write-Host ""
 
+# The single collector that writes shard results to the database
+if ($Sharded -and -not $NoCollector) {
+    Write-Host "✅ Starting Collector..." -ForegroundColor Green
+    $jobs += Start-Job -ScriptBlock {
+        Set-Location $using:PWD
+        php artisan queue:work --queue=collector --name="collector"
+    }
+    Start-Sleep -Milliseconds 500
+}
+
 # Start workers
 for ($i = 1; $i -le $workerCount; $i++) {
     Write-Host "✅ Starting Worker #$i..." -ForegroundColor Green
     
-    $job = Start-Job -ScriptBlock {
-        param($workerId)
-        Set-Location $using:PWD
-        php artisan queue:work --queue=default --tries=1 --name="worker-$workerId"
-    } -ArgumentList $i
+    if ($Sharded) {
+        # Worker ids must be unique across boxes and stable across restarts
+        $job = Start-Job -ScriptBlock {
+            param($workerId)
+            Set-Location $using:PWD
+            php artisan devices:probe-shard --worker="$env:COMPUTERNAME-$workerId"
+        } -ArgumentList $i
+    } else {
+        $job = Start-Job -ScriptBlock {
+            param($workerId)
+            Set-Location $using:PWD
+            php artisan queue:work --queue=default --tries=1 --name="worker-$workerId"
+        } -ArgumentList $i
+    }
     
     $jobs += $job
     Start-Sleep -Milliseconds 500
@@ -0,0 +1,11 @@
+<?php
+
+test('the current month cannot be archived', function () {
+    $this->artisan('monitoring:archive', ['--month' => now()->format('Y-m')])
+        ->expectsOutputToContain('is not complete yet')
+        ->assertFailed();
+});
+
+test('a malformed month is rejected', function () {
+    $this->artisan('monitoring:archive', ['--month' => '2025-13'])->assertFailed();
+});
@@ -0,0 +1,72 @@
+<?php
+
+use App\Helpers\LatencyStats;
+use App\Services\DeviceStatusWriter;
+use Carbon\Carbon;
+
+test('a sweep updates statuses and transition timestamps in bulk', function () {
+    $before = Carbon::parse('2025-12-10 11:00:00');
+    $now = Carbon::parse('2025-12-10 12:00:00');
+
+    $goingDown = monitoredDevice(['status' => 'online', 'online_since' => $before]);
+    $comingUp = monitoredDevice(['status' => 'offline', 'offline_since' => $before, 'offline_alert_sent' => true]);
+    $recovering = monitoredDevice(['status' => 'warning', 'online_since' => $before]);
+
+    $updated = (new DeviceStatusWriter())->write([
+        ['device_id' => $goingDown->id, 'status' => 'offline', 'response_time' => null],
+        ['device_id' => $comingUp->id, 'status' => 'online', 'response_time' => 12.0, 'stats' => LatencyStats::fromRtts([10.0, 14.0], 3)],
+        ['device_id' => $recovering->id, 'status' => 'online', 'response_time' => 8.5],
+    ], $now);
+
+    expect($updated)->toBe(3);
+
+    $goingDown->refresh();
+    expect($goingDown->status)->toBe('offline')
+        ->and($goingDown->previous_status)->toBe('online')
+        ->and($goingDown->offline_since->toDateTimeString())->toBe($now->toDateTimeString())
+        ->and($goingDown->online_since)->toBeNull()
+        ->and($goingDown->last_status_change->toDateTimeString())->toBe($now->toDateTimeString());
+
+    $comingUp->refresh();
+    expect($comingUp->status)->toBe('online')
+        ->and($comingUp->previous_status)->toBe('offline')
+        ->and($comingUp->online_since->toDateTimeString())->toBe($now->toDateTimeString())
+        ->and($comingUp->offline_since)->toBeNull()
+        ->and($comingUp->offline_alert_sent)->toBeFalse()
+        ->and((float) $comingUp->response_time)->toBe(12.0)
+        ->and((float) $comingUp->jitter)->toBe(2.0)
+        ->and($comingUp->packet_loss)->toBe(33);
+
+    // warning -> online stays on the up side: only the status change is recorded
+    $recovering->refresh();
+    expect($recovering->status)->toBe('online')
+        ->and($recovering->previous_status)->toBe('warning')
+        ->and($recovering->online_since->toDateTimeString())->toBe($before->toDateTimeString())
+        ->and((float) $recovering->response_time)->toBe(8.5);
+});
+
+test('an unchanged status leaves the transition columns alone across chunks', function () {
+    config(['monitoring.performance.status_write_chunk' => 1]);
+    $before = Carbon::parse('2025-12-10 11:00:00');
+    $now = Carbon::parse('2025-12-10 12:00:00');
+
+    $devices = [
+        monitoredDevice(['status' => 'online', 'online_since' => $before, 'last_status_change' => $before]),
+        monitoredDevice(['status' => 'offline', 'offline_since' => $before, 'last_status_change' => $before]),
+    ];
+
+    $updated = (new DeviceStatusWriter())->write([
+        ['id' => $devices[0]->id, 'status' => 'online', 'response_time' => 5.0, 'timestamp' => $now],
+        ['id' => $devices[1]->id, 'status' => 'offline', 'response_time' => null, 'timestamp' => $now],
+    ], $now);
+
+    expect($updated)->toBe(2);
+
+    foreach ($devices as $device) {
+        $device->refresh();
+        expect($device->last_status_change->toDateTimeString())->toBe($before->toDateTimeString())
+            ->and($device->last_ping->toDateTimeString())->toBe($now->toDateTimeString());
+    }
+    expect($devices[0]->online_since->toDateTimeString())->toBe($before->toDateTimeString())
+        ->and($devices[1]->offline_since->toDateTimeString())->toBe($before->toDateTimeString());
+});
@@ -0,0 +1,69 @@
+<?php
+
+use App\Services\MonitoringArchiveService;
+use App\Services\MonitoringRollupService;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\File;
+
+beforeEach(function () {
+    $this->archivePath = sys_get_temp_dir() . '/monitoring-archive-' . uniqid();
+    config(['monitoring.archive.path' => $this->archivePath]);
+});
+
+afterEach(function () {
+    File::deleteDirectory($this->archivePath);
+});
+
+test('an archived month reads back the same totals', function () {
+    $up = monitoredDevice();
+    $flapping = monitoredDevice();
+    $down = monitoredDevice();
+    $month = now()->subMonthNoOverflow()->startOfMonth();
+
+    $bucket = fn($device, $hours, $checks, $online, $down, $rttCount, $rttSum, $transitions = 0) => [
+        'device_id' => $device->id,
+        'resolution' => 'hour',
+        'bucket_start' => $month->copy()->addHours($hours),
+        'checks' => $checks,
+        'online_checks' => $online,
+        'down_checks' => $down,
+        'transitions' => $transitions,
+        'rtt_count' => $rttCount,
+        'rtt_sum' => $rttSum,
+        'rtt_min' => $rttCount ? $rttSum / $rttCount : null,
+        'rtt_max' => $rttCount ? $rttSum / $rttCount : null,
+    ];
+    DB::table(MonitoringRollupService::TABLE)->insert([
+        $bucket($up, 0, 12, 12, 0, 12, 120.0),
+        $bucket($up, 1, 12, 12, 0, 12, 240.0),
+        $bucket($flapping, 0, 12, 6, 6, 6, 90.0, 2),
+        $bucket($flapping, 30, 12, 12, 0, 12, 60.0, 1),
+        $bucket($down, 5, 12, 0, 12, 0, 0.0),
+    ]);
+
+    $archive = new MonitoringArchiveService();
+    expect($archive->archive($month))->toBe(5)
+        ->and(file_exists($archive->file($month)))->toBeTrue();
+
+    $totals = $archive->totals(null, $month, $month->copy()->addMonth());
+    expect($totals->keys()->sort()->values()->all())->toBe([$up->id, $flapping->id, $down->id]);
+
+    expect((array) $totals[$up->id])->toEqual([
+        'checks' => 24, 'online_checks' => 24, 'down_checks' => 0, 'transitions' => 0,
+        'rtt_count' => 24, 'rtt_sum' => 360.0, 'rtt_min' => 10.0, 'rtt_max' => 20.0,
+    ]);
+    expect((array) $totals[$flapping->id])->toEqual([
+        'checks' => 24, 'online_checks' => 18, 'down_checks' => 6, 'transitions' => 3,
+        'rtt_count' => 18, 'rtt_sum' => 150.0, 'rtt_min' => 5.0, 'rtt_max' => 15.0,
+    ]);
+    expect((array) $totals[$down->id])->toEqual([
+        'checks' => 12, 'online_checks' => 0, 'down_checks' => 12, 'transitions' => 0,
+        'rtt_count' => 0, 'rtt_sum' => 0.0, 'rtt_min' => null, 'rtt_max' => null,
+    ]);
+
+    // Ranges inside the month only count the buckets they cover
+    $firstHour = $archive->totals([$flapping->id], $month, $month->copy()->addHour());
+    expect($firstHour->keys()->all())->toBe([$flapping->id])
+        ->and($firstHour[$flapping->id]->checks)->toBe(12)
+        ->and($firstHour[$flapping->id]->online_checks)->toBe(6);
+});
@@ -0,0 +1,100 @@
+<?php
+
+use App\Models\DeviceStatusInterval;
+use App\Services\MonitoringRollupService;
+use App\Services\StatusIntervalService;
+use Illuminate\Support\Facades\DB;
+
+function intervalSample($device, $status, $at, $rtt = null): array
+{
+    return ['device_id' => $device->id, 'status' => $status, 'response_time' => $rtt, 'timestamp' => $at];
+}
+
+test('a sample with the same status extends the open interval', function () {
+    $device = monitoredDevice();
+    $start = now()->startOfHour();
+    $service = new StatusIntervalService();
+
+    $service->record([intervalSample($device, 'online', $start, 10.0)]);
+    $service->record([intervalSample($device, 'online', $start->copy()->addMinute(), 20.0)]);
+    $service->record([intervalSample($device, 'online', $start->copy()->addMinutes(2))]);
+
+    $intervals = DeviceStatusInterval::where('device_id', $device->id)->get();
+    expect($intervals)->toHaveCount(1);
+
+    $interval = $intervals->first();
+    expect($interval->is_open)->toBeTrue()
+        ->and($interval->samples)->toBe(3)
+        ->and($interval->rtt_samples)->toBe(2)
+        ->and((float) $interval->rtt_min)->toBe(10.0)
+        ->and((float) $interval->rtt_max)->toBe(20.0)
+        ->and((float) $interval->rtt_sum)->toBe(30.0)
+        ->and($interval->started_at->toDateTimeString())->toBe($start->toDateTimeString())
+        ->and($interval->ended_at->toDateTimeString())->toBe($start->copy()->addMinutes(2)->toDateTimeString());
+});
+
+test('a status change closes the interval at the new sample and opens the next', function () {
+    $device = monitoredDevice();
+    $start = now()->startOfHour();
+    $changedAt = $start->copy()->addMinutes(2);
+    $service = new StatusIntervalService();
+
+    $service->record([intervalSample($device, 'online', $start, 10.0)]);
+    $service->record([intervalSample($device, 'offline', $changedAt)]);
+
+    [$closed, $opened] = DeviceStatusInterval::where('device_id', $device->id)->orderBy('started_at')->get()->all();
+    expect($closed->is_open)->toBeFalse()
+        ->and($closed->ended_at->toDateTimeString())->toBe($changedAt->toDateTimeString())
+        ->and($opened->is_open)->toBeTrue()
+        ->and($opened->status)->toBe('offline')
+        ->and($opened->previous_status)->toBe('online')
+        ->and($opened->started_at->toDateTimeString())->toBe($changedAt->toDateTimeString());
+
+    expect($service->incidentCount([$device->id], $start))->toBe(1);
+});
+
+test('a sample after more than max_gap starts a new interval', function () {
+    config(['monitoring.history.max_gap' => 900]);
+    $device = monitoredDevice();
+    $start = now()->startOfHour();
+    $resumedAt = $start->copy()->addSeconds(901);
+    $service = new StatusIntervalService();
+
+    $service->record([intervalSample($device, 'online', $start, 10.0)]);
+    $service->record([intervalSample($device, 'online', $resumedAt, 12.0)]);
+
+    [$closed, $opened] = DeviceStatusInterval::where('device_id', $device->id)->orderBy('started_at')->get()->all();
+
+    // The old interval keeps its last sample as its end; nothing is claimed for the gap
+    expect($closed->is_open)->toBeFalse()
+        ->and($closed->ended_at->toDateTimeString())->toBe($start->toDateTimeString())
+        ->and($opened->is_open)->toBeTrue()
+        ->and($opened->previous_status)->toBe('online')
+        ->and($opened->started_at->toDateTimeString())->toBe($resumedAt->toDateTimeString());
+});
+
+test('a sample older than the open interval is ignored', function () {
+    $device = monitoredDevice();
+    $start = now()->startOfHour();
+    $service = new StatusIntervalService();
+
+    $service->record([intervalSample($device, 'online', $start->copy()->addMinutes(2), 10.0)]);
+    // A late shard result from before the last recorded sample
+    $service->record([intervalSample($device, 'offline', $start->copy()->addMinute())]);
+
+    $intervals = DeviceStatusInterval::where('device_id', $device->id)->get();
+    expect($intervals)->toHaveCount(1);
+
+    $interval = $intervals->first();
+    expect($interval->status)->toBe('online')
+        ->and($interval->is_open)->toBeTrue()
+        ->and($interval->samples)->toBe(1)
+        ->and($interval->ended_at->toDateTimeString())->toBe($start->copy()->addMinutes(2)->toDateTimeString());
+
+    // Nor does it reach the rollups
+    $checks = DB::table(MonitoringRollupService::TABLE)
+        ->where('device_id', $device->id)
+        ->where('resolution', 'hour')
+        ->sum('checks');
+    expect((int) $checks)->toBe(1);
+});
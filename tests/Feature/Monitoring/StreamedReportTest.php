@@ -0,0 +1,27 @@
+<?php
+
+test('a streamed uptime report counts devices by category in its summary', function () {
+    $first = monitoredDevice(['category' => 'switches']);
+    monitoredDevice(['category' => 'switches', 'branch_id' => $first->branch_id]);
+    monitoredDevice(['category' => 'cctv', 'branch_id' => $first->branch_id]);
+
+    $response = $this->get('/api/reports/generate?' . http_build_query([
+        'branch_id' => $first->branch_id,
+        'report_type' => 'uptime',
+        'format' => 'csv',
+        'start_date' => now()->subDay()->toDateTimeString(),
+        'end_date' => now()->subMinute()->toDateTimeString(),
+        'categories' => ['switches', 'cctv'],
+    ]));
+
+    $response->assertOk();
+    $lines = explode("\r\n", $response->streamedContent());
+    $summary = array_slice($lines, array_search('Summary', $lines));
+
+    expect($summary)->toContain('Total Devices,3')
+        ->and($summary)->toContain('Devices By Category (Switches),2')
+        ->and($summary)->toContain('Devices By Category (CCTV),1');
+
+    preg_match('/filename="([^"]+)"/', $response->headers->get('Content-Disposition'), $match);
+    @unlink(storage_path("app/reports/{$match[1]}"));
+});
@@ -0,0 +1,31 @@
+<?php
+
+use App\Services\StatusIntervalService;
+use App\Services\UptimeWindowService;
+use Illuminate\Support\Facades\DB;
+
+test('samples leave the 24h window when their rollup bucket expires', function () {
+    config(['monitoring.analytics.aggregation_interval' => 5]);
+    $device = monitoredDevice();
+    $start = now()->startOfHour()->subDay();
+    $intervals = new StatusIntervalService();
+    $windows = new UptimeWindowService();
+
+    $intervals->record([['device_id' => $device->id, 'status' => 'online', 'response_time' => 10.0, 'timestamp' => $start]]);
+    $intervals->record([['device_id' => $device->id, 'status' => 'offline', 'timestamp' => $start->copy()->addMinutes(5)]]);
+
+    expect($windows->uptime([$device->id])[$device->id])->toBe(['24h' => 50.0, '7d' => 50.0, '30d' => 50.0]);
+
+    // A day later the first five-minute bucket has left the 24h window, but not the others
+    $later = $start->copy()->addDay()->addMinute();
+    expect($windows->advance($later))->toBeGreaterThan(0)
+        ->and($windows->uptime([$device->id])[$device->id])->toBe(['24h' => 0.0, '7d' => 50.0, '30d' => 50.0]);
+
+    // Sliding the counters agrees with recounting them from the rollups
+    $slid = (array) DB::table(UptimeWindowService::TABLE)->where('device_id', $device->id)->first();
+    $windows->rebuild($later);
+    expect((array) DB::table(UptimeWindowService::TABLE)->where('device_id', $device->id)->first())->toEqual($slid);
+
+    $windows->advance($start->copy()->addDay()->addMinutes(6));
+    expect($windows->uptime([$device->id])[$device->id]['24h'])->toBeNull();
+});
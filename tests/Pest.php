@@ -45,3 +45,26 @@ function something()
 {
     // ..
 }
+
+/**
+ * An active device in a fresh branch, for the monitoring services' tests
+ */
+function monitoredDevice(array $attributes = []): App\Models\Device
+{
+    static $sequence = 0;
+    $sequence++;
+
+    $branch = App\Models\Branch::create([
+        'name' => "Branch {$sequence}",
+        'code' => "BR{$sequence}",
+    ]);
+
+    return App\Models\Device::create($attributes + [
+        'branch_id' => $branch->id,
+        'name' => "Device {$sequence}",
+        'ip_address' => "10.0.0.{$sequence}",
+        'barcode' => "DEV{$sequence}",
+        'status' => 'online',
+        'is_active' => true,
+    ]);
+}
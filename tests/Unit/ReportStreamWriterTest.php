@@ -0,0 +1,41 @@
+<?php
+
+use App\Services\ReportStreamWriter;
+
+test('a streamed xlsx report is a valid zip workbook', function () {
+    $sink = tmpfile();
+    $writer = new ReportStreamWriter('xlsx', [$sink]);
+
+    $writer->startSheet('Summary', ['metric' => 'Metric', 'value' => 'Value']);
+    $writer->writeRow(['metric' => 'Total Devices', 'value' => 3]);
+    $writer->startSheet('Uptime: Devices', ['name' => 'Device', 'uptime' => 'Uptime %', 'online' => 'Online']);
+    $writer->writeRow(['name' => 'Core <switch> & "router"', 'uptime' => 99.5, 'online' => true]);
+    $writer->writeRow(['name' => 'Edge', 'uptime' => null]);
+    $writer->finish();
+
+    $path = stream_get_meta_data($sink)['uri'];
+    $zip = new ZipArchive();
+    expect($zip->open($path, ZipArchive::CHECKCONS))->toBeTrue();
+
+    foreach (['[Content_Types].xml', '_rels/.rels', 'xl/workbook.xml', 'xl/_rels/workbook.xml.rels', 'xl/styles.xml', 'xl/worksheets/sheet1.xml', 'xl/worksheets/sheet2.xml'] as $part) {
+        // getFromName checks each entry's CRC against the data descriptor
+        expect($zip->getFromName($part))->toBeString();
+    }
+
+    $workbook = simplexml_load_string($zip->getFromName('xl/workbook.xml'));
+    $names = array_map(fn($sheet) => (string) $sheet['name'], iterator_to_array($workbook->sheets->sheet, false));
+    expect($names)->toBe(['Summary', 'Uptime  Devices']);
+
+    $sheet = $zip->getFromName('xl/worksheets/sheet2.xml');
+    expect(simplexml_load_string($sheet))->not->toBeFalse()
+        ->and($sheet)->toContain('Core &lt;switch&gt; &amp; &quot;router&quot;')
+        ->and($sheet)->toContain('<v>99.5</v>')
+        ->and($sheet)->toContain('<c t="b"><v>1</v></c>');
+
+    $zip->close();
+    fclose($sink);
+})->skip(! class_exists(ZipArchive::class), 'ext-zip is not installed');
+
+test('unsupported formats are rejected', function () {
+    new ReportStreamWriter('pdf', []);
+})->throws(InvalidArgumentException::class);